@@ -1,15 +1,35 @@
 from fastapi import FastAPI, File, UploadFile, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from groq import Groq
 import uvicorn
+import asyncio
 import logging
-import json
 import os
-from typing import List, Dict, Optional, Tuple
+import time
+import uuid
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from datetime import datetime
 from dotenv import load_dotenv
 
+from analyzer.prompts import (
+    TOPIC_PROMPT, SENTIMENT_PROMPT, SENTIMENT_FEW_SHOT_EXAMPLES, INTENT_PROMPT, DECODE_RETRY_PROMPT
+)
+from analyzer.batching import BATCH_MODE, classify_utterances_batched
+from analyzer.backends import LLMBackend
+from analyzer.breaker import CircuitOpenError
+from analyzer.cascade import ESCALATABLE_SOURCES, TIER_LARGE, TIER_LOCAL, TIER_SMALL, cascade, summarize_tiers
+from analyzer.cache import llm_cache, make_cache_key
+from analyzer.deadline import Deadline
+from analyzer.distilled import distilled_classifier
+from analyzer.decoding import LLM_DECODE_RETRIES, DecodeError, decode_response, decode_stats
+from analyzer.gateway import gateway, models_used, record_calls, summarize_calls
+from analyzer.keywords import get_matcher
+from analyzer.microbatch import microbatcher
+from analyzer.preclassifier import preclassify
+from analyzer.semantic_cache import semantic_cache
+from analyzer.topics import reduce_topic_results, split_topic_chunks
+from analyzer.transcript import iter_speaker_utterances
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -35,49 +55,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Groq client
-try:
-    groq_api_key = os.getenv("GROQ_API_KEY")
-    if not groq_api_key:
-        raise ValueError("GROQ_API_KEY not found in environment variables")
-    client = Groq(api_key=groq_api_key)
-    logger.info("Groq client initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize Groq client: {str(e)}")
-    client = None
-
+# Maximum number of in-flight LLM calls (topic, sentiment and intent) per analysis
+ANALYZER_CONCURRENCY = int(os.getenv("ANALYZER_CONCURRENCY", "8"))
 
-def extract_speaker_utterances(text: str) -> List[Tuple[str, str]]:
-    """Enhanced speaker utterance extraction with better error handling"""
-    try:
-        lines = text.strip().split("\n")
-        utterances = []
+# Agent scoring: resolution score by final customer sentiment (professional language markers are
+# the "professional" lexicon in analyzer.keywords)
+RESOLUTION_SCORES = {
+    'extreme positive': 95,
+    'positive': 80,
+    'neutral': 60,
+    'negative': 25,
+    'extreme negative': 10
+}
 
-        for line_num, line in enumerate(lines, 1):
-            line = line.strip()
-            if not line:
-                continue
+# All LLM calls go through the process-wide gateway (rate limiting, pooling, retries)
+if not gateway.available:
+    logger.error("GROQ_API_KEY not found in environment variables; LLM analysis is unavailable")
 
-            if ":" in line:
-                parts = line.split(":", 1)
-                if len(parts) == 2:
-                    speaker, message = parts
-                    speaker = speaker.strip()
-                    message = message.strip()
-
-                    if speaker and message:
-                        # Standardize speaker names
-                        if any(word in speaker.lower() for word in ['agent', 'support', 'rep', 'staff']):
-                            speaker = "Agent"
-                        elif any(word in speaker.lower() for word in ['customer', 'client', 'user', 'caller']):
-                            speaker = "Customer"
-
-                        utterances.append((speaker, message))
-                    else:
-                        logger.warning(f"Empty speaker or message on line {line_num}: {line}")
-            else:
-                logger.warning(f"No speaker delimiter found on line {line_num}: {line}")
 
+def extract_speaker_utterances(text: str) -> List[Tuple[str, str]]:
+    """Speaker utterances from a transcript (see analyzer.transcript for the streaming parser)"""
+    try:
+        utterances = list(iter_speaker_utterances(text))
         logger.info(f"Extracted {len(utterances)} utterances from conversation")
         return utterances
 
@@ -86,47 +85,80 @@ def extract_speaker_utterances(text: str) -> List[Tuple[str, str]]:
         return []
 
 
-def detect_topics(text: str) -> Dict:
-    """Enhanced topic detection using LLM"""
+async def request_structured(kind: str, messages: List[Dict], semaphore: asyncio.Semaphore,
+                             model: Optional[str] = None, backend: Optional[LLMBackend] = None,
+                             stage: Optional[str] = None) -> Dict:
+    """
+    One sentiment, intent or topic call, decoded and repaired locally by analyzer.decoding.
+    Only a response that cannot be repaired is re-requested (up to LLM_DECODE_RETRIES times), with
+    the rejected reply and the reason it failed; raises DecodeError if the retries fail too.
+    model and backend default to the gateway's chat model and backend; stage defaults to kind.
+    """
+    stage = stage or kind
+    attempt = 0
+    while True:
+        async with semaphore:
+            response = await gateway.chat(
+                stage=stage if attempt == 0 else f"{stage}_retry",
+                backend=backend,
+                model=model or gateway.chat_model,
+                messages=messages,
+                response_format={"type": "json_object"},
+                temperature=0.2
+            )
+        content = response.choices[0].message.content
+        try:
+            return decode_response(kind, content)
+        except DecodeError as e:
+            if attempt >= LLM_DECODE_RETRIES:
+                raise
+            attempt += 1
+            decode_stats.record(kind, "re_requested")
+            logger.warning(f"Re-requesting {kind} classification: {str(e)}")
+            messages = messages + [
+                {"role": "assistant", "content": content or ""},
+                {"role": "user", "content": DECODE_RETRY_PROMPT.format(error=str(e))}
+            ]
+
+
+async def classify_topic_text(text: str, semaphore: asyncio.Semaphore) -> Dict:
+    """One topic classification call (cached); raises on failure"""
+    cache_key = make_cache_key("topic", text, TOPIC_PROMPT, None, gateway.chat_model, 0.2)
+    cached = await llm_cache.get_async(cache_key)
+    if cached is not None:
+        return cached
+
+    if not gateway.available:
+        return {"topics": ["general"], "primary_topic": "general", "confidence": 0.5}
+
+    result = await request_structured("topic", [
+        {"role": "system", "content": TOPIC_PROMPT},
+        {"role": "user", "content": f"Conversation text: {text}"}
+    ], semaphore)
+    await llm_cache.set_async(cache_key, "topic", gateway.chat_model, result)
+    return result
+
+
+async def detect_topics_async(text: str, semaphore: Optional[asyncio.Semaphore] = None) -> Dict:
+    """
+    Enhanced topic detection using LLM. Conversations too long for one prompt are split into
+    token-bounded chunks that are classified concurrently and merged by reduce_topic_results.
+    """
     try:
-        if not client:
-            return {"topics": ["general"], "primary_topic": "general", "confidence": 0.5}
-
-        topic_prompt = """
-        You are an expert topic classifier for customer service conversations.
-
-        Analyze the conversation and identify relevant topics from these categories:
-        - "billing": payment issues, charges, invoices, refunds
-        - "technical_support": software/hardware problems, troubleshooting, setup
-        - "product_inquiry": questions about features, specifications, availability
-        - "account_management": login issues, profile changes, account settings
-        - "shipping": delivery, tracking, shipping methods, delays
-        - "returns_exchanges": product returns, exchanges, warranty claims
-        - "complaint": service issues, dissatisfaction, negative experiences
-        - "compliment": praise, positive feedback, satisfaction
-        - "general_inquiry": general questions, information requests
-        - "cancellation": service termination, subscription cancellation
-
-        Return ONLY in this exact JSON format:
-        {
-            "topics": ["list", "of", "relevant", "topics"],
-            "primary_topic": "most_relevant_topic",
-            "confidence": 0.85,
-            "reasoning": "Brief explanation of topic classification"
-        }
-        """
-
-        response = client.chat.completions.create(
-            model="llama3-8b-8192",
-            messages=[
-                {"role": "system", "content": topic_prompt},
-                {"role": "user", "content": f"Conversation text: {text}"}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.2
-        )
-
-        result = json.loads(response.choices[0].message.content)
+        chunks = split_topic_chunks(text)
+        semaphore = semaphore or asyncio.Semaphore(1 if len(chunks) == 1 else ANALYZER_CONCURRENCY)
+        if len(chunks) == 1:
+            result = await classify_topic_text(text, semaphore)
+        else:
+            chunk_results = await asyncio.gather(*(classify_topic_text(chunk, semaphore) for chunk, _ in chunks),
+                                                 return_exceptions=True)
+            for error in (r for r in chunk_results if isinstance(r, Exception)):
+                logger.warning(f"Topic detection failed for a conversation chunk: {str(error)}")
+            result = reduce_topic_results([(None if isinstance(r, Exception) else r, tokens)
+                                           for r, (_, tokens) in zip(chunk_results, chunks)])
+            if result is None:
+                raise RuntimeError(f"all {len(chunks)} conversation chunks failed")
+
         logger.info(f"Topic detection successful: {result.get('primary_topic', 'unknown')}")
         return result
 
@@ -140,6 +172,11 @@ def detect_topics(text: str) -> Dict:
         }
 
 
+def detect_topics(text: str) -> Dict:
+    """Synchronous wrapper around detect_topics_async"""
+    return asyncio.run(detect_topics_async(text))
+
+
 def normalize_sentiment_score(sentiment_label: str, raw_score: float) -> float:
     """Normalize sentiment score to match the sentiment label"""
     sentiment_label = sentiment_label.lower()
@@ -204,9 +241,12 @@ def calculate_csat_score(utterances: List[Dict]) -> Dict:
 
         # Additional analysis for context
         sentiment_distribution = {}
+        source_distribution = {}
         for utterance in customer_utterances:
             sentiment = utterance.get('sentiment', 'neutral')
             sentiment_distribution[sentiment] = sentiment_distribution.get(sentiment, 0) + 1
+            source = utterance.get('analysis_source', 'llm')
+            source_distribution[source] = source_distribution.get(source, 0) + 1
 
         return {
             "csat_score": round(csat_score, 1),
@@ -215,6 +255,7 @@ def calculate_csat_score(utterances: List[Dict]) -> Dict:
                            f"bias and normalization",
             "customer_utterances_count": len(customer_utterances),
             "sentiment_distribution": sentiment_distribution,
+            "source_distribution": source_distribution,
             "final_customer_sentiment": customer_utterances[-1].get('sentiment',
                                                                     'neutral') if customer_utterances else 'none'
         }
@@ -224,7 +265,7 @@ def calculate_csat_score(utterances: List[Dict]) -> Dict:
         return {"csat_score": 0, "csat_rating": "Error", "methodology": f"Error: {str(e)}"}
 
 
-def calculate_agent_performance(utterances: List[Dict]) -> Dict:
+def calculate_agent_performance(utterances: List[Dict], domain: Optional[str] = None) -> Dict:
     """Calculate comprehensive agent performance metrics"""
     try:
         agent_utterances = [u for u in utterances if u.get('speaker', '').lower() == 'agent']
@@ -244,15 +285,9 @@ def calculate_agent_performance(utterances: List[Dict]) -> Dict:
         avg_agent_sentiment = sum(agent_normalized_scores) / len(agent_normalized_scores)
 
         # 2. Response quality indicators (professional keywords)
-        positive_keywords = ['help', 'assist', 'solve', 'resolve', 'understand', 'sorry', 'apologize',
-                             'thank', 'please', 'certainly', 'absolutely', 'definitely', 'glad', 'happy',
-                             'everything', 'right', 'fix', 'support']
-        professional_responses = 0
-
-        for utterance in agent_utterances:
-            text = utterance.get('sentence', '').lower()
-            if any(keyword in text for keyword in positive_keywords):
-                professional_responses += 1
+        matcher = get_matcher(domain)
+        professional_responses = sum(1 for utterance in agent_utterances
+                                     if matcher.contains(utterance.get('sentence', ''), "professional"))
 
         professionalism_score = (professional_responses / len(agent_utterances)) * 100
 
@@ -283,17 +318,8 @@ def calculate_agent_performance(utterances: List[Dict]) -> Dict:
         resolution_score = 50  # Default neutral
         if customer_utterances:
             final_customer_sentiment = customer_utterances[-1].get('sentiment', 'neutral')
-
-            if final_customer_sentiment == 'extreme positive':
-                resolution_score = 95
-            elif final_customer_sentiment == 'positive':
-                resolution_score = 80
-            elif final_customer_sentiment == 'neutral':
-                resolution_score = 60
-            elif final_customer_sentiment == 'negative':
-                resolution_score = 25
-            else:  # extreme negative
-                resolution_score = 10
+            # Anything else, including extreme negative, counts as unresolved
+            resolution_score = RESOLUTION_SCORES.get(final_customer_sentiment, 10)
 
         # 5. Calculate overall performance score with balanced weighting
         agent_component = avg_agent_sentiment * 100 * 0.30  # Agent professionalism (30%)
@@ -340,170 +366,455 @@ def calculate_agent_performance(utterances: List[Dict]) -> Dict:
         return {"error": f"Performance calculation failed: {str(e)}"}
 
 
-def analyze_sentences(text: str, domain: Optional[str] = None) -> Dict:
-    """Enhanced sentence analysis with comprehensive error handling"""
+def sentiment_cache_key(sentence: str, model: Optional[str] = None) -> str:
+    return make_cache_key("sentiment", sentence, SENTIMENT_PROMPT, SENTIMENT_FEW_SHOT_EXAMPLES,
+                          model or gateway.chat_model, 0.2)
+
+
+def intent_cache_key(sentence: str, model: Optional[str] = None) -> str:
+    return make_cache_key("intent", sentence, INTENT_PROMPT, None, model or gateway.chat_model, 0.2)
+
+
+def sentiment_messages(sentence: str) -> List[Dict]:
+    return [{"role": "system", "content": SENTIMENT_PROMPT}] + SENTIMENT_FEW_SHOT_EXAMPLES + [
+        {"role": "user", "content": sentence}]
+
+
+def intent_messages(sentence: str) -> List[Dict]:
+    return [{"role": "system", "content": INTENT_PROMPT}, {"role": "user", "content": sentence}]
+
+
+async def analyze_utterance_sentiment(sentence: str, utterance_num: int, semaphore: asyncio.Semaphore,
+                                      cached: Optional[Dict] = None, check_cache: bool = True) -> Dict:
+    """
+    Per-utterance sentiment analysis, falling back to a neutral default on failure. check_cache=False
+    uses cached as the result of a cache lookup the caller already made.
+    """
+    cache_key = sentiment_cache_key(sentence)
+    if check_cache:
+        cached = await llm_cache.get_async(cache_key)
+    if cached is not None:
+        return cached
+
+    sentiment_result = {"sentiment": "neutral", "score": 0.5, "reason": "Default", "keywords": [],
+                        "confidence": 0.5}
+    if gateway.available:
+        try:
+            sentiment_result = await request_structured("sentiment", sentiment_messages(sentence), semaphore)
+            await llm_cache.set_async(cache_key, "sentiment", gateway.chat_model, sentiment_result)
+        except CircuitOpenError:
+            # The provider is down: report the utterance as failed rather than as a default answer
+            raise
+        except Exception as e:
+            logger.warning(f"Sentiment analysis failed for utterance {utterance_num}: {str(e)}")
+    return sentiment_result
+
+
+async def analyze_utterance_intent(sentence: str, utterance_num: int, semaphore: asyncio.Semaphore,
+                                   cached: Optional[Dict] = None, check_cache: bool = True) -> Dict:
+    """
+    Per-utterance intent analysis, falling back to an unknown default on failure. check_cache=False
+    uses cached as the result of a cache lookup the caller already made.
+    """
+    cache_key = intent_cache_key(sentence)
+    if check_cache:
+        cached = await llm_cache.get_async(cache_key)
+    if cached is not None:
+        return cached
+
+    intent_result = {"intent": "unknown", "secondary_intents": [], "confidence": 0.5,
+                     "reasoning": "Default"}
+    if gateway.available:
+        try:
+            intent_result = await request_structured("intent", intent_messages(sentence), semaphore)
+            await llm_cache.set_async(cache_key, "intent", gateway.chat_model, intent_result)
+        except CircuitOpenError:
+            # The provider is down: report the utterance as failed rather than as a default answer
+            raise
+        except Exception as e:
+            logger.warning(f"Intent analysis failed for utterance {utterance_num}: {str(e)}")
+    return intent_result
+
+
+def recorded_confidence(result: Dict) -> float:
+    """Confidence for the output record; replies that left it out (unknown to the cascade) record 0.5"""
+    confidence = result.get("confidence")
+    return 0.5 if confidence is None else confidence
+
+
+def build_utterance_result(utterance_num: int, speaker: str, sentence: str, sentiment_result: Dict,
+                           intent_result: Dict, source: str = "llm") -> Dict:
+    """Compile sentiment and intent results into the per-utterance output record"""
+    return {
+        "utterance_id": utterance_num,
+        "speaker": speaker,
+        "sentence": sentence,
+        "sentiment": sentiment_result.get("sentiment", "neutral"),
+        "score": sentiment_result.get("score", 0.5),
+        "reason": sentiment_result.get("reason", "Analysis unavailable"),
+        "keywords": sentiment_result.get("keywords", []),
+        "sentiment_confidence": recorded_confidence(sentiment_result),
+        "intent": intent_result.get("intent", "unknown"),
+        "secondary_intents": intent_result.get("secondary_intents", []),
+        "intent_confidence": recorded_confidence(intent_result),
+        "intent_reasoning": intent_result.get("reasoning", "Analysis unavailable"),
+        "analysis_source": source
+    }
+
+
+def utterance_succeeded(utterance: Dict) -> bool:
+    """
+    False for utterances that fell back to error, default or deadline results. Reasons are checked
+    too, for stored records from before analysis_source was kept.
+    """
+    return (utterance.get("analysis_source") not in ("error", "deadline") and utterance.get("reason") != "Default"
+            and utterance.get("intent_reasoning") != "Default"
+            and not (utterance.get("reason") or "").startswith(("Error", "Pending")))
+
+
+def topics_succeeded(topic_analysis: Optional[Dict]) -> bool:
+    """False for missing topics and the error, failure and deadline placeholders"""
+    if not topic_analysis or topic_analysis.get("primary_topic") in (None, "", "error"):
+        return False
+    return not (topic_analysis.get("reasoning") or "").startswith(("Error", "Pending"))
+
+
+def summarize_utterance_quality(utterances: List[Dict]) -> Dict:
+    """Share of utterances analyzed successfully and their mean sentiment/intent confidence"""
+    if not utterances:
+        return {"utterance_success_rate": 0.0, "average_confidence": 0.0}
+    def confidence(value) -> float:
+        try:
+            return min(1.0, max(0.0, float(value)))
+        except (TypeError, ValueError):
+            return 0.0
+
+    confidences = [(confidence(u.get("sentiment_confidence")) + confidence(u.get("intent_confidence"))) / 2
+                   for u in utterances]
+    return {
+        "utterance_success_rate": round(sum(1 for u in utterances if utterance_succeeded(u)) / len(utterances), 4),
+        "average_confidence": round(sum(confidences) / len(confidences), 4)
+    }
+
+
+def build_error_result(utterance_num: int, speaker: str, sentence: str, error: Exception) -> Dict:
+    """Default output record for an utterance whose analysis raised"""
+    return {
+        "utterance_id": utterance_num,
+        "speaker": speaker,
+        "sentence": sentence,
+        "sentiment": "neutral",
+        "score": 0.5,
+        "reason": f"Error: {str(error)}",
+        "keywords": [],
+        "sentiment_confidence": 0.0,
+        "intent": "unknown",
+        "secondary_intents": [],
+        "intent_confidence": 0.0,
+        "intent_reasoning": f"Error: {str(error)}",
+        "analysis_source": "error"
+    }
+
+
+def build_degraded_result(utterance_num: int, speaker: str, sentence: str) -> Dict:
+    """
+    Output record for an utterance still waiting on the LLM when the deadline's degrade point passed:
+    the best local answer (any pre-classifier rule, whatever its confidence), else a pending placeholder
+    """
+    local_result = preclassify(sentence, speaker, threshold=0.0)
+    if local_result is not None:
+        sentiment_result, intent_result, _ = local_result
+    else:
+        sentiment_result = {"sentiment": "neutral", "score": 0.5, "reason": "Pending: analysis deadline reached",
+                            "keywords": [], "confidence": 0.0}
+        intent_result = {"intent": "unknown", "secondary_intents": [], "confidence": 0.0,
+                         "reasoning": "Pending: analysis deadline reached"}
+    result = build_utterance_result(utterance_num, speaker, sentence, sentiment_result, intent_result, "deadline")
+    result["degraded"] = True
+    return result
+
+
+def build_degraded_topics() -> Dict:
+    """Topic analysis placeholder when topic detection has not finished by the deadline"""
+    return {"topics": ["general"], "primary_topic": "general", "confidence": 0.0,
+            "reasoning": "Pending: analysis deadline reached"}
+
+
+async def classify_microbatched(speaker: str, sentence: str,
+                                semaphore: asyncio.Semaphore) -> Optional[Tuple[Dict, Dict, str]]:
+    """
+    Sentiment and intent from a request shared with other in-flight analyses (see analyzer.microbatch).
+    Waiting holds one of the analysis's semaphore slots, so each analysis has at most `concurrency`
+    items in the shared windows. Only called for utterances with neither result cached; None when the
+    batch could not answer, and the per-utterance calls handle those.
+    """
+    async with semaphore:
+        result = await microbatcher.classify(speaker, sentence)
+    return (*result, "microbatch") if result is not None else None
+
+
+async def classify_large(kind: str, sentence: str, semaphore: asyncio.Semaphore) -> Dict:
+    """One sentiment or intent call to the cascade's large model (cached); raises on failure"""
+    cache_key = (sentiment_cache_key if kind == "sentiment" else intent_cache_key)(sentence, cascade.large_model)
+    cached = await llm_cache.get_async(cache_key)
+    if cached is not None:
+        return cached
+    messages = sentiment_messages(sentence) if kind == "sentiment" else intent_messages(sentence)
+    result = await request_structured(kind, messages, semaphore, model=cascade.large_model,
+                                      backend=cascade.large_backend, stage=f"{kind}_escalated")
+    await llm_cache.set_async(cache_key, kind, cascade.large_model, result)
+    return result
+
+
+async def escalate_utterance(utterance_num: int, sentence: str, sentiment_result: Dict, intent_result: Dict,
+                             semaphore: asyncio.Semaphore) -> Tuple[Dict, Dict, str, List[str]]:
+    """
+    Re-ask the cascade's large model for the parts of a small-tier answer that need it (see
+    analyzer.cascade). Returns the final results, the tier that produced them and the escalation
+    reasons; a failed escalation keeps the small-tier result.
+    """
+    kinds, reasons = cascade.escalations(sentiment_result, intent_result)
+    if not kinds:
+        cascade.record(kinds, reasons)
+        return sentiment_result, intent_result, TIER_SMALL, []
+
+    results = {"sentiment": sentiment_result, "intent": intent_result}
+    escalated = await asyncio.gather(*(classify_large(kind, sentence, semaphore) for kind in kinds),
+                                     return_exceptions=True)
+    failures = 0
+    for kind, result in zip(kinds, escalated):
+        if isinstance(result, Exception):
+            failures += 1
+            logger.warning(f"Escalating {kind} of utterance {utterance_num} failed, keeping the small-tier "
+                           f"result: {str(result)}")
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            results[kind] = result
+    cascade.record(kinds, reasons, failures)
+    tier = TIER_LARGE if failures < len(kinds) else TIER_SMALL
+    return results["sentiment"], results["intent"], tier, reasons
+
+
+async def analyze_utterance(utterance_num: int, speaker: str, sentence: str, semaphore: asyncio.Semaphore,
+                            preset_result: Optional[Tuple[Dict, Dict, str]] = None) -> Dict:
+    """
+    Analyze one utterance, running its sentiment and intent calls concurrently.
+    preset_result is a (sentiment_result, intent_result, source) triple already produced by the
+    pre-classifier or a batched request, in which case no per-utterance calls are made.
+    With the model cascade enabled, LLM answers that need it are re-asked of the large model and
+    the record notes the model_tier that produced it. With the semantic cache enabled, successful
+    LLM answers are indexed for reuse by similar utterances.
+    """
     try:
-        if not text or not text.strip():
-            raise ValueError("Empty or invalid text provided")
-
-        # Extract utterances
-        utterances = extract_speaker_utterances(text)
-        if not utterances:
-            raise ValueError("No valid speaker utterances found in the text")
-
-        # Detect topics
-        topic_analysis = detect_topics(text)
-
-        results = []
-
-        # Enhanced prompts
-        sentiment_prompt = """
-        You are an expert sentiment analysis system trained across multiple industries.
-
-        Analyze each sentence and classify sentiment into:
-        - "extreme positive": highly enthusiastic, delighted, grateful
-        - "positive": satisfied, content, pleased  
-        - "neutral": factual, polite, emotionally flat
-        - "negative": unsatisfied, concerned, mildly critical
-        - "extreme negative": angry, highly critical, frustrated
-
-        Consider context, tone, and domain-specific language.
-
-        Classify based on **emotional tone**, even if wording is polite. For example, 
-        'I guess it's fine' might still be negative depending on tone. Interpret sarcasm and indirect emotions.
-
-        Return ONLY in this exact JSON format:
-        {
-            "sentiment": "extreme positive|positive|neutral|negative|extreme negative",
-            "score": float between 0 and 1,
-            "reason": "Detailed explanation of sentiment classification",
-            "keywords": ["key", "emotional", "words"],
-            "confidence": float between 0 and 1
-        }
-        """
-
-        # Few-shot examples for better grounding
-        few_shot_examples = [
-            {"role": "user", "content": "The support was phenomenal! I couldn't be happier."},
-            {"role": "assistant",
-             "content": '{"sentiment": "extreme positive", "score": 0.95, "reason": "Very enthusiastic '
-                        'and joyful tone"}'},
-            {"role": "user", "content": "It's okay I guess. Nothing special."},
-            {"role": "assistant",
-             "content": '{"sentiment": "neutral", "score": 0.5, "reason": "Factual and indifferent tone"}'},
-            {"role": "user", "content": "Thanks for your help, but I'm still waiting for a resolution."},
-            {"role": "assistant",
-             "content": '{"sentiment": "negative", "score": 0.4, "reason": "Underlying dissatisfaction despite '
-                        'politeness"}'},
-            {"role": "user", "content": "This has been a horrible experience. I will never use this service again."},
-            {"role": "assistant",
-             "content": '{"sentiment": "extreme negative", "score": 0.9, "reason": "Strong frustration and refusal '
-                        'to return"}'},
-            {"role": "user", "content": "Really appreciate the quick fix! Saved my day."},
-            {"role": "assistant",
-             "content": '{"sentiment": "positive", "score": 0.8, "reason": "Gratitude and satisfaction with service"}'}
-        ]
-
-        intent_prompt = """
-        You are an intelligent intent classification system.
-
-        Classify the intent into one or more categories:
-        - "complaint": expressing dissatisfaction, reporting issues
-        - "inquiry": asking for information, clarifying something  
-        - "feedback": giving opinions, suggestions, praise, critique
-        - "request": asking for action, service, or assistance
-        - "acknowledgment": confirming, agreeing, thanking
-        - "escalation": demanding supervisor, threatening action
-
-        Return ONLY in this JSON format:
-        {
-            "intent": "primary_intent",
-            "secondary_intents": ["list", "of", "secondary"],
-            "confidence": float between 0 and 1,
-            "reasoning": "Explanation of intent classification"
-        }
-        """
+        logger.info(f"Processing utterance {utterance_num} from {speaker}")
+
+        # Cached results are looked up once and handed to the per-utterance calls
+        cached_sentiment = cached_intent = None
+        looked_up = False
+        if preset_result is None and microbatcher.enabled and gateway.available:
+            cached_sentiment, cached_intent = await asyncio.gather(
+                llm_cache.get_async(sentiment_cache_key(sentence)), llm_cache.get_async(intent_cache_key(sentence)))
+            looked_up = True
+            if cached_sentiment is None and cached_intent is None:
+                preset_result = await classify_microbatched(speaker, sentence, semaphore)
+
+        if preset_result is not None:
+            sentiment_result, intent_result, source = preset_result
+        else:
+            sentiment_result, intent_result = await asyncio.gather(
+                analyze_utterance_sentiment(sentence, utterance_num, semaphore, cached_sentiment, not looked_up),
+                analyze_utterance_intent(sentence, utterance_num, semaphore, cached_intent, not looked_up)
+            )
+            source = "llm"
+
+        tier, reasons = TIER_LOCAL, []
+        if cascade.enabled and source in ESCALATABLE_SOURCES:
+            sentiment_result, intent_result, tier, reasons = await escalate_utterance(
+                utterance_num, sentence, sentiment_result, intent_result, semaphore)
+        result = build_utterance_result(utterance_num, speaker, sentence, sentiment_result, intent_result, source)
+        if cascade.enabled:
+            result["model_tier"] = tier
+            result["escalation_reasons"] = reasons
+        if semantic_cache.enabled and source in ESCALATABLE_SOURCES and utterance_succeeded(result):
+            semantic_cache.add(sentence, sentiment_result, intent_result)
+        return result
 
-        # System messages
-        system_msg_sentiment = {"role": "system", "content": sentiment_prompt}
-        system_msg_intent = {"role": "system", "content": intent_prompt}
+    except Exception as e:
+        logger.error(f"Error processing utterance {utterance_num}: {str(e)}")
+        return build_error_result(utterance_num, speaker, sentence, e)
+
+
+async def stream_analysis(text: str, domain: Optional[str] = None, batch_mode: Optional[bool] = None,
+                          concurrency: Optional[int] = None,
+                          preset_results: Optional[Dict[int, Tuple[Dict, Dict, str]]] = None,
+                          topic_analysis: Optional[Dict] = None,
+                          call_log: Optional[List[Dict]] = None,
+                          deadline: Optional[Deadline] = None) -> AsyncIterator[Dict]:
+    """
+    Analyze a conversation and yield events as results become available:
+    "start", one "utterance" per utterance in completion order, "topics", then "summary"
+    carrying the full analysis dict (utterances in utterance_id order).
+    Topic detection and all sentiment/intent calls run concurrently, bounded by a single
+    semaphore of `concurrency` (default: ANALYZER_CONCURRENCY) in-flight requests.
+    With batch_mode (default: ANALYZER_BATCH_MODE) utterances are classified in token-bounded
+    windows with one request each, and only missing or malformed entries are re-asked individually.
+    preset_results maps utterance_id to an already known (sentiment_result, intent_result, source)
+    triple, and topic_analysis skips topic detection; both are used for incremental re-analysis.
+    Every LLM call is recorded in a call log (call_log, when the caller already started one for
+    transcription) that the summary returns as "llm_calls" and rolls up into "performance".
+    With a deadline, utterances unfinished at its degrade point are cancelled and answered by
+    build_degraded_result, topic detection is abandoned at the deadline itself, and the summary's
+    "degradation" section lists what was degraded.
+    Pending work is cancelled if the consumer stops iterating early.
+    """
+    if not text or not text.strip():
+        raise ValueError("Empty or invalid text provided")
+
+    # Extract utterances
+    utterances = extract_speaker_utterances(text)
+    if not utterances:
+        raise ValueError("No valid speaker utterances found in the text")
+
+    # The random suffix keeps analyses started within the same second from sharing an ID
+    conversation_id = f"conv_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    yield {"event": "start", "conversation_id": conversation_id, "total_utterances": len(utterances)}
+
+    semaphore = asyncio.Semaphore(concurrency or ANALYZER_CONCURRENCY)
+    call_log = record_calls(call_log)
+    # Stages recorded before the analysis (conversion, diarization, transcription) ran back to back
+    prior_seconds = sum(entry.get("wall_seconds") or 0.0 for entry in call_log)
+    start = time.perf_counter()
+    pending_tasks = []
 
-        # Process each utterance
+    try:
+        # Detect topics alongside the utterance calls
+        topic_task = None
+        if topic_analysis is None:
+            topic_task = asyncio.create_task(detect_topics_async(text, semaphore))
+            pending_tasks.append(topic_task)
+
+        # Local fast path for trivially classifiable utterances
+        preset_results = dict(preset_results or {})
+        local_count = 0
         for i, (speaker, sentence) in enumerate(utterances):
-            try:
-                logger.info(f"Processing utterance {i + 1}/{len(utterances)} from {speaker}")
-
-                # Sentiment analysis
-                sentiment_result = {"sentiment": "neutral", "score": 0.5, "reason": "Default", "keywords": [],
-                                    "confidence": 0.5}
-                if client:
-                    try:
-                        sentiment_response = client.chat.completions.create(
-                            model="llama3-8b-8192",
-                            messages=[system_msg_sentiment] + few_shot_examples + [
-                                {"role": "user", "content": sentence}],
-                            response_format={"type": "json_object"},
-                            temperature=0.2
-                        )
-                        sentiment_result = json.loads(sentiment_response.choices[0].message.content)
-                    except Exception as e:
-                        logger.warning(f"Sentiment analysis failed for utterance {i + 1}: {str(e)}")
-
-                # Intent analysis
-                intent_result = {"intent": "unknown", "secondary_intents": [], "confidence": 0.5,
-                                 "reasoning": "Default"}
-                if client:
-                    try:
-                        intent_response = client.chat.completions.create(
-                            model="llama3-8b-8192",
-                            messages=[system_msg_intent, {"role": "user", "content": sentence}],
-                            response_format={"type": "json_object"},
-                            temperature=0.2
-                        )
-                        intent_result = json.loads(intent_response.choices[0].message.content)
-                    except Exception as e:
-                        logger.warning(f"Intent analysis failed for utterance {i + 1}: {str(e)}")
-
-                # Compile results
-                results.append({
-                    "utterance_id": i + 1,
-                    "speaker": speaker,
-                    "sentence": sentence,
-                    "sentiment": sentiment_result.get("sentiment", "neutral"),
-                    "score": sentiment_result.get("score", 0.5),
-                    "reason": sentiment_result.get("reason", "Analysis unavailable"),
-                    "keywords": sentiment_result.get("keywords", []),
-                    "sentiment_confidence": sentiment_result.get("confidence", 0.5),
-                    "intent": intent_result.get("intent", "unknown"),
-                    "secondary_intents": intent_result.get("secondary_intents", []),
-                    "intent_confidence": intent_result.get("confidence", 0.5),
-                    "intent_reasoning": intent_result.get("reasoning", "Analysis unavailable")
-                })
-
-            except Exception as e:
-                logger.error(f"Error processing utterance {i + 1}: {str(e)}")
-                results.append({
-                    "utterance_id": i + 1,
-                    "speaker": speaker,
-                    "sentence": sentence,
-                    "sentiment": "neutral",
-                    "score": 0.5,
-                    "reason": f"Error: {str(e)}",
-                    "keywords": [],
-                    "sentiment_confidence": 0.0,
-                    "intent": "unknown",
-                    "secondary_intents": [],
-                    "intent_confidence": 0.0,
-                    "intent_reasoning": f"Error: {str(e)}"
-                })
+            if i + 1 in preset_results:
+                continue
+            local_result = preclassify(sentence, speaker)
+            if local_result is not None:
+                preset_results[i + 1] = local_result
+                local_count += 1
+        if local_count:
+            logger.info(f"Pre-classifier answered {local_count}/{len(utterances)} utterances locally")
+
+        # Reuse the answers given to near-identical utterances (see analyzer.semantic_cache)
+        if semantic_cache.enabled:
+            remaining = [i + 1 for i in range(len(utterances)) if i + 1 not in preset_results]
+            matches = semantic_cache.lookup_many([utterances[num - 1][1] for num in remaining])
+            semantic_count = 0
+            for utterance_num, match in zip(remaining, matches):
+                if match is not None:
+                    sentiment_result, intent_result, _, _ = match
+                    preset_results[utterance_num] = (sentiment_result, intent_result, "semantic")
+                    semantic_count += 1
+            if semantic_count:
+                logger.info(f"Semantic cache answered {semantic_count}/{len(utterances)} utterances")
+
+        # Distilled local classifier (see analyzer.distilled); without an LLM provider it answers everything
+        if distilled_classifier.enabled:
+            remaining = [i + 1 for i in range(len(utterances)) if i + 1 not in preset_results]
+            answers = distilled_classifier.classify_many([utterances[num - 1] for num in remaining],
+                                                         threshold=None if gateway.available else 0.0)
+            distilled_count = 0
+            for utterance_num, answer in zip(remaining, answers):
+                if answer is not None:
+                    preset_results[utterance_num] = answer
+                    distilled_count += 1
+            if distilled_count:
+                logger.info(f"Distilled model answered {distilled_count}/{len(utterances)} utterances")
+
+        # Batched sentiment + intent classification for the rest
+        if batch_mode is None:
+            batch_mode = BATCH_MODE
+        batch_task = None
+        if batch_mode and gateway.available:
+            pending = [(i + 1, speaker, sentence) for i, (speaker, sentence) in enumerate(utterances)
+                       if i + 1 not in preset_results]
+            batch_task = asyncio.create_task(classify_utterances_batched(pending, semaphore))
+            pending_tasks.append(batch_task)
+
+        async def run_utterance(utterance_num: int, speaker: str, sentence: str) -> Tuple[int, Dict]:
+            preset_result = preset_results.get(utterance_num)
+            if preset_result is None and batch_task is not None:
+                batched_results = await batch_task
+                if utterance_num in batched_results:
+                    preset_result = (*batched_results[utterance_num], "batch")
+            return utterance_num, await analyze_utterance(utterance_num, speaker, sentence, semaphore, preset_result)
+
+        utterance_tasks = [asyncio.create_task(run_utterance(i + 1, speaker, sentence))
+                           for i, (speaker, sentence) in enumerate(utterances)]
+        pending_tasks.extend(utterance_tasks)
+
+        # Emit each utterance as soon as it completes
+        results = [None] * len(utterances)
+        completed = 0
+        degraded_utterances = []
+        unfinished = set(utterance_tasks)
+        while unfinished:
+            done, unfinished = await asyncio.wait(
+                unfinished, timeout=deadline.until_degrade() if deadline else None,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                utterance_num, result = task.result()
+                results[utterance_num - 1] = result
+                completed += 1
+                yield {"event": "utterance", "completed": completed, "total_utterances": len(utterances),
+                       "utterance": result}
+
+            if unfinished and deadline is not None and deadline.should_degrade():
+                for task in unfinished:
+                    task.cancel()
+                if batch_task is not None:
+                    batch_task.cancel()
+                await asyncio.gather(*unfinished, return_exceptions=True)
+                degraded_utterances = [i + 1 for i, result in enumerate(results) if result is None]
+                logger.warning(f"Analysis deadline: answering {len(degraded_utterances)}/{len(utterances)} "
+                               f"utterances locally after {deadline.elapsed():.1f}s")
+                for utterance_num in degraded_utterances:
+                    speaker, sentence = utterances[utterance_num - 1]
+                    result = build_degraded_result(utterance_num, speaker, sentence)
+                    results[utterance_num - 1] = result
+                    completed += 1
+                    yield {"event": "utterance", "completed": completed, "total_utterances": len(utterances),
+                           "utterance": result}
+                break
+
+        topics_degraded = False
+        if topic_task is not None and deadline is None:
+            topic_analysis = await topic_task
+        elif topic_task is not None:
+            await asyncio.wait({topic_task}, timeout=deadline.remaining())
+            if topic_task.done():
+                topic_analysis = topic_task.result()
+            else:
+                topic_task.cancel()
+                topics_degraded = True
+                logger.warning("Analysis deadline: topic detection abandoned")
+                topic_analysis = build_degraded_topics()
+        yield {"event": "topics", "topic_analysis": topic_analysis}
 
         # Calculate performance metrics
         csat_data = calculate_csat_score(results)
-        agent_performance = calculate_agent_performance(results)
+        agent_performance = calculate_agent_performance(results, domain)
+
+        performance = summarize_calls(call_log)
+        performance["processing_time_seconds"] = round(prior_seconds + time.perf_counter() - start, 3)
+        performance.update(summarize_utterance_quality(results))
 
         # Compile comprehensive analysis
         analysis_summary = {
-            "conversation_id": f"conv_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+            "conversation_id": conversation_id,
             "total_utterances": len(results),
             "speakers": list(set([r['speaker'] for r in results])),
             "topic_analysis": topic_analysis,
@@ -511,26 +822,69 @@ def analyze_sentences(text: str, domain: Optional[str] = None) -> Dict:
             "agent_performance": agent_performance,
             "utterances": results,
             "analysis_timestamp": datetime.now().isoformat(),
-            "domain": domain or "general"
+            "domain": domain or "general",
+            # Backend and model that served this analysis; cached and local results need no call
+            "model_used": ", ".join(models_used(call_log)) or gateway.model_label,
+            "performance": performance,
+            "llm_calls": list(call_log)
         }
+        if deadline is not None:
+            analysis_summary["degradation"] = deadline.report(degraded_utterances, topics_degraded)
+        if cascade.enabled:
+            analysis_summary["cascade"] = summarize_tiers(results)
 
         logger.info(f"Analysis completed successfully for {len(results)} utterances")
+        yield {"event": "summary", "analysis": analysis_summary}
+
+    finally:
+        for task in pending_tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def analyze_sentences_async(text: str, domain: Optional[str] = None, batch_mode: Optional[bool] = None,
+                                  concurrency: Optional[int] = None,
+                                  preset_results: Optional[Dict[int, Tuple[Dict, Dict, str]]] = None,
+                                  topic_analysis: Optional[Dict] = None,
+                                  call_log: Optional[List[Dict]] = None,
+                                  deadline: Optional[Deadline] = None) -> Dict:
+    """
+    Enhanced sentence analysis with comprehensive error handling.
+    Runs stream_analysis to completion and returns its final summary.
+    """
+    try:
+        analysis_summary = None
+        async for event in stream_analysis(text, domain, batch_mode, concurrency, preset_results, topic_analysis,
+                                           call_log, deadline):
+            if event["event"] == "summary":
+                analysis_summary = event["analysis"]
         return analysis_summary
 
     except Exception as e:
-        logger.error(f"Critical error in analyze_sentences: {str(e)}", exc_info=True)
-        return {
-            "error": f"Analysis failed: {str(e)}",
-            "conversation_id": f"error_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-            "total_utterances": 0,
-            "speakers": [],
-            "topic_analysis": {"topics": ["error"], "primary_topic": "error", "confidence": 0.0},
-            "csat_analysis": {"csat_score": 0, "csat_rating": "Error", "methodology": "Error occurred"},
-            "agent_performance": {"error": "Analysis failed"},
-            "utterances": [],
-            "analysis_timestamp": datetime.now().isoformat(),
-            "domain": domain or "general"
-        }
+        logger.error(f"Critical error in analyze_sentences_async: {str(e)}", exc_info=True)
+        return build_error_analysis(e, domain)
+
+
+def build_error_analysis(error: Exception, domain: Optional[str] = None) -> Dict:
+    """Analysis dict returned in place of a summary when a conversation cannot be analyzed"""
+    return {
+        "error": f"Analysis failed: {str(error)}",
+        "conversation_id": f"error_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+        "total_utterances": 0,
+        "speakers": [],
+        "topic_analysis": {"topics": ["error"], "primary_topic": "error", "confidence": 0.0},
+        "csat_analysis": {"csat_score": 0, "csat_rating": "Error", "methodology": "Error occurred"},
+        "agent_performance": {"error": "Analysis failed"},
+        "utterances": [],
+        "analysis_timestamp": datetime.now().isoformat(),
+        "domain": domain or "general"
+    }
+
+
+def analyze_sentences(text: str, domain: Optional[str] = None, batch_mode: Optional[bool] = None,
+                      concurrency: Optional[int] = None) -> Dict:
+    """Synchronous wrapper around analyze_sentences_async for CLI and script use"""
+    return asyncio.run(analyze_sentences_async(text, domain, batch_mode, concurrency))
 
 
 @app.post("/analyze/")
@@ -561,7 +915,7 @@ async def analyze_conversation(file: UploadFile = File(...), domain: str = Form(
             raise HTTPException(status_code=400, detail="File contains no readable text")
 
         # Perform analysis
-        results = analyze_sentences(text, domain)
+        results = await analyze_sentences_async(text, domain)
 
         if "error" in results:
             raise HTTPException(status_code=500, detail=results["error"])
@@ -580,9 +934,16 @@ async def analyze_conversation(file: UploadFile = File(...), domain: str = Form(
 async def health_check():
     """Health check endpoint"""
     return {
-        "status": "healthy",
+        "status": "degraded" if gateway.any_circuit_open() else "healthy",
         "timestamp": datetime.now().isoformat(),
-        "groq_client": "available" if client else "unavailable"
+        "llm_provider": gateway.provider_status(),
+        "llm_gateway": gateway.stats(),
+        "llm_cache": llm_cache.stats(),
+        "llm_decoding": decode_stats.stats(),
+        "llm_microbatching": microbatcher.stats(),
+        "llm_cascade": cascade.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "distilled_classifier": distilled_classifier.stats()
     }
 
 
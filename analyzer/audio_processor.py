@@ -1,5 +1,6 @@
 import os
 import re
+import sys
 import subprocess
 import tempfile
 import logging
@@ -10,10 +11,15 @@ from mutagen.mp4 import MP4
 from mutagen.wave import WAVE
 from mutagen.mp3 import MP3
 import eyed3.mp3.headers as hdr
-from groq import Groq
 from pyannote.audio import Pipeline
 from dotenv import load_dotenv
 
+# Allow running as a script (python analyzer/audio_processor.py) as well as a module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from analyzer.gateway import gateway, timed_stage
+from analyzer.keywords import get_matcher
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -21,19 +27,10 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize clients
-try:
-    groq_api_key = os.getenv("GROQ_API_KEY")
-    if not groq_api_key:
-        logger.warning("GROQ_API_KEY not found in environment variables. "
-                       "Transcription will not be available.")
-        client = None
-    else:
-        client = Groq(api_key=groq_api_key)
-        logger.info("Groq client initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize Groq client: {str(e)}")
-    client = None
+# Transcription calls go through the shared LLM gateway (rate limiting, pooling, retries)
+if not gateway.available:
+    logger.warning("GROQ_API_KEY not found in environment variables. "
+                   "Transcription will not be available.")
 
 try:
     huggingface_token = os.getenv("HF_TOKEN")
@@ -118,7 +115,7 @@ def transcribe_audio_only(audio_file_path: str) -> str:
     Transcribe full audio file without diarization or analysis.
     Returns the raw transcription text.
     """
-    if not client:
+    if not gateway.available:
         raise Exception("Groq client not initialized. Please set GROQ_API_KEY in .env.")
 
     if not os.path.exists(audio_file_path):
@@ -143,7 +140,8 @@ def transcribe_audio_only(audio_file_path: str) -> str:
                 temp_wav_path = temp_wav.name
 
             try:
-                rebuild_audio(audio_file_path, temp_wav_path)
+                with timed_stage("audio_conversion"):
+                    rebuild_audio(audio_file_path, temp_wav_path)
                 processing_file_path = temp_wav_path
                 logger.info("[DEBUG] Audio conversion completed for transcription")
             except Exception as e:
@@ -152,9 +150,9 @@ def transcribe_audio_only(audio_file_path: str) -> str:
 
         # Perform transcription on full file
         with open(processing_file_path, "rb") as f:
-            response = client.audio.transcriptions.create(
+            response = gateway.transcribe(
                 file=f,
-                model="whisper-large-v3-turbo",
+                model=gateway.transcription_model,
                 response_format="verbose_json",
                 temperature=0.0
             )
@@ -230,9 +228,9 @@ def transcribe_speaker_segments(audio_file_path, speaker_segments):
         # Now the file handle is closed; re-open for reading
         try:
             with open(temp_name, "rb") as f:
-                response = client.audio.transcriptions.create(
+                response = gateway.transcribe(
                     file=f,
-                    model="whisper-large-v3-turbo",
+                    model=gateway.transcription_model,
                     response_format="verbose_json",
                     temperature=0.0
                 )
@@ -283,19 +281,19 @@ def perform_speaker_diarization(audio_file_path: str) -> list:
 
 def map_speakers_to_roles_enhanced(merged_segments: list) -> list:
     speaker_stats = {}
-    agent_keywords = ['help', 'assist', 'support', 'company', 'policy', 'thank you for calling']  # expand this
-    customer_keywords = ['problem', 'issue', 'my order', 'I need', 'complaint', 'refund']
+    matcher = get_matcher()  # "agent_role" / "customer_role" lexicons
 
     for seg in merged_segments:
         speaker = seg["speaker"]
         text = seg["text"].lower()
+        hits = matcher.count(text, distinct=True)
         if speaker not in speaker_stats:
             speaker_stats[speaker] = {"text": [], "duration": 0, "count": 0, "agent_score": 0, "customer_score": 0}
         speaker_stats[speaker]["text"].append(text)
         speaker_stats[speaker]["duration"] += seg["end"] - seg["start"]
         speaker_stats[speaker]["count"] += 1
-        speaker_stats[speaker]["agent_score"] += sum(1 for k in agent_keywords if k in text)
-        speaker_stats[speaker]["customer_score"] += sum(1 for k in customer_keywords if k in text)
+        speaker_stats[speaker]["agent_score"] += hits["agent_role"]
+        speaker_stats[speaker]["customer_score"] += hits["customer_role"]
 
     # Determine first speaker
     first_speaker = merged_segments[0]["speaker"]
@@ -371,7 +369,8 @@ def process_audio_file(audio_file_path: str) -> str:
                 temp_wav_path = temp_wav.name
 
             try:
-                rebuild_audio(audio_file_path, temp_wav_path)
+                with timed_stage("audio_conversion"):
+                    rebuild_audio(audio_file_path, temp_wav_path)
                 processing_file_path = temp_wav_path
                 logger.info("[DEBUG] Audio conversion completed")
             except Exception as e:
@@ -380,7 +379,8 @@ def process_audio_file(audio_file_path: str) -> str:
 
         # Step 1: Perform speaker diarization
         logger.info("[DEBUG] Starting speaker diarization...")
-        speaker_segments = perform_speaker_diarization(processing_file_path)
+        with timed_stage("diarization"):
+            speaker_segments = perform_speaker_diarization(processing_file_path)
         logger.info(f"[DEBUG] Speaker segments: {len(speaker_segments)}")
 
         if not speaker_segments:
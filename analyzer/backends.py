@@ -0,0 +1,172 @@
+import logging
+import os
+from typing import Dict, Optional
+
+import httpx
+import groq
+from dotenv import load_dotenv
+
+from analyzer.prompts import CHAT_MODEL
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Which backend serves chat completions, and which serves audio transcription
+LLM_BACKEND = os.getenv("LLM_BACKEND", "groq").lower()
+LLM_TRANSCRIPTION_BACKEND = os.getenv("LLM_TRANSCRIPTION_BACKEND", "groq").lower()
+# Backends that take over while the primary one's circuit is open (empty = fail fast instead)
+LLM_FALLBACK_BACKEND = os.getenv("LLM_FALLBACK_BACKEND", "").lower()
+LLM_TRANSCRIPTION_FALLBACK_BACKEND = os.getenv("LLM_TRANSCRIPTION_FALLBACK_BACKEND", "").lower()
+
+# HTTP connection pool for the Groq backend
+GATEWAY_MAX_CONNECTIONS = int(os.getenv("GATEWAY_MAX_CONNECTIONS", "50"))
+GATEWAY_MAX_KEEPALIVE = int(os.getenv("GATEWAY_MAX_KEEPALIVE", "20"))
+GATEWAY_KEEPALIVE_EXPIRY = float(os.getenv("GATEWAY_KEEPALIVE_EXPIRY", "60"))
+GATEWAY_TIMEOUT = float(os.getenv("GATEWAY_TIMEOUT", "60"))
+
+
+def env_float(name: str, default: Optional[str]) -> Optional[float]:
+    value = os.getenv(name, default)
+    return float(value) if value not in (None, "") else None
+
+
+class LLMBackend:
+    """
+    One chat/transcription provider: its model, endpoint, connection pool and concurrency.
+    rpm/tpm of None fall back to the gateway defaults; max_concurrency of 0 means no
+    per-backend cap on in-flight requests.
+    """
+
+    name = "base"
+    connection_errors = ()
+    status_errors = ()
+
+    def __init__(self, api_key: Optional[str], base_url: Optional[str], chat_model: str,
+                 transcription_model: Optional[str] = None, max_connections: int = 50,
+                 max_keepalive: int = 20, keepalive_expiry: float = 60, timeout: float = 60,
+                 max_concurrency: int = 0, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.api_key = api_key
+        self.base_url = base_url or None
+        self.chat_model = chat_model
+        self.transcription_model = transcription_model
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive,
+                                   keepalive_expiry=keepalive_expiry)
+        self.timeout = httpx.Timeout(timeout, connect=5.0)
+        self.max_concurrency = max_concurrency
+        self.rpm = rpm
+        self.tpm = tpm
+
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}:{self.chat_model}"
+
+    def create_async_client(self):
+        raise NotImplementedError
+
+    def create_sync_client(self):
+        raise NotImplementedError
+
+    def describe(self) -> Dict:
+        return {
+            "backend": self.name,
+            "chat_model": self.chat_model,
+            "transcription_model": self.transcription_model,
+            "base_url": self.base_url,
+            "max_connections": self.limits.max_connections,
+            "max_concurrency": self.max_concurrency
+        }
+
+
+class GroqBackend(LLMBackend):
+    name = "groq"
+    connection_errors = (groq.APIConnectionError,)
+    status_errors = (groq.APIStatusError,)
+
+    @classmethod
+    def from_env(cls) -> "GroqBackend":
+        return cls(
+            api_key=os.getenv("GROQ_API_KEY"),
+            base_url=os.getenv("GROQ_BASE_URL"),
+            chat_model=CHAT_MODEL,
+            transcription_model=os.getenv("GROQ_WHISPER_MODEL", "whisper-large-v3-turbo"),
+            max_connections=GATEWAY_MAX_CONNECTIONS,
+            max_keepalive=GATEWAY_MAX_KEEPALIVE,
+            keepalive_expiry=GATEWAY_KEEPALIVE_EXPIRY,
+            timeout=GATEWAY_TIMEOUT,
+            max_concurrency=int(os.getenv("GROQ_MAX_CONCURRENCY", "0"))
+        )
+
+    def create_async_client(self):
+        return groq.AsyncGroq(api_key=self.api_key, base_url=self.base_url, max_retries=0, timeout=self.timeout,
+                              http_client=httpx.AsyncClient(limits=self.limits, timeout=self.timeout))
+
+    def create_sync_client(self):
+        return groq.Groq(api_key=self.api_key, base_url=self.base_url, max_retries=0, timeout=self.timeout,
+                         http_client=httpx.Client(limits=self.limits, timeout=self.timeout))
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """Any server speaking the OpenAI chat completions protocol (llama.cpp server, vLLM, TGI, ...)"""
+
+    name = "openai"
+    connection_errors = (openai.APIConnectionError,) if openai else ()
+    status_errors = (openai.APIStatusError,) if openai else ()
+
+    @classmethod
+    def from_env(cls) -> "OpenAICompatibleBackend":
+        return cls(
+            # Local servers usually ignore the key, but the SDK requires one
+            api_key=os.getenv("OPENAI_COMPAT_API_KEY", "not-needed"),
+            base_url=os.getenv("OPENAI_COMPAT_BASE_URL", "http://localhost:8080/v1"),
+            chat_model=os.getenv("OPENAI_COMPAT_CHAT_MODEL", "llama-3.1-8b-instruct"),
+            transcription_model=os.getenv("OPENAI_COMPAT_WHISPER_MODEL", "whisper-1"),
+            max_connections=int(os.getenv("OPENAI_COMPAT_MAX_CONNECTIONS", "16")),
+            max_keepalive=int(os.getenv("OPENAI_COMPAT_MAX_KEEPALIVE", "16")),
+            keepalive_expiry=float(os.getenv("OPENAI_COMPAT_KEEPALIVE_EXPIRY", "60")),
+            timeout=float(os.getenv("OPENAI_COMPAT_TIMEOUT", "120")),
+            max_concurrency=int(os.getenv("OPENAI_COMPAT_MAX_CONCURRENCY", "8")),
+            # Self-hosted servers have no provider quota; throughput is bounded by max_concurrency
+            rpm=env_float("OPENAI_COMPAT_RPM", "0"),
+            tpm=env_float("OPENAI_COMPAT_TPM", "0")
+        )
+
+    @property
+    def available(self) -> bool:
+        return openai is not None and bool(self.base_url)
+
+    def _require_sdk(self):
+        if openai is None:
+            raise RuntimeError("The openai package is required for LLM_BACKEND=openai (pip install openai)")
+
+    def create_async_client(self):
+        self._require_sdk()
+        return openai.AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0, timeout=self.timeout,
+                                  http_client=httpx.AsyncClient(limits=self.limits, timeout=self.timeout))
+
+    def create_sync_client(self):
+        self._require_sdk()
+        return openai.OpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0, timeout=self.timeout,
+                             http_client=httpx.Client(limits=self.limits, timeout=self.timeout))
+
+
+BACKENDS = {
+    GroqBackend.name: GroqBackend,
+    OpenAICompatibleBackend.name: OpenAICompatibleBackend,
+}
+
+
+def create_backend(name: str) -> LLMBackend:
+    """Build a backend from its environment settings"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{name}'. Use one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name].from_env()
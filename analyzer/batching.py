@@ -0,0 +1,183 @@
+import asyncio
+import json
+import logging
+import os
+from typing import List, Dict, Optional, Tuple
+
+from analyzer.decoding import DecodeError, decode_response, decode_stats, extract_json
+from analyzer.gateway import gateway
+from analyzer.prompts import BATCH_CLASSIFICATION_PROMPT
+
+logger = logging.getLogger(__name__)
+
+# Batched classification settings
+BATCH_MODE = os.getenv("ANALYZER_BATCH_MODE", "false").lower() == "true"
+BATCH_TOKEN_BUDGET = int(os.getenv("ANALYZER_BATCH_TOKEN_BUDGET", "1500"))
+BATCH_MAX_ITEMS = int(os.getenv("ANALYZER_BATCH_MAX_ITEMS", "25"))
+
+# Rough per-utterance overhead for the JSON wrapper ({"id": .., "speaker": .., "text": ..})
+UTTERANCE_TOKEN_OVERHEAD = 12
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for window sizing"""
+    return len(text) // 4 + 1
+
+
+def build_batch_windows(utterances: List[Tuple[int, str, str]], token_budget: int = BATCH_TOKEN_BUDGET,
+                        max_items: int = BATCH_MAX_ITEMS) -> List[List[Tuple[int, str, str]]]:
+    """Split (utterance_id, speaker, sentence) tuples into windows that fit the token budget"""
+    windows = []
+    current = []
+    current_tokens = 0
+
+    for utterance_id, speaker, sentence in utterances:
+        tokens = estimate_tokens(sentence) + UTTERANCE_TOKEN_OVERHEAD
+        if current and (current_tokens + tokens > token_budget or len(current) >= max_items):
+            windows.append(current)
+            current = []
+            current_tokens = 0
+        # An utterance larger than the budget still gets a window of its own
+        current.append((utterance_id, speaker, sentence))
+        current_tokens += tokens
+
+    if current:
+        windows.append(current)
+
+    return windows
+
+
+def build_batch_messages(window: List[Tuple[int, str, str]]) -> List[Dict]:
+    """Build the chat messages for one window of numbered utterances"""
+    payload = {
+        "utterances": [{"id": utterance_id, "speaker": speaker, "text": sentence}
+                       for utterance_id, speaker, sentence in window]
+    }
+    return [
+        {"role": "system", "content": BATCH_CLASSIFICATION_PROMPT},
+        {"role": "user", "content": json.dumps(payload, ensure_ascii=False)}
+    ]
+
+
+def validate_batch_entry(entry: Dict, repaired: bool = False) -> Optional[Tuple[Dict, Dict]]:
+    """
+    Decode one batch entry into (sentiment_result, intent_result), repairing what analyzer.decoding
+    can; None if it cannot be repaired
+    """
+    try:
+        result = decode_response("batch", entry, repaired)
+    except DecodeError:
+        return None
+
+    reason = result["reason"] or "Batched classification"
+    sentiment_result = {
+        "sentiment": result["sentiment"],
+        "score": result["score"],
+        "reason": reason,
+        "keywords": result["keywords"],
+        "confidence": result["confidence"]
+    }
+    intent_result = {
+        "intent": result["intent"],
+        "secondary_intents": result["secondary_intents"],
+        "confidence": result["confidence"],
+        "reasoning": reason
+    }
+    return sentiment_result, intent_result
+
+
+def parse_batch_response(content: str, window: List[Tuple[int, str, str]]) -> Dict[int, Tuple[Dict, Dict]]:
+    """
+    Parse a batched response and line its entries up against the window's utterance ids.
+    Entries with unknown or duplicated ids, or malformed fields, are dropped so the caller
+    can fall back to per-utterance analysis for them.
+    """
+    try:
+        data, repaired = extract_json(content)
+        entries = data.get("results", []) if isinstance(data, dict) else data
+        if not isinstance(entries, list):
+            raise DecodeError("batched response does not contain a results list")
+    except DecodeError:
+        decode_stats.record("batch", "failed")
+        raise
+
+    expected_ids = {utterance_id for utterance_id, _, _ in window}
+    seen_ids = set()
+    duplicate_ids = set()
+    parsed = {}
+
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            utterance_id = int(entry.get("id"))
+        except (TypeError, ValueError):
+            continue
+        if utterance_id not in expected_ids:
+            logger.warning(f"Batched response returned unexpected utterance id {utterance_id}")
+            continue
+        if utterance_id in seen_ids:
+            duplicate_ids.add(utterance_id)
+            continue
+        seen_ids.add(utterance_id)
+
+        result = validate_batch_entry(entry, repaired)
+        if result is not None:
+            parsed[utterance_id] = result
+
+    # Ambiguous duplicates cannot be trusted either way
+    for utterance_id in duplicate_ids:
+        logger.warning(f"Batched response returned utterance id {utterance_id} more than once")
+        parsed.pop(utterance_id, None)
+
+    return parsed
+
+
+async def classify_batch(window: List[Tuple[int, str, str]], model: Optional[str] = None,
+                         stage: str = "batch") -> Dict[int, Tuple[Dict, Dict]]:
+    """Classify one window of utterances with a single chat completion (default: the gateway's chat model)"""
+    response = await gateway.chat(
+        stage=stage,
+        model=model,
+        messages=build_batch_messages(window),
+        response_format={"type": "json_object"},
+        temperature=0.2
+    )
+    return parse_batch_response(response.choices[0].message.content, window)
+
+
+async def classify_utterances_batched(utterances: List[Tuple[int, str, str]], semaphore: asyncio.Semaphore,
+                                      token_budget: int = BATCH_TOKEN_BUDGET,
+                                      max_items: int = BATCH_MAX_ITEMS) -> Dict[int, Tuple[Dict, Dict]]:
+    """
+    Classify sentiment and intent for (utterance_id, speaker, sentence) tuples in token-bounded
+    windows, with the windows running concurrently under the caller's semaphore.
+    Returns a mapping of utterance_id -> (sentiment_result, intent_result) for the
+    entries that came back valid; missing ids should be analyzed individually.
+    """
+    windows = build_batch_windows(utterances, token_budget, max_items)
+
+    async def run_window(window_num: int, window: List[Tuple[int, str, str]]) -> Dict[int, Tuple[Dict, Dict]]:
+        try:
+            async with semaphore:
+                parsed = await classify_batch(window)
+            missing = len(window) - len(parsed)
+            if missing:
+                # The per-utterance calls are the targeted re-requests for these entries
+                decode_stats.record("batch", "re_requested", missing)
+                logger.warning(f"Batch window {window_num}/{len(windows)}: {missing} of {len(window)} "
+                               f"utterances missing or malformed, falling back to per-utterance analysis")
+            return parsed
+        except Exception as e:
+            if isinstance(e, DecodeError):
+                decode_stats.record("batch", "re_requested", len(window))
+            logger.warning(f"Batch window {window_num}/{len(windows)} failed: {str(e)}")
+            return {}
+
+    results = {}
+    for parsed in await asyncio.gather(*(run_window(n, w) for n, w in enumerate(windows, 1))):
+        results.update(parsed)
+
+    logger.info(f"Batched classification covered {len(results)}/{len(utterances)} utterances "
+                f"in {len(windows)} requests")
+    return results
@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+# Circuit breaker per backend and model. A circuit opens when at least BREAKER_ERROR_RATE of the
+# attempts in the last BREAKER_WINDOW_SECONDS failed (given BREAKER_MIN_CALLS attempts), rejects
+# calls for BREAKER_OPEN_SECONDS, then lets BREAKER_HALF_OPEN_PROBES trial calls through: a success
+# closes it again, a failure reopens it.
+BREAKER_ENABLED = os.getenv("BREAKER_ENABLED", "true").lower() == "true"
+BREAKER_WINDOW_SECONDS = float(os.getenv("BREAKER_WINDOW_SECONDS", "60"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+BREAKER_HALF_OPEN_PROBES = int(os.getenv("BREAKER_HALF_OPEN_PROBES", "1"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose circuit is open"""
+
+    def __init__(self, key: str, retry_after: float):
+        super().__init__(f"LLM provider {key} is unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.key = key
+        self.retry_after = retry_after
+
+
+class Circuit:
+    """Rolling attempt outcomes and breaker state for one backend:model"""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.state = CLOSED
+        self.outcomes: Deque[Tuple[float, bool]] = deque()
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self.counters = {"opened": 0, "rejected": 0, "failures": 0, "successes": 0}
+        self.last_error: Optional[str] = None
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breakers shared by the gateway's chat and transcription paths.
+    allow() is asked before each attempt, record() after it; only provider failures (connection
+    errors, timeouts, 5xx, authentication) are recorded, so rate limiting and bad requests never trip it.
+    """
+
+    def __init__(self, enabled: bool = BREAKER_ENABLED, window_seconds: float = BREAKER_WINDOW_SECONDS,
+                 min_calls: int = BREAKER_MIN_CALLS, error_rate: float = BREAKER_ERROR_RATE,
+                 open_seconds: float = BREAKER_OPEN_SECONDS, half_open_probes: int = BREAKER_HALF_OPEN_PROBES):
+        self.enabled = enabled
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._circuits: Dict[str, Circuit] = {}
+        self._lock = threading.Lock()
+
+    def _circuit(self, key: str) -> Circuit:
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            circuit = self._circuits[key] = Circuit(key)
+        return circuit
+
+    def _trim(self, circuit: Circuit, now: float):
+        while circuit.outcomes and circuit.outcomes[0][0] < now - self.window_seconds:
+            _, ok = circuit.outcomes.popleft()
+            circuit.failures -= not ok
+
+    def _open(self, circuit: Circuit, now: float):
+        circuit.state = OPEN
+        circuit.opened_at = now
+        circuit.probes = 0
+        circuit.counters["opened"] += 1
+
+    def retry_after(self, key: str) -> float:
+        """Seconds until an open circuit lets a trial call through (0 when it is not open)"""
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if circuit is None or circuit.state != OPEN:
+                return 0.0
+            return max(0.0, circuit.opened_at + self.open_seconds - time.monotonic())
+
+    def is_open(self, key: str) -> bool:
+        """Whether calls to this backend:model would be rejected right now"""
+        return self.enabled and self.retry_after(key) > 0
+
+    def allow(self, key: str) -> bool:
+        """Whether an attempt may go out now; counts as a half-open probe when it does"""
+        if not self.enabled:
+            return True
+        with self._lock:
+            circuit = self._circuit(key)
+            now = time.monotonic()
+            if circuit.state == OPEN and now >= circuit.opened_at + self.open_seconds:
+                circuit.state = HALF_OPEN
+                circuit.probes = 0
+            if circuit.state == CLOSED:
+                return True
+            if circuit.state == HALF_OPEN and circuit.probes < self.half_open_probes:
+                circuit.probes += 1
+                return True
+            circuit.counters["rejected"] += 1
+            return False
+
+    def release(self, key: str):
+        """An allowed attempt ended without an outcome (cancelled, or an error that says nothing of the provider)"""
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if circuit is not None and circuit.state == HALF_OPEN and circuit.probes:
+                circuit.probes -= 1
+
+    def record(self, key: str, ok: bool, error: Optional[Exception] = None):
+        """Record the outcome of an attempt and update the circuit's state"""
+        if not self.enabled:
+            return
+        with self._lock:
+            circuit = self._circuit(key)
+            now = time.monotonic()
+            circuit.counters["successes" if ok else "failures"] += 1
+            if not ok:
+                circuit.last_error = str(error)[:200] if error is not None else None
+
+            if circuit.state == HALF_OPEN:
+                if ok:
+                    circuit.state = CLOSED
+                    circuit.outcomes.clear()
+                    circuit.failures = 0
+                else:
+                    self._open(circuit, now)
+                return
+            if circuit.state == OPEN:
+                # An attempt started before the circuit opened
+                return
+
+            circuit.outcomes.append((now, ok))
+            circuit.failures += not ok
+            self._trim(circuit, now)
+            calls = len(circuit.outcomes)
+            if calls >= self.min_calls and circuit.failures / calls >= self.error_rate:
+                self._open(circuit, now)
+
+    def state(self, key: str) -> str:
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if circuit is None:
+                return CLOSED
+            if circuit.state == OPEN and time.monotonic() >= circuit.opened_at + self.open_seconds:
+                return HALF_OPEN
+            return circuit.state
+
+    def stats(self) -> Dict:
+        """Per backend:model state, rolling error rate and counters for /health"""
+        circuits = {}
+        for key in list(self._circuits):
+            state = self.state(key)
+            retry_after = self.retry_after(key)
+            with self._lock:
+                circuit = self._circuits[key]
+                self._trim(circuit, time.monotonic())
+                calls = len(circuit.outcomes)
+                circuits[key] = {
+                    "state": state,
+                    "window_calls": calls,
+                    "window_error_rate": round(circuit.failures / calls, 3) if calls else 0.0,
+                    "retry_after_seconds": round(retry_after, 1),
+                    "last_error": circuit.last_error,
+                    **circuit.counters
+                }
+        return {"enabled": self.enabled, "error_rate": self.error_rate, "min_calls": self.min_calls,
+                "window_seconds": self.window_seconds, "open_seconds": self.open_seconds, "circuits": circuits}
@@ -0,0 +1,360 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, func
+
+from analyzer.gateway import gateway
+from analyzer.prompts import SENTIMENT_PROMPT, SENTIMENT_FEW_SHOT_EXAMPLES, INTENT_PROMPT
+from databaseLib.database import SessionLocal, engine, init_db
+from databaseLib.models import LLMCacheEntry, Utterance
+
+logger = logging.getLogger(__name__)
+
+# Cache settings
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MEMORY_SIZE = int(os.getenv("LLM_CACHE_MEMORY_SIZE", "10000"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+LLM_CACHE_MAX_ROWS = int(os.getenv("LLM_CACHE_MAX_ROWS", "200000"))
+
+# Check the disk tier size every N writes rather than on every insert
+EVICTION_CHECK_INTERVAL = 500
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_sentence(sentence: str) -> str:
+    """Collapse whitespace so trivially different copies of a line share a cache entry"""
+    return WHITESPACE_PATTERN.sub(' ', sentence).strip()
+
+
+def make_cache_key(kind: str, sentence: str, system_prompt: str, few_shot_examples: Optional[List[Dict]],
+                   model: str, temperature: float) -> str:
+    """
+    Content-addressed cache key. The prompt text, few-shot examples, model and temperature are
+    part of the hash, so changing any of them invalidates old entries without a manual flush.
+    """
+    material = json.dumps({
+        "kind": kind,
+        "input": normalize_sentence(sentence),
+        "prompt": system_prompt,
+        "few_shot": few_shot_examples or [],
+        "model": model,
+        "temperature": temperature
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LLMResultCache:
+    """Bounded in-process LRU in front of the llm_cache_entries SQLite table"""
+
+    def __init__(self, memory_size: int = LLM_CACHE_MEMORY_SIZE, ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+                 max_rows: int = LLM_CACHE_MAX_ROWS, enabled: bool = LLM_CACHE_ENABLED):
+        self.memory_size = memory_size
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.max_rows = max_rows
+        self.enabled = enabled
+        self._memory = OrderedDict()  # cache_key -> (expires_at, result)
+        self._lock = threading.Lock()
+        self._table_ready = False
+        self._writes_since_check = 0
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0,
+                         "disk_errors": 0}
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def _ensure_table(self):
+        if not self._table_ready:
+            LLMCacheEntry.__table__.create(bind=engine, checkfirst=True)
+            self._table_ready = True
+
+    def _remember(self, cache_key: str, result: Dict, expires_at: datetime):
+        with self._lock:
+            self._memory[cache_key] = (expires_at, result)
+            self._memory.move_to_end(cache_key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def _get_memory(self, cache_key: str, now: datetime) -> Optional[Dict]:
+        with self._lock:
+            cached = self._memory.get(cache_key)
+            if cached is not None:
+                expires_at, result = cached
+                if expires_at > now:
+                    self._memory.move_to_end(cache_key)
+                    self.counters["memory_hits"] += 1
+                    return dict(result)
+                del self._memory[cache_key]
+        return None
+
+    def _get_disk(self, cache_key: str, now: datetime) -> Optional[Dict]:
+        try:
+            self._ensure_table()
+            db = SessionLocal()
+            try:
+                entry = db.get(LLMCacheEntry, cache_key)
+                if entry is not None and entry.created_at + self.ttl > now:
+                    entry.hit_count = (entry.hit_count or 0) + 1
+                    entry.last_accessed_at = now
+                    db.commit()
+                    self._remember(cache_key, entry.result, entry.created_at + self.ttl)
+                    self._count("disk_hits")
+                    return dict(entry.result)
+            finally:
+                db.close()
+        except Exception as e:
+            self._count("disk_errors")
+            logger.warning(f"LLM cache read failed: {str(e)}")
+
+        self._count("misses")
+        return None
+
+    def get(self, cache_key: str) -> Optional[Dict]:
+        """Look a result up in memory, then on disk; returns None on a miss or expired entry"""
+        if not self.enabled:
+            return None
+        now = datetime.utcnow()
+        cached = self._get_memory(cache_key, now)
+        return cached if cached is not None else self._get_disk(cache_key, now)
+
+    async def get_async(self, cache_key: str) -> Optional[Dict]:
+        """get() for the event loop: memory hits are answered inline, the SQLite tier runs in a worker thread"""
+        if not self.enabled:
+            return None
+        now = datetime.utcnow()
+        cached = self._get_memory(cache_key, now)
+        return cached if cached is not None else await asyncio.to_thread(self._get_disk, cache_key, now)
+
+    def _write(self, cache_key: str, kind: str, model: str, result: Dict, now: datetime):
+        try:
+            self._ensure_table()
+            db = SessionLocal()
+            try:
+                db.merge(LLMCacheEntry(cache_key=cache_key, kind=kind, model=model, result=result,
+                                       hit_count=0, created_at=now, last_accessed_at=now))
+                db.commit()
+            finally:
+                db.close()
+            self._count("writes")
+        except Exception as e:
+            self._count("disk_errors")
+            logger.warning(f"LLM cache write failed: {str(e)}")
+            return
+
+        with self._lock:
+            self._writes_since_check += 1
+            check_due = self._writes_since_check >= EVICTION_CHECK_INTERVAL
+            if check_due:
+                self._writes_since_check = 0
+        if check_due:
+            self.evict()
+
+    def set(self, cache_key: str, kind: str, model: str, result: Dict):
+        """Store a successful LLM result in both tiers"""
+        if not self.enabled:
+            return
+        now = datetime.utcnow()
+        self._remember(cache_key, result, now + self.ttl)
+        self._write(cache_key, kind, model, result, now)
+
+    async def set_async(self, cache_key: str, kind: str, model: str, result: Dict):
+        """set() for the event loop: the memory tier is updated inline, the SQLite write runs in a worker thread"""
+        if not self.enabled:
+            return
+        now = datetime.utcnow()
+        self._remember(cache_key, result, now + self.ttl)
+        await asyncio.to_thread(self._write, cache_key, kind, model, result, now)
+
+    def set_many(self, entries: List[Tuple[str, str, str, Dict]]) -> int:
+        """Store (cache_key, kind, model, result) entries in both tiers from one session; returns rows written"""
+        if not self.enabled or not entries:
+            return 0
+
+        now = datetime.utcnow()
+        for cache_key, _, _, result in entries:
+            self._remember(cache_key, result, now + self.ttl)
+
+        try:
+            self._ensure_table()
+            db = SessionLocal()
+            try:
+                for n, (cache_key, kind, model, result) in enumerate(entries, 1):
+                    db.merge(LLMCacheEntry(cache_key=cache_key, kind=kind, model=model, result=result,
+                                           hit_count=0, created_at=now, last_accessed_at=now))
+                    if n % 1000 == 0:
+                        db.commit()
+                db.commit()
+            finally:
+                db.close()
+            self._count("writes", len(entries))
+        except Exception as e:
+            self._count("disk_errors")
+            logger.warning(f"LLM cache write failed: {str(e)}")
+            return 0
+
+        self.evict()
+        return len(entries)
+
+    def evict(self) -> int:
+        """Drop expired rows, then the least recently used rows above max_rows"""
+        try:
+            self._ensure_table()
+            db = SessionLocal()
+            try:
+                cutoff = datetime.utcnow() - self.ttl
+                removed = db.query(LLMCacheEntry).filter(LLMCacheEntry.created_at < cutoff).delete(
+                    synchronize_session=False)
+
+                excess = db.query(LLMCacheEntry).count() - self.max_rows
+                if excess > 0:
+                    stale_keys = [row.cache_key for row in db.query(LLMCacheEntry.cache_key)
+                                  .order_by(LLMCacheEntry.last_accessed_at.asc()).limit(excess)]
+                    removed += db.query(LLMCacheEntry).filter(LLMCacheEntry.cache_key.in_(stale_keys)).delete(
+                        synchronize_session=False)
+                db.commit()
+            finally:
+                db.close()
+        except Exception as e:
+            self._count("disk_errors")
+            logger.warning(f"LLM cache eviction failed: {str(e)}")
+            return 0
+
+        if removed:
+            self._count("evictions", removed)
+            logger.info(f"LLM cache evicted {removed} rows")
+        return removed
+
+    def table_stats(self) -> Dict:
+        """Persistent figures from the llm_cache_entries table: rows per kind, expired rows and hits served"""
+        self._ensure_table()
+        db = SessionLocal()
+        try:
+            cutoff = datetime.utcnow() - self.ttl
+            rows, total_hits, rows_hit, oldest, newest = db.query(
+                func.count(LLMCacheEntry.cache_key),
+                func.sum(LLMCacheEntry.hit_count),
+                func.sum(case((LLMCacheEntry.hit_count > 0, 1), else_=0)),
+                func.min(LLMCacheEntry.created_at),
+                func.max(LLMCacheEntry.created_at)
+            ).one()
+            expired = db.query(LLMCacheEntry).filter(LLMCacheEntry.created_at < cutoff).count()
+            kinds = dict(db.query(LLMCacheEntry.kind, func.count(LLMCacheEntry.cache_key))
+                         .group_by(LLMCacheEntry.kind).all())
+        finally:
+            db.close()
+        return {
+            "rows": rows,
+            "max_rows": self.max_rows,
+            "expired_rows": expired,
+            "rows_by_kind": kinds,
+            "total_hits": int(total_hits or 0),
+            "rows_hit": int(rows_hit or 0),
+            "oldest_entry": oldest.isoformat() if oldest else None,
+            "newest_entry": newest.isoformat() if newest else None
+        }
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for /health"""
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else 0.0
+        stats["enabled"] = self.enabled
+        return stats
+
+
+# Process-wide cache shared by the analyzer
+llm_cache = LLMResultCache()
+
+# Stored answers that came from the chat model. Pre-classifier, semantic cache, distilled model,
+# deadline and error answers are not LLM labels, nor are defaults the LLM path fell back to.
+LLM_SOURCES = ("llm", "batch", "microbatch")
+# Rows stored before analysis_source was recorded are judged by their reasons alone
+NON_LLM_REASON_PREFIXES = ("Error", "Default", "Pending", "Matched ", "Distilled model")
+
+
+def llm_answered(row: Utterance) -> bool:
+    """Whether a stored utterance's sentiment and intent are the chat model's own answers"""
+    if row.analysis_source is not None and row.analysis_source not in LLM_SOURCES:
+        return False
+    return not ((row.sentiment_reason or "").startswith(NON_LLM_REASON_PREFIXES)
+                or (row.intent_reasoning or "").startswith(NON_LLM_REASON_PREFIXES))
+
+
+def warm_cache_from_utterances(limit: Optional[int] = None) -> int:
+    """
+    Seed the cache from stored Utterance rows, keyed with the current prompts and model. Only the chat
+    model's own answers are used (see llm_answered). Entries are collected while reading and written once
+    the read has finished: committing while its cursor is open would wait out SQLite's lock and fail.
+    """
+    entries = []
+    seen = set()
+    db = SessionLocal()
+    try:
+        query = db.query(Utterance).order_by(Utterance.processed_at.desc())
+        if limit:
+            query = query.limit(limit)
+
+        for row in query.yield_per(1000):
+            if not row.sentence or not llm_answered(row):
+                continue
+            sentence = normalize_sentence(row.sentence)
+            if sentence in seen:
+                continue
+            seen.add(sentence)
+
+            if row.sentiment:
+                entries.append((
+                    make_cache_key("sentiment", sentence, SENTIMENT_PROMPT, SENTIMENT_FEW_SHOT_EXAMPLES,
+                                   gateway.chat_model, 0.2),
+                    "sentiment", gateway.chat_model,
+                    {"sentiment": row.sentiment, "score": row.sentiment_score, "reason": row.sentiment_reason or "",
+                     "keywords": row.sentiment_keywords or [], "confidence": row.sentiment_confidence}
+                ))
+
+            if row.intent and row.intent != "unknown":
+                entries.append((
+                    make_cache_key("intent", sentence, INTENT_PROMPT, None, gateway.chat_model, 0.2),
+                    "intent", gateway.chat_model,
+                    {"intent": row.intent, "secondary_intents": row.secondary_intents or [],
+                     "confidence": row.intent_confidence, "reasoning": row.intent_reasoning or ""}
+                ))
+    finally:
+        db.close()
+
+    seeded = llm_cache.set_many(entries)
+    logger.info(f"LLM cache warm-up seeded {seeded} entries from {len(seen)} distinct utterances")
+    return seeded
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the LLM result cache")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    warm_parser = subparsers.add_parser("warm", help="Seed the cache from existing Utterance rows")
+    warm_parser.add_argument("--limit", type=int, default=None, help="Only use the N most recent utterances")
+    subparsers.add_parser("evict", help="Drop expired and least recently used entries")
+    subparsers.add_parser("stats", help="Print row, expiry and hit figures of the cache table")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "warm":
+        init_db()
+        print(f"Seeded {warm_cache_from_utterances(args.limit)} cache entries")
+    elif args.command == "evict":
+        print(f"Evicted {llm_cache.evict()} cache entries")
+    else:
+        # A fresh process has no in-memory counters; /health reports those for the running API
+        print(json.dumps(llm_cache.table_stats(), indent=2))
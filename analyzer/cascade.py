@@ -0,0 +1,123 @@
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from analyzer.backends import LLMBackend, create_backend
+
+# Model cascade: utterances are classified by the chat backend's model (the small tier) first, and only
+# answers below CASCADE_CONFIDENCE_THRESHOLD, or whose sentiment and intent contradict each other, are
+# re-asked of CASCADE_LARGE_MODEL on CASCADE_LARGE_BACKEND (default: the chat backend)
+CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "false").lower() == "true"
+CASCADE_LARGE_MODEL = os.getenv("CASCADE_LARGE_MODEL", "llama-3.3-70b-versatile")
+CASCADE_LARGE_BACKEND = os.getenv("CASCADE_LARGE_BACKEND", "").lower()
+CASCADE_CONFIDENCE_THRESHOLD = float(os.getenv("CASCADE_CONFIDENCE_THRESHOLD", "0.6"))
+CASCADE_ESCALATE_CONFLICTS = os.getenv("CASCADE_ESCALATE_CONFLICTS", "true").lower() == "true"
+
+# Sentiment and intent pairs that contradict each other badly enough to re-ask both
+CONFLICTING_LABELS = {
+    ("extreme positive", "complaint"),
+    ("extreme positive", "escalation"),
+    ("positive", "escalation"),
+    ("extreme negative", "acknowledgment"),
+}
+
+# Sources of small-tier answers; pre-classifier and deadline answers are never escalated
+ESCALATABLE_SOURCES = ("llm", "batch", "microbatch")
+
+TIER_LOCAL = "local"
+TIER_SMALL = "small"
+TIER_LARGE = "large"
+
+
+def result_confidence(result: Dict) -> Optional[float]:
+    """The result's confidence, None when the model did not report one"""
+    try:
+        return float(result["confidence"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def low_confidence(result: Dict, threshold: float) -> bool:
+    """Only a reported confidence below threshold is low; an unknown one is not"""
+    confidence = result_confidence(result)
+    return confidence is not None and confidence < threshold
+
+
+class ModelCascade:
+    """
+    Decides which small-tier answers are re-asked of the large model, and counts escalations.
+    large_backend of None sends escalations to the gateway's chat backend.
+    """
+
+    def __init__(self, enabled: bool = CASCADE_ENABLED, large_model: str = CASCADE_LARGE_MODEL,
+                 large_backend: Optional[LLMBackend] = None, threshold: float = CASCADE_CONFIDENCE_THRESHOLD,
+                 escalate_conflicts: bool = CASCADE_ESCALATE_CONFLICTS):
+        self.enabled = enabled
+        self.large_model = large_model
+        if large_backend is None and CASCADE_LARGE_BACKEND:
+            large_backend = create_backend(CASCADE_LARGE_BACKEND)
+        self.large_backend = large_backend
+        self.threshold = threshold
+        self.escalate_conflicts = escalate_conflicts
+        self._lock = threading.Lock()
+        self.counters = {"checked": 0, "escalated": 0, "sentiment_escalated": 0, "intent_escalated": 0,
+                         "low_sentiment_confidence": 0, "low_intent_confidence": 0, "conflict": 0,
+                         "escalation_failures": 0}
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def escalations(self, sentiment_result: Dict, intent_result: Dict) -> Tuple[List[str], List[str]]:
+        """Which results ("sentiment", "intent") to re-ask of the large model, and why"""
+        kinds, reasons = [], []
+        if low_confidence(sentiment_result, self.threshold):
+            kinds.append("sentiment")
+            reasons.append("low_sentiment_confidence")
+        if low_confidence(intent_result, self.threshold):
+            kinds.append("intent")
+            reasons.append("low_intent_confidence")
+        if self.escalate_conflicts and (sentiment_result.get("sentiment"), intent_result.get("intent")) in \
+                CONFLICTING_LABELS:
+            kinds = ["sentiment", "intent"]
+            reasons.append("conflict")
+        return kinds, reasons
+
+    def record(self, kinds: List[str], reasons: List[str], failures: int = 0):
+        """Count one checked utterance, the results re-asked for it and the escalations that failed"""
+        self._count("checked")
+        if kinds:
+            self._count("escalated")
+        for name in [f"{kind}_escalated" for kind in kinds] + reasons:
+            self._count(name)
+        if failures:
+            self._count("escalation_failures", failures)
+
+    def stats(self) -> Dict:
+        """Settings and escalation counters for /health"""
+        with self._lock:
+            stats = dict(self.counters)
+        stats["escalation_rate"] = round(stats["escalated"] / stats["checked"], 4) if stats["checked"] else 0.0
+        stats.update(enabled=self.enabled, large_model=self.large_model, threshold=self.threshold,
+                     large_backend=self.large_backend.name if self.large_backend is not None else None)
+        return stats
+
+
+def summarize_tiers(utterances: List[Dict]) -> Dict:
+    """Utterances answered by each tier and the escalation reasons, for an analysis summary"""
+    tiers = {}
+    reasons = {}
+    for utterance in utterances:
+        tier = utterance.get("model_tier")
+        if tier is None:
+            continue
+        tiers[tier] = tiers.get(tier, 0) + 1
+        for reason in utterance.get("escalation_reasons") or []:
+            reasons[reason] = reasons.get(reason, 0) + 1
+    checked = tiers.get(TIER_SMALL, 0) + tiers.get(TIER_LARGE, 0)
+    return {"tiers": tiers, "escalation_reasons": reasons,
+            "escalation_rate": round(tiers.get(TIER_LARGE, 0) / checked, 4) if checked else 0.0}
+
+
+# Process-wide cascade settings shared by all analyses
+cascade = ModelCascade()
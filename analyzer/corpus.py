@@ -0,0 +1,460 @@
+"""
+Bulk corpus analyzer: run every .txt and audio file under a directory, glob or manifest through
+the analysis pipeline, fanned out over two process pools (CPU-bound audio processing and
+LLM-bound text analysis, sized separately).
+
+Results stream to JSONL or Parquet as they complete. Every finished file is appended to a
+checkpoint, so re-running the same command after a crash skips what is already done.
+A throughput summary is printed at the end.
+
+Usage (from the repository root):
+    python -m analyzer.corpus data/ --output results.jsonl --text-workers 8 --audio-workers 2
+    python -m analyzer.corpus --manifest files.txt --output results.parquet --store-db
+"""
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+logger = logging.getLogger(__name__)
+
+TEXT_EXTENSIONS = ('.txt',)
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.mp4', '.m4a')
+
+# Pool sizes and output flushing
+CORPUS_TEXT_WORKERS = int(os.getenv("CORPUS_TEXT_WORKERS", "4"))
+CORPUS_AUDIO_WORKERS = int(os.getenv("CORPUS_AUDIO_WORKERS", "1"))
+CORPUS_FLUSH_EVERY = int(os.getenv("CORPUS_FLUSH_EVERY", "50"))
+CORPUS_FLUSH_SECONDS = float(os.getenv("CORPUS_FLUSH_SECONDS", "10"))
+
+
+# --- Input discovery ---
+
+def discover_inputs(paths: List[str], manifest: Optional[str] = None,
+                    default_domain: Optional[str] = None) -> List[Tuple[str, Optional[str]]]:
+    """(path, domain) for every supported file in the given directories/globs/files and manifest"""
+    supported = TEXT_EXTENSIONS + AUDIO_EXTENSIONS
+    found = []
+
+    for pattern in paths:
+        matches = [pattern] if os.path.exists(pattern) else sorted(glob.glob(pattern, recursive=True))
+        for match in matches:
+            if os.path.isdir(match):
+                for root, _, files in os.walk(match):
+                    found.extend(os.path.join(root, f) for f in sorted(files) if f.lower().endswith(supported))
+            elif match.lower().endswith(supported):
+                found.append(match)
+
+    entries = [(path, default_domain) for path in found]
+
+    if manifest:
+        # One file per line, optionally followed by ",domain"; relative paths are relative to the manifest
+        base_dir = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                path, _, domain = line.partition(",")
+                path = path.strip()
+                if not os.path.isabs(path):
+                    path = os.path.join(base_dir, path)
+                entries.append((path, domain.strip() or default_domain))
+
+    # Deduplicate while keeping order; a domain given in the manifest wins over the default
+    unique: Dict[str, Optional[str]] = {}
+    for path, domain in entries:
+        key = os.path.abspath(path)
+        if key not in unique or domain != default_domain:
+            unique[key] = domain
+    return list(unique.items())
+
+
+def is_audio(path: str) -> bool:
+    return path.lower().endswith(AUDIO_EXTENSIONS)
+
+
+def corpus_conversation_id(path: str) -> str:
+    """Stable conversation id per source file, so resumed runs and DB inserts line up"""
+    return f"corpus_{hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:16]}"
+
+
+# --- Worker processes ---
+
+def init_text_worker(pool_size: int, log_level: int):
+    # Ctrl-C is handled by the parent, which lets running files finish
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Import first: the analyzer modules configure logging on import
+    import analyzer.analyzer  # noqa: F401
+    from analyzer.gateway import gateway
+    logging.getLogger().setLevel(log_level)
+    logging.getLogger("httpx").setLevel(max(log_level, logging.WARNING))
+    # The provider quota is shared by every worker process
+    gateway.scale_limits(1.0 / max(1, pool_size))
+
+
+def init_audio_worker(log_level: int):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import analyzer.audio_processor  # noqa: F401
+    logging.getLogger().setLevel(log_level)
+
+
+def analyze_text(path: str, domain: Optional[str], text: Optional[str] = None,
+                 batch_mode: Optional[bool] = None, call_log: Optional[List[Dict]] = None) -> Dict:
+    """Analyze one conversation (runs in a text worker process)"""
+    from analyzer.analyzer import analyze_sentences_async
+
+    start = time.perf_counter()
+    try:
+        if text is None:
+            with open(path, "rb") as fh:
+                content = fh.read()
+            try:
+                text = content.decode("utf-8")
+            except UnicodeDecodeError:
+                text = content.decode("latin-1")
+
+        analysis = asyncio.run(analyze_sentences_async(text, domain, batch_mode, call_log=call_log))
+        if "error" in analysis:
+            return {"source_path": path, "status": "failed", "error": analysis["error"],
+                    "seconds": round(time.perf_counter() - start, 3)}
+
+        analysis["conversation_id"] = corpus_conversation_id(path)
+        analysis["raw_text"] = text
+        analysis["original_filename"] = os.path.basename(path)
+        return {"source_path": path, "status": "ok", "analysis": analysis,
+                "seconds": round(time.perf_counter() - start, 3)}
+
+    except Exception as e:
+        return {"source_path": path, "status": "failed", "error": f"{type(e).__name__}: {str(e)}",
+                "seconds": round(time.perf_counter() - start, 3)}
+
+
+def transcribe_audio(path: str) -> Dict:
+    """Diarize and transcribe one audio file (runs in an audio worker process)"""
+    start = time.perf_counter()
+    try:
+        from analyzer.audio_processor import process_audio_file
+        from analyzer.gateway import record_calls
+        # Conversion, diarization and transcription calls continue in the text worker's call log
+        call_log = record_calls()
+        text = process_audio_file(path)
+        if not text or not text.strip():
+            raise ValueError("No speech detected in audio file")
+        return {"source_path": path, "status": "ok", "text": text, "llm_calls": call_log,
+                "seconds": round(time.perf_counter() - start, 3)}
+    except Exception as e:
+        return {"source_path": path, "status": "failed", "error": f"{type(e).__name__}: {str(e)}",
+                "seconds": round(time.perf_counter() - start, 3)}
+
+
+# --- Output ---
+
+class JsonlResultWriter:
+    """One JSON record per line; records are buffered and written together on flush"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = open(path, "a", encoding="utf-8")
+        self._pending = []
+
+    def write(self, record: Dict):
+        self._pending.append(record)
+
+    def flush(self) -> List[Dict]:
+        """Make buffered records durable and return them for checkpointing"""
+        if not self._pending:
+            return []
+        self._fh.write("".join(json.dumps(record, default=str) + "\n" for record in self._pending))
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        committed, self._pending = self._pending, []
+        return committed
+
+    def close(self):
+        self._fh.close()
+
+
+class ParquetResultWriter:
+    """
+    Flat per-conversation columns (full analysis kept as JSON) written as one part file per flush
+    into an output directory, so a resumed run adds parts instead of rewriting a partial file.
+    """
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow  # noqa: F401
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)")
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._pending = []
+
+    @staticmethod
+    def flatten(record: Dict) -> Dict:
+        analysis = record.get("analysis") or {}
+        return {
+            "source_path": record["source_path"],
+            "status": record["status"],
+            "error": record.get("error"),
+            "seconds": record.get("seconds"),
+            "conversation_id": analysis.get("conversation_id"),
+            "domain": analysis.get("domain"),
+            "file_type": record.get("file_type"),
+            "total_utterances": analysis.get("total_utterances"),
+            "primary_topic": analysis.get("topic_analysis", {}).get("primary_topic"),
+            "csat_score": analysis.get("csat_analysis", {}).get("csat_score"),
+            "csat_rating": analysis.get("csat_analysis", {}).get("csat_rating"),
+            "agent_performance_score": analysis.get("agent_performance", {}).get("overall_score"),
+            "agent_performance_rating": analysis.get("agent_performance", {}).get("rating"),
+            "model_used": analysis.get("model_used"),
+            "processing_time_seconds": analysis.get("performance", {}).get("processing_time_seconds"),
+            "llm_calls": analysis.get("performance", {}).get("llm_calls"),
+            "db_id": record.get("db_id"),
+            "analysis_json": json.dumps(analysis, default=str) if analysis else None
+        }
+
+    def write(self, record: Dict):
+        self._pending.append(record)
+
+    def flush(self) -> List[Dict]:
+        if not self._pending:
+            return []
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pylist([self.flatten(r) for r in self._pending])
+        part = os.path.join(self.path, f"part-{datetime.now().strftime('%Y%m%d%H%M%S%f')}.parquet")
+        pq.write_table(table, part + ".tmp")
+        os.replace(part + ".tmp", part)
+        committed, self._pending = self._pending, []
+        return committed
+
+    def close(self):
+        pass
+
+
+def open_writer(path: str, output_format: Optional[str] = None):
+    output_format = output_format or ("parquet" if path.endswith(".parquet") else "jsonl")
+    if output_format == "parquet":
+        return ParquetResultWriter(path)
+    return JsonlResultWriter(path)
+
+
+class Checkpoint:
+    """Append-only log of source files that reached a final state"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Dict[str, str] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn final line from a crash
+                    self.done[entry["path"]] = entry["status"]
+        self._fh = open(path, "a", encoding="utf-8")
+
+    def record(self, records: List[Dict]):
+        for record in records:
+            self._fh.write(json.dumps({"path": record["source_path"], "status": record["status"]}) + "\n")
+            self.done[record["source_path"]] = record["status"]
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+
+    def close(self):
+        self._fh.close()
+
+
+# --- Driver ---
+
+def run_corpus(entries: List[Tuple[str, Optional[str]]], output: str, output_format: Optional[str] = None,
+               checkpoint_path: Optional[str] = None, text_workers: int = CORPUS_TEXT_WORKERS,
+               audio_workers: int = CORPUS_AUDIO_WORKERS, store_db: bool = False,
+               batch_mode: Optional[bool] = None, retry_failed: bool = False,
+               flush_every: int = CORPUS_FLUSH_EVERY, log_level: int = logging.WARNING) -> Dict:
+    checkpoint = Checkpoint(checkpoint_path or f"{output.rstrip('/')}.checkpoint.jsonl")
+    skip_statuses = {"ok"} if retry_failed else {"ok", "failed"}
+    todo = [(path, domain) for path, domain in entries if checkpoint.done.get(path) not in skip_statuses]
+    skipped = len(entries) - len(todo)
+    logger.info(f"{len(entries)} files, {skipped} already done, {len(todo)} to process")
+
+    writer = open_writer(output, output_format)
+    db = None
+    if store_db:
+        from databaseLib.database import SessionLocal, init_db
+        init_db()
+        db = SessionLocal()
+
+    summary = {"files_total": len(entries), "skipped_from_checkpoint": skipped, "processed": 0, "ok": 0,
+               "failed": 0, "utterances": 0, "audio_files": 0, "text_files": 0, "stored": 0}
+    unflushed = []
+    start = time.perf_counter()
+    last_flush = [start]
+
+    def flush():
+        # Database, then output, then checkpoint: a file is only skipped on resume once both are durable
+        if store_db and unflushed:
+            from analyzer.dedup import analysis_fingerprint
+            from databaseLib.storage import store_analysis_batch
+            ok_records = [r for r in unflushed if r["status"] == "ok"]
+            analyses = [r["analysis"] for r in ok_records]
+            stored_ids = store_analysis_batch(db, analyses, [analysis_fingerprint(a) for a in analyses])
+            summary["stored"] += sum(1 for i in stored_ids if i is not None)
+        checkpoint.record(writer.flush())
+        unflushed.clear()
+        last_flush[0] = time.perf_counter()
+
+    def finish(record: Dict, file_type: str):
+        record["file_type"] = file_type
+        writer.write(record)
+        unflushed.append(record)
+        summary["processed"] += 1
+        summary[record["status"]] += 1
+        if record["status"] == "ok":
+            summary["utterances"] += record["analysis"].get("total_utterances", 0)
+        else:
+            logger.warning(f"Failed: {record['source_path']}: {record.get('error')}")
+        if len(unflushed) >= flush_every or time.perf_counter() - last_flush[0] >= CORPUS_FLUSH_SECONDS:
+            flush()
+
+    text_pool = ProcessPoolExecutor(max_workers=text_workers, initializer=init_text_worker,
+                                    initargs=(text_workers, log_level))
+    audio_pool = None
+    if any(is_audio(path) for path, _ in todo):
+        audio_pool = ProcessPoolExecutor(max_workers=audio_workers, initializer=init_audio_worker,
+                                         initargs=(log_level,))
+
+    # Keep a bounded number of submissions in flight per pool instead of queuing the whole corpus
+    text_queue = [(path, domain) for path, domain in todo if not is_audio(path)]
+    audio_queue = [(path, domain) for path, domain in todo if is_audio(path)]
+    text_queue.reverse()
+    audio_queue.reverse()
+    in_flight = {}
+    audio_domains = {}
+
+    def fill():
+        text_pending = sum(1 for kind in in_flight.values() if kind[0] != "audio")
+        while text_queue and text_pending < text_workers * 2:
+            path, domain = text_queue.pop()
+            in_flight[text_pool.submit(analyze_text, path, domain, None, batch_mode)] = ("text", path)
+            text_pending += 1
+        audio_pending = sum(1 for kind in in_flight.values() if kind[0] == "audio")
+        while audio_queue and audio_pending < audio_workers * 2:
+            path, domain = audio_queue.pop()
+            audio_domains[path] = domain
+            in_flight[audio_pool.submit(transcribe_audio, path)] = ("audio", path)
+            audio_pending += 1
+
+    interrupted = False
+    try:
+        fill()
+        while in_flight:
+            try:
+                done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+            except KeyboardInterrupt:
+                if interrupted:
+                    raise
+                # First Ctrl-C: stop submitting and drain what is already running
+                interrupted = True
+                text_queue.clear()
+                audio_queue.clear()
+                logger.warning(f"Interrupted: finishing {len(in_flight)} in-flight files (Ctrl-C again to abort)")
+                continue
+            for future in done:
+                kind, path = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"source_path": path, "status": "failed", "error": f"Worker crashed: {str(e)}"}
+
+                if kind == "audio":
+                    summary["audio_files"] += 1
+                    if result["status"] == "ok" and interrupted:
+                        continue  # Not checkpointed, so the next run picks it up again
+                    if result["status"] == "ok":
+                        # Transcript goes on to the LLM-bound text pool
+                        future_text = text_pool.submit(analyze_text, path, audio_domains.pop(path, None),
+                                                       result["text"], batch_mode, result["llm_calls"])
+                        in_flight[future_text] = ("audio_text", path)
+                    else:
+                        finish(result, "audio")
+                else:
+                    if kind == "text":
+                        summary["text_files"] += 1
+                    finish(result, "audio" if kind == "audio_text" else "text")
+            fill()
+        flush()
+    except KeyboardInterrupt:
+        # Keep what already finished so the next run resumes after it
+        flush()
+        raise
+    finally:
+        text_pool.shutdown(cancel_futures=True)
+        if audio_pool is not None:
+            audio_pool.shutdown(cancel_futures=True)
+        writer.close()
+        checkpoint.close()
+        if db is not None:
+            db.close()
+
+    elapsed = time.perf_counter() - start
+    summary["interrupted"] = interrupted
+    summary["elapsed_seconds"] = round(elapsed, 2)
+    summary["files_per_second"] = round(summary["processed"] / elapsed, 3) if elapsed else 0.0
+    summary["utterances_per_second"] = round(summary["utterances"] / elapsed, 2) if elapsed else 0.0
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze a corpus of conversation text and audio files")
+    parser.add_argument("paths", nargs="*", help="Directories, files or glob patterns")
+    parser.add_argument("--manifest", help="File listing one input path per line (optionally 'path,domain')")
+    parser.add_argument("--output", required=True, help="Results .jsonl file or .parquet directory")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], help="Defaults to the --output extension")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint.jsonl)")
+    parser.add_argument("--text-workers", type=int, default=CORPUS_TEXT_WORKERS,
+                        help="Processes for LLM-bound text analysis")
+    parser.add_argument("--audio-workers", type=int, default=CORPUS_AUDIO_WORKERS,
+                        help="Processes for audio conversion, diarization and transcription")
+    parser.add_argument("--domain", help="Domain for files without one in the manifest")
+    parser.add_argument("--batch-mode", action="store_true", default=None,
+                        help="Use batched sentiment/intent classification")
+    parser.add_argument("--store-db", action="store_true", help="Also bulk-insert results into the database")
+    parser.add_argument("--retry-failed", action="store_true", help="Re-run files that failed in a previous run")
+    parser.add_argument("--flush-every", type=int, default=CORPUS_FLUSH_EVERY,
+                        help="Results per output flush / checkpoint / DB batch")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    if not args.paths and not args.manifest:
+        parser.error("Give at least one path or --manifest")
+
+    log_level = logging.INFO if args.verbose else logging.WARNING
+    logging.getLogger().setLevel(log_level)
+
+    entries = discover_inputs(args.paths, args.manifest, args.domain)
+    summary = run_corpus(entries, args.output, args.format, args.checkpoint, args.text_workers,
+                         args.audio_workers, args.store_db, args.batch_mode, args.retry_failed,
+                         args.flush_every, log_level)
+    print(json.dumps(summary, indent=2))
+    if summary["interrupted"]:
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import os
+import time
+from typing import Dict, Optional
+
+# Per-request analysis budget. /analyze/ uses the client's deadline_seconds, or this when the client
+# sends none (0 = no deadline). Once only ANALYSIS_DEGRADE_RESERVE of the budget is left, utterances
+# still waiting on the LLM are answered locally and flagged as degraded.
+ANALYSIS_DEADLINE_SECONDS = float(os.getenv("ANALYSIS_DEADLINE_SECONDS", "0"))
+ANALYSIS_DEGRADE_RESERVE = float(os.getenv("ANALYSIS_DEGRADE_RESERVE", "0.15"))
+# Finish degraded utterances with the LLM after the response and update the stored conversation
+ANALYSIS_BACKGROUND_COMPLETION = os.getenv("ANALYSIS_BACKGROUND_COMPLETION", "true").lower() == "true"
+
+
+class Deadline:
+    """
+    A request's time budget, started when the request arrived so transcription counts against it.
+    Analysis degrades at degrade_at and gives up waiting at expires_at.
+    """
+
+    def __init__(self, budget_seconds: float, reserve: float = ANALYSIS_DEGRADE_RESERVE,
+                 started: Optional[float] = None):
+        self.budget_seconds = budget_seconds
+        self.started = time.monotonic() if started is None else started
+        self.expires_at = self.started + budget_seconds
+        self.degrade_at = self.expires_at - budget_seconds * min(1.0, max(0.0, reserve))
+
+    @classmethod
+    def from_budget(cls, budget_seconds: Optional[float]) -> Optional["Deadline"]:
+        """Deadline for a request's budget (ANALYSIS_DEADLINE_SECONDS when None), or None for no deadline"""
+        if budget_seconds is None:
+            budget_seconds = ANALYSIS_DEADLINE_SECONDS
+        return cls(budget_seconds) if budget_seconds and budget_seconds > 0 else None
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining(self) -> float:
+        """Seconds until the deadline (never negative)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def until_degrade(self) -> float:
+        """Seconds until remaining work should switch to the cheap path (never negative)"""
+        return max(0.0, self.degrade_at - time.monotonic())
+
+    def should_degrade(self) -> bool:
+        return time.monotonic() >= self.degrade_at
+
+    def report(self, degraded_utterances, topics_degraded: bool) -> Dict:
+        """
+        The "degradation" section of an analysis run under this deadline; the caller sets
+        pending_completion when it schedules the degraded work to be finished in the background
+        """
+        degraded_utterances = sorted(degraded_utterances)
+        return {
+            "deadline_seconds": self.budget_seconds,
+            "elapsed_seconds": round(self.elapsed(), 3),
+            "degraded": bool(degraded_utterances) or topics_degraded,
+            "degraded_utterances": degraded_utterances,
+            "topics_degraded": topics_degraded,
+            "pending_completion": False
+        }
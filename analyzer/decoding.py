@@ -0,0 +1,345 @@
+import json
+import logging
+import math
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from analyzer.prompts import SENTIMENT_LABELS, INTENT_LABELS, TOPIC_LABELS
+
+logger = logging.getLogger(__name__)
+
+# Targeted re-requests per call when a response cannot be repaired locally (0 disables them)
+LLM_DECODE_RETRIES = int(os.getenv("LLM_DECODE_RETRIES", "1"))
+
+CODE_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+NUMBER_PREFIX = re.compile(r"^[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+LABEL_SEPARATORS = re.compile(r"[\s_\-]+")
+# Bare numbers from here to 100 are read as percentages; between 1 and this they are clamped to 1
+PERCENT_SCALE_MIN = 2.0
+
+# Label variants models produce instead of the requested ones, after lowercasing and folding
+# "_" / "-" to spaces
+SENTIMENT_SYNONYMS = {
+    "very positive": "extreme positive", "extremely positive": "extreme positive",
+    "highly positive": "extreme positive", "strongly positive": "extreme positive",
+    "positive extreme": "extreme positive", "pos": "positive", "slightly positive": "positive",
+    "mildly positive": "positive", "neutral positive": "neutral", "mixed": "neutral", "neu": "neutral",
+    "slightly negative": "negative", "mildly negative": "negative", "neg": "negative",
+    "very negative": "extreme negative", "extremely negative": "extreme negative",
+    "highly negative": "extreme negative", "strongly negative": "extreme negative",
+    "negative extreme": "extreme negative"
+}
+INTENT_SYNONYMS = {
+    "complain": "complaint", "complaints": "complaint", "problem report": "complaint", "issue report": "complaint",
+    "question": "inquiry", "enquiry": "inquiry", "information request": "inquiry", "query": "inquiry",
+    "clarification": "inquiry", "praise": "feedback", "suggestion": "feedback", "opinion": "feedback",
+    "action request": "request", "service request": "request", "assistance": "request",
+    "acknowledgement": "acknowledgment", "acknowledge": "acknowledgment", "confirmation": "acknowledgment",
+    "agreement": "acknowledgment", "thanks": "acknowledgment", "gratitude": "acknowledgment",
+    "escalate": "escalation", "threat": "escalation"
+}
+TOPIC_SYNONYMS = {
+    "tech support": "technical_support", "technical": "technical_support", "technical issue": "technical_support",
+    "payment": "billing", "payments": "billing", "refund": "billing", "invoice": "billing",
+    "delivery": "shipping", "shipment": "shipping", "returns": "returns_exchanges", "return": "returns_exchanges",
+    "exchange": "returns_exchanges", "account": "account_management", "login": "account_management",
+    "product": "product_inquiry", "general": "general_inquiry", "cancel": "cancellation"
+}
+
+
+class DecodeError(ValueError):
+    """A model response that could not be repaired into the expected payload"""
+
+
+def extract_json(content: Any) -> Tuple[Any, bool]:
+    """
+    Parse a JSON response, returning (data, repaired). Falls back to the body of a ```json fence,
+    then to the outermost {...} / [...] span in surrounding prose, each retried without trailing commas.
+    """
+    if isinstance(content, (dict, list)):
+        return content, False
+    if not isinstance(content, str) or not content.strip():
+        raise DecodeError("empty response")
+    try:
+        return json.loads(content), False
+    except ValueError:
+        pass
+
+    candidates = [match.group(1) for match in CODE_FENCE.finditer(content)]
+    for open_char, close_char in (("{", "}"), ("[", "]")):
+        start, end = content.find(open_char), content.rfind(close_char)
+        if 0 <= start < end:
+            candidates.append(content[start:end + 1])
+    for candidate in candidates:
+        for text in (candidate, TRAILING_COMMA.sub(r"\1", candidate)):
+            try:
+                return json.loads(text), True
+            except ValueError:
+                continue
+    raise DecodeError("no JSON object found in response")
+
+
+# Field coercers: value -> (coerced value, repaired), raising DecodeError when nothing sensible fits
+
+def unit_float(value: Any) -> Tuple[float, bool]:
+    """
+    A score or confidence in [0, 1]; numeric strings and percentages are rescaled, as are 0-100 scores
+    from PERCENT_SCALE_MIN up. Values just above 1 are clamped to 1.
+    """
+    if type(value) is float and 0.0 <= value <= 1.0:
+        return value, False
+    repaired, percent = True, False
+    if isinstance(value, bool) or value is None:
+        raise DecodeError(f"expected a number, got {value!r}")
+    if isinstance(value, (int, float)):
+        number = float(value)
+        repaired = not 0.0 <= number <= 1.0
+    elif isinstance(value, str):
+        text = value.strip()
+        match = NUMBER_PREFIX.match(text)
+        if not match:
+            raise DecodeError(f"expected a number, got {value!r}")
+        number = float(match.group())
+        percent = text[match.end():].strip().startswith("%")
+    else:
+        raise DecodeError(f"expected a number, got {type(value).__name__}")
+
+    if math.isnan(number) or number < 0.0 or number > 100.0:
+        raise DecodeError(f"number out of range: {value!r}")
+    if percent or number >= PERCENT_SCALE_MIN:
+        number /= 100
+    elif number > 1.0:
+        # Just past 1 is an overshoot of the unit scale, not a percentage (1.5 is not 1.5%)
+        number = 1.0
+    return number, repaired
+
+
+def text_field(value: Any) -> Tuple[str, bool]:
+    if isinstance(value, str):
+        return value, False
+    if value is None:
+        raise DecodeError("expected text, got null")
+    return json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list)) else str(value), True
+
+
+def string_list(value: Any) -> Tuple[List[str], bool]:
+    """A list of strings; a comma-separated string or a single value becomes a list"""
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        return value, False
+    if value is None or value == "":
+        return [], True
+    if isinstance(value, str):
+        return [part.strip() for part in value.split(",") if part.strip()], True
+    if isinstance(value, list):
+        return [str(item) for item in value if item is not None], True
+    return [str(value)], True
+
+
+def fold_label(value: str) -> str:
+    return LABEL_SEPARATORS.sub(" ", value.strip().lower()).strip()
+
+
+def label_coercer(labels: List[str], synonyms: Dict[str, str], open_set: bool = False,
+                  separator: Optional[str] = None) -> Callable[[Any], Tuple[str, bool]]:
+    """
+    Coercer for one label field. Exact labels, case/spacing variants and synonyms are resolved
+    with a single dict lookup. With open_set, unknown labels are kept lowercased (words joined by
+    separator, when given) instead of rejected.
+    """
+    lookup = {fold_label(label): label for label in labels}
+    for synonym, label in synonyms.items():
+        lookup.setdefault(fold_label(synonym), label)
+    allowed = set(labels)
+
+    def coerce(value: Any) -> Tuple[str, bool]:
+        if not isinstance(value, str) or not value.strip():
+            raise DecodeError(f"expected a label, got {value!r}")
+        if value in allowed:
+            return value, False
+        folded = fold_label(value)
+        label = lookup.get(folded)
+        if label is None:
+            if not open_set:
+                raise DecodeError(f"unknown label {value!r}")
+            label = value.strip().lower() if separator is None else folded.replace(" ", separator)
+        return label, label != value
+
+    return coerce
+
+
+def label_list(coerce_label: Callable[[Any], Tuple[str, bool]]) -> Callable[[Any], Tuple[List[str], bool]]:
+    def coerce(value: Any) -> Tuple[List[str], bool]:
+        items, repaired = string_list(value)
+        labels = []
+        for item in items:
+            try:
+                label, changed = coerce_label(item)
+            except DecodeError:
+                repaired = True
+                continue
+            repaired = repaired or changed
+            if label not in labels:
+                labels.append(label)
+            else:
+                repaired = True
+        return labels, repaired
+
+    return coerce
+
+
+# (field, coercer, default); a field without a default is required
+Field = Tuple[str, Callable[[Any], Tuple[Any, bool]], Any]
+REQUIRED = object()
+
+
+class SchemaDecoder:
+    """
+    Decoder for one response payload, compiled once from its field list. decode() returns the
+    payload with every field coerced to its type (extra keys dropped, defaults filled in) and
+    whether anything had to be repaired; required fields that cannot be coerced raise DecodeError.
+    """
+
+    def __init__(self, kind: str, fields: List[Field],
+                 fixup: Optional[Callable[[Dict, Dict], bool]] = None):
+        self.kind = kind
+        self.fields = fields
+        self.fixup = fixup
+
+    def decode_object(self, data: Any) -> Tuple[Dict, bool]:
+        if not isinstance(data, dict):
+            raise DecodeError(f"{self.kind} response is not a JSON object")
+        result = {}
+        repaired = False
+        for name, coerce, default in self.fields:
+            value = data.get(name)
+            if value is None:
+                if default is REQUIRED:
+                    continue
+                # Optional fields may be left out; only unusable values count as repairs
+                result[name] = default() if callable(default) else default
+                continue
+            try:
+                result[name], changed = coerce(value)
+            except DecodeError as e:
+                if default is REQUIRED:
+                    continue
+                logger.debug(f"{self.kind} field '{name}' replaced by its default: {str(e)}")
+                result[name] = default() if callable(default) else default
+                changed = True
+            repaired = repaired or changed
+        if self.fixup is not None:
+            repaired = self.fixup(data, result) or repaired
+        missing = [name for name, _, default in self.fields if default is REQUIRED and name not in result]
+        if missing:
+            raise DecodeError(f"{self.kind} response is missing or has invalid {', '.join(missing)}")
+        return result, repaired
+
+    def decode(self, content: Any) -> Tuple[Dict, bool]:
+        data, extracted = extract_json(content)
+        result, repaired = self.decode_object(data)
+        return result, extracted or repaired
+
+
+def fix_topics(data: Dict, result: Dict) -> bool:
+    """primary_topic and topics stand in for each other, and the primary topic leads the list"""
+    topics = result.get("topics") or []
+    if "primary_topic" not in result:
+        if not topics:
+            return False
+        result["primary_topic"] = topics[0]
+    primary = result["primary_topic"]
+    if topics and topics[0] == primary:
+        return False
+    result["topics"] = [primary] + [t for t in topics if t != primary]
+    return True
+
+
+coerce_sentiment = label_coercer(SENTIMENT_LABELS, SENTIMENT_SYNONYMS)
+coerce_intent = label_coercer(INTENT_LABELS, INTENT_SYNONYMS, open_set=True)
+coerce_topic = label_coercer(TOPIC_LABELS, TOPIC_SYNONYMS, open_set=True, separator="_")
+
+DECODERS = {
+    "sentiment": SchemaDecoder("sentiment", [
+        ("sentiment", coerce_sentiment, REQUIRED),
+        ("score", unit_float, REQUIRED),
+        ("reason", text_field, ""),
+        ("keywords", string_list, list),
+        # A left-out confidence stays unknown (None) rather than reading as a middling 0.5
+        ("confidence", unit_float, None)
+    ]),
+    "intent": SchemaDecoder("intent", [
+        ("intent", coerce_intent, REQUIRED),
+        ("secondary_intents", label_list(coerce_intent), list),
+        ("confidence", unit_float, None),
+        ("reasoning", text_field, "")
+    ]),
+    "topic": SchemaDecoder("topic", [
+        ("topics", label_list(coerce_topic), list),
+        ("primary_topic", coerce_topic, REQUIRED),
+        ("confidence", unit_float, 0.5),
+        ("reasoning", text_field, "")
+    ], fixup=fix_topics),
+    # One entry of a batched classification response; the envelope is decoded in analyzer.batching
+    "batch": SchemaDecoder("batch", [
+        ("sentiment", coerce_sentiment, REQUIRED),
+        ("score", unit_float, REQUIRED),
+        ("confidence", unit_float, None),
+        ("intent", coerce_intent, REQUIRED),
+        ("secondary_intents", label_list(coerce_intent), list),
+        ("reason", text_field, "Batched classification"),
+        ("keywords", string_list, list)
+    ])
+}
+
+
+class DecodeStats:
+    """
+    Per-kind counters of decoded responses: clean, repaired locally, or failed (unrepairable), plus
+    how many calls were re-requested after a failure (the retried response is counted again).
+    """
+
+    OUTCOMES = ("clean", "repaired", "re_requested", "failed")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[str, int]] = {}
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+
+    def record(self, kind: str, outcome: str, amount: int = 1):
+        with self._lock:
+            counters = self.counters.setdefault(kind, dict.fromkeys(self.OUTCOMES, 0))
+            counters[outcome] += amount
+
+    def stats(self) -> Dict:
+        """Counters for /health, with the share of responses that needed repair or a re-request"""
+        with self._lock:
+            stats = {kind: dict(counters) for kind, counters in self.counters.items()}
+        for counters in stats.values():
+            decoded = counters["clean"] + counters["repaired"] + counters["failed"]
+            counters["repair_rate"] = round(counters["repaired"] / decoded, 4) if decoded else 0.0
+            counters["re_request_rate"] = round(counters["re_requested"] / decoded, 4) if decoded else 0.0
+        return stats
+
+
+# Process-wide counters shared by the analyzer and batching
+decode_stats = DecodeStats()
+
+
+def decode_response(kind: str, content: Any, repaired: bool = False) -> Dict:
+    """
+    Decode and repair one model response (or an already parsed batch entry) of the given kind,
+    counting the outcome; repaired marks content that was already repaired by the caller.
+    """
+    try:
+        result, changed = DECODERS[kind].decode(content)
+    except DecodeError:
+        decode_stats.record(kind, "failed")
+        raise
+    decode_stats.record(kind, "repaired" if repaired or changed else "clean")
+    return result
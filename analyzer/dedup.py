@@ -0,0 +1,246 @@
+import hashlib
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from analyzer.analyzer import topics_succeeded, utterance_succeeded
+from analyzer.cache import normalize_sentence
+from analyzer.keywords import tokenize
+from analyzer.transcript import iter_speaker_utterances
+from databaseLib.database import engine
+from databaseLib.models import ConversationFingerprint
+
+logger = logging.getLogger(__name__)
+
+# Uploads whose estimated Jaccard similarity to a stored conversation (same domain) reaches this
+# are answered with the stored analysis instead of a fresh one
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_NEAR_THRESHOLD = float(os.getenv("DEDUP_NEAR_THRESHOLD", "0.9"))
+
+# MinHash / LSH layout: NUM_PERM = BANDS * ROWS. Pairs become candidates with probability
+# 1 - (1 - s^ROWS)^BANDS, about 50% at s = (1/BANDS)^(1/ROWS) = 0.71 and > 99.9% at s >= 0.9
+MINHASH_NUM_PERM = 128
+LSH_BANDS = 16
+LSH_ROWS = MINHASH_NUM_PERM // LSH_BANDS
+SHINGLE_WORDS = 3
+# Shingles hashed against all permutations at once; bounds the temporary matrix size
+SHINGLE_CHUNK = 4096
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+# Fixed seed: signatures are stored, so the permutations must be the same in every process
+_permutation_rng = np.random.RandomState(1)
+PERMUTATION_A = _permutation_rng.randint(1, (1 << 61) - 1, size=MINHASH_NUM_PERM, dtype=np.uint64)
+PERMUTATION_B = _permutation_rng.randint(0, (1 << 61) - 1, size=MINHASH_NUM_PERM, dtype=np.uint64)
+
+
+def normalized_utterances(text: str) -> List[Tuple[str, str]]:
+    """
+    (speaker, message) pairs as extract_speaker_utterances parses them, with speaker labels
+    case-folded and whitespace collapsed, so re-uploads that only differ in those compare equal
+    """
+    return [(speaker.lower(), normalize_sentence(message)) for speaker, message in iter_speaker_utterances(text)]
+
+
+def content_hash(utterances: List[Tuple[str, str]]) -> str:
+    digest = hashlib.sha256()
+    for speaker, message in utterances:
+        digest.update(f"{speaker}\t{message}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def shingle_hashes(utterances: List[Tuple[str, str]]) -> np.ndarray:
+    """32-bit hashes of the distinct word 3-grams of the conversation, speaker labels included"""
+    words = []
+    for speaker, message in utterances:
+        words.append(f"<{speaker}>")
+        words.extend(tokenize(message))
+    if len(words) < SHINGLE_WORDS:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    return np.fromiter((int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+                        for s in shingles), dtype=np.uint64, count=len(shingles))
+
+
+def minhash_signature(hashes: np.ndarray) -> np.ndarray:
+    """MinHash signature (uint32 per permutation) of a set of shingle hashes"""
+    signature = np.full(MINHASH_NUM_PERM, MAX_HASH, dtype=np.uint64)
+    for start in range(0, len(hashes), SHINGLE_CHUNK):
+        chunk = hashes[start:start + SHINGLE_CHUNK, None]
+        permuted = ((chunk * PERMUTATION_A + PERMUTATION_B) % MERSENNE_PRIME) & MAX_HASH
+        np.minimum(signature, permuted.min(axis=0), out=signature)
+    return signature.astype(np.uint32)
+
+
+def fingerprint_conversation(text: str) -> Optional[Dict]:
+    """Exact and near-duplicate fingerprints of a transcript, or None when it has no utterances"""
+    utterances = normalized_utterances(text or "")
+    if not utterances:
+        return None
+    return {
+        "content_hash": content_hash(utterances),
+        "minhash": minhash_signature(shingle_hashes(utterances)),
+        "total_utterances": len(utterances)
+    }
+
+
+def band_keys(signature: np.ndarray) -> List[bytes]:
+    return [signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes() for band in range(LSH_BANDS)]
+
+
+class DuplicateIndex:
+    """
+    In-process LSH index over the conversation_fingerprints table. It catches up with rows added
+    by any process (by id) before each lookup, and candidates are re-read from the table so
+    re-analyzed or deleted conversations are never matched on stale content.
+    """
+
+    def __init__(self, bind=engine):
+        self.bind = bind
+        self.buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(LSH_BANDS)]
+        self.signatures: Dict[int, np.ndarray] = {}
+        self.last_id = 0
+        self._lock = threading.Lock()
+        self._table_ready = False
+        self.counters = {"lookups": 0, "exact_matches": 0, "near_matches": 0, "indexed": 0}
+
+    def ensure_table(self):
+        if not self._table_ready:
+            ConversationFingerprint.__table__.create(bind=self.bind, checkfirst=True)
+            self._table_ready = True
+
+    def _add(self, row_id: int, signature: np.ndarray):
+        self.signatures[row_id] = signature
+        for band, key in enumerate(band_keys(signature)):
+            self.buckets[band].setdefault(key, []).append(row_id)
+        self.counters["indexed"] += 1
+
+    def _discard(self, row_id: int):
+        signature = self.signatures.pop(row_id, None)
+        if signature is None:
+            return
+        for band, key in enumerate(band_keys(signature)):
+            ids = self.buckets[band].get(key)
+            if ids and row_id in ids:
+                ids.remove(row_id)
+                if not ids:
+                    del self.buckets[band][key]
+
+    def sync(self, db: Session):
+        """Index fingerprint rows stored since the last sync"""
+        self.ensure_table()
+        rows = (db.query(ConversationFingerprint.id, ConversationFingerprint.minhash)
+                .filter(ConversationFingerprint.id > self.last_id)
+                .order_by(ConversationFingerprint.id).all())
+        with self._lock:
+            for row_id, minhash in rows:
+                if row_id > self.last_id:
+                    if minhash:
+                        self._add(row_id, np.frombuffer(minhash, dtype=np.uint32))
+                    self.last_id = row_id
+
+    def find(self, db: Session, text: str, domain: Optional[str] = None,
+             threshold: float = DEDUP_NEAR_THRESHOLD) -> Optional[Dict]:
+        """
+        The stored conversation an upload duplicates, as {"conversation_db_id", "match", "similarity"}
+        ("exact" when the normalized utterances are identical, "near" above threshold), or None
+        """
+        fingerprint = fingerprint_conversation(text)
+        if fingerprint is None:
+            return None
+        domain = domain or "general"
+        self.ensure_table()
+        with self._lock:
+            self.counters["lookups"] += 1
+
+        exact = (db.query(ConversationFingerprint)
+                 .filter(ConversationFingerprint.content_hash == fingerprint["content_hash"],
+                         ConversationFingerprint.domain == domain)
+                 .order_by(ConversationFingerprint.id.desc()).first())
+        if exact is not None:
+            with self._lock:
+                self.counters["exact_matches"] += 1
+            return {"conversation_db_id": exact.conversation_id, "match": "exact", "similarity": 1.0}
+
+        self.sync(db)
+        signature = fingerprint["minhash"]
+        with self._lock:
+            candidates = {row_id for band, key in enumerate(band_keys(signature))
+                          for row_id in self.buckets[band].get(key, ())}
+            scored = sorted(((float(np.mean(self.signatures[row_id] == signature)), row_id) for row_id in candidates),
+                            reverse=True)
+
+        for similarity, row_id in scored:
+            if similarity < threshold:
+                break
+            row = db.get(ConversationFingerprint, row_id)
+            if row is None:
+                with self._lock:
+                    self._discard(row_id)
+                continue
+            if row.domain != domain:
+                continue
+            with self._lock:
+                self.counters["near_matches"] += 1
+            return {"conversation_db_id": row.conversation_id, "match": "near", "similarity": round(similarity, 4)}
+        return None
+
+    def stats(self) -> Dict:
+        """Lookup and match counters for /health"""
+        with self._lock:
+            stats = dict(self.counters)
+            stats["fingerprints"] = len(self.signatures)
+        stats["enabled"] = DEDUP_ENABLED
+        stats["near_threshold"] = DEDUP_NEAR_THRESHOLD
+        return stats
+
+
+def fingerprint_row(conversation_db_id: Optional[int], text: str,
+                    domain: Optional[str] = None) -> Optional[ConversationFingerprint]:
+    """Fingerprint row for a stored conversation, or None when the text has no utterances"""
+    fingerprint = fingerprint_conversation(text)
+    if fingerprint is None:
+        return None
+    return ConversationFingerprint(
+        conversation_id=conversation_db_id,
+        domain=domain or "general",
+        content_hash=fingerprint["content_hash"],
+        minhash=fingerprint["minhash"].tobytes(),
+        total_utterances=fingerprint["total_utterances"]
+    )
+
+
+def analysis_succeeded(analysis: Dict) -> bool:
+    """
+    Whether every utterance and the topics of an analysis got a real answer. Analyses with error,
+    default or deadline results (an outage, an open circuit, degraded topics) must not answer later
+    re-uploads of the same transcript.
+    """
+    if (analysis.get("degradation") or {}).get("topics_degraded"):
+        return False
+    if not topics_succeeded(analysis.get("topic_analysis")):
+        return False
+    return all(utterance_succeeded(u) for u in analysis.get("utterances") or [])
+
+
+def analysis_fingerprint(analysis: Dict) -> Optional[ConversationFingerprint]:
+    """
+    Fingerprint row to store with an analysis (the storage layer sets its conversation id), or None
+    when the analysis did not fully succeed or its transcript has no utterances
+    """
+    if not analysis_succeeded(analysis):
+        return None
+    try:
+        return fingerprint_row(None, analysis.get("raw_text", ""), analysis.get("domain"))
+    except Exception as e:
+        logger.warning(f"Could not fingerprint conversation {analysis.get('conversation_id')}: {str(e)}")
+        return None
+
+
+# Process-wide index used by the API
+duplicate_index = DuplicateIndex()
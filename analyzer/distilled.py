@@ -0,0 +1,487 @@
+import glob
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from analyzer.cache import llm_answered, normalize_sentence
+from analyzer.semantic_cache import ngram_features
+from databaseLib.database import SessionLocal, engine, init_db
+from databaseLib.models import Utterance
+
+logger = logging.getLogger(__name__)
+
+# Distilled classifier: linear models over hashed n-grams, trained on the sentiment and intent labels
+# the LLM stored in the utterances table. With DISTILLED_ENABLED, utterances it answers with calibrated
+# confidence of at least DISTILLED_CONFIDENCE_THRESHOLD (for both sentiment and intent) skip the LLM;
+# 0 answers every utterance locally, as does a missing LLM provider.
+DISTILLED_ENABLED = os.getenv("DISTILLED_ENABLED", "false").lower() == "true"
+DISTILLED_CONFIDENCE_THRESHOLD = float(os.getenv("DISTILLED_CONFIDENCE_THRESHOLD", "0.9"))
+# Artifact version to load: a number, or "latest"
+DISTILLED_MODEL_VERSION = os.getenv("DISTILLED_MODEL_VERSION", "latest")
+DISTILLED_FEATURE_DIM = int(os.getenv("DISTILLED_FEATURE_DIM", str(1 << 18)))
+
+
+def default_model_dir() -> str:
+    """distilled_models/ beside the SQLite file"""
+    database = engine.url.database
+    if not database or database == ":memory:":
+        return os.path.abspath("distilled_models")
+    return os.path.join(os.path.dirname(os.path.abspath(database)), "distilled_models")
+
+
+DISTILLED_MODEL_DIR = os.getenv("DISTILLED_MODEL_DIR") or default_model_dir()
+
+# Bumped whenever featurize changes, so artifacts trained on other features are refused
+FEATURES_VERSION = 1
+ARTIFACT_PATTERN = re.compile(r"distilled-v(\d+)\.npz$")
+
+# Training defaults
+TRAIN_EPOCHS = 6
+TRAIN_BATCH_SIZE = 512
+TRAIN_LEARNING_RATE = 0.5
+TRAIN_L2 = 1e-6
+# Rows kept out of training by a hash of the sentence: calibration, then held-out evaluation
+CALIBRATION_SHARE = 0.1
+TEST_SHARE = 0.1
+TEMPERATURE_GRID = np.geomspace(0.1, 10.0, 61)
+CALIBRATION_BINS = 10
+
+
+class SparseRows:
+    """Hashed feature rows in CSR layout (row i owns indices/values[indptr[i]:indptr[i + 1]])"""
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, values: np.ndarray):
+        self.indptr = indptr
+        self.indices = indices
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    def take(self, rows: np.ndarray) -> "SparseRows":
+        starts, ends = self.indptr[rows], self.indptr[rows + 1]
+        lengths = ends - starts
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        positions = np.repeat(starts - indptr[:-1], lengths) + np.arange(indptr[-1])
+        return SparseRows(indptr, self.indices[positions], self.values[positions])
+
+    def row_ids(self) -> np.ndarray:
+        return np.repeat(np.arange(len(self)), np.diff(self.indptr))
+
+
+def featurize(utterances: Iterable[Tuple[str, str]], dim: int = DISTILLED_FEATURE_DIM) -> SparseRows:
+    """
+    L2-normalized signed hashed n-grams (analyzer.semantic_cache.ngram_features) of (speaker, sentence)
+    pairs, plus the speaker label and a constant feature, so every row has at least one entry
+    """
+    indptr, indices, values = [0], [], []
+    for speaker, sentence in utterances:
+        features = ngram_features(sentence)
+        features.append((f"<speaker>{(speaker or '').strip().lower()}", 1.0))
+        features.append(("<bias>", 1.0))
+        hashes = np.fromiter((zlib.crc32(feature.encode("utf-8")) for feature, _ in features), dtype=np.uint32,
+                             count=len(features))
+        weights = np.fromiter((weight for _, weight in features), dtype=np.float32, count=len(features))
+        weights *= np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        weights /= np.linalg.norm(weights)
+        indices.append((hashes % dim).astype(np.int64))
+        values.append(weights)
+        indptr.append(indptr[-1] + len(features))
+    return SparseRows(np.array(indptr, dtype=np.int64),
+                      np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64),
+                      np.concatenate(values) if values else np.zeros(0, dtype=np.float32))
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
+
+
+class LinearHead:
+    """Multinomial logistic regression over hashed features, with a temperature for calibration"""
+
+    def __init__(self, labels: List[str], weights: np.ndarray, bias: np.ndarray, temperature: float = 1.0):
+        self.labels = labels
+        self.weights = weights
+        self.bias = bias
+        self.temperature = temperature
+
+    def logits(self, rows: SparseRows) -> np.ndarray:
+        contributions = self.weights[rows.indices] * rows.values[:, None]
+        return np.add.reduceat(contributions, rows.indptr[:-1], axis=0) + self.bias
+
+    def probabilities(self, rows: SparseRows, temperature: Optional[float] = None) -> np.ndarray:
+        return softmax(self.logits(rows) / (temperature or self.temperature))
+
+    @classmethod
+    def train(cls, rows: SparseRows, targets: np.ndarray, labels: List[str], dim: int, epochs: int = TRAIN_EPOCHS,
+              batch_size: int = TRAIN_BATCH_SIZE, learning_rate: float = TRAIN_LEARNING_RATE, l2: float = TRAIN_L2,
+              seed: int = 0) -> "LinearHead":
+        """
+        Mini-batch AdaGrad on the cross-entropy loss. Only the weight rows of features present in a
+        batch are updated, so an epoch costs time proportional to the non-zero features, not to dim.
+        """
+        classes = len(labels)
+        weights = np.zeros((dim, classes), dtype=np.float32)
+        bias = np.zeros(classes, dtype=np.float32)
+        squared = np.zeros((dim, classes), dtype=np.float32)
+        bias_squared = np.zeros(classes, dtype=np.float32)
+        head = cls(labels, weights, bias)
+        rng = np.random.default_rng(seed)
+
+        for _ in range(epochs):
+            order = rng.permutation(len(rows))
+            for start in range(0, len(order), batch_size):
+                batch_rows = order[start:start + batch_size]
+                batch = rows.take(batch_rows)
+                errors = softmax(head.logits(batch))
+                errors[np.arange(len(batch_rows)), targets[batch_rows]] -= 1.0
+                errors /= len(batch_rows)
+
+                touched, inverse = np.unique(batch.indices, return_inverse=True)
+                row_ids = batch.row_ids()
+                gradient = np.stack([np.bincount(inverse, weights=batch.values * errors[row_ids, c],
+                                                 minlength=len(touched)) for c in range(classes)], axis=1)
+                gradient = gradient.astype(np.float32) + l2 * weights[touched]
+                squared[touched] += gradient ** 2
+                weights[touched] -= learning_rate * gradient / (np.sqrt(squared[touched]) + 1e-8)
+
+                bias_gradient = errors.sum(axis=0)
+                bias_squared += bias_gradient ** 2
+                bias -= learning_rate * bias_gradient / (np.sqrt(bias_squared) + 1e-8)
+        return head
+
+    def calibrate(self, rows: SparseRows, targets: np.ndarray) -> float:
+        """Temperature minimizing the negative log-likelihood of targets (temperature scaling)"""
+        logits = self.logits(rows)
+        best_temperature, best_loss = 1.0, float("inf")
+        for temperature in TEMPERATURE_GRID:
+            probabilities = softmax(logits / temperature)
+            loss = -float(np.mean(np.log(probabilities[np.arange(len(targets)), targets] + 1e-12)))
+            if loss < best_loss:
+                best_temperature, best_loss = float(temperature), loss
+        self.temperature = best_temperature
+        return best_temperature
+
+
+def calibration_error(probabilities: np.ndarray, targets: np.ndarray, bins: int = CALIBRATION_BINS) -> float:
+    """Expected calibration error: confidence vs accuracy gap, weighted over equal-width confidence bins"""
+    confidence = probabilities.max(axis=1)
+    correct = probabilities.argmax(axis=1) == targets
+    bin_ids = np.minimum((confidence * bins).astype(int), bins - 1)
+    error = 0.0
+    for b in range(bins):
+        members = bin_ids == b
+        if members.any():
+            error += members.mean() * abs(confidence[members].mean() - correct[members].mean())
+    return round(float(error), 4)
+
+
+def split_of(sentence: str) -> str:
+    """Deterministic train/calibration/test assignment by sentence, so copies never straddle splits"""
+    bucket = zlib.crc32(normalize_sentence(sentence).lower().encode("utf-8")) % 1000 / 1000
+    if bucket < TEST_SHARE:
+        return "test"
+    if bucket < TEST_SHARE + CALIBRATION_SHARE:
+        return "calibration"
+    return "train"
+
+
+def load_training_rows(session_factory=SessionLocal, limit: Optional[int] = None) -> List[Dict]:
+    """
+    LLM-labeled utterances as {"speaker", "text", "sentiment", "sentiment_score", "intent"}, most
+    recent first, one per distinct sentence. Only the chat model's own answers are used (see llm_answered):
+    rows answered by the pre-classifier, the semantic cache or this model, and default, error or deadline
+    results, are skipped.
+    """
+    rows = []
+    seen = set()
+    db = session_factory()
+    try:
+        query = db.query(Utterance).order_by(Utterance.processed_at.desc())
+        if limit:
+            query = query.limit(limit)
+        for row in query.yield_per(1000):
+            if (not row.sentence or not row.sentiment or not row.intent or row.intent == "unknown"
+                    or not llm_answered(row)):
+                continue
+            sentence = normalize_sentence(row.sentence)
+            if sentence.lower() in seen:
+                continue
+            seen.add(sentence.lower())
+            rows.append({"speaker": row.speaker, "text": sentence, "sentiment": row.sentiment,
+                         "sentiment_score": row.sentiment_score, "intent": row.intent})
+    finally:
+        db.close()
+    return rows
+
+
+def evaluate(sentiment_head: LinearHead, intent_head: LinearHead, rows: List[Dict], features: SparseRows,
+             threshold: float = DISTILLED_CONFIDENCE_THRESHOLD) -> Dict:
+    """Agreement with the stored labels, calibration error and coverage at the routing threshold"""
+    sentiment_targets = np.array([sentiment_head.labels.index(row["sentiment"]) if row["sentiment"] in
+                                  sentiment_head.labels else -1 for row in rows])
+    intent_targets = np.array([intent_head.labels.index(row["intent"]) if row["intent"] in intent_head.labels
+                               else -1 for row in rows])
+    sentiment_probabilities = sentiment_head.probabilities(features)
+    intent_probabilities = intent_head.probabilities(features)
+    sentiment_right = sentiment_probabilities.argmax(axis=1) == sentiment_targets
+    intent_right = intent_probabilities.argmax(axis=1) == intent_targets
+    confident = np.minimum(sentiment_probabilities.max(axis=1), intent_probabilities.max(axis=1)) >= threshold
+    both_right = sentiment_right & intent_right
+    return {
+        "rows": len(rows),
+        "sentiment_agreement": round(float(sentiment_right.mean()), 4),
+        "intent_agreement": round(float(intent_right.mean()), 4),
+        "both_agreement": round(float(both_right.mean()), 4),
+        "sentiment_calibration_error": calibration_error(sentiment_probabilities, sentiment_targets),
+        "intent_calibration_error": calibration_error(intent_probabilities, intent_targets),
+        "threshold": threshold,
+        "coverage": round(float(confident.mean()), 4),
+        "agreement_when_confident": round(float(both_right[confident].mean()), 4) if confident.any() else None
+    }
+
+
+def artifact_versions(model_dir: str = DISTILLED_MODEL_DIR) -> List[int]:
+    versions = []
+    for path in glob.glob(os.path.join(model_dir, "distilled-v*.npz")):
+        match = ARTIFACT_PATTERN.search(path)
+        if match:
+            versions.append(int(match.group(1)))
+    return sorted(versions)
+
+
+def artifact_path(version: int, model_dir: str = DISTILLED_MODEL_DIR) -> str:
+    return os.path.join(model_dir, f"distilled-v{version:04d}.npz")
+
+
+def train_distilled_model(rows: List[Dict], dim: int = DISTILLED_FEATURE_DIM, epochs: int = TRAIN_EPOCHS,
+                          model_dir: Optional[str] = DISTILLED_MODEL_DIR, source: str = "utterances") -> Dict:
+    """
+    Train, calibrate and evaluate sentiment and intent heads on labeled rows and save them as the next
+    artifact version in model_dir (None: do not save). Returns the artifact metadata, metrics included.
+    """
+    splits = {"train": [], "calibration": [], "test": []}
+    for row in rows:
+        splits[split_of(row["text"])].append(row)
+    if not splits["train"] or not splits["calibration"]:
+        raise ValueError(f"Not enough labeled rows to train on ({len(rows)})")
+    sentiment_labels = sorted({row["sentiment"] for row in splits["train"]})
+    intent_labels = sorted({row["intent"] for row in splits["train"]})
+
+    start = time.perf_counter()
+    features = {name: featurize(((row["speaker"], row["text"]) for row in split_rows), dim)
+                for name, split_rows in splits.items()}
+
+    def targets(split: str, key: str, labels: List[str]) -> Tuple[SparseRows, np.ndarray]:
+        known = [i for i, row in enumerate(splits[split]) if row[key] in labels]
+        return features[split].take(np.array(known, dtype=np.int64)), \
+            np.array([labels.index(splits[split][i][key]) for i in known])
+
+    heads = {}
+    for key, labels in (("sentiment", sentiment_labels), ("intent", intent_labels)):
+        head = LinearHead.train(*targets("train", key, labels), labels, dim, epochs=epochs)
+        head.calibrate(*targets("calibration", key, labels))
+        heads[key] = head
+    training_seconds = time.perf_counter() - start
+
+    # Mean stored sentiment_score per label, for the score of a prediction
+    label_scores = {}
+    for label in sentiment_labels:
+        scores = [row["sentiment_score"] for row in splits["train"]
+                  if row["sentiment"] == label and row.get("sentiment_score") is not None]
+        label_scores[label] = round(float(np.mean(scores)), 4) if scores else 0.5
+
+    metadata = {
+        "features_version": FEATURES_VERSION,
+        "feature_dim": dim,
+        "created_at": datetime.utcnow().isoformat(),
+        "source": source,
+        "rows": {name: len(split_rows) for name, split_rows in splits.items()},
+        "epochs": epochs,
+        "training_seconds": round(training_seconds, 3),
+        "sentiment_labels": sentiment_labels,
+        "intent_labels": intent_labels,
+        "sentiment_label_scores": label_scores,
+        "temperatures": {key: head.temperature for key, head in heads.items()},
+        "held_out": evaluate(heads["sentiment"], heads["intent"], splits["test"], features["test"])
+        if splits["test"] else None
+    }
+    if model_dir is not None:
+        os.makedirs(model_dir, exist_ok=True)
+        metadata["version"] = max(artifact_versions(model_dir), default=0) + 1
+        path = artifact_path(metadata["version"], model_dir)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as fh:
+            np.savez_compressed(fh, sentiment_weights=heads["sentiment"].weights,
+                                sentiment_bias=heads["sentiment"].bias, intent_weights=heads["intent"].weights,
+                                intent_bias=heads["intent"].bias,
+                                meta=np.frombuffer(json.dumps(metadata).encode("utf-8"), dtype=np.uint8))
+        os.replace(tmp_path, path)
+        metadata["path"] = path
+        logger.info(f"Distilled model v{metadata['version']} saved to {path}")
+    metadata["heads"] = heads
+    return metadata
+
+
+class DistilledClassifier:
+    """
+    Loads a distilled model artifact and answers (speaker, sentence) pairs locally. Answers below the
+    confidence threshold are left to the LLM. The artifact is loaded on first use; a missing or
+    incompatible one disables the classifier with a warning.
+    """
+
+    name = "distilled"
+
+    def __init__(self, enabled: bool = DISTILLED_ENABLED, threshold: float = DISTILLED_CONFIDENCE_THRESHOLD,
+                 version: str = DISTILLED_MODEL_VERSION, model_dir: str = DISTILLED_MODEL_DIR):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.version = version
+        self.model_dir = model_dir
+        self.metadata: Optional[Dict] = None
+        self.sentiment_head: Optional[LinearHead] = None
+        self.intent_head: Optional[LinearHead] = None
+        self._lock = threading.Lock()
+        self._load_attempted = False
+        self.counters = {"classified": 0, "answered": 0, "deferred": 0}
+
+    def load(self, version: Optional[str] = None) -> bool:
+        """Load an artifact version ("latest" or a number); False when none could be loaded"""
+        version = str(version or self.version)
+        versions = artifact_versions(self.model_dir)
+        number = versions[-1] if version == "latest" and versions else int(version) if version.isdigit() else None
+        if number is None or number not in versions:
+            logger.warning(f"Distilled model {version} not found in {self.model_dir}; run "
+                           f"'python -m analyzer.distilled train' first")
+            return False
+        try:
+            with np.load(artifact_path(number, self.model_dir)) as data:
+                metadata = json.loads(data["meta"].tobytes().decode("utf-8"))
+                if metadata.get("features_version") != FEATURES_VERSION:
+                    raise ValueError(f"artifact uses features version {metadata.get('features_version')}, "
+                                     f"expected {FEATURES_VERSION}")
+                sentiment_head = LinearHead(metadata["sentiment_labels"], data["sentiment_weights"],
+                                            data["sentiment_bias"], metadata["temperatures"]["sentiment"])
+                intent_head = LinearHead(metadata["intent_labels"], data["intent_weights"], data["intent_bias"],
+                                         metadata["temperatures"]["intent"])
+        except Exception as e:
+            logger.warning(f"Distilled model v{number} could not be loaded: {str(e)}")
+            return False
+        with self._lock:
+            self.metadata = metadata
+            self.sentiment_head = sentiment_head
+            self.intent_head = intent_head
+        logger.info(f"Distilled model v{number} loaded ({metadata['rows']['train']} training rows)")
+        return True
+
+    def use(self, metadata: Dict):
+        """Use the heads of a model train_distilled_model just returned, without a saved artifact"""
+        with self._lock:
+            self.metadata = {key: value for key, value in metadata.items() if key != "heads"}
+            self.sentiment_head = metadata["heads"]["sentiment"]
+            self.intent_head = metadata["heads"]["intent"]
+            self._load_attempted = True
+
+    @property
+    def ready(self) -> bool:
+        if self.sentiment_head is None and not self._load_attempted:
+            with self._lock:
+                first = not self._load_attempted
+                self._load_attempted = True
+            if first:
+                self.load()
+        return self.sentiment_head is not None
+
+    def predict(self, utterances: List[Tuple[str, str]]) -> List[Tuple[Dict, Dict, float]]:
+        """(sentiment_result, intent_result, confidence) per (speaker, sentence); confidence is the lower of the two"""
+        if not utterances or not self.ready:
+            return []
+        features = featurize(utterances, self.metadata["feature_dim"])
+        sentiment_probabilities = self.sentiment_head.probabilities(features)
+        intent_probabilities = self.intent_head.probabilities(features)
+        label_scores = self.metadata["sentiment_label_scores"]
+        scores = sentiment_probabilities @ np.array([label_scores[label] for label in self.sentiment_head.labels])
+        reason = f"Distilled model v{self.metadata.get('version', 'unsaved')}"
+
+        predictions = []
+        for sentiment_p, intent_p, score in zip(sentiment_probabilities, intent_probabilities, scores):
+            sentiment_confidence = round(float(sentiment_p.max()), 4)
+            intent_confidence = round(float(intent_p.max()), 4)
+            sentiment_result = {"sentiment": self.sentiment_head.labels[int(sentiment_p.argmax())],
+                                "score": round(float(score), 4), "reason": reason, "keywords": [],
+                                "confidence": sentiment_confidence}
+            intent_result = {"intent": self.intent_head.labels[int(intent_p.argmax())], "secondary_intents": [],
+                             "confidence": intent_confidence, "reasoning": reason}
+            predictions.append((sentiment_result, intent_result, min(sentiment_confidence, intent_confidence)))
+        return predictions
+
+    def classify_many(self, utterances: List[Tuple[str, str]],
+                      threshold: Optional[float] = None) -> List[Optional[Tuple[Dict, Dict, str]]]:
+        """(sentiment_result, intent_result, "distilled") for confident answers, None for the LLM's share"""
+        if not self.enabled or not utterances:
+            return [None] * len(utterances)
+        threshold = self.threshold if threshold is None else threshold
+        predictions = self.predict(utterances)
+        if not predictions:
+            return [None] * len(utterances)
+        answers = [(sentiment_result, intent_result, self.name) if confidence >= threshold else None
+                   for sentiment_result, intent_result, confidence in predictions]
+        answered = sum(1 for answer in answers if answer is not None)
+        with self._lock:
+            self.counters["classified"] += len(answers)
+            self.counters["answered"] += answered
+            self.counters["deferred"] += len(answers) - answered
+        return answers
+
+    def stats(self) -> Dict:
+        """Loaded version, held-out metrics and routing counters for /health"""
+        with self._lock:
+            stats = dict(self.counters)
+            metadata = self.metadata or {}
+        stats["local_rate"] = round(stats["answered"] / stats["classified"], 3) if stats["classified"] else 0.0
+        stats.update(enabled=self.enabled, threshold=self.threshold, version=metadata.get("version"),
+                     trained_at=metadata.get("created_at"), held_out=metadata.get("held_out"))
+        return stats
+
+
+# Process-wide classifier used by the analyzer
+distilled_classifier = DistilledClassifier()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train and inspect the distilled sentiment/intent classifier")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    train_parser = subparsers.add_parser("train", help="Train a new model version from stored Utterance rows")
+    train_parser.add_argument("--limit", type=int, default=None, help="Only use the N most recent utterances")
+    train_parser.add_argument("--epochs", type=int, default=TRAIN_EPOCHS)
+    train_parser.add_argument("--dim", type=int, default=DISTILLED_FEATURE_DIM, help="Hashed feature dimension")
+    subparsers.add_parser("list", help="List model versions and their held-out metrics")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "train":
+        init_db()
+        training_rows = load_training_rows(limit=args.limit)
+        logger.info(f"Training on {len(training_rows)} distinct labeled utterances")
+        trained = train_distilled_model(training_rows, args.dim, args.epochs)
+        trained.pop("heads")
+        print(json.dumps(trained, indent=2))
+    else:
+        for artifact_version in artifact_versions():
+            with np.load(artifact_path(artifact_version)) as artifact:
+                artifact_meta = json.loads(artifact["meta"].tobytes().decode("utf-8"))
+            print(json.dumps({"version": artifact_version, "created_at": artifact_meta["created_at"],
+                              "rows": artifact_meta["rows"], "held_out": artifact_meta["held_out"]}))
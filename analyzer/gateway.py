@@ -0,0 +1,873 @@
+import asyncio
+import concurrent.futures
+import json
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from analyzer.backends import (
+    LLM_BACKEND, LLM_FALLBACK_BACKEND, LLM_TRANSCRIPTION_BACKEND, LLM_TRANSCRIPTION_FALLBACK_BACKEND, LLMBackend,
+    create_backend
+)
+from analyzer.breaker import OPEN, CircuitBreaker, CircuitOpenError
+from analyzer.hedging import HedgePolicy
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Per-model rate limits (requests and tokens per minute); GATEWAY_MODEL_LIMITS overrides per model, e.g.
+# {"llama3-8b-8192": {"rpm": 30, "tpm": 30000}, "whisper-large-v3-turbo": {"rpm": 20}}
+GATEWAY_DEFAULT_RPM = float(os.getenv("GATEWAY_DEFAULT_RPM", "30"))
+GATEWAY_DEFAULT_TPM = float(os.getenv("GATEWAY_DEFAULT_TPM", "30000"))
+GATEWAY_MODEL_LIMITS = json.loads(os.getenv("GATEWAY_MODEL_LIMITS", "{}"))
+
+# How many seconds' worth of requests/tokens may be sent in a burst
+GATEWAY_BURST_SECONDS = float(os.getenv("GATEWAY_BURST_SECONDS", "5"))
+
+# Retry / backoff
+GATEWAY_MAX_RETRIES = int(os.getenv("GATEWAY_MAX_RETRIES", "5"))
+GATEWAY_BACKOFF_BASE = float(os.getenv("GATEWAY_BACKOFF_BASE", "0.5"))
+GATEWAY_BACKOFF_MAX = float(os.getenv("GATEWAY_BACKOFF_MAX", "30"))
+
+# Completion tokens reserved up front when the caller does not set max_tokens
+ESTIMATED_COMPLETION_TOKENS = 200
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+# Responses that say the provider itself is failing (any 5xx too), as opposed to this request
+PROVIDER_FAILURE_STATUS_CODES = {401, 403, 408}
+
+# Threads running hedged transcriptions (the primary upload and its duplicate)
+GATEWAY_HEDGE_THREADS = int(os.getenv("GATEWAY_HEDGE_THREADS", "16"))
+
+# Calls made in the current analysis, when one has asked for them with record_calls()
+_call_log: ContextVar[Optional[List[Dict]]] = ContextVar("llm_call_log", default=None)
+
+
+def record_calls(call_log: Optional[List[Dict]] = None) -> List[Dict]:
+    """
+    Start collecting the calls made from this context (and tasks or asyncio.to_thread work started
+    from it). Pass an existing call_log to keep appending to it, e.g. transcription then analysis.
+    """
+    log = call_log if call_log is not None else []
+    _call_log.set(log)
+    return log
+
+
+def current_call_log() -> Optional[List[Dict]]:
+    """The call log this context is recording into, if any"""
+    return _call_log.get()
+
+
+def log_call(entry: Dict):
+    call_log = _call_log.get()
+    if call_log is not None:
+        call_log.append(entry)
+
+
+def models_used(call_log: List[Dict]) -> List[str]:
+    """Distinct backend:model labels that served the chat calls in a call log"""
+    return sorted({f"{entry['backend']}:{entry['model']}" for entry in call_log
+                   if entry.get("operation", "chat") == "chat" and entry.get("outcome", "ok") == "ok"})
+
+
+@contextmanager
+def timed_stage(stage: str):
+    """Record the wall time of a local (non-LLM) processing stage in the current call log"""
+    started_at = datetime.utcnow()
+    start = time.perf_counter()
+    outcome, error = "error", None
+    try:
+        yield
+        outcome = "ok"
+    except Exception as e:
+        error = str(e)[:500]
+        raise
+    finally:
+        log_call({"stage": stage, "operation": "local", "backend": "local", "model": None,
+                  "started_at": started_at.isoformat(), "wall_seconds": round(time.perf_counter() - start, 4),
+                  "queued_seconds": 0.0, "prompt_tokens": None, "completion_tokens": None,
+                  "tokens_estimated": False, "retries": 0, "outcome": outcome, "error": error})
+
+
+def roll_up(call_log: List[Dict], label) -> Dict[str, Dict]:
+    """Calls, failures, retries, wall/queued time and tokens per label(entry)"""
+    rollups = {}
+    for entry in call_log:
+        rollup = rollups.setdefault(label(entry), {
+            "calls": 0, "failed": 0, "retries": 0, "wall_seconds": 0.0, "queued_seconds": 0.0,
+            "prompt_tokens": 0, "completion_tokens": 0
+        })
+        rollup["calls"] += 1
+        rollup["failed"] += entry.get("outcome") != "ok"
+        rollup["retries"] += entry.get("retries") or 0
+        rollup["wall_seconds"] += entry.get("wall_seconds") or 0.0
+        rollup["queued_seconds"] += entry.get("queued_seconds") or 0.0
+        rollup["prompt_tokens"] += entry.get("prompt_tokens") or 0
+        rollup["completion_tokens"] += entry.get("completion_tokens") or 0
+
+    for rollup in rollups.values():
+        rollup["wall_seconds"] = round(rollup["wall_seconds"], 3)
+        rollup["queued_seconds"] = round(rollup["queued_seconds"], 3)
+    return rollups
+
+
+def summarize_calls(call_log: List[Dict]) -> Dict:
+    """Roll-up of a call log per stage and per backend:model: calls, failures, retries, wall/queued time and tokens"""
+    remote = [e for e in call_log if e.get("operation") != "local"]
+    succeeded = sum(1 for e in remote if e.get("outcome") == "ok")
+    return {
+        "llm_calls": len(remote),
+        "failed_calls": len(remote) - succeeded,
+        "success_rate": round(succeeded / len(remote), 4) if remote else 1.0,
+        "retries": sum(e.get("retries") or 0 for e in remote),
+        "hedges": sum(e.get("hedges") or 0 for e in remote),
+        "hedge_wins": sum(1 for e in remote if e.get("hedge_won")),
+        "prompt_tokens": sum(e.get("prompt_tokens") or 0 for e in remote),
+        "completion_tokens": sum(e.get("completion_tokens") or 0 for e in remote),
+        "stages": roll_up(call_log, lambda entry: entry.get("stage") or "unknown"),
+        "models": roll_up(remote, lambda entry: f"{entry.get('backend')}:{entry.get('model')}")
+    }
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at rate_per_minute (0 disables the limit),
+    holding at most burst_seconds worth of tokens.
+    reserve() takes the tokens immediately (the balance may go negative) and returns how long
+    the caller has to wait before using them, so waiters are served in arrival order.
+    """
+
+    def __init__(self, rate_per_minute: float, burst_seconds: float = GATEWAY_BURST_SECONDS):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = max(1.0, self.rate_per_second * burst_seconds)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_second)
+        self.updated_at = now
+
+    def reserve(self, amount: float) -> float:
+        if self.rate_per_second <= 0:
+            return 0.0
+        # A single request larger than the bucket would otherwise never be admitted
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate_per_second
+
+    def try_take(self, amount: float) -> bool:
+        """Take the tokens only if they are available right now"""
+        if self.rate_per_second <= 0:
+            return True
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens < amount:
+                return False
+            self.tokens -= amount
+            return True
+
+    def adjust(self, amount: float):
+        """Give back (positive) or take (negative) tokens once the real usage is known"""
+        if self.rate_per_second <= 0:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class ModelLimiter:
+    """Request and token buckets for one model, plus a provider-imposed pause after a 429"""
+
+    def __init__(self, model: str, rpm: float, tpm: float):
+        self.model = model
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float) -> float:
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens) if tokens else 0.0)
+        with self._lock:
+            return max(wait, self.blocked_until - time.monotonic())
+
+    def try_reserve(self, tokens: float) -> bool:
+        """Admit an optional request (a hedge) only if it would not have to wait"""
+        with self._lock:
+            if self.blocked_until > time.monotonic():
+                return False
+        if not self.requests.try_take(1):
+            return False
+        if tokens and not self.tokens.try_take(tokens):
+            self.requests.adjust(1)
+            return False
+        return True
+
+    def block_for(self, seconds: float):
+        """Hold every caller of this model back until the provider's Retry-After has passed"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+def estimate_request_tokens(kwargs: Dict) -> int:
+    """Rough token cost of a chat request (~4 characters per token) for TPM accounting"""
+    prompt_chars = sum(len(str(m.get("content", ""))) for m in kwargs.get("messages", []))
+    return prompt_chars // 4 + int(kwargs.get("max_tokens") or ESTIMATED_COMPLETION_TOKENS)
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """Read Retry-After (seconds) or retry-after-ms from a provider error response"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+def is_retryable(error: Exception, backend: LLMBackend) -> bool:
+    if isinstance(error, backend.connection_errors):
+        return True
+    return isinstance(error, backend.status_errors) and error.status_code in RETRYABLE_STATUS_CODES
+
+
+def circuit_key(backend: LLMBackend, model: str) -> str:
+    return f"{backend.name}:{model}"
+
+
+def is_provider_failure(error: Exception, backend: LLMBackend) -> bool:
+    """Whether an error counts against the backend's circuit: connection errors, timeouts, 5xx, bad credentials"""
+    if isinstance(error, backend.connection_errors):
+        return True
+    if isinstance(error, backend.status_errors):
+        return error.status_code in PROVIDER_FAILURE_STATUS_CODES or error.status_code >= 500
+    return False
+
+
+class LLMGateway:
+    """
+    Process-wide entry point for every chat and transcription call.
+    Chat and transcription each go to a configured backend (LLM_BACKEND, LLM_TRANSCRIPTION_BACKEND),
+    each with its own connection pool and in-flight cap. Applies per-model RPM/TPM token buckets
+    and retries 429/5xx/connection errors with Retry-After-aware exponential backoff and jitter,
+    so callers slow down under pressure instead of failing over to default results. Requests
+    still running past the model's rolling latency percentile are hedged (see analyzer.hedging).
+    Each backend:model has a circuit breaker (see analyzer.breaker): while it is open, calls go to
+    the fallback backend if one is configured, or fail at once with CircuitOpenError.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 backend: Optional[LLMBackend] = None, transcription_backend: Optional[LLMBackend] = None,
+                 fallback_backend: Optional[LLMBackend] = None,
+                 transcription_fallback_backend: Optional[LLMBackend] = None):
+        self.backend = backend or create_backend(LLM_BACKEND)
+        if transcription_backend is None:
+            transcription_backend = (self.backend if LLM_TRANSCRIPTION_BACKEND == self.backend.name
+                                     else create_backend(LLM_TRANSCRIPTION_BACKEND))
+        self.transcription_backend = transcription_backend
+        if fallback_backend is None and LLM_FALLBACK_BACKEND:
+            fallback_backend = create_backend(LLM_FALLBACK_BACKEND)
+        if transcription_fallback_backend is None and LLM_TRANSCRIPTION_FALLBACK_BACKEND:
+            transcription_fallback_backend = create_backend(LLM_TRANSCRIPTION_FALLBACK_BACKEND)
+        self.fallback_backend = fallback_backend
+        self.transcription_fallback_backend = transcription_fallback_backend
+        self.max_retries = GATEWAY_MAX_RETRIES
+
+        # Injected clients (tests/benchmarks) take precedence over the real SDK clients
+        self.async_client = None
+        self.sync_client = None
+        self._sync_clients: Dict[str, object] = {}
+        # httpx async pools and semaphores are bound to the event loop that created them
+        self._async_clients: Dict[str, weakref.WeakKeyDictionary] = {}
+        self._semaphores: Dict[str, weakref.WeakKeyDictionary] = {}
+
+        self.default_rpm = GATEWAY_DEFAULT_RPM
+        self.default_tpm = GATEWAY_DEFAULT_TPM
+        self.model_limits = dict(GATEWAY_MODEL_LIMITS)
+        self._limiters: Dict[str, ModelLimiter] = {}
+        self._lock = threading.Lock()
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.counters: Dict[str, Dict[str, float]] = {}
+        self.hedging = HedgePolicy()
+        self.breaker = CircuitBreaker()
+        self._hedge_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+        if api_key is not None:
+            self.api_key = api_key
+        if base_url is not None:
+            self.base_url = base_url
+
+    # The chat backend's credentials, kept as attributes for existing callers
+    @property
+    def api_key(self) -> Optional[str]:
+        return self.backend.api_key
+
+    @api_key.setter
+    def api_key(self, value: Optional[str]):
+        self.backend.api_key = value
+        self._reset_clients(self.backend)
+
+    @property
+    def base_url(self) -> Optional[str]:
+        return self.backend.base_url
+
+    @base_url.setter
+    def base_url(self, value: Optional[str]):
+        self.backend.base_url = value or None
+        self._reset_clients(self.backend)
+
+    @property
+    def available(self) -> bool:
+        return self.backend.available or self.async_client is not None or self.sync_client is not None
+
+    @property
+    def chat_model(self) -> str:
+        return self.backend.chat_model
+
+    @property
+    def transcription_model(self) -> Optional[str]:
+        return self.transcription_backend.transcription_model
+
+    @property
+    def model_label(self) -> str:
+        return self.backend.label
+
+    def set_backend(self, backend: LLMBackend, transcription: bool = False):
+        """Switch the chat (or transcription) backend at runtime"""
+        if transcription:
+            self.transcription_backend = backend
+        else:
+            self.backend = backend
+        self._reset_clients(backend)
+        logger.info(f"LLM gateway: {'transcription' if transcription else 'chat'} backend is now {backend.label}")
+
+    def set_fallback(self, backend: Optional[LLMBackend], transcription: bool = False):
+        """Set (or clear, with None) the backend used while the chat (or transcription) circuit is open"""
+        if transcription:
+            self.transcription_fallback_backend = backend
+        else:
+            self.fallback_backend = backend
+        if backend is not None:
+            self._reset_clients(backend)
+
+    def _fallback(self, backend: LLMBackend, transcription: bool = False) -> Optional[LLMBackend]:
+        """The backend to route to when this one's circuit rejects a call, if any"""
+        fallback = self.transcription_fallback_backend if transcription else self.fallback_backend
+        if fallback is None or fallback is backend or fallback.name == backend.name:
+            return None
+        return fallback
+
+    def _record_attempt(self, key: str, backend: LLMBackend, error: Optional[Exception] = None):
+        """Feed one attempt's outcome to its circuit; errors that are not the provider's fault are not counted"""
+        if error is None:
+            self.breaker.record(key, True)
+        elif is_provider_failure(error, backend):
+            self.breaker.record(key, False, error)
+        else:
+            self.breaker.release(key)
+
+    def _route_around(self, key: str, backend: LLMBackend, model: str,
+                      transcription: bool = False) -> Tuple[LLMBackend, str]:
+        """The fallback backend and its model for a call whose circuit is open; CircuitOpenError without one"""
+        self._count(model, "circuit_rejected")
+        fallback = self._fallback(backend, transcription)
+        if fallback is None:
+            raise CircuitOpenError(key, self.breaker.retry_after(key))
+        self._count(model, "fallbacks")
+        logger.info(f"LLM gateway: circuit for {key} is open, routing to {fallback.name}")
+        return fallback, fallback.transcription_model if transcription else fallback.chat_model
+
+    def circuit_retry_after(self, transcription: bool = False) -> float:
+        """
+        Seconds until chat (or transcription) calls can be served again when the primary backend's
+        circuit is open and no fallback can take them; 0 when calls can go out now
+        """
+        backend = self.transcription_backend if transcription else self.backend
+        model = backend.transcription_model if transcription else backend.chat_model
+        retry_after = self.breaker.retry_after(circuit_key(backend, model))
+        fallback = self._fallback(backend, transcription)
+        if not retry_after or fallback is None:
+            return retry_after
+        fallback_model = fallback.transcription_model if transcription else fallback.chat_model
+        return min(retry_after, self.breaker.retry_after(circuit_key(fallback, fallback_model)))
+
+    def _reset_clients(self, backend: LLMBackend):
+        with self._lock:
+            self._async_clients.pop(backend.name, None)
+            self._sync_clients.pop(backend.name, None)
+
+    def _limiter(self, model: str, backend: Optional[LLMBackend] = None) -> ModelLimiter:
+        with self._lock:
+            if model not in self._limiters:
+                backend = backend or self.backend
+                limits = self.model_limits.get(model, {})
+                rpm = limits.get("rpm", backend.rpm if backend.rpm is not None else self.default_rpm)
+                tpm = limits.get("tpm", backend.tpm if backend.tpm is not None else self.default_tpm)
+                self._limiters[model] = ModelLimiter(model, float(rpm), float(tpm))
+                self.counters[model] = {"requests": 0, "retries": 0, "rate_limited": 0, "failures": 0,
+                                        "throttled_seconds": 0.0, "hedges": 0, "hedge_wins": 0,
+                                        "hedges_skipped": 0, "circuit_rejected": 0, "fallbacks": 0}
+            return self._limiters[model]
+
+    def set_limits(self, rpm: float, tpm: float, model: Optional[str] = None):
+        """Change the RPM/TPM limits for one model, or the defaults for all models and backends (0 = unlimited)"""
+        with self._lock:
+            if model is None:
+                self.default_rpm, self.default_tpm = rpm, tpm
+                self.model_limits = {}
+                for backend in (self.backend, self.transcription_backend):
+                    backend.rpm = backend.tpm = None
+                limiters = list(self._limiters.values())
+            else:
+                self.model_limits[model] = {"rpm": rpm, "tpm": tpm}
+                limiters = [self._limiters[model]] if model in self._limiters else []
+            for limiter in limiters:
+                limiter.requests = TokenBucket(rpm)
+                limiter.tokens = TokenBucket(tpm)
+
+    def scale_limits(self, factor: float):
+        """Scale every RPM/TPM limit, e.g. by 1/N when N worker processes share one provider quota"""
+        with self._lock:
+            self.default_rpm *= factor
+            self.default_tpm *= factor
+            self.model_limits = {model: {name: float(value) * factor for name, value in limits.items()}
+                                 for model, limits in self.model_limits.items()}
+            for backend in {id(b): b for b in (self.backend, self.transcription_backend)}.values():
+                backend.rpm = backend.rpm * factor if backend.rpm is not None else None
+                backend.tpm = backend.tpm * factor if backend.tpm is not None else None
+            self._limiters = {}
+
+    def _count(self, model: str, name: str, amount: float = 1):
+        with self._lock:
+            self.counters[model][name] += amount
+
+    def _track(self, queued: int = 0, in_flight: int = 0):
+        with self._lock:
+            self.queue_depth += queued
+            self.in_flight += in_flight
+
+    def get_async_client(self, backend: Optional[LLMBackend] = None):
+        if self.async_client is not None:
+            return self.async_client
+        backend = backend or self.backend
+        loop = asyncio.get_running_loop()
+        clients = self._async_clients.setdefault(backend.name, weakref.WeakKeyDictionary())
+        client = clients.get(loop)
+        if client is None:
+            client = backend.create_async_client()
+            clients[loop] = client
+        return client
+
+    def get_sync_client(self, backend: Optional[LLMBackend] = None):
+        if self.sync_client is not None:
+            return self.sync_client
+        backend = backend or self.transcription_backend
+        with self._lock:
+            if backend.name not in self._sync_clients:
+                self._sync_clients[backend.name] = backend.create_sync_client()
+            return self._sync_clients[backend.name]
+
+    def _concurrency(self, backend: LLMBackend) -> Optional[asyncio.Semaphore]:
+        """Per-backend cap on in-flight async requests (None when unlimited)"""
+        if not backend.max_concurrency:
+            return None
+        loop = asyncio.get_running_loop()
+        semaphores = self._semaphores.setdefault(backend.name, weakref.WeakKeyDictionary())
+        semaphore = semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(backend.max_concurrency)
+            semaphores[loop] = semaphore
+        return semaphore
+
+    def _backoff(self, model: str, attempt: int, error: Exception, backend: LLMBackend) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None if the error should be raised"""
+        if attempt >= self.max_retries or not is_retryable(error, backend):
+            self._count(model, "failures")
+            return None
+
+        retry_after = get_retry_after(error)
+        # Full jitter keeps concurrent callers from retrying in lockstep
+        delay = random.uniform(0, min(GATEWAY_BACKOFF_MAX, GATEWAY_BACKOFF_BASE * (2 ** attempt)))
+        if getattr(error, "status_code", None) == 429:
+            self._count(model, "rate_limited")
+            if retry_after is not None:
+                self._limiter(model).block_for(retry_after)
+                delay = retry_after + random.uniform(0, GATEWAY_BACKOFF_BASE)
+        elif retry_after is not None:
+            delay = max(delay, retry_after)
+
+        self._count(model, "retries")
+        logger.warning(f"LLM gateway: {model} attempt {attempt + 1} failed ({str(error)}), "
+                       f"retrying in {delay:.2f}s")
+        return delay
+
+    async def _wait_async(self, model: str, seconds: float):
+        if seconds > 0:
+            self._count(model, "throttled_seconds", seconds)
+            self._track(queued=1)
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                self._track(queued=-1)
+
+    def _wait_sync(self, model: str, seconds: float):
+        if seconds > 0:
+            self._count(model, "throttled_seconds", seconds)
+            self._track(queued=1)
+            try:
+                time.sleep(seconds)
+            finally:
+                self._track(queued=-1)
+
+    def _settle_tokens(self, model: str, estimated: int, response):
+        usage = getattr(response, "usage", None)
+        total_tokens = getattr(usage, "total_tokens", None)
+        if isinstance(total_tokens, (int, float)):
+            self._limiter(model).tokens.adjust(estimated - total_tokens)
+
+    async def _create_completion(self, backend: LLMBackend, kwargs: Dict):
+        semaphore = self._concurrency(backend)
+        if semaphore is None:
+            return await self.get_async_client(backend).chat.completions.create(**kwargs)
+        async with semaphore:
+            return await self.get_async_client(backend).chat.completions.create(**kwargs)
+
+    def _admit_hedge(self, model: str, limiter: ModelLimiter, estimated: int) -> bool:
+        """Whether a slow request may get a duplicate: hedge budget left and no rate-limit wait"""
+        if self.hedging.try_spend() and limiter.try_reserve(estimated):
+            self._count(model, "hedges")
+            self._count(model, "requests")
+            return True
+        self._count(model, "hedges_skipped")
+        return False
+
+    async def _tracked_completion(self, backend: LLMBackend, kwargs: Dict):
+        self._track(in_flight=1)
+        try:
+            return await self._create_completion(backend, kwargs)
+        finally:
+            self._track(in_flight=-1)
+
+    async def _hedged_completion(self, backend: LLMBackend, model: str, limiter: ModelLimiter, estimated: int,
+                                 kwargs: Dict):
+        """
+        One chat attempt, hedged once it outlives the model's latency threshold.
+        Returns (response, hedged, hedge_won); the slower request is cancelled. If the first
+        request to finish failed, the other one is still awaited before the error is raised.
+        """
+        self.hedging.earn()
+        delay = self.hedging.delay(model)
+        start = time.perf_counter()
+        if delay is None:
+            response = await self._tracked_completion(backend, kwargs)
+            self.hedging.observe(model, time.perf_counter() - start)
+            return response, False, False
+
+        primary = asyncio.ensure_future(self._tracked_completion(backend, kwargs))
+        started = {primary: start}
+        try:
+            await asyncio.wait({primary}, timeout=delay)
+            if not primary.done() and self._admit_hedge(model, limiter, estimated):
+                logger.info(f"LLM gateway: hedging {model} request after {delay:.2f}s")
+                hedge = asyncio.ensure_future(self._tracked_completion(backend, kwargs))
+                started[hedge] = time.perf_counter()
+
+            error = None
+            pending = set(started)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda t: t is not primary):
+                    if task.exception() is None:
+                        self.hedging.observe(model, time.perf_counter() - started[task])
+                        hedge_won = task is not primary
+                        if hedge_won:
+                            self._count(model, "hedge_wins")
+                        return task.result(), len(started) > 1, hedge_won
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in started:
+                if not task.done():
+                    task.cancel()
+
+    def _tracked_transcription(self, backend: LLMBackend, kwargs: Dict):
+        self._track(in_flight=1)
+        try:
+            return self.get_sync_client(backend).audio.transcriptions.create(**kwargs)
+        finally:
+            self._track(in_flight=-1)
+
+    def _hedged_transcription(self, backend: LLMBackend, model: str, limiter: ModelLimiter, kwargs: Dict):
+        """
+        One transcription attempt, hedged like chat requests. The duplicate opens its own handle on
+        the audio file, so only uploads of named files on disk are hedged. A sync call cannot be
+        interrupted, so the slower request is left to finish in the background and discarded.
+        """
+        self.hedging.earn()
+        delay = self.hedging.delay(model)
+        path = getattr(kwargs.get("file"), "name", None)
+        start = time.perf_counter()
+        if delay is None or not isinstance(path, str) or not os.path.isfile(path):
+            response = self._tracked_transcription(backend, kwargs)
+            self.hedging.observe(model, time.perf_counter() - start)
+            return response, False, False
+
+        def run_hedge():
+            with open(path, "rb") as audio_file:
+                return self._tracked_transcription(backend, dict(kwargs, file=audio_file))
+
+        executor = self._get_hedge_executor()
+        primary = executor.submit(self._tracked_transcription, backend, kwargs)
+        started = {primary: start}
+        concurrent.futures.wait([primary], timeout=delay)
+        if not primary.done() and self._admit_hedge(model, limiter, 0):
+            logger.info(f"LLM gateway: hedging {model} transcription after {delay:.2f}s")
+            started[executor.submit(run_hedge)] = time.perf_counter()
+
+        error = None
+        pending = set(started)
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in sorted(done, key=lambda f: f is not primary):
+                if future.exception() is None:
+                    self.hedging.observe(model, time.perf_counter() - started[future])
+                    hedge_won = future is not primary
+                    if hedge_won:
+                        self._count(model, "hedge_wins")
+                    for other in pending:
+                        other.cancel()
+                    return future.result(), len(started) > 1, hedge_won
+                error = error or future.exception()
+        raise error
+
+    def _get_hedge_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        with self._lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=GATEWAY_HEDGE_THREADS, thread_name_prefix="llm-hedge")
+            return self._hedge_executor
+
+    def _log_call(self, operation: str, stage: str, backend: LLMBackend, model: str, started_at: datetime,
+                  start: float, queued: float, retries: int, outcome: str, error: Optional[Exception],
+                  kwargs: Dict, response=None, hedges: int = 0, hedge_won: bool = False):
+        """Append one call to the current call log (if an analysis is recording one)"""
+        if _call_log.get() is None:
+            return
+        prompt_tokens = completion_tokens = None
+        estimated = False
+        if operation == "chat":
+            usage = getattr(response, "usage", None)
+            prompt_tokens = getattr(usage, "prompt_tokens", None)
+            completion_tokens = getattr(usage, "completion_tokens", None)
+            if not isinstance(prompt_tokens, int) or not isinstance(completion_tokens, int):
+                # Servers that do not report usage get the same ~4 characters per token estimate
+                estimated = True
+                prompt_tokens = sum(len(str(m.get("content", ""))) for m in kwargs.get("messages", [])) // 4
+                completion_tokens = 0
+                if response is not None:
+                    content = getattr(response.choices[0].message, "content", None) or ""
+                    completion_tokens = len(content) // 4
+        log_call({
+            "stage": stage, "operation": operation, "backend": backend.name, "model": model,
+            "started_at": started_at.isoformat(), "wall_seconds": round(time.perf_counter() - start, 4),
+            "queued_seconds": round(queued, 4), "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens, "tokens_estimated": estimated, "retries": retries,
+            "hedges": hedges, "hedge_won": hedge_won,
+            "outcome": outcome, "error": str(error)[:500] if error is not None else None
+        })
+
+    async def chat(self, stage: Optional[str] = None, backend: Optional[LLMBackend] = None, **kwargs):
+        """
+        chat.completions.create on the chat backend (or backend, e.g. a cascade tier), through the rate
+        limiter and retry policy. stage labels the call in the call log (sentiment, intent, topic, batch, ...).
+        """
+        backend = backend or self.backend
+        if not kwargs.get("model"):
+            kwargs["model"] = backend.chat_model
+        model = kwargs["model"]
+        limiter = self._limiter(model, backend)
+        estimated = estimate_request_tokens(kwargs)
+        attempt = hedges = 0
+        hedge_won = False
+        started_at, start, queued = datetime.utcnow(), time.perf_counter(), 0.0
+        outcome, error, response = "error", None, None
+
+        try:
+            while True:
+                key = circuit_key(backend, model)
+                if not self.breaker.allow(key):
+                    try:
+                        backend, model = self._route_around(key, backend, model)
+                    except CircuitOpenError as e:
+                        outcome, error = "circuit_open", e
+                        raise
+                    kwargs["model"] = model
+                    limiter = self._limiter(model, backend)
+                    continue
+
+                wait = limiter.reserve(estimated)
+                queued += max(0.0, wait)
+                await self._wait_async(model, wait)
+                self._count(model, "requests")
+                try:
+                    response, hedged, hedge_won = await self._hedged_completion(backend, model, limiter, estimated,
+                                                                                kwargs)
+                    hedges += hedged
+                except asyncio.CancelledError:
+                    self.breaker.release(key)
+                    raise
+                except Exception as e:
+                    self._record_attempt(key, backend, e)
+                    if self.breaker.is_open(key):
+                        # No more attempts on this circuit: the fallback takes over, or the error stands
+                        if self._fallback(backend) is None:
+                            self._count(model, "failures")
+                            error = e
+                            raise
+                        attempt += 1
+                        continue
+                    delay = self._backoff(model, attempt, e, backend)
+                    if delay is None:
+                        error = e
+                        raise
+                    attempt += 1
+                    queued += delay
+                    await self._wait_async(model, delay)
+                    continue
+                self._record_attempt(key, backend)
+                self._settle_tokens(model, estimated, response)
+                outcome = "ok"
+                return response
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            self._log_call("chat", stage or "chat", backend, model, started_at, start, queued, attempt, outcome,
+                           error, kwargs, response, hedges, hedge_won)
+
+    def transcribe(self, stage: Optional[str] = None, **kwargs):
+        """audio.transcriptions.create on the transcription backend, through the rate limiter and retry policy"""
+        backend = self.transcription_backend
+        if not kwargs.get("model"):
+            kwargs["model"] = backend.transcription_model
+        model = kwargs["model"]
+        limiter = self._limiter(model, backend)
+        audio_file = kwargs.get("file")
+        attempt = hedges = 0
+        hedge_won = False
+        started_at, start, queued = datetime.utcnow(), time.perf_counter(), 0.0
+        outcome, error = "error", None
+
+        try:
+            while True:
+                key = circuit_key(backend, model)
+                if not self.breaker.allow(key):
+                    try:
+                        backend, model = self._route_around(key, backend, model, transcription=True)
+                    except CircuitOpenError as e:
+                        outcome, error = "circuit_open", e
+                        raise
+                    kwargs["model"] = model
+                    limiter = self._limiter(model, backend)
+                    continue
+
+                wait = limiter.reserve(0)
+                queued += max(0.0, wait)
+                self._wait_sync(model, wait)
+                # A retried upload has to start from the beginning of the file again
+                if hasattr(audio_file, "seek"):
+                    audio_file.seek(0)
+                self._count(model, "requests")
+                try:
+                    response, hedged, hedge_won = self._hedged_transcription(backend, model, limiter, kwargs)
+                    hedges += hedged
+                    self._record_attempt(key, backend)
+                    outcome = "ok"
+                    return response
+                except Exception as e:
+                    self._record_attempt(key, backend, e)
+                    if self.breaker.is_open(key):
+                        if self._fallback(backend, transcription=True) is None:
+                            self._count(model, "failures")
+                            error = e
+                            raise
+                        attempt += 1
+                        continue
+                    delay = self._backoff(model, attempt, e, backend)
+                    if delay is None:
+                        error = e
+                        raise
+                    attempt += 1
+                    queued += delay
+                    self._wait_sync(model, delay)
+        finally:
+            self._log_call("transcription", stage or "transcription", backend, model, started_at, start, queued,
+                           attempt, outcome, error, kwargs, hedges=hedges, hedge_won=hedge_won)
+
+    def stats(self) -> Dict:
+        """Backends, queue depth, in-flight requests, per-model counters and hedging state for /health"""
+        with self._lock:
+            stats = {
+                "available": self.available,
+                "backend": self.backend.describe(),
+                "transcription_backend": self.transcription_backend.describe(),
+                "queue_depth": self.queue_depth,
+                "in_flight": self.in_flight,
+                "models": {model: {k: round(v, 2) for k, v in counters.items()}
+                           for model, counters in self.counters.items()}
+            }
+        stats["hedging"] = self.hedging.stats()
+        stats["fallback_backend"] = self.fallback_backend.describe() if self.fallback_backend else None
+        stats["transcription_fallback_backend"] = (self.transcription_fallback_backend.describe()
+                                                   if self.transcription_fallback_backend else None)
+        stats["circuits"] = self.breaker.stats()
+        return stats
+
+    def provider_status(self) -> Dict:
+        """Circuit state of the chat and transcription backends, and the fallback that would serve them"""
+        status = {}
+        for operation, backend in (("chat", self.backend), ("transcription", self.transcription_backend)):
+            transcription = operation == "transcription"
+            model = backend.transcription_model if transcription else backend.chat_model
+            fallback = self._fallback(backend, transcription)
+            key = circuit_key(backend, model)
+            status[operation] = {
+                "backend": key,
+                "circuit": self.breaker.state(key),
+                "retry_after_seconds": round(self.circuit_retry_after(transcription), 1),
+                "fallback": (circuit_key(fallback, fallback.transcription_model if transcription
+                                         else fallback.chat_model) if fallback is not None else None)
+            }
+        status["available"] = self.available
+        return status
+
+    def any_circuit_open(self) -> bool:
+        """Whether any backend:model circuit is currently rejecting calls"""
+        return any(c["state"] == OPEN for c in self.breaker.stats()["circuits"].values())
+
+
+# Shared by analyzer.analyzer and analyzer.audio_processor
+gateway = LLMGateway()
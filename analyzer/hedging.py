@@ -0,0 +1,102 @@
+import math
+import os
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+
+# Hedged requests: a call still running past the model's rolling latency percentile gets a
+# duplicate, and whichever answers first wins. Hedges are capped at GATEWAY_HEDGE_MAX_RATE of all
+# requests (with up to GATEWAY_HEDGE_BURST saved up), so spend stays bounded.
+GATEWAY_HEDGE_ENABLED = os.getenv("GATEWAY_HEDGE_ENABLED", "true").lower() == "true"
+GATEWAY_HEDGE_PERCENTILE = float(os.getenv("GATEWAY_HEDGE_PERCENTILE", "95"))
+# Never hedge sooner than this, however fast the model usually is
+GATEWAY_HEDGE_MIN_DELAY = float(os.getenv("GATEWAY_HEDGE_MIN_DELAY", "1.0"))
+GATEWAY_HEDGE_MAX_RATE = float(os.getenv("GATEWAY_HEDGE_MAX_RATE", "0.05"))
+GATEWAY_HEDGE_BURST = float(os.getenv("GATEWAY_HEDGE_BURST", "5"))
+# Latencies kept per model, and how many a model needs before its calls are hedged
+GATEWAY_HEDGE_WINDOW = int(os.getenv("GATEWAY_HEDGE_WINDOW", "500"))
+GATEWAY_HEDGE_MIN_SAMPLES = int(os.getenv("GATEWAY_HEDGE_MIN_SAMPLES", "20"))
+
+# Recompute a model's threshold after this many new samples rather than on every call
+THRESHOLD_REFRESH_SAMPLES = 10
+
+
+class HedgePolicy:
+    """
+    Thread-safe hedging policy shared by the gateway's chat and transcription paths: rolling
+    per-model latency windows that set when a call gets a hedge, and a credit budget (each
+    request earns max_rate of a hedge, up to burst) that decides whether it may.
+    """
+
+    def __init__(self, enabled: bool = GATEWAY_HEDGE_ENABLED, percentile: float = GATEWAY_HEDGE_PERCENTILE,
+                 min_delay: float = GATEWAY_HEDGE_MIN_DELAY, max_rate: float = GATEWAY_HEDGE_MAX_RATE,
+                 burst: float = GATEWAY_HEDGE_BURST, window: int = GATEWAY_HEDGE_WINDOW,
+                 min_samples: int = GATEWAY_HEDGE_MIN_SAMPLES):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_rate = max_rate
+        self.burst = burst
+        self.window = window
+        self.min_samples = min_samples
+        self.credits = burst
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._thresholds: Dict[str, Optional[float]] = {}
+        self._stale: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, model: str, seconds: float):
+        """Record the latency of a successful request"""
+        with self._lock:
+            latencies = self._latencies.get(model)
+            if latencies is None:
+                latencies = self._latencies[model] = deque(maxlen=self.window)
+            latencies.append(seconds)
+            self._stale[model] = self._stale.get(model, THRESHOLD_REFRESH_SAMPLES) + 1
+
+    def threshold(self, model: str) -> Optional[float]:
+        """The model's latency percentile, or None until it has min_samples latencies"""
+        with self._lock:
+            latencies = self._latencies.get(model)
+            if latencies is None or len(latencies) < self.min_samples:
+                return None
+            if self._stale.get(model, 0) >= THRESHOLD_REFRESH_SAMPLES or model not in self._thresholds:
+                ordered = sorted(latencies)
+                index = min(len(ordered) - 1, max(0, math.ceil(self.percentile / 100 * len(ordered)) - 1))
+                self._thresholds[model] = ordered[index]
+                self._stale[model] = 0
+            return self._thresholds[model]
+
+    def delay(self, model: str) -> Optional[float]:
+        """Seconds to wait for a call to this model before hedging it, or None to never hedge it"""
+        if not self.enabled or self.max_rate <= 0:
+            return None
+        threshold = self.threshold(model)
+        return None if threshold is None else max(self.min_delay, threshold)
+
+    def earn(self):
+        """Every request adds max_rate of a hedge to the budget"""
+        with self._lock:
+            self.credits = min(self.burst, self.credits + self.max_rate)
+
+    def try_spend(self) -> bool:
+        """Take one hedge from the budget, if there is one"""
+        with self._lock:
+            if self.credits < 1:
+                return False
+            self.credits -= 1
+            return True
+
+    def stats(self) -> Dict:
+        """Settings and per-model thresholds for /health"""
+        models = {}
+        for model in list(self._latencies):
+            threshold = self.threshold(model)
+            with self._lock:
+                samples = len(self._latencies[model])
+            models[model] = {"samples": samples,
+                             "threshold_seconds": round(threshold, 3) if threshold is not None else None}
+        with self._lock:
+            credits = self.credits
+        return {"enabled": self.enabled, "percentile": self.percentile, "min_delay": self.min_delay,
+                "max_rate": self.max_rate, "credits": round(credits, 2), "models": models}
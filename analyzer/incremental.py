@@ -0,0 +1,135 @@
+import difflib
+import logging
+from typing import List, Dict, Optional, Tuple
+
+from analyzer.analyzer import (
+    analyze_sentences_async, extract_speaker_utterances, topics_succeeded, utterance_succeeded
+)
+from analyzer.cache import normalize_sentence
+
+logger = logging.getLogger(__name__)
+
+
+def utterance_key(sentence: Optional[str]) -> str:
+    """Alignment key: sentiment and intent depend only on the sentence, so speaker changes still match"""
+    return normalize_sentence(sentence or "")
+
+
+def align_utterances(new_utterances: List[Tuple[str, str]], stored_utterances: List[Dict]) -> Dict:
+    """
+    Align the new (speaker, sentence) list against stored utterance dicts (in utterance_id order)
+    with a sequence diff. Returns the stored dict to reuse for each unchanged new position
+    (keyed by 1-based utterance_id) and counts of inserted, modified and removed lines. Unchanged
+    lines whose stored analysis failed (error, default or deadline results) are not reused, so
+    they are analyzed again.
+    """
+    stored_keys = [utterance_key(u.get("sentence")) for u in stored_utterances]
+    new_keys = [utterance_key(sentence) for _, sentence in new_utterances]
+
+    matcher = difflib.SequenceMatcher(None, stored_keys, new_keys, autojunk=False)
+    reused = {}
+    counts = {"inserted": 0, "modified": 0, "removed": 0}
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            for offset in range(i2 - i1):
+                if utterance_succeeded(stored_utterances[i1 + offset]):
+                    reused[j1 + offset + 1] = stored_utterances[i1 + offset]
+        elif tag == "replace":
+            counts["modified"] += j2 - j1
+            counts["removed"] += max(0, (i2 - i1) - (j2 - j1))
+        elif tag == "insert":
+            counts["inserted"] += j2 - j1
+        elif tag == "delete":
+            counts["removed"] += i2 - i1
+
+    return {"reused": reused, **counts}
+
+
+def stored_preset(utterance: Dict) -> Tuple[Dict, Dict, str]:
+    """Turn a stored utterance record back into a (sentiment_result, intent_result, source) preset"""
+    sentiment_result = {
+        "sentiment": utterance.get("sentiment") or "neutral",
+        "score": utterance.get("score") if utterance.get("score") is not None else 0.5,
+        "reason": utterance.get("reason") or "Reused from previous analysis",
+        "keywords": utterance.get("keywords") or [],
+        "confidence": utterance.get("sentiment_confidence") if utterance.get("sentiment_confidence") is not None
+        else 0.5
+    }
+    intent_result = {
+        "intent": utterance.get("intent") or "unknown",
+        "secondary_intents": utterance.get("secondary_intents") or [],
+        "confidence": utterance.get("intent_confidence") if utterance.get("intent_confidence") is not None
+        else 0.5,
+        "reasoning": utterance.get("intent_reasoning") or "Reused from previous analysis"
+    }
+    return sentiment_result, intent_result, "reused"
+
+
+async def reanalyze_sentences_async(text: str, stored_utterances: List[Dict],
+                                    stored_topic_analysis: Optional[Dict] = None,
+                                    domain: Optional[str] = None, refresh_topics: bool = False,
+                                    batch_mode: Optional[bool] = None,
+                                    call_log: Optional[List[Dict]] = None) -> Dict:
+    """
+    Re-analyze a corrected transcript against a previous analysis. Unchanged sentences keep their
+    stored sentiment and intent; only inserted or modified lines go to the LLM. Stored topics are
+    kept unless refresh_topics is set or none were stored. Aggregate metrics are always recomputed.
+    """
+    new_utterances = extract_speaker_utterances(text)
+    alignment = align_utterances(new_utterances, stored_utterances)
+    preset_results = {utterance_id: stored_preset(stored)
+                      for utterance_id, stored in alignment["reused"].items()}
+
+    # Error and deadline placeholders are never kept
+    topic_analysis = None
+    if topics_succeeded(stored_topic_analysis) and not refresh_topics:
+        topic_analysis = stored_topic_analysis
+
+    analysis = await analyze_sentences_async(text, domain, batch_mode, preset_results=preset_results,
+                                             topic_analysis=topic_analysis, call_log=call_log)
+    if "error" in analysis:
+        return analysis
+
+    analysis["reanalysis"] = {
+        "reused": len(preset_results),
+        "reanalyzed": len(new_utterances) - len(preset_results),
+        "inserted": alignment["inserted"],
+        "modified": alignment["modified"],
+        "removed": alignment["removed"],
+        "previous_utterances": len(stored_utterances),
+        "topics_reused": topic_analysis is not None
+    }
+    logger.info(f"Re-analysis reused {len(preset_results)} and re-analyzed "
+                f"{len(new_utterances) - len(preset_results)} of {len(new_utterances)} utterances")
+    return analysis
+
+
+async def complete_degraded_async(analysis: Dict, domain: Optional[str] = None,
+                                  call_log: Optional[List[Dict]] = None) -> Dict:
+    """
+    Finish an analysis that was degraded to meet a deadline: utterances answered in time are kept,
+    degraded ones (and topics, if they were abandoned) are analyzed again without a deadline.
+    """
+    degradation = analysis.get("degradation") or {}
+    degraded = set(degradation.get("degraded_utterances") or [])
+    preset_results = {}
+    for utterance in analysis.get("utterances", []):
+        if utterance.get("utterance_id") not in degraded:
+            sentiment_result, intent_result, _ = stored_preset(utterance)
+            preset_results[utterance["utterance_id"]] = (sentiment_result, intent_result,
+                                                         utterance.get("analysis_source") or "reused")
+    topic_analysis = None if degradation.get("topics_degraded") else analysis.get("topic_analysis")
+
+    completed = await analyze_sentences_async(analysis.get("raw_text", ""), domain or analysis.get("domain"),
+                                              preset_results=preset_results, topic_analysis=topic_analysis,
+                                              call_log=call_log)
+    if "error" in completed:
+        return completed
+
+    completed["conversation_id"] = analysis.get("conversation_id")
+    for name in ("raw_text", "file_type", "original_filename"):
+        if name in analysis:
+            completed[name] = analysis[name]
+    logger.info(f"Completed {len(degraded)} degraded utterances of {analysis.get('conversation_id')}"
+                f"{' and its topics' if topic_analysis is None else ''}")
+    return completed
@@ -0,0 +1,193 @@
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Keyword lexicons used by agent scoring and speaker role mapping. Entries match whole words
+# (so "fix" does not fire inside "prefix"); a trailing "*" makes the last word a stem, so "help*"
+# matches "help", "helping" and "helpful". Multi-word entries match consecutive words.
+DEFAULT_LEXICONS: Dict[str, List[str]] = {
+    # Professional language in agent utterances
+    "professional": ['help*', 'assist*', 'solve*', 'resolve*', 'understand*', 'sorry', 'apologi*',
+                     'thank*', 'please', 'certainly', 'absolutely', 'definitely', 'glad', 'happy',
+                     'everything', 'right', 'fix*', 'support*'],
+    # Diarized speaker → role heuristics
+    "agent_role": ['help*', 'assist*', 'support*', 'company', 'policy', 'thank you for calling'],
+    "customer_role": ['problem*', 'issue*', 'my order*', 'i need', 'complaint*', 'refund*']
+}
+
+# Per-domain additions, e.g. {"ecommerce": {"professional": ["order number"]}}; entries extend the defaults
+KEYWORD_LEXICONS = json.loads(os.getenv("KEYWORD_LEXICONS", "{}"))
+
+WORD_PATTERN = re.compile(r"\w+(?:'\w+)*")
+# The same word boundaries as regex fragments ("don't" is one word, so "don" does not match in it)
+WORD_START = r"(?<!\w)(?<!\w')"
+WORD_END = r"(?!\w|'\w)"
+WORD_GAP = WORD_END + r"\W+"
+WORD_REST = r"\w*(?:'\w+)*"
+
+# Distinct first words whose trie lookups are memoized per matcher
+FIRST_WORD_CACHE_SIZE = 50000
+
+
+def tokenize(text: str) -> List[str]:
+    return WORD_PATTERN.findall(text.lower())
+
+
+def compile_entries(entries: List[Tuple[str, bool]]):
+    """
+    One regex for (entry, is_stem) pairs, with entries given as lowercase words joined by single
+    spaces. Matches start at a word and end at a word boundary (a stem takes the rest of its word),
+    and a space matches the gap to the next word. The alternatives are factored into a character
+    trie so the regex engine tries at most one branch per character instead of every keyword.
+    """
+    char_trie = {}
+    for entry, is_stem in entries:
+        if not entry:
+            continue
+        node = char_trie
+        for char in entry:
+            node = node.setdefault(char, {})
+        node["stem" if is_stem else "whole"] = True
+
+    def emit(node) -> str:
+        if node.get("stem"):
+            return WORD_REST
+        alternatives = [(WORD_GAP if char == " " else re.escape(char)) + emit(child)
+                        for char, child in sorted(node.items()) if len(char) == 1]
+        if node.get("whole"):
+            alternatives.append(WORD_END)
+        return alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+
+    if not char_trie:
+        return re.compile(r"(?!x)x")
+    return re.compile(WORD_START + emit(char_trie))
+
+
+class TrieNode:
+    __slots__ = ("children", "stems", "stem_key", "outputs")
+
+    def __init__(self):
+        self.children: Dict[str, "TrieNode"] = {}
+        # Stems indexed by their first stem_key characters: one dict lookup per word, then startswith
+        self.stems: Dict[str, List[Tuple[str, List[Tuple[str, str]]]]] = {}
+        self.stem_key = 0
+        self.outputs: List[Tuple[str, str]] = []
+
+    def stem_hits(self, word: str) -> List[Tuple[str, str]]:
+        hits = []
+        for stem, outputs in self.stems.get(word[:self.stem_key], ()):
+            if word.startswith(stem):
+                hits.extend(outputs)
+        return hits
+
+
+class KeywordMatcher:
+    """
+    Multi-lexicon keyword matcher. All entries are compiled into one word-level trie, plus a regex
+    over the trie's first words that finds the few positions where any entry can start. count()
+    scans a text once (in C) for those positions and walks the trie only from them, so every
+    lexicon is counted in a single pass; contains() runs one compiled regex per lexicon. Neither
+    cost grows much with the number of keywords.
+    """
+
+    def __init__(self, lexicons: Dict[str, Iterable[str]]):
+        self.lexicons = {name: list(entries) for name, entries in lexicons.items()}
+        self.root = TrieNode()
+        self.first_words: Dict[str, Tuple[List[Tuple[str, str]], Optional[TrieNode]]] = {}
+
+        for name, entries in self.lexicons.items():
+            for entry in entries:
+                self.add(name, entry)
+        self.start_pattern = self.compile_start_pattern()
+        # contains() only needs a yes/no per lexicon, which one regex per lexicon answers entirely in C
+        self.lexicon_patterns = {
+            name: compile_entries([(" ".join(tokenize(entry.rstrip("*"))), entry.endswith("*")) for entry in entries])
+            for name, entries in self.lexicons.items()
+        }
+
+    def add(self, lexicon: str, entry: str):
+        is_stem = entry.endswith("*")
+        words = tokenize(entry.rstrip("*"))
+        if not words:
+            return
+
+        node = self.root
+        for word in words[:-1]:
+            node = node.children.setdefault(word, TrieNode())
+        if is_stem:
+            stems = {stem: outputs for candidates in node.stems.values() for stem, outputs in candidates}
+            stems.setdefault(words[-1], []).append((lexicon, entry))
+            node.stem_key = min(len(stem) for stem in stems)
+            node.stems = {}
+            for stem, outputs in stems.items():
+                node.stems.setdefault(stem[:node.stem_key], []).append((stem, outputs))
+        else:
+            node = node.children.setdefault(words[-1], TrieNode())
+            node.outputs.append((lexicon, entry))
+
+    def compile_start_pattern(self):
+        """Regex matching at the start of any word that begins an entry (whole first word or stem)"""
+        entries = [(word, False) for word in self.root.children]
+        entries += [(stem, True) for candidates in self.root.stems.values() for stem, _ in candidates]
+        return compile_entries(entries)
+
+    def walk(self, text: str, word: str, end: int) -> List[Tuple[str, str]]:
+        """Every (lexicon, entry) that starts at `word`, which ends at offset `end` of text"""
+        first = self.first_words.get(word)
+        if first is None:
+            hits = self.root.stem_hits(word) if self.root.stems else []
+            node = self.root.children.get(word)
+            if node is not None:
+                hits += node.outputs
+                if not node.children and not node.stems:
+                    node = None
+            first = (hits, node)
+            if len(self.first_words) < FIRST_WORD_CACHE_SIZE:
+                self.first_words[word] = first
+
+        hits, node = first
+        if node is None:
+            return hits
+        # Multi-word entries: keep walking only while the following words stay on a trie path
+        hits = list(hits)
+        while True:
+            token = WORD_PATTERN.search(text, end)
+            if token is None:
+                break
+            word, end = token.group(), token.end()
+            if node.stems:
+                hits.extend(node.stem_hits(word))
+            node = node.children.get(word)
+            if node is None:
+                break
+            hits.extend(node.outputs)
+        return hits
+
+    def matches(self, text: str) -> Iterator[Tuple[str, str]]:
+        """(lexicon, entry) for every match in text, in order of where the match starts"""
+        text = (text or "").lower()
+        for candidate in self.start_pattern.finditer(text):
+            yield from self.walk(text, candidate.group(), candidate.end())
+
+    def count(self, text: str, distinct: bool = False) -> Dict[str, int]:
+        """Hits per lexicon (every lexicon present, 0 when nothing matched); distinct counts each entry once"""
+        counts = dict.fromkeys(self.lexicons, 0)
+        hits = list(self.matches(text))
+        for lexicon, _ in (set(hits) if distinct else hits):
+            counts[lexicon] += 1
+        return counts
+
+    def contains(self, text: str, lexicon: str) -> bool:
+        """Whether any entry of one lexicon occurs in text"""
+        return self.lexicon_patterns[lexicon].search((text or "").lower()) is not None
+
+
+@lru_cache(maxsize=None)
+def get_matcher(domain: Optional[str] = None) -> KeywordMatcher:
+    """Matcher for the default lexicons plus the domain's KEYWORD_LEXICONS additions"""
+    lexicons = {name: list(entries) for name, entries in DEFAULT_LEXICONS.items()}
+    for name, entries in KEYWORD_LEXICONS.get(domain or "general", {}).items():
+        lexicons.setdefault(name, []).extend(entries)
+    return KeywordMatcher(lexicons)
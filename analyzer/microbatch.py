@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import os
+import threading
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+from analyzer.batching import (
+    BATCH_MAX_ITEMS, BATCH_TOKEN_BUDGET, UTTERANCE_TOKEN_OVERHEAD, classify_batch, estimate_tokens
+)
+from analyzer.decoding import DecodeError, decode_stats
+from analyzer.gateway import current_call_log, record_calls
+
+logger = logging.getLogger(__name__)
+
+# Cross-request micro-batching: sentiment + intent work from every in-flight analysis is collected
+# for up to MICROBATCH_WINDOW_MS and sent as one batched classification request
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "false").lower() == "true"
+MICROBATCH_WINDOW_MS = float(os.getenv("MICROBATCH_WINDOW_MS", "25"))
+MICROBATCH_TOKEN_BUDGET = int(os.getenv("MICROBATCH_TOKEN_BUDGET", str(BATCH_TOKEN_BUDGET)))
+MICROBATCH_MAX_ITEMS = int(os.getenv("MICROBATCH_MAX_ITEMS", str(BATCH_MAX_ITEMS)))
+
+
+class WorkItem:
+    __slots__ = ("speaker", "sentence", "tokens", "future", "call_log")
+
+    def __init__(self, speaker: str, sentence: str, tokens: int, future: asyncio.Future,
+                 call_log: Optional[List[Dict]]):
+        self.speaker = speaker
+        self.sentence = sentence
+        self.tokens = tokens
+        self.future = future
+        self.call_log = call_log
+
+
+class OpenWindow:
+    """Items collected for the next request on one event loop"""
+
+    def __init__(self):
+        self.items: List[WorkItem] = []
+        self.tokens = 0
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher:
+    """
+    Collects single-utterance classification work from concurrent analyses into shared batched
+    requests. A window is sent when it reaches the token budget or item cap, or window_seconds after
+    its first item, whichever comes first. Each caller gets its own (sentiment_result, intent_result),
+    or None when the batch could not answer it and it should be analyzed individually.
+    Windows are per event loop, so concurrent asyncio.run() callers in other threads batch separately.
+    """
+
+    def __init__(self, enabled: bool = MICROBATCH_ENABLED, window_seconds: float = MICROBATCH_WINDOW_MS / 1000,
+                 token_budget: int = MICROBATCH_TOKEN_BUDGET, max_items: int = MICROBATCH_MAX_ITEMS):
+        self.enabled = enabled
+        self.window_seconds = window_seconds
+        self.token_budget = token_budget
+        self.max_items = max_items
+        self._windows: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, OpenWindow]" = \
+            weakref.WeakKeyDictionary()
+        self._sending = set()
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "items": 0, "answered": 0, "fallbacks": 0, "abandoned": 0,
+                         "full_flushes": 0, "timed_flushes": 0}
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+
+    async def classify(self, speaker: str, sentence: str) -> Optional[Tuple[Dict, Dict]]:
+        """Queue one utterance for the next shared request and wait for its result"""
+        loop = asyncio.get_running_loop()
+        tokens = estimate_tokens(sentence) + UTTERANCE_TOKEN_OVERHEAD
+        window = self._windows.get(loop)
+        if window is not None and window.items and window.tokens + tokens > self.token_budget:
+            self._flush(loop, window, "full_flushes")
+
+        window = self._windows.get(loop)
+        if window is None:
+            window = self._windows[loop] = OpenWindow()
+            window.timer = loop.call_later(self.window_seconds, self._flush, loop, window, "timed_flushes")
+
+        item = WorkItem(speaker, sentence, tokens, loop.create_future(), current_call_log())
+        window.items.append(item)
+        window.tokens += tokens
+        if len(window.items) >= self.max_items or window.tokens >= self.token_budget:
+            self._flush(loop, window, "full_flushes")
+        return await item.future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop, window: OpenWindow, reason: str):
+        """Close a window (if it is still the open one) and send it"""
+        if self._windows.get(loop) is not window:
+            return
+        del self._windows[loop]
+        if window.timer is not None:
+            window.timer.cancel()
+        self._count(reason)
+        task = loop.create_task(self._send(window.items))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send(self, items: List[WorkItem]):
+        # Callers cancelled while waiting (deadline, disconnect) are dropped from the request
+        live = [item for item in items if not item.future.done()]
+        self._count("abandoned", len(items) - len(live))
+        if not live:
+            return
+
+        window = [(n, item.speaker, item.sentence) for n, item in enumerate(live, 1)]
+        calls = record_calls()
+        parsed = {}
+        try:
+            parsed = await classify_batch(window, stage="microbatch")
+        except Exception as e:
+            if isinstance(e, DecodeError):
+                decode_stats.record("batch", "re_requested", len(live))
+            logger.warning(f"Micro-batch of {len(live)} utterances failed: {str(e)}")
+        else:
+            missing = len(live) - len(parsed)
+            if missing:
+                decode_stats.record("batch", "re_requested", missing)
+                logger.warning(f"Micro-batch: {missing} of {len(live)} utterances missing or malformed, "
+                               f"falling back to per-utterance analysis")
+        finally:
+            self._count("requests")
+            self._count("items", len(live))
+            self._count("answered", len(parsed))
+            self._count("fallbacks", len(live) - len(parsed))
+            share_calls(calls, live)
+
+        for n, item in enumerate(live, 1):
+            if not item.future.done():
+                item.future.set_result(parsed.get(n))
+
+    def stats(self) -> Dict:
+        """Settings and counters for /health"""
+        with self._lock:
+            stats = dict(self.counters)
+        stats["items_per_request"] = round(stats["items"] / stats["requests"], 2) if stats["requests"] else 0.0
+        stats.update(enabled=self.enabled, window_ms=round(self.window_seconds * 1000, 1),
+                     token_budget=self.token_budget, max_items=self.max_items)
+        return stats
+
+
+def share_calls(calls: List[Dict], items: List[WorkItem]):
+    """
+    Record a shared request in the call log of every analysis that had items in it, with tokens
+    split by each analysis's share of the items
+    """
+    shares: Dict[int, Tuple[List[Dict], int]] = {}
+    for item in items:
+        if item.call_log is not None:
+            call_log, count = shares.get(id(item.call_log), (item.call_log, 0))
+            shares[id(item.call_log)] = (call_log, count + 1)
+
+    for call_log, count in shares.values():
+        fraction = count / len(items)
+        for entry in calls:
+            shared = dict(entry, batch_items=count, batch_size=len(items))
+            for name in ("prompt_tokens", "completion_tokens"):
+                if entry.get(name) is not None:
+                    shared[name] = round(entry[name] * fraction)
+            call_log.append(shared)
+
+
+# Process-wide batcher shared by all analyses
+microbatcher = MicroBatcher()
@@ -0,0 +1,168 @@
+import logging
+import os
+import re
+from typing import List, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Pre-classification settings
+PRECLASSIFIER_ENABLED = os.getenv("PRECLASSIFIER_ENABLED", "true").lower() == "true"
+PRECLASSIFIER_CONFIDENCE_THRESHOLD = float(os.getenv("PRECLASSIFIER_CONFIDENCE_THRESHOLD", "0.9"))
+
+# (rule name, whole-utterance pattern, sentiment, score, intent, confidence)
+# Patterns are matched against the normalized utterance (lowercase, no trailing punctuation),
+# so only utterances that consist entirely of the phrase are routed locally.
+LEXICON_RULES = [
+    ("acknowledgment",
+     r"(?:ok(?:ay)?|sure|alright|all right|yes|yeah|yep|got it|i see|understood|no problem|right|fine|"
+     r"of course|will do|noted)(?: (?:thanks|thank you))?",
+     "neutral", 0.5, "acknowledgment", 0.92),
+    ("positive_acknowledgment",
+     r"(?:great|perfect|awesome|excellent|wonderful|sounds good|sounds great|that's great|that works)"
+     r"(?: (?:thanks|thank you)(?: so much| very much)?)?",
+     "positive", 0.75, "acknowledgment", 0.9),
+    ("thanks",
+     r"(?:thank you|thanks|many thanks|thanks a lot|thank you so much|thank you very much|thanks so much)"
+     r"(?: for (?:your|the|all your) (?:help|time|assistance|patience))?(?: again)?",
+     "positive", 0.8, "acknowledgment", 0.93),
+    ("hold",
+     r"(?:please )?(?:hold(?: on)?|one moment|just a (?:moment|second|sec|minute)|"
+     r"give me (?:a|one) (?:moment|second|minute)|bear with me)(?: please)?",
+     "neutral", 0.5, "request", 0.92),
+    ("identifier",
+     r"(?:(?:sure|yes|yeah|okay|ok),? )?(?:it'?s |it is |that'?s |my (?:order|account|ticket|reference|case) "
+     r"(?:number |id )?is )?#?[a-z]{0,4}[- ]?\d{4,}",
+     "neutral", 0.5, "acknowledgment", 0.92),
+    ("greeting",
+     r"(?:hi|hello|hey|good (?:morning|afternoon|evening))(?: there)?",
+     "neutral", 0.55, "acknowledgment", 0.9),
+    ("farewell",
+     r"(?:bye|goodbye|bye bye|have a (?:good|great|nice) (?:day|one|evening|weekend))(?: to you too| too)?",
+     "positive", 0.7, "acknowledgment", 0.9),
+]
+
+PUNCTUATION_PATTERN = re.compile(r"[\s.!?,;:]+$")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_utterance(sentence: str) -> str:
+    """Lowercase, unify apostrophes and strip trailing punctuation before lexicon matching"""
+    text = sentence.lower().replace("’", "'").replace("‘", "'")
+    text = WHITESPACE_PATTERN.sub(" ", text).strip()
+    return PUNCTUATION_PATTERN.sub("", text)
+
+
+class LexiconPreClassifier:
+    """Compiled whole-utterance phrase matcher for trivially classifiable lines"""
+
+    name = "lexicon"
+
+    def __init__(self, rules: List[Tuple] = None):
+        self.rules = rules or LEXICON_RULES
+        # One alternation with a named group per rule, so each utterance is scanned once
+        self.pattern = re.compile("|".join(f"(?P<r{i}>{rule[1]})" for i, rule in enumerate(self.rules)))
+
+    def classify(self, sentence: str, speaker: Optional[str] = None) -> Optional[Dict]:
+        match = self.pattern.fullmatch(normalize_utterance(sentence))
+        if not match:
+            return None
+
+        name, _, sentiment, score, intent, confidence = self.rules[int(match.lastgroup[1:])]
+        return {
+            "sentiment": sentiment,
+            "score": score,
+            "intent": intent,
+            "confidence": confidence,
+            "rule": name
+        }
+
+
+# Pre-classifiers are tried in order; the first confident answer wins
+PRECLASSIFIERS = [LexiconPreClassifier()]
+
+
+def register_preclassifier(preclassifier, first: bool = False):
+    """Add a pre-classifier (any object with a name and classify(sentence, speaker) -> Optional[Dict])"""
+    if first:
+        PRECLASSIFIERS.insert(0, preclassifier)
+    else:
+        PRECLASSIFIERS.append(preclassifier)
+
+
+def preclassify(sentence: str, speaker: Optional[str] = None,
+                threshold: float = PRECLASSIFIER_CONFIDENCE_THRESHOLD) -> Optional[Tuple[Dict, Dict, str]]:
+    """
+    Run the pre-classifier stage. Returns (sentiment_result, intent_result, source) for
+    high-certainty utterances, or None if the utterance should go to the LLM.
+    """
+    if not PRECLASSIFIER_ENABLED:
+        return None
+
+    for preclassifier in PRECLASSIFIERS:
+        try:
+            result = preclassifier.classify(sentence, speaker)
+        except Exception as e:
+            logger.warning(f"Pre-classifier {preclassifier.name} failed: {str(e)}")
+            continue
+        if result is None or result["confidence"] < threshold:
+            continue
+
+        reason = f"Matched {preclassifier.name} rule '{result.get('rule', 'unknown')}'"
+        sentiment_result = {
+            "sentiment": result["sentiment"],
+            "score": result["score"],
+            "reason": reason,
+            "keywords": [],
+            "confidence": result["confidence"]
+        }
+        intent_result = {
+            "intent": result["intent"],
+            "secondary_intents": result.get("secondary_intents", []),
+            "confidence": result["confidence"],
+            "reasoning": reason
+        }
+        return sentiment_result, intent_result, preclassifier.name
+
+    return None
+
+
+def routing_report(utterances: List[Tuple[str, str]], threshold: float = PRECLASSIFIER_CONFIDENCE_THRESHOLD) -> Dict:
+    """Fraction of utterances the pre-classifier stage would answer locally, with per-rule counts"""
+    rule_counts = {}
+    routed = 0
+    for speaker, sentence in utterances:
+        for preclassifier in PRECLASSIFIERS:
+            result = preclassifier.classify(sentence, speaker)
+            if result is not None and result["confidence"] >= threshold:
+                key = f"{preclassifier.name}:{result.get('rule', 'unknown')}"
+                rule_counts[key] = rule_counts.get(key, 0) + 1
+                routed += 1
+                break
+
+    return {
+        "total_utterances": len(utterances),
+        "routed_locally": routed,
+        "local_fraction": round(routed / len(utterances), 3) if utterances else 0.0,
+        "llm_calls_saved": routed * 2,
+        "rules": rule_counts
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+    import json
+
+    from analyzer.transcript import iter_file_utterances
+
+    parser = argparse.ArgumentParser(description="Report how many utterances the pre-classifier routes locally")
+    parser.add_argument("paths", nargs="+", help="Conversation .txt files or glob patterns")
+    parser.add_argument("--threshold", type=float, default=PRECLASSIFIER_CONFIDENCE_THRESHOLD)
+    args = parser.parse_args()
+
+    corpus = []
+    for pattern in args.paths:
+        for path in sorted(glob.glob(pattern)):
+            corpus.extend(iter_file_utterances(path))
+
+    print(json.dumps(routing_report(corpus, args.threshold), indent=2))
@@ -0,0 +1,147 @@
+import os
+
+# Chat model used for sentiment, intent and topic classification
+CHAT_MODEL = os.getenv("GROQ_CHAT_MODEL", "llama3-8b-8192")
+
+SENTIMENT_LABELS = ["extreme positive", "positive", "neutral", "negative", "extreme negative"]
+
+INTENT_LABELS = ["complaint", "inquiry", "feedback", "request", "acknowledgment", "escalation"]
+
+TOPIC_LABELS = ["billing", "technical_support", "product_inquiry", "account_management", "shipping",
+                "returns_exchanges", "complaint", "compliment", "general_inquiry", "cancellation"]
+
+TOPIC_PROMPT = """
+        You are an expert topic classifier for customer service conversations.
+
+        Analyze the conversation and identify relevant topics from these categories:
+        - "billing": payment issues, charges, invoices, refunds
+        - "technical_support": software/hardware problems, troubleshooting, setup
+        - "product_inquiry": questions about features, specifications, availability
+        - "account_management": login issues, profile changes, account settings
+        - "shipping": delivery, tracking, shipping methods, delays
+        - "returns_exchanges": product returns, exchanges, warranty claims
+        - "complaint": service issues, dissatisfaction, negative experiences
+        - "compliment": praise, positive feedback, satisfaction
+        - "general_inquiry": general questions, information requests
+        - "cancellation": service termination, subscription cancellation
+
+        Return ONLY in this exact JSON format:
+        {
+            "topics": ["list", "of", "relevant", "topics"],
+            "primary_topic": "most_relevant_topic",
+            "confidence": 0.85,
+            "reasoning": "Brief explanation of topic classification"
+        }
+        """
+
+SENTIMENT_PROMPT = """
+        You are an expert sentiment analysis system trained across multiple industries.
+
+        Analyze each sentence and classify sentiment into:
+        - "extreme positive": highly enthusiastic, delighted, grateful
+        - "positive": satisfied, content, pleased
+        - "neutral": factual, polite, emotionally flat
+        - "negative": unsatisfied, concerned, mildly critical
+        - "extreme negative": angry, highly critical, frustrated
+
+        Consider context, tone, and domain-specific language.
+
+        Classify based on **emotional tone**, even if wording is polite. For example,
+        'I guess it's fine' might still be negative depending on tone. Interpret sarcasm and indirect emotions.
+
+        Return ONLY in this exact JSON format:
+        {
+            "sentiment": "extreme positive|positive|neutral|negative|extreme negative",
+            "score": float between 0 and 1,
+            "reason": "Detailed explanation of sentiment classification",
+            "keywords": ["key", "emotional", "words"],
+            "confidence": float between 0 and 1
+        }
+        """
+
+# Few-shot examples for better grounding
+SENTIMENT_FEW_SHOT_EXAMPLES = [
+    {"role": "user", "content": "The support was phenomenal! I couldn't be happier."},
+    {"role": "assistant",
+     "content": '{"sentiment": "extreme positive", "score": 0.95, "reason": "Very enthusiastic '
+                'and joyful tone", "keywords": ["phenomenal", "couldn\'t be happier"], "confidence": 0.95}'},
+    {"role": "user", "content": "It's okay I guess. Nothing special."},
+    {"role": "assistant",
+     "content": '{"sentiment": "neutral", "score": 0.5, "reason": "Factual and indifferent tone", '
+                '"keywords": ["okay", "nothing special"], "confidence": 0.8}'},
+    {"role": "user", "content": "Thanks for your help, but I'm still waiting for a resolution."},
+    {"role": "assistant",
+     "content": '{"sentiment": "negative", "score": 0.4, "reason": "Underlying dissatisfaction despite '
+                'politeness", "keywords": ["still waiting"], "confidence": 0.7}'},
+    {"role": "user", "content": "This has been a horrible experience. I will never use this service again."},
+    {"role": "assistant",
+     "content": '{"sentiment": "extreme negative", "score": 0.9, "reason": "Strong frustration and refusal '
+                'to return", "keywords": ["horrible", "never use"], "confidence": 0.95}'},
+    {"role": "user", "content": "Really appreciate the quick fix! Saved my day."},
+    {"role": "assistant",
+     "content": '{"sentiment": "positive", "score": 0.8, "reason": "Gratitude and satisfaction with service", '
+                '"keywords": ["appreciate", "saved my day"], "confidence": 0.9}'}
+]
+
+INTENT_PROMPT = """
+        You are an intelligent intent classification system.
+
+        Classify the intent into one or more categories:
+        - "complaint": expressing dissatisfaction, reporting issues
+        - "inquiry": asking for information, clarifying something
+        - "feedback": giving opinions, suggestions, praise, critique
+        - "request": asking for action, service, or assistance
+        - "acknowledgment": confirming, agreeing, thanking
+        - "escalation": demanding supervisor, threatening action
+
+        Return ONLY in this JSON format:
+        {
+            "intent": "primary_intent",
+            "secondary_intents": ["list", "of", "secondary"],
+            "confidence": float between 0 and 1,
+            "reasoning": "Explanation of intent classification"
+        }
+        """
+
+BATCH_CLASSIFICATION_PROMPT = """
+        You are an expert sentiment and intent classification system for customer service conversations.
+
+        You will receive a JSON object with a list of numbered utterances. Classify EVERY utterance
+        independently.
+
+        Sentiment must be one of:
+        - "extreme positive": highly enthusiastic, delighted, grateful
+        - "positive": satisfied, content, pleased
+        - "neutral": factual, polite, emotionally flat
+        - "negative": unsatisfied, concerned, mildly critical
+        - "extreme negative": angry, highly critical, frustrated
+
+        Classify based on **emotional tone**, even if wording is polite. Interpret sarcasm and indirect emotions.
+
+        Intent must be one of:
+        - "complaint": expressing dissatisfaction, reporting issues
+        - "inquiry": asking for information, clarifying something
+        - "feedback": giving opinions, suggestions, praise, critique
+        - "request": asking for action, service, or assistance
+        - "acknowledgment": confirming, agreeing, thanking
+        - "escalation": demanding supervisor, threatening action
+
+        Return ONLY in this exact JSON format, with one entry per input utterance and the same "id":
+        {
+            "results": [
+                {
+                    "id": 1,
+                    "sentiment": "extreme positive|positive|neutral|negative|extreme negative",
+                    "score": float between 0 and 1,
+                    "confidence": float between 0 and 1,
+                    "intent": "primary_intent",
+                    "secondary_intents": ["list", "of", "secondary"],
+                    "reason": "Short explanation"
+                }
+            ]
+        }
+        """
+
+# Follow-up sent (after the rejected reply) when a response cannot be repaired locally
+DECODE_RETRY_PROMPT = ("Your previous reply could not be used ({error}). Reply again with ONLY the JSON object "
+                       "in the exact format requested, with every required field filled in.")
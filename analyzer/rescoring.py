@@ -0,0 +1,316 @@
+"""
+Vectorized recomputation of CSAT and agent performance for the stored corpus.
+
+Utterance rows are loaded as columnar arrays ordered by conversation and utterance_id, and
+normalize_sentiment_score, calculate_csat_score and calculate_agent_performance are re-expressed
+as NumPy array operations over all conversations at once. Per-conversation sums use np.bincount,
+which accumulates in row order like the scalar loops do, so results match the scalar functions
+exactly; verify_parity checks that on any set of columns.
+
+Usage (from the repository root):
+    python -m analyzer.rescoring [--dry-run] [--verify]
+"""
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select
+
+from analyzer.analyzer import RESOLUTION_SCORES, calculate_csat_score, calculate_agent_performance
+from analyzer.keywords import get_matcher
+from databaseLib.models import Conversation, Utterance
+
+logger = logging.getLogger(__name__)
+
+# Label codes used by the vectorized normalization; anything else keeps its raw score
+SENTIMENT_CODES = {"extreme positive": 0, "positive": 1, "neutral": 2, "negative": 3, "extreme negative": 4}
+OTHER_SENTIMENT = len(SENTIMENT_CODES)
+
+CSAT_RATINGS = [(80, "Excellent"), (65, "Good"), (50, "Satisfactory"), (30, "Poor")]
+AGENT_RATINGS = [(80, "Excellent"), (65, "Good"), (50, "Satisfactory"), (35, "Needs Improvement")]
+
+
+def factorize(values: Sequence) -> (np.ndarray, List):
+    """Integer codes for each value plus the list of distinct values, in first-seen order"""
+    table = {}
+    codes = np.fromiter((table.setdefault(v, len(table)) for v in values), dtype=np.int64, count=len(values))
+    return codes, list(table)
+
+
+def normalize_sentiment_scores(sentiment_codes: np.ndarray, raw_scores: np.ndarray) -> np.ndarray:
+    """Array form of normalize_sentiment_score; codes come from lowercased labels"""
+    raw = raw_scores
+    normalized = raw.copy()
+
+    bands = [
+        (0, np.where(raw > 0.5, np.maximum(0.85, np.minimum(1.0, raw)), 0.9)),
+        (1, np.where(raw > 0.5, np.maximum(0.65, np.minimum(0.84, raw)), 0.75)),
+        (2, np.where(np.abs(raw - 0.5) < 0.15, np.maximum(0.45, np.minimum(0.64, raw)), 0.5)),
+        (3, np.where(raw < 0.5, np.minimum(0.35, np.maximum(0.15, raw)), 0.25)),
+        (4, np.where(raw < 0.5, np.minimum(0.14, np.maximum(0.0, raw)), 0.1)),
+    ]
+    for code, values in bands:
+        mask = sentiment_codes == code
+        normalized[mask] = values[mask]
+    return normalized
+
+
+def rate(scores: np.ndarray, thresholds: List, lowest: str) -> np.ndarray:
+    return np.select([scores >= threshold for threshold, _ in thresholds],
+                     [label for _, label in thresholds], default=lowest).astype(object)
+
+
+def rescore_columns(columns: Dict) -> Dict[str, np.ndarray]:
+    """
+    Compute CSAT and agent performance for every conversation in `columns`.
+    columns holds equal-length "conversation_id", "speaker", "sentence", "sentiment" and "score"
+    sequences, grouped by conversation and in utterance order within each conversation, and
+    optionally "domain" (the conversation's domain, selecting its keyword lexicons).
+    Missing values take the same defaults the scalar functions use.
+    Returns per-conversation arrays keyed like the Conversation columns they update.
+    """
+    conv_codes, conversation_ids = factorize(columns["conversation_id"])
+    num_conversations = len(conversation_ids)
+    if num_conversations and np.any(np.diff(conv_codes) < 0):
+        raise ValueError("Utterance columns must be grouped by conversation")
+
+    speaker_codes, speakers = factorize(columns["speaker"])
+    speaker_roles = np.array([(s or "").lower() for s in speakers] or [""], dtype=object)
+    is_customer = (speaker_roles == "customer")[speaker_codes]
+    is_agent = (speaker_roles == "agent")[speaker_codes]
+
+    label_codes, labels = factorize(columns["sentiment"])
+    labels = [label if label is not None else "neutral" for label in labels]
+    normalize_codes = np.array([SENTIMENT_CODES.get(label.lower(), OTHER_SENTIMENT) for label in labels] or [0])
+    exact_codes = np.array([SENTIMENT_CODES.get(label, OTHER_SENTIMENT) for label in labels] or [0])
+
+    raw_scores = np.array([0.5 if s is None else s for s in columns["score"]], dtype=np.float64)
+    normalized = normalize_sentiment_scores(normalize_codes[label_codes], raw_scores)
+
+    # --- CSAT: recency-weighted average of customer scores ---
+    customer_conv = conv_codes[is_customer]
+    customer_scores = normalized[is_customer]
+    customer_counts = np.bincount(customer_conv, minlength=num_conversations)
+    customer_starts = np.cumsum(customer_counts) - customer_counts
+    rank = np.arange(len(customer_conv)) - customer_starts[customer_conv]
+    weights = 1.0 + (rank / np.maximum(1, customer_counts[customer_conv] - 1)) * 1.5
+
+    weighted_sum = np.bincount(customer_conv, weights=customer_scores * weights, minlength=num_conversations)
+    weight_sum = np.bincount(customer_conv, weights=weights, minlength=num_conversations)
+    has_customer = customer_counts > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        csat_scores = np.where(has_customer, weighted_sum / weight_sum * 100, 0.0)
+
+    # --- Agent performance ---
+    agent_conv = conv_codes[is_agent]
+    agent_counts = np.bincount(agent_conv, minlength=num_conversations)
+    has_agent = agent_counts > 0
+    agent_sums = np.bincount(agent_conv, weights=normalized[is_agent], minlength=num_conversations)
+
+    sentences = columns["sentence"]
+    domains = columns.get("domain") or [None] * len(sentences)
+    agent_rows = np.flatnonzero(is_agent)
+    keyword_hits = np.fromiter((get_matcher(domains[i]).contains(sentences[i] or "", "professional")
+                                for i in agent_rows), dtype=bool, count=len(agent_rows))
+    professional_counts = np.bincount(agent_conv, weights=keyword_hits, minlength=num_conversations)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        agent_sentiment_avg = agent_sums / agent_counts
+        professionalism = (professional_counts / agent_counts) * 100
+
+    # First/last customer deltas
+    first_rows = np.where(has_customer, customer_starts, 0)
+    last_rows = np.where(has_customer, customer_starts + customer_counts - 1, 0)
+    customer_exact_codes = exact_codes[label_codes][is_customer]
+    if len(customer_scores):
+        first_scores, last_scores = customer_scores[first_rows], customer_scores[last_rows]
+        last_codes = customer_exact_codes[last_rows]
+    else:
+        first_scores = last_scores = np.zeros(num_conversations)
+        last_codes = np.full(num_conversations, OTHER_SENTIMENT)
+
+    improvement = np.zeros(num_conversations)
+    multiple = customer_counts >= 2
+    improvement[multiple] = (last_scores[multiple] - first_scores[multiple]) * 100
+    single_negative = (customer_counts == 1) & np.isin(last_codes, [SENTIMENT_CODES["negative"],
+                                                                     SENTIMENT_CODES["extreme negative"]])
+    improvement[single_negative] = -25
+
+    resolution_table = np.array([RESOLUTION_SCORES.get(label, 10) for label in SENTIMENT_CODES] + [10])
+    resolution = np.where(has_customer, resolution_table[last_codes], 50)
+
+    agent_component = agent_sentiment_avg * 100 * 0.30
+    professional_component = professionalism * 0.30
+    improvement_component = np.maximum(0, 50 + improvement) * 0.20
+    resolution_component = resolution * 0.20
+    performance = agent_component + professional_component + improvement_component + resolution_component
+    performance = np.clip(np.trunc(np.nan_to_num(performance)), 0, 100)
+
+    return {
+        "id": np.array(conversation_ids, dtype=object),
+        "has_customer": has_customer,
+        "has_agent": has_agent,
+        "customer_count": customer_counts,
+        "csat_score": csat_scores,
+        "csat_rating": np.where(has_customer, rate(csat_scores, CSAT_RATINGS, "Very Poor"), "No customer data"),
+        "agent_performance_score": performance,
+        "agent_performance_rating": rate(performance, AGENT_RATINGS, "Poor"),
+        "agent_sentiment_avg": agent_sentiment_avg,
+        "professionalism_score": professionalism,
+        "customer_sentiment_improvement": improvement
+    }
+
+
+def score_rows(scores: Dict[str, np.ndarray]) -> List[Dict]:
+    """Per-conversation update mappings, rounded with Python round() like the scalar functions"""
+    rows = []
+    for i, conversation_id in enumerate(scores["id"]):
+        row = {"id": conversation_id}
+        if scores["has_customer"][i]:
+            row["csat_score"] = round(float(scores["csat_score"][i]), 1)
+            row["csat_rating"] = scores["csat_rating"][i]
+            row["csat_methodology"] = (f"Weighted average of {int(scores['customer_count'][i])} customer sentiment "
+                                       f"scores with recency bias and normalization")
+        else:
+            row["csat_score"] = 0
+            row["csat_rating"] = "No customer data"
+            row["csat_methodology"] = "No customer utterances found"
+
+        if scores["has_agent"][i]:
+            row["agent_performance_score"] = round(float(scores["agent_performance_score"][i]), 1)
+            row["agent_performance_rating"] = scores["agent_performance_rating"][i]
+            row["agent_sentiment_avg"] = round(float(scores["agent_sentiment_avg"][i]), 2)
+            row["professionalism_score"] = round(float(scores["professionalism_score"][i]), 1)
+            row["customer_sentiment_improvement"] = round(float(scores["customer_sentiment_improvement"][i]), 1)
+        else:
+            for name in ("agent_performance_score", "agent_performance_rating", "agent_sentiment_avg",
+                         "professionalism_score", "customer_sentiment_improvement"):
+                row[name] = None
+        rows.append(row)
+    return rows
+
+
+def scalar_score_rows(columns: Dict) -> List[Dict]:
+    """Reference results from calculate_csat_score / calculate_agent_performance, one row per conversation"""
+    grouped = {}
+    conversation_domains = {}
+    domains = columns.get("domain") or [None] * len(columns["conversation_id"])
+    for conversation_id, speaker, sentence, sentiment, score, domain in zip(
+            columns["conversation_id"], columns["speaker"], columns["sentence"],
+            columns["sentiment"], columns["score"], domains):
+        utterance = {"speaker": speaker, "sentence": sentence, "sentiment": sentiment, "score": score}
+        grouped.setdefault(conversation_id, []).append({k: v for k, v in utterance.items() if v is not None})
+        conversation_domains[conversation_id] = domain
+
+    rows = []
+    for conversation_id, utterances in grouped.items():
+        csat = calculate_csat_score(utterances)
+        agent = calculate_agent_performance(utterances, conversation_domains[conversation_id])
+        rows.append({
+            "id": conversation_id,
+            "csat_score": csat.get("csat_score"),
+            "csat_rating": csat.get("csat_rating"),
+            "csat_methodology": csat.get("methodology"),
+            "agent_performance_score": agent.get("overall_score"),
+            "agent_performance_rating": agent.get("rating"),
+            "agent_sentiment_avg": agent.get("agent_sentiment_avg"),
+            "professionalism_score": agent.get("professionalism_score"),
+            "customer_sentiment_improvement": agent.get("customer_sentiment_improvement")
+        })
+    return rows
+
+
+def verify_parity(columns: Dict, limit: Optional[int] = None) -> Dict:
+    """Compare vectorized and scalar results; limit restricts the check to the first N conversations"""
+    if limit is not None:
+        conv_codes, _ = factorize(columns["conversation_id"])
+        cutoff = int(np.searchsorted(conv_codes, limit))
+        columns = {name: values[:cutoff] for name, values in columns.items()}
+
+    vectorized = score_rows(rescore_columns(columns))
+    scalar = scalar_score_rows(columns)
+
+    mismatches = []
+    for fast, slow in zip(vectorized, scalar):
+        diffs = {name: (fast[name], slow[name]) for name in slow if fast[name] != slow[name]}
+        if diffs:
+            mismatches.append({"id": slow["id"], "fields": diffs})
+
+    return {
+        "conversations_checked": len(scalar),
+        "mismatched_conversations": len(mismatches),
+        "examples": mismatches[:5]
+    }
+
+
+def load_utterance_columns(db) -> Dict[str, list]:
+    """Load stored utterances as columns, grouped by conversation in utterance order"""
+    result = db.execute(
+        select(Utterance.conversation_id, Utterance.speaker, Utterance.sentence,
+               Utterance.sentiment, Utterance.sentiment_score, Conversation.domain)
+        .join(Conversation, Utterance.conversation_id == Conversation.id)
+        .order_by(Utterance.conversation_id, Utterance.utterance_id, Utterance.id)
+    ).all()
+    names = ("conversation_id", "speaker", "sentence", "sentiment", "score", "domain")
+    if not result:
+        return {name: [] for name in names}
+    return dict(zip(names, (list(column) for column in zip(*result))))
+
+
+def write_scores(db, rows: List[Dict]) -> int:
+    now = datetime.utcnow()
+    for row in rows:
+        row["updated_at"] = now
+    try:
+        db.bulk_update_mappings(Conversation, rows)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to write rescored conversations: {str(e)}")
+        raise
+    return len(rows)
+
+
+def rescore_corpus(db, dry_run: bool = False, verify: bool = False) -> Dict:
+    """Recompute CSAT and agent performance for every stored conversation and write them back"""
+    start = time.perf_counter()
+    columns = load_utterance_columns(db)
+    loaded = time.perf_counter()
+
+    rows = score_rows(rescore_columns(columns))
+    scored = time.perf_counter()
+
+    report = {
+        "utterances": len(columns["conversation_id"]),
+        "conversations": len(rows),
+        "load_seconds": round(loaded - start, 3),
+        "score_seconds": round(scored - loaded, 3)
+    }
+    if verify:
+        report["parity"] = verify_parity(columns)
+    if not dry_run:
+        write_scores(db, rows)
+        report["write_seconds"] = round(time.perf_counter() - scored, 3)
+    report["updated"] = 0 if dry_run else len(rows)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from databaseLib.database import SessionLocal, init_db
+
+    parser = argparse.ArgumentParser(description="Recompute CSAT and agent performance for stored conversations")
+    parser.add_argument("--dry-run", action="store_true", help="Compute scores without writing them back")
+    parser.add_argument("--verify", action="store_true", help="Check results against the scalar functions")
+    args = parser.parse_args()
+
+    init_db()
+    session = SessionLocal()
+    try:
+        print(json.dumps(rescore_corpus(session, args.dry_run, args.verify), indent=2, default=str))
+    finally:
+        session.close()
@@ -0,0 +1,406 @@
+import json
+import logging
+import os
+import re
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from analyzer.cache import llm_answered
+from analyzer.gateway import gateway
+from databaseLib.database import SessionLocal, engine, init_db
+from databaseLib.models import Utterance
+
+logger = logging.getLogger(__name__)
+
+# Semantic cache: utterances whose embedding is at least SEMANTIC_CACHE_THRESHOLD cosine-similar to
+# one the LLM already answered (with the same chat model and the same negation) reuse its sentiment
+# and intent. Embeddings are hashed word and character n-grams computed locally, so lookups need no
+# network call. The index lives in memory and is saved next to the SQLite database.
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+SEMANTIC_CACHE_DIM = int(os.getenv("SEMANTIC_CACHE_DIM", "512"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "50000"))
+# Answers less confident than this are not reused
+SEMANTIC_CACHE_MIN_CONFIDENCE = float(os.getenv("SEMANTIC_CACHE_MIN_CONFIDENCE", "0.6"))
+# Save the index after this many new entries (and on API shutdown)
+SEMANTIC_CACHE_SAVE_EVERY = int(os.getenv("SEMANTIC_CACHE_SAVE_EVERY", "200"))
+
+
+def default_index_path() -> Optional[str]:
+    """speech2sense.semantic.npz beside the SQLite file, or None for an in-memory database"""
+    database = engine.url.database
+    if not database or database == ":memory:":
+        return None
+    return os.path.splitext(database)[0] + ".semantic.npz"
+
+
+SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH") or default_index_path()
+
+# Character 3-grams make the embedding robust to spelling and inflection; they are down-weighted so
+# whole words still dominate
+WORD_WEIGHT = 1.0
+BIGRAM_WEIGHT = 1.0
+CHAR_WEIGHT = 0.3
+CHAR_NGRAM = 3
+# Rows added to the matrix at a time
+GROWTH_ROWS = 1024
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+NEGATIONS = {"not", "no", "never", "nobody", "nothing", "none", "neither", "nor", "cannot", "without"}
+# Contractions as transcripts often spell them, without the apostrophe
+NEGATIONS.update(f"{verb}t" for verb in ("don", "doesn", "didn", "isn", "wasn", "aren", "weren", "hasn", "haven",
+                                           "hadn", "can", "couldn", "won", "wouldn", "shouldn", "ain"))
+
+
+def tokenize(sentence: str) -> List[str]:
+    return TOKEN_PATTERN.findall(sentence.lower().replace("’", "'").replace("‘", "'"))
+
+
+def duplicate_key(model: str, tokens: List[str]) -> str:
+    """Utterances with the same words (case, punctuation and apostrophes aside) share one entry per model"""
+    words = " ".join(token.replace("'", "") for token in tokens)
+    return f"{model}\t{words}"
+
+
+def is_negated(tokens: List[str]) -> bool:
+    """Whether the utterance contains a negation; "not happy" must never reuse the answer for "happy" """
+    return any(token in NEGATIONS or token.endswith("n't") for token in tokens)
+
+
+def ngram_features(sentence: str) -> List[Tuple[str, float]]:
+    """(feature, weight) pairs for the word unigrams, word bigrams and character 3-grams of an utterance"""
+    tokens = [token.replace("'", "") for token in tokenize(sentence)]
+    if not tokens:
+        return []
+    features = [(token, WORD_WEIGHT) for token in tokens]
+    features.extend((f"{a} {b}", BIGRAM_WEIGHT) for a, b in zip(tokens, tokens[1:]))
+    padded = f" {' '.join(tokens)} "
+    features.extend((f"#{padded[i:i + CHAR_NGRAM]}", CHAR_WEIGHT) for i in range(len(padded) - CHAR_NGRAM + 1))
+    return features
+
+
+def embed(sentence: str, dim: int = SEMANTIC_CACHE_DIM) -> np.ndarray:
+    """
+    L2-normalized signed feature hashing of ngram_features (float32, dim values); the zero vector
+    when the utterance has no words
+    """
+    features = ngram_features(sentence)
+    vector = np.zeros(dim, dtype=np.float32)
+    if not features:
+        return vector
+    hashes = np.fromiter((zlib.crc32(feature.encode("utf-8")) for feature, _ in features), dtype=np.uint32,
+                         count=len(features))
+    weights = np.fromiter((weight for _, weight in features), dtype=np.float32, count=len(features))
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+    np.add.at(vector, hashes % dim, signs * weights)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def low_confidence(result: Dict, min_confidence: float) -> bool:
+    """A reported confidence below min_confidence; one the reply left out is unknown, not low"""
+    confidence = result.get("confidence")
+    if confidence is None:
+        return False
+    try:
+        return float(confidence) < min_confidence
+    except (TypeError, ValueError):
+        return True
+
+
+class SemanticIndex:
+    """
+    Brute-force cosine nearest-neighbour index over the embeddings of answered utterances.
+    Entries are kept per chat model (answers from another model or prompt generation are never
+    reused across a model switch) and evicted oldest first beyond max_entries. Thread-safe; the
+    index is loaded from path on first use and saved from a background thread.
+    """
+
+    def __init__(self, enabled: bool = SEMANTIC_CACHE_ENABLED, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 dim: int = SEMANTIC_CACHE_DIM, max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+                 path: Optional[str] = SEMANTIC_CACHE_PATH, min_confidence: float = SEMANTIC_CACHE_MIN_CONFIDENCE):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.dim = dim
+        self.max_entries = max_entries
+        self.path = path
+        self.min_confidence = min_confidence
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._count_rows = 0
+        self._negated = np.zeros(0, dtype=bool)
+        self._model_ids = np.zeros(0, dtype=np.int32)
+        self._models: List[str] = []
+        self._sentences: List[str] = []
+        self._results: List[Tuple[Dict, Dict]] = []
+        self._keys = set()
+        self._lock = threading.Lock()
+        self._loaded = path is None
+        self._adds_since_save = 0
+        self._saving = False
+        self.counters = {"lookups": 0, "hits": 0, "misses": 0, "added": 0, "duplicates": 0, "evicted": 0,
+                         "saves": 0, "save_errors": 0}
+
+    def __len__(self) -> int:
+        return self._count_rows
+
+    def _model_id(self, model: str) -> int:
+        if model not in self._models:
+            self._models.append(model)
+        return self._models.index(model)
+
+    def ensure_loaded(self):
+        """Load the saved index the first time it is needed"""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if self.path and os.path.exists(self.path):
+                try:
+                    self._load(self.path)
+                    logger.info(f"Semantic cache loaded {self._count_rows} entries from {self.path}")
+                except Exception as e:
+                    logger.warning(f"Semantic cache load from {self.path} failed, starting empty: {str(e)}")
+
+    def _load(self, path: str):
+        with np.load(path) as data:
+            vectors = data["vectors"].astype(np.float32)
+            # Stored as float16; restore unit length
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors /= np.where(norms > 0, norms, 1.0)
+            meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"index has dimension {vectors.shape[1]}, expected {self.dim}")
+        self._vectors = vectors
+        self._count_rows = len(vectors)
+        self._negated = np.array(meta["negated"], dtype=bool)
+        self._model_ids = np.array(meta["model_ids"], dtype=np.int32)
+        self._models = meta["models"]
+        self._sentences = meta["sentences"]
+        self._results = [tuple(pair) for pair in meta["results"]]
+        self._keys = {duplicate_key(self._models[model_id], tokenize(sentence))
+                      for model_id, sentence in zip(self._model_ids, self._sentences)}
+
+    def save(self, path: Optional[str] = None) -> bool:
+        """Write the index atomically (temporary file, then rename); False when it could not be saved"""
+        path = path or self.path
+        if not path:
+            return False
+        with self._lock:
+            vectors = self._vectors[:self._count_rows].astype(np.float16)
+            meta = {"models": list(self._models), "model_ids": self._model_ids[:self._count_rows].tolist(),
+                    "negated": self._negated[:self._count_rows].tolist(), "sentences": list(self._sentences),
+                    "results": list(self._results)}
+            self._adds_since_save = 0
+        try:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as fh:
+                np.savez(fh, vectors=vectors,
+                         meta=np.frombuffer(json.dumps(meta, ensure_ascii=False).encode("utf-8"), dtype=np.uint8))
+            os.replace(tmp_path, path)
+        except Exception as e:
+            self._count("save_errors")
+            logger.warning(f"Semantic cache save to {path} failed: {str(e)}")
+            return False
+        self._count("saves")
+        return True
+
+    def _save_in_background(self):
+        with self._lock:
+            if self._saving:
+                return
+            self._saving = True
+
+        def run():
+            try:
+                self.save()
+            finally:
+                with self._lock:
+                    self._saving = False
+
+        threading.Thread(target=run, name="semantic-cache-save", daemon=True).start()
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def _nearest(self, vectors: np.ndarray, negated: np.ndarray, model: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Best row and its similarity for each query among the same model's entries (-1 when none); lock held"""
+        rows = self._count_rows
+        if not rows or model not in self._models:
+            return np.full(len(vectors), -1), np.zeros(len(vectors), dtype=np.float32)
+        similarities = vectors @ self._vectors[:rows].T
+        same_model = self._model_ids[:rows] == self._models.index(model)
+        similarities[:, ~same_model] = -1.0
+        # Negation must agree: mask the rows whose polarity differs from each query's
+        similarities[negated[:, None] != self._negated[None, :rows]] = -1.0
+        best = similarities.argmax(axis=1)
+        return best, similarities[np.arange(len(vectors)), best]
+
+    def lookup_many(self, sentences: List[str], model: Optional[str] = None,
+                    threshold: Optional[float] = None) -> List[Optional[Tuple[Dict, Dict, float, str]]]:
+        """
+        For each sentence, the (sentiment_result, intent_result, similarity, matched_sentence) of its
+        nearest answered utterance at or above threshold, or None
+        """
+        if not self.enabled or not sentences:
+            return [None] * len(sentences)
+        self.ensure_loaded()
+        model = model or gateway.chat_model
+        threshold = self.threshold if threshold is None else threshold
+        tokens = [tokenize(sentence) for sentence in sentences]
+        vectors = np.stack([embed(sentence, self.dim) for sentence in sentences])
+        negated = np.array([is_negated(words) for words in tokens], dtype=bool)
+
+        matches = []
+        with self._lock:
+            best, similarities = self._nearest(vectors, negated, model)
+            for row, similarity, has_words in zip(best, similarities, (bool(words) for words in tokens)):
+                self.counters["lookups"] += 1
+                if row < 0 or not has_words or similarity < threshold:
+                    self.counters["misses"] += 1
+                    matches.append(None)
+                    continue
+                self.counters["hits"] += 1
+                sentiment_result, intent_result = self._results[row]
+                matches.append((dict(sentiment_result), dict(intent_result), float(similarity),
+                                self._sentences[row]))
+        return matches
+
+    def lookup(self, sentence: str, model: Optional[str] = None,
+               threshold: Optional[float] = None) -> Optional[Tuple[Dict, Dict, float, str]]:
+        return self.lookup_many([sentence], model, threshold)[0]
+
+    def add(self, sentence: str, sentiment_result: Dict, intent_result: Dict, model: Optional[str] = None) -> bool:
+        """
+        Index an LLM answer. Low-confidence answers, utterances without words and copies of an
+        indexed utterance are skipped; returns whether the entry was added.
+        """
+        if not self.enabled:
+            return False
+        if low_confidence(sentiment_result, self.min_confidence) or low_confidence(intent_result, self.min_confidence):
+            return False
+        tokens = tokenize(sentence)
+        if not tokens:
+            return False
+        self.ensure_loaded()
+        model = model or gateway.chat_model
+        key = duplicate_key(model, tokens)
+        vector = embed(sentence, self.dim)
+        negated = is_negated(tokens)
+
+        with self._lock:
+            if key in self._keys:
+                self.counters["duplicates"] += 1
+                return False
+            self._keys.add(key)
+            if self._count_rows == len(self._vectors):
+                self._grow()
+            row = self._count_rows
+            self._vectors[row] = vector
+            self._negated[row] = negated
+            self._model_ids[row] = self._model_id(model)
+            self._sentences.append(sentence)
+            self._results.append((dict(sentiment_result), dict(intent_result)))
+            self._count_rows += 1
+            self.counters["added"] += 1
+            if self._count_rows > self.max_entries:
+                self._evict(max(1, self.max_entries // 10))
+            self._adds_since_save += 1
+            save_due = self.path is not None and self._adds_since_save >= SEMANTIC_CACHE_SAVE_EVERY
+        if save_due:
+            self._save_in_background()
+        return True
+
+    def _grow(self):
+        rows = len(self._vectors) + GROWTH_ROWS
+        vectors = np.zeros((rows, self.dim), dtype=np.float32)
+        vectors[:self._count_rows] = self._vectors[:self._count_rows]
+        self._vectors = vectors
+        self._negated = np.resize(self._negated, rows)
+        self._model_ids = np.resize(self._model_ids, rows)
+
+    def _evict(self, count: int):
+        """Drop the count oldest entries; lock held"""
+        for model_id, sentence in zip(self._model_ids[:count], self._sentences[:count]):
+            self._keys.discard(duplicate_key(self._models[model_id], tokenize(sentence)))
+        keep = slice(count, self._count_rows)
+        self._vectors = self._vectors[keep].copy()
+        self._negated = self._negated[keep].copy()
+        self._model_ids = self._model_ids[keep].copy()
+        self._sentences = self._sentences[count:]
+        self._results = self._results[count:]
+        self._count_rows -= count
+        self.counters["evicted"] += count
+
+    def stats(self) -> Dict:
+        """Settings, index size and hit counters for /health"""
+        with self._lock:
+            stats = dict(self.counters)
+            stats["entries"] = self._count_rows
+            stats["models"] = len(self._models)
+        stats["hit_rate"] = round(stats["hits"] / stats["lookups"], 3) if stats["lookups"] else 0.0
+        stats.update(enabled=self.enabled, threshold=self.threshold, dim=self.dim, max_entries=self.max_entries,
+                     path=self.path)
+        return stats
+
+
+# Process-wide index shared by all analyses
+semantic_cache = SemanticIndex()
+
+
+def build_from_utterances(index: SemanticIndex = semantic_cache, limit: Optional[int] = None,
+                          model: Optional[str] = None) -> int:
+    """
+    Index stored Utterance rows as answers of the current chat model (or model). Only the chat model's
+    own answers are indexed (see llm_answered), and low-confidence ones are skipped.
+    """
+    added = 0
+    db = SessionLocal()
+    try:
+        query = db.query(Utterance).order_by(Utterance.processed_at.desc())
+        if limit:
+            query = query.limit(limit)
+
+        for row in query.yield_per(1000):
+            if (not row.sentence or not row.sentiment or not row.intent or row.intent == "unknown"
+                    or not llm_answered(row)):
+                continue
+            sentiment_result = {"sentiment": row.sentiment, "score": row.sentiment_score,
+                                "reason": row.sentiment_reason or "", "keywords": row.sentiment_keywords or [],
+                                "confidence": row.sentiment_confidence}
+            intent_result = {"intent": row.intent, "secondary_intents": row.secondary_intents or [],
+                             "confidence": row.intent_confidence, "reasoning": row.intent_reasoning or ""}
+            added += index.add(row.sentence, sentiment_result, intent_result, model)
+    finally:
+        db.close()
+
+    logger.info(f"Semantic cache indexed {added} stored utterances")
+    return added
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the semantic similarity cache")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="Index existing Utterance rows and save the index")
+    build_parser.add_argument("--limit", type=int, default=None, help="Only use the N most recent utterances")
+    subparsers.add_parser("stats", help="Print index counters")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    semantic_cache.enabled = True
+
+    if args.command == "build":
+        init_db()
+        print(f"Indexed {build_from_utterances(limit=args.limit)} utterances")
+        if semantic_cache.save():
+            print(f"Saved {len(semantic_cache)} entries to {semantic_cache.path}")
+    else:
+        semantic_cache.ensure_loaded()
+        print(json.dumps(semantic_cache.stats(), indent=2))
@@ -0,0 +1,127 @@
+import os
+from typing import List, Dict, Optional, Tuple
+
+from analyzer.batching import estimate_tokens
+
+# Conversations estimated above this many tokens are split instead of sent in one topic prompt
+# (llama3-8b-8192 leaves room for the system prompt and the reply)
+TOPIC_SINGLE_CALL_TOKENS = int(os.getenv("TOPIC_SINGLE_CALL_TOKENS", "6000"))
+# Target size of each chunk, and the most chunks classified for one conversation
+TOPIC_CHUNK_TOKENS = int(os.getenv("TOPIC_CHUNK_TOKENS", "2500"))
+TOPIC_MAX_CHUNKS = int(os.getenv("TOPIC_MAX_CHUNKS", "24"))
+# Secondary topics must be mentioned in chunks covering at least this share of the conversation
+TOPIC_MIN_SHARE = float(os.getenv("TOPIC_MIN_SHARE", "0.15"))
+
+
+def split_long_line(line: str, token_budget: int) -> List[str]:
+    """Split a single oversized line on word boundaries"""
+    pieces = []
+    current = []
+    current_tokens = 0
+    for word in line.split():
+        tokens = estimate_tokens(word)
+        if current and current_tokens + tokens > token_budget:
+            pieces.append(" ".join(current))
+            current = []
+            current_tokens = 0
+        current.append(word)
+        current_tokens += tokens
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def pack_lines(lines: List[str], token_budget: int) -> List[Tuple[str, int]]:
+    """Pack lines into (chunk_text, estimated_tokens) chunks of at most token_budget"""
+    chunks = []
+    current = []
+    current_tokens = 0
+    for line in lines:
+        for piece in ([line] if estimate_tokens(line) <= token_budget else split_long_line(line, token_budget)):
+            tokens = estimate_tokens(piece)
+            if current and current_tokens + tokens > token_budget:
+                chunks.append(("\n".join(current), current_tokens))
+                current = []
+                current_tokens = 0
+            current.append(piece)
+            current_tokens += tokens
+    if current:
+        chunks.append(("\n".join(current), current_tokens))
+    return chunks
+
+
+def split_topic_chunks(text: str, single_call_tokens: Optional[int] = None, chunk_tokens: Optional[int] = None,
+                       max_chunks: Optional[int] = None) -> List[Tuple[str, int]]:
+    """
+    Split a conversation into token-bounded chunks on utterance (line) boundaries.
+    Returns a single chunk when the whole text fits in one topic prompt. Very long conversations
+    first get larger chunks (up to single_call_tokens); past that, evenly spaced chunks are kept
+    so the number of calls stays bounded.
+    """
+    single_call_tokens = single_call_tokens or TOPIC_SINGLE_CALL_TOKENS
+    chunk_tokens = chunk_tokens or TOPIC_CHUNK_TOKENS
+    max_chunks = max_chunks or TOPIC_MAX_CHUNKS
+
+    total_tokens = estimate_tokens(text)
+    if total_tokens <= single_call_tokens:
+        return [(text, total_tokens)]
+
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    budget = max(chunk_tokens, min(single_call_tokens, -(-total_tokens // max_chunks)))
+    chunks = pack_lines(lines, budget)
+
+    if len(chunks) > max_chunks:
+        step = len(chunks) / max_chunks
+        chunks = [chunks[int(i * step)] for i in range(max_chunks)]
+    return chunks
+
+
+def normalize_topic(topic) -> str:
+    return str(topic).strip().lower().replace(" ", "_")
+
+
+def reduce_topic_results(results: List[Tuple[Optional[Dict], int]]) -> Optional[Dict]:
+    """
+    Merge per-chunk topic results, given as (result, chunk_tokens) pairs with None for failed
+    chunks. Deterministic: each chunk's primary topic gets a vote weighted by chunk size times its
+    confidence; ties go to the alphabetically first topic. The merged confidence is the weighted
+    share of the conversation that voted for the winner. Returns None if every chunk failed.
+    """
+    primary_votes: Dict[str, float] = {}
+    mentions: Dict[str, float] = {}
+    primary_chunks: Dict[str, int] = {}
+    total_weight = 0.0
+    succeeded = 0
+
+    for result, weight in results:
+        if not result or not result.get("primary_topic"):
+            continue
+        succeeded += 1
+        total_weight += weight
+        primary = normalize_topic(result["primary_topic"])
+        try:
+            confidence = min(1.0, max(0.0, float(result.get("confidence", 0.5))))
+        except (TypeError, ValueError):
+            confidence = 0.5
+
+        primary_votes[primary] = primary_votes.get(primary, 0.0) + weight * confidence
+        primary_chunks[primary] = primary_chunks.get(primary, 0) + 1
+        for topic in {primary, *(normalize_topic(t) for t in result.get("topics") or [])}:
+            mentions[topic] = mentions.get(topic, 0.0) + weight
+
+    if not succeeded or total_weight <= 0:
+        return None
+
+    primary_topic = sorted(primary_votes, key=lambda t: (-primary_votes[t], t))[0]
+    secondary = sorted((t for t in mentions if t != primary_topic and mentions[t] / total_weight >= TOPIC_MIN_SHARE),
+                       key=lambda t: (-mentions[t], t))
+
+    return {
+        "topics": [primary_topic] + secondary,
+        "primary_topic": primary_topic,
+        "confidence": round(primary_votes[primary_topic] / total_weight, 2),
+        "reasoning": f"Merged from {succeeded} conversation chunks; '{primary_topic}' was the primary topic "
+                     f"in {primary_chunks[primary_topic]} of them",
+        "chunks": len(results),
+        "failed_chunks": len(results) - succeeded
+    }
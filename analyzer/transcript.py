@@ -0,0 +1,121 @@
+import io
+import logging
+import re
+from functools import lru_cache
+from typing import IO, Iterable, Iterator, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Role normalization: speaker labels containing one of these become "Agent" / "Customer"
+AGENT_ROLE_PATTERN = re.compile(r"agent|support|rep|staff", re.IGNORECASE)
+CUSTOMER_ROLE_PATTERN = re.compile(r"customer|client|user|caller", re.IGNORECASE)
+
+# "[12.00-15.30] Agent: text" as written by save_transcript_file; hh:mm:ss stamps are accepted too
+TIMESTAMP_PREFIX = re.compile(r"^\[\s*([\d:.]+)\s*-\s*([\d:.]+)\s*\]\s*")
+# A speaker label is a short run of text before the first colon; longer prefixes are prose
+SPEAKER_LINE = re.compile(r"^([^:]{1,40}?)\s*:\s*(.*)$")
+MAX_SPEAKER_WORDS = 5
+
+# Section markers and summary bullets written around the dialogue by save_transcript_file
+SECTION_MARKER = re.compile(r"^===\s*(.*?)\s*===$")
+SUMMARY_SECTION = "conversation summary"
+
+Source = Union[str, bytes, IO[str], IO[bytes], Iterable[str]]
+
+
+@lru_cache(maxsize=1024)
+def normalize_speaker(label: str) -> str:
+    """Map a raw speaker label to Agent / Customer, leaving other names unchanged"""
+    if AGENT_ROLE_PATTERN.search(label):
+        return "Agent"
+    if CUSTOMER_ROLE_PATTERN.search(label):
+        return "Customer"
+    return label
+
+
+def parse_timestamp(value: str) -> Optional[float]:
+    """Seconds from '12.5' or 'hh:mm:ss(.ff)' / 'mm:ss'"""
+    try:
+        seconds = 0.0
+        for part in value.split(":"):
+            seconds = seconds * 60 + float(part)
+        return seconds
+    except ValueError:
+        return None
+
+
+def iter_lines(source: Source, encoding: str = "utf-8") -> Iterator[str]:
+    """Lines from text, bytes, a text or binary file object, or any iterable of lines"""
+    if isinstance(source, str):
+        return iter(source.splitlines())
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    if hasattr(source, "read") and not isinstance(source, io.TextIOBase):
+        if isinstance(source.read(0), bytes):
+            return iter(io.TextIOWrapper(source, encoding=encoding, errors="replace"))
+    return iter(source)
+
+
+def iter_speaker_utterances(source: Source, with_timestamps: bool = False,
+                            encoding: str = "utf-8") -> Iterator[Tuple]:
+    """
+    Incrementally parse a transcript into (speaker, message) tuples, or (speaker, message, start, end)
+    with with_timestamps (None when a line has no [start-end] prefix). Reads one line at a time, so
+    memory stays flat for file and stream sources. Lines without a speaker label continue the
+    previous utterance; summary sections and === markers from saved transcripts are skipped.
+    """
+    current = None  # [speaker, message parts, start, end]
+    in_summary = False
+    orphan_lines = 0
+
+    for raw_line in iter_lines(source, encoding):
+        line = raw_line.strip()
+        if not line:
+            continue
+
+        marker = SECTION_MARKER.match(line) if line[0] == "=" else None
+        if marker:
+            in_summary = marker.group(1).lower() == SUMMARY_SECTION
+            continue
+        if in_summary:
+            continue
+
+        start = end = None
+        stamp = TIMESTAMP_PREFIX.match(line) if line[0] == "[" else None
+        if stamp:
+            start, end = parse_timestamp(stamp.group(1)), parse_timestamp(stamp.group(2))
+            line = line[stamp.end():]
+
+        match = SPEAKER_LINE.match(line)
+        if match and len(match.group(1).split()) <= MAX_SPEAKER_WORDS:
+            if current is not None and current[1]:
+                yield emit(current, with_timestamps)
+            current = [normalize_speaker(match.group(1).strip()), [], start, end]
+            message = match.group(2).strip()
+            if message:
+                current[1].append(message)
+        elif current is not None:
+            # Wrapped line: part of the previous speaker's turn
+            current[1].append(line)
+            if end is not None:
+                current[3] = end
+        else:
+            orphan_lines += 1
+
+    if current is not None and current[1]:
+        yield emit(current, with_timestamps)
+
+    if orphan_lines:
+        logger.warning(f"Skipped {orphan_lines} lines before the first speaker label")
+
+
+def emit(current: list, with_timestamps: bool) -> Tuple:
+    speaker, parts, start, end = current
+    message = " ".join(parts)
+    return (speaker, message, start, end) if with_timestamps else (speaker, message)
+
+
+def iter_file_utterances(path: str, with_timestamps: bool = False, encoding: str = "utf-8") -> Iterator[Tuple]:
+    """Stream utterances from a transcript file without reading it into memory"""
+    with open(path, "rb") as fh:
+        yield from iter_speaker_utterances(fh, with_timestamps, encoding)
@@ -0,0 +1,303 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from databaseLib.database import SessionLocal
+from databaseLib.models import AnalysisJob
+
+logger = logging.getLogger(__name__)
+
+# Job queue settings
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_TIMEOUT_SECONDS = float(os.getenv("JOB_TIMEOUT_SECONDS", "900"))
+JOB_UPLOAD_DIR = os.getenv("JOB_UPLOAD_DIR", "./job_uploads")
+JOB_PROGRESS_INTERVAL = float(os.getenv("JOB_PROGRESS_INTERVAL", "1.0"))  # Min seconds between progress writes
+
+ACTIVE_STATUSES = ("queued", "running")
+FINAL_STATUSES = ("completed", "failed", "cancelled", "timed_out")
+
+
+def job_to_dict(job: AnalysisJob, include_result: bool = True) -> Dict:
+    data = {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": round(job.progress or 0.0, 1),
+        "filename": job.filename,
+        "domain": job.domain,
+        "timeout_seconds": job.timeout_seconds,
+        "error": job.error,
+        "conversation_db_id": job.conversation_db_id,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
+    if include_result:
+        data["result"] = job.result
+    return data
+
+
+class JobContext:
+    """Handed to job handlers for progress reporting and recording extra job fields"""
+
+    def __init__(self, queue: "JobQueue", job_id: str):
+        self.queue = queue
+        self.job_id = job_id
+        self._last_stage = None
+        self._last_write = 0.0
+
+    def report(self, stage: str, progress: Optional[float] = None, force: bool = False):
+        """Record the current stage and percent done; writes are throttled unless the stage changes"""
+        now = time.monotonic()
+        if not force and stage == self._last_stage and now - self._last_write < JOB_PROGRESS_INTERVAL:
+            return
+        fields = {"stage": stage}
+        if progress is not None:
+            fields["progress"] = max(0.0, min(100.0, progress))
+        self.queue.update(self.job_id, **fields)
+        self._last_stage = stage
+        self._last_write = now
+
+    def update(self, **fields):
+        self.queue.update(self.job_id, **fields)
+
+
+class JobQueue:
+    """
+    Durable submit/poll job queue. Jobs and their results live in the analysis_jobs table and
+    uploaded inputs are kept in JOB_UPLOAD_DIR, so queued and interrupted jobs are picked up
+    again on the next start. A fixed pool of asyncio workers runs the registered handlers;
+    blocking work inside a handler should go through asyncio.to_thread. Cancelling or timing out
+    a job stops waiting for it immediately, but a blocking call already running in a thread is
+    left to finish in the background and its result is discarded.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, upload_dir: str = JOB_UPLOAD_DIR,
+                 default_timeout: float = JOB_TIMEOUT_SECONDS, session_factory=SessionLocal):
+        self.workers = workers
+        self.upload_dir = upload_dir
+        self.default_timeout = default_timeout
+        self.session_factory = session_factory
+        self.handlers: Dict[str, Callable] = {}
+        self.running: Dict[str, asyncio.Task] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._stopping = False
+
+    def register(self, kind: str, handler: Callable):
+        """handler(job: Dict, context: JobContext) is a coroutine returning the JSON-serializable result"""
+        self.handlers[kind] = handler
+
+    # --- Persistence ---
+
+    def update(self, job_id: str, **fields):
+        db = self.session_factory()
+        try:
+            job = db.get(AnalysisJob, job_id)
+            if job is None:
+                return
+            for name, value in fields.items():
+                setattr(job, name, value)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to update job {job_id}: {str(e)}")
+        finally:
+            db.close()
+
+    def get(self, job_id: str, include_result: bool = True) -> Optional[Dict]:
+        db = self.session_factory()
+        try:
+            job = db.get(AnalysisJob, job_id)
+            return job_to_dict(job, include_result) if job else None
+        finally:
+            db.close()
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        db = self.session_factory()
+        try:
+            query = db.query(AnalysisJob)
+            if status:
+                query = query.filter(AnalysisJob.status == status)
+            jobs = query.order_by(AnalysisJob.created_at.desc()).limit(limit).all()
+            return [job_to_dict(job, include_result=False) for job in jobs]
+        finally:
+            db.close()
+
+    # --- Client operations ---
+
+    def submit(self, content: bytes, filename: str, kind: str, is_audio: bool = False,
+               domain: Optional[str] = "general", timeout_seconds: Optional[float] = None) -> Dict:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind '{kind}'")
+
+        job_id = str(uuid.uuid4())
+        os.makedirs(self.upload_dir, exist_ok=True)
+        input_path = os.path.join(self.upload_dir, f"{job_id}{os.path.splitext(filename or '')[1].lower()}")
+        with open(input_path, "wb") as fh:
+            fh.write(content)
+
+        db = self.session_factory()
+        try:
+            job = AnalysisJob(
+                id=job_id,
+                kind=kind,
+                status="queued",
+                stage="queued",
+                progress=0.0,
+                filename=filename,
+                input_path=input_path,
+                is_audio=is_audio,
+                domain=domain or "general",
+                timeout_seconds=timeout_seconds or self.default_timeout
+            )
+            db.add(job)
+            db.commit()
+            data = job_to_dict(job)
+        except Exception:
+            db.rollback()
+            self._remove_input(input_path)
+            raise
+        finally:
+            db.close()
+
+        if self._queue is not None:
+            self._queue.put_nowait(job_id)
+        logger.info(f"Queued {kind} job {job_id} for {filename}")
+        return data
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """Cancel a queued or running job; finished jobs are returned unchanged"""
+        job = self.get(job_id, include_result=False)
+        if job is None or job["status"] in FINAL_STATUSES:
+            return job
+
+        task = self.running.get(job_id)
+        if task is not None:
+            task.cancel()
+        else:
+            self._finish(job_id, "cancelled", stage="cancelled", error="Cancelled before start")
+        logger.info(f"Cancellation requested for job {job_id}")
+        return self.get(job_id, include_result=False)
+
+    # --- Workers ---
+
+    async def start(self):
+        """Start the worker pool and re-queue jobs left queued or running by a previous process"""
+        self._stopping = False
+        self._queue = asyncio.Queue()
+
+        db = self.session_factory()
+        try:
+            pending = (db.query(AnalysisJob)
+                       .filter(AnalysisJob.status.in_(ACTIVE_STATUSES))
+                       .order_by(AnalysisJob.created_at)
+                       .all())
+            pending_ids = [(job.id, job.input_path) for job in pending]
+        finally:
+            db.close()
+
+        for job_id, input_path in pending_ids:
+            if input_path and os.path.exists(input_path):
+                self.update(job_id, status="queued", stage="queued", progress=0.0, started_at=None)
+                self._queue.put_nowait(job_id)
+            else:
+                self._finish(job_id, "failed", error="Input file missing after restart")
+        if pending_ids:
+            logger.info(f"Recovered {len(pending_ids)} unfinished jobs")
+
+        self._worker_tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+        logger.info(f"Started {self.workers} job workers")
+
+    async def stop(self):
+        """Stop the workers; interrupted jobs stay active in the database and resume on next start"""
+        self._stopping = True
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    async def _worker(self, worker_num: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker {worker_num} failed on job {job_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = self.get(job_id, include_result=False)
+        if job is None or job["status"] != "queued":
+            return
+
+        db = self.session_factory()
+        try:
+            job_row = db.get(AnalysisJob, job_id)
+            job["input_path"] = job_row.input_path
+            job["is_audio"] = job_row.is_audio
+        finally:
+            db.close()
+
+        handler = self.handlers.get(job["kind"])
+        if handler is None:
+            self._finish(job_id, "failed", error=f"No handler registered for job kind '{job['kind']}'")
+            return
+
+        self.update(job_id, status="running", stage="starting", started_at=datetime.utcnow())
+        context = JobContext(self, job_id)
+        timeout = job["timeout_seconds"] or self.default_timeout
+        task = asyncio.create_task(asyncio.wait_for(handler(job, context), timeout=timeout))
+        self.running[job_id] = task
+
+        try:
+            result = await task
+            self._finish(job_id, "completed", stage="completed", progress=100.0, result=result)
+            logger.info(f"Job {job_id} completed")
+        except asyncio.TimeoutError:
+            self._finish(job_id, "timed_out", error=f"Job exceeded its {timeout:g}s timeout")
+            logger.warning(f"Job {job_id} timed out after {timeout:g}s")
+        except asyncio.CancelledError:
+            if self._stopping:
+                # Leave the job active so it is re-queued on the next start
+                task.cancel()
+                raise
+            self._finish(job_id, "cancelled", stage="cancelled", error="Cancelled by request")
+        except Exception as e:
+            detail = getattr(e, "detail", None) or str(e)
+            self._finish(job_id, "failed", error=str(detail))
+            logger.error(f"Job {job_id} failed: {detail}")
+        finally:
+            self.running.pop(job_id, None)
+
+    def _finish(self, job_id: str, status: str, **fields):
+        fields.setdefault("stage", status)
+        self.update(job_id, status=status, finished_at=datetime.utcnow(), **fields)
+
+        db = self.session_factory()
+        try:
+            job = db.get(AnalysisJob, job_id)
+            input_path = job.input_path if job else None
+        finally:
+            db.close()
+        self._remove_input(input_path)
+
+    @staticmethod
+    def _remove_input(input_path: Optional[str]):
+        if input_path:
+            try:
+                os.unlink(input_path)
+            except OSError:
+                pass
+
+
+# Process-wide queue used by the API
+job_queue = JobQueue()
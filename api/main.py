@@ -1,5 +1,7 @@
+import asyncio
 import json
 import logging
+import math
 import tempfile
 import os
 import traceback
@@ -8,18 +10,31 @@ import uuid
 
 from fastapi import FastAPI, HTTPException, UploadFile, File, Depends, BackgroundTasks, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Optional
-from datetime import datetime, date
+from typing import Optional, Tuple
+from datetime import datetime, date, timedelta
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from analyzer.analyzer import analyze_sentences
+from analyzer.analyzer import analyze_sentences_async, stream_analysis
+from analyzer.cache import llm_cache
+from analyzer.decoding import decode_stats
+from analyzer.deadline import ANALYSIS_BACKGROUND_COMPLETION, Deadline
+from analyzer.distilled import distilled_classifier
+from analyzer.dedup import DEDUP_ENABLED, analysis_fingerprint, analysis_succeeded, duplicate_index
+from analyzer.incremental import complete_degraded_async, reanalyze_sentences_async
+from analyzer.microbatch import microbatcher
+from analyzer.semantic_cache import semantic_cache
+from analyzer.gateway import gateway, record_calls
 from analyzer.audio_processor import process_audio_file, transcribe_audio_only, save_transcript_file
-from databaseLib.models import (
-    Conversation, Utterance, AnalysisResult
-)
+from api.jobs import JobContext, job_queue
+from databaseLib.models import Conversation
 from databaseLib.database import SessionLocal, init_db
+from databaseLib.storage import (
+    conversation_to_analysis, stage_latency_report, store_analysis_results, update_analysis_results,
+    utterance_row_to_dict
+)
 
 # Configure logging
 logging.basicConfig(
@@ -64,16 +79,47 @@ def startup_event():
         logger.error(f"Database initialization failed: {str(e)}")
 
 
+@app.on_event("startup")
+async def start_job_workers():
+    await job_queue.start()
+
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await job_queue.stop()
+
+
+@app.on_event("shutdown")
+def save_semantic_cache():
+    if semantic_cache.enabled:
+        semantic_cache.save()
+
+
 # ✅ Health Check Endpoint
 @app.get("/health")
 def health_check():
     return {
-        "status": "healthy",
+        "status": "degraded" if gateway.any_circuit_open() else "healthy",
         "timestamp": datetime.now().isoformat(),
-        "supported_formats": ["text/plain", "audio/wav", "audio/mp3", "audio/mp4", "audio/mpeg"]
+        "supported_formats": ["text/plain", "audio/wav", "audio/mp3", "audio/mp4", "audio/mpeg"],
+        "llm_provider": gateway.provider_status(),
+        "llm_cache": llm_cache.stats(),
+        "llm_gateway": gateway.stats(),
+        "llm_decoding": decode_stats.stats(),
+        "llm_microbatching": microbatcher.stats(),
+        "deduplication": duplicate_index.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "distilled_classifier": distilled_classifier.stats()
     }
 
 
+@app.get("/performance/stages")
+def performance_stages(hours: Optional[float] = None, db: Session = Depends(get_db)):
+    """Where analysis time goes: per-stage totals from the LLM call ledger, slowest stage first"""
+    since = datetime.utcnow() - timedelta(hours=hours) if hours else None
+    return {"since": since.isoformat() if since else None, "stages": stage_latency_report(db, since)}
+
+
 # Helper to serialize datetime values
 def serialize_datetimes(obj):
     if isinstance(obj, dict):
@@ -97,155 +143,260 @@ async def log_exceptions(request: Request, call_next):
         raise e
 
 
-def store_analysis_results(db: Session, analysis_data: dict) -> int:
+AUDIO_CONTENT_TYPES = ["audio/wav", "audio/mp3", "audio/mp4", "audio/mpeg", "audio/x-wav"]
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.mp4', '.m4a')
+
+# How often a blocking analysis checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", "0.5"))
+
+
+async def read_upload(file: UploadFile) -> Tuple[bytes, bool]:
+    """Validate an uploaded conversation file and return (raw bytes, is_audio_file)"""
+    content_type = file.content_type
+    filename = file.filename.lower() if file.filename else ""
+
+    logger.info(f"Processing file: {file.filename}, Content-Type: {content_type}")
+    logger.info(f"File extension: {os.path.splitext(filename)[1]}")
+    logger.info(f"MIME type: {content_type}")
+
+    # Fallback: guess file type by extension if content_type is missing or generic
+    if not content_type or content_type == "application/octet-stream":
+        if filename.endswith(AUDIO_EXTENSIONS):
+            content_type = "audio/mpeg"
+        elif filename.endswith('.txt'):
+            content_type = "text/plain"
+        logger.warning(f"Guessed content_type as '{content_type}' based on file extension")
+
+    is_audio_file = content_type in AUDIO_CONTENT_TYPES or filename.endswith(AUDIO_EXTENSIONS)
+
+    is_text_file = (
+            content_type in ["text/plain", "application/octet-stream"] or
+            filename.endswith('.txt')
+    )
+
+    if not (is_audio_file or is_text_file):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file format '{content_type}' with extension '{filename}'."
+                   f" Only .txt, .wav, .mp3, .mp4 supported."
+        )
+
+    return await file.read(), is_audio_file
+
+
+def transcribe_upload(content: bytes, filename: str) -> str:
+    """Run the audio pipeline on uploaded bytes and return the speaker-labelled transcript"""
+    logger.info("Processing audio file...")
+    suffix = os.path.splitext(filename.lower() if filename else "")[1]
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
+        temp_file.write(content)
+        temp_file_path = temp_file.name
+
     try:
-        conversation = Conversation(
-            conversation_id=analysis_data.get('conversation_id'),
-            raw_text=analysis_data.get('raw_text', ''),
-            domain=analysis_data.get('domain', 'general'),
-            primary_topic=analysis_data.get('topic_analysis', {}).get('primary_topic'),
-            topics=analysis_data.get('topic_analysis', {}).get('topics', []),
-            topic_confidence=analysis_data.get('topic_analysis', {}).get('confidence'),
-            topic_reasoning=analysis_data.get('topic_analysis', {}).get('reasoning'),
-            csat_score=analysis_data.get('csat_analysis', {}).get('csat_score'),
-            csat_rating=analysis_data.get('csat_analysis', {}).get('csat_rating'),
-            csat_methodology=analysis_data.get('csat_analysis', {}).get('methodology'),
-            agent_performance_score=analysis_data.get('agent_performance', {}).get('overall_score'),
-            agent_performance_rating=analysis_data.get('agent_performance', {}).get('rating'),
-            agent_sentiment_avg=analysis_data.get('agent_performance', {}).get('agent_sentiment_avg'),
-            professionalism_score=analysis_data.get('agent_performance', {}).get('professionalism_score'),
-            customer_sentiment_improvement=analysis_data.get('agent_performance', {}).
-            get('customer_sentiment_improvement'),
-            total_utterances=analysis_data.get('total_utterances'),
-            speakers=analysis_data.get('speakers', [])
+        text_content = process_audio_file(temp_file_path)
+        if not text_content or not text_content.strip():
+            raise HTTPException(status_code=400, detail="No speech detected in audio file")
+        logger.info("Audio processing completed successfully")
+        return text_content
+
+    except HTTPException:
+        raise
+    except Exception as audio_error:
+        logger.error(f"Audio processing failed: {str(audio_error)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(
+            status_code=500,
+            detail=f"Audio processing failed: {str(audio_error)}"
         )
+    finally:
+        try:
+            os.unlink(temp_file_path)
+        except:
+            pass
+
 
-        db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
-
-        for utterance_data in analysis_data.get('utterances', []):
-            utterance = Utterance(
-                conversation_id=conversation.id,
-                utterance_id=utterance_data.get('utterance_id'),
-                speaker=utterance_data.get('speaker_name', utterance_data.get('speaker')),
-                sentence=utterance_data.get('sentence'),
-                sentiment=utterance_data.get('sentiment'),
-                sentiment_score=utterance_data.get('score'),
-                sentiment_reason=utterance_data.get('reason'),
-                sentiment_keywords=utterance_data.get('keywords', []),
-                sentiment_confidence=utterance_data.get('sentiment_confidence'),
-                intent=utterance_data.get('intent'),
-                secondary_intents=utterance_data.get('secondary_intents', []),
-                intent_confidence=utterance_data.get('intent_confidence'),
-                intent_reasoning=utterance_data.get('intent_reasoning')
+def require_provider(transcription: bool = False):
+    """503 with Retry-After while the backend's circuit is open and no fallback can take its calls"""
+    retry_after = gateway.circuit_retry_after(transcription)
+    if retry_after > 0:
+        operation = "transcription" if transcription else "analysis"
+        raise HTTPException(status_code=503, detail=f"LLM {operation} backend is unavailable, retry later",
+                            headers={"Retry-After": str(math.ceil(retry_after))})
+
+
+def decode_text_upload(content: bytes) -> str:
+    logger.info("Processing text file...")
+    try:
+        return content.decode("utf-8")
+    except UnicodeDecodeError:
+        try:
+            return content.decode("latin-1")
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="File encoding not supported. Please use UTF-8.")
+
+
+def save_analysis_transcript(analysis_results: dict):
+    """Write the transcript file for a finished analysis and record its path on the results"""
+    try:
+        conversation_id = analysis_results.get('conversation_id', str(uuid.uuid4()))
+        utterances = analysis_results.get('utterances', [])
+
+        if utterances:
+            # Create summary from topic and CSAT data
+            summary_lines = []
+            if 'topic_analysis' in analysis_results:
+                topic_data = analysis_results['topic_analysis']
+                summary_lines.append(f"Primary Topic: {topic_data.get('primary_topic', 'Unknown')}")
+                if topic_data.get('reasoning'):
+                    summary_lines.append(f"Context: {topic_data.get('reasoning')}")
+
+            if 'csat_analysis' in analysis_results:
+                csat_data = analysis_results['csat_analysis']
+                summary_lines.append(
+                    f"CSAT Score: {csat_data.get('csat_score', 0)}/100 ({csat_data.get('csat_rating', 'Unknown')})")
+
+            if 'agent_performance' in analysis_results:
+                agent_data = analysis_results['agent_performance']
+                summary_lines.append(
+                    f"Agent Performance: {agent_data.get('overall_score', 0)}/100 ({agent_data.get('rating', 'Unknown')})")
+
+            # Save transcript file
+            transcript_path = save_transcript_file(
+                conversation_id=conversation_id,
+                utterances=utterances,
+                summary=summary_lines if summary_lines else None
             )
-            db.add(utterance)
-
-        analysis_result = AnalysisResult(
-            conversation_id=conversation.id,
-            analysis_version="2.1.0",
-            model_used="llama3-8b-8192",
-            analysis_success_rate=1.0,
-            average_confidence_score=0.85
-        )
-        db.add(analysis_result)
 
-        db.commit()
-        logger.info(f"Analysis results stored for conversation {conversation.id}")
-        return conversation.id
+            analysis_results['transcript_file_path'] = transcript_path
+            logger.info(f"Transcript saved to: {transcript_path}")
 
-    except Exception as e:
-        db.rollback()
-        logger.error(f"Error storing analysis results: {str(e)}")
-        raise
+    except Exception as transcript_error:
+        logger.warning(f"Failed to save transcript file: {str(transcript_error)}")
+        # Don't fail the entire analysis if transcript saving fails
 
 
 # Enhanced Analyze API supporting both audio and text files
+class ClientDisconnected(Exception):
+    pass
+
+
+async def until_disconnected(request: Request, awaitable):
+    """Await a request's work, cancelling it and raising ClientDisconnected if the client goes away first"""
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+async def store_and_complete_analysis(analysis_results: dict, domain: Optional[str]):
+    """Store a deadline-degraded analysis, then finish its degraded utterances and update the stored rows"""
+    db = SessionLocal()
+    try:
+        conversation_db_id = await asyncio.to_thread(store_analysis_results, db, analysis_results,
+                                                     analysis_fingerprint(analysis_results))
+        completed = await complete_degraded_async(analysis_results, domain)
+        if "error" in completed:
+            logger.error(f"Could not complete degraded analysis {conversation_db_id}: {completed['error']}")
+            return
+        conversation = db.get(Conversation, conversation_db_id)
+        if conversation is not None:
+            await asyncio.to_thread(update_analysis_results, db, conversation, completed,
+                                    analysis_fingerprint(completed))
+    except Exception as e:
+        logger.error(f"Background completion of a degraded analysis failed: {str(e)}")
+    finally:
+        db.close()
+
+
+def find_duplicate_analysis(db: Session, text_content: str, domain: Optional[str]) -> Optional[dict]:
+    """Stored analysis of a conversation this transcript duplicates, or None (lookup errors fall through)"""
+    try:
+        match = duplicate_index.find(db, text_content, domain)
+        if match is None:
+            return None
+        conversation = db.get(Conversation, match["conversation_db_id"])
+        if conversation is None:
+            return None
+        stored = conversation_to_analysis(conversation)
+        # Failed analyses are no longer fingerprinted, but older databases may still match one
+        if not analysis_succeeded(stored):
+            logger.info(f"Duplicate conversation {conversation.conversation_id} has failed utterances, "
+                        "analyzing the upload again")
+            return None
+        return {
+            "duplicate_of": {
+                "conversation_id": conversation.conversation_id,
+                "conversation_db_id": conversation.id,
+                "match": match["match"],
+                "similarity": match["similarity"]
+            },
+            "data": stored
+        }
+    except Exception as e:
+        logger.warning(f"Duplicate lookup failed, analyzing normally: {str(e)}")
+        return None
+
+
 @app.post("/analyze/", response_model=dict)
 async def analyze_conversation(
+        request: Request,
         background_tasks: BackgroundTasks,
         file: UploadFile = File(...),
         domain: Optional[str] = Form("general"),
+        force: bool = Form(False),
+        deadline_seconds: Optional[float] = Form(None),
         db: Session = Depends(get_db)
 ):
+    """
+    Analyze an uploaded conversation. A transcript already stored for the same domain, or one
+    within DEDUP_NEAR_THRESHOLD of it, is answered with the stored analysis (see duplicate_of)
+    unless force is set.
+    deadline_seconds (default ANALYSIS_DEADLINE_SECONDS, 0 = none) is the client's time budget,
+    transcription included: utterances still unanswered near it are classified locally, listed under
+    data.degradation, and finished in the background. Work stops if the client disconnects.
+    """
+    deadline = Deadline.from_budget(deadline_seconds)
     try:
-        content_type = file.content_type
-        filename = file.filename.lower() if file.filename else ""
-
-        logger.info(f"Processing file: {file.filename}, Content-Type: {content_type}")
-        logger.info(f"File extension: {os.path.splitext(filename)[1]}")
-        logger.info(f"MIME type: {content_type}")
-
-        # Fallback: guess file type by extension if content_type is missing or generic
-        if not content_type or content_type == "application/octet-stream":
-            if filename.endswith(('.wav', '.mp3', '.mp4', '.m4a')):
-                content_type = "audio/mpeg"
-            elif filename.endswith('.txt'):
-                content_type = "text/plain"
-            logger.warning(f"Guessed content_type as '{content_type}' based on file extension")
-
-        is_audio_file = (
-                content_type in ["audio/wav", "audio/mp3", "audio/mp4", "audio/mpeg", "audio/x-wav"] or
-                filename.endswith(('.wav', '.mp3', '.mp4', '.m4a'))
-        )
-
-        is_text_file = (
-                content_type in ["text/plain", "application/octet-stream"] or
-                filename.endswith('.txt')
-        )
-
-        if not (is_audio_file or is_text_file):
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported file format '{content_type}' with extension '{filename}'."
-                       f" Only .txt, .wav, .mp3, .mp4 supported."
-            )
-
-        text_content = ""
+        content, is_audio_file = await read_upload(file)
 
+        # One call ledger for transcription and analysis
+        call_log = record_calls()
         if is_audio_file:
-            logger.info("Processing audio file...")
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as temp_file:
-                temp_file.write(await file.read())
-                temp_file_path = temp_file.name
-
-            try:
-                text_content = process_audio_file(temp_file_path)
-                if not text_content or not text_content.strip():
-                    raise HTTPException(status_code=400, detail="No speech detected in audio file")
-                logger.info("Audio processing completed successfully")
-
-            except Exception as audio_error:
-                logger.error(f"Audio processing failed: {str(audio_error)}")
-                logger.error(traceback.format_exc())
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Audio processing failed: {str(audio_error)}"
-                )
-            finally:
-                try:
-                    os.unlink(temp_file_path)
-                except:
-                    pass
-
+            require_provider(transcription=True)
+            text_content = await until_disconnected(
+                request, asyncio.to_thread(transcribe_upload, content, file.filename))
         else:
-            logger.info("Processing text file...")
-            content = await file.read()
-
-            try:
-                text_content = content.decode("utf-8")
-            except UnicodeDecodeError:
-                try:
-                    text_content = content.decode("latin-1")
-                except UnicodeDecodeError:
-                    raise HTTPException(status_code=400, detail="File encoding not supported. Please use UTF-8.")
+            text_content = decode_text_upload(content)
 
         if not text_content.strip():
             raise HTTPException(status_code=400, detail="File contains no readable content")
 
+        # Stored analyses can still be served while the provider is down
+        if DEDUP_ENABLED and not force:
+            # SQLite queries and the first LSH index build run in a worker thread, off the event loop
+            duplicate = await asyncio.to_thread(find_duplicate_analysis, db, text_content, domain)
+            if duplicate is not None:
+                logger.info(f"{file.filename} duplicates conversation {duplicate['duplicate_of']['conversation_id']} "
+                            f"({duplicate['duplicate_of']['match']} match), returning the stored analysis")
+                return json.loads(json.dumps({
+                    "status": "success",
+                    "message": "Duplicate of a stored conversation; returning its analysis",
+                    "file_type": 'audio' if is_audio_file else 'text',
+                    "duplicate_of": duplicate["duplicate_of"],
+                    "data": serialize_datetimes(duplicate["data"])
+                }))
+
+        require_provider()
         logger.info("Starting conversation analysis...")
-        analysis_results = analyze_sentences(text_content, domain)
+        analysis_results = await until_disconnected(
+            request, analyze_sentences_async(text_content, domain, call_log=call_log, deadline=deadline))
 
         if "error" in analysis_results:
             raise HTTPException(status_code=500, detail=analysis_results["error"])
@@ -255,61 +406,212 @@ async def analyze_conversation(
         analysis_results['original_filename'] = file.filename
 
         # Save transcript file after successful analysis
-        try:
-            conversation_id = analysis_results.get('conversation_id', str(uuid.uuid4()))
-            utterances = analysis_results.get('utterances', [])
-
-            if utterances:
-                # Create summary from topic and CSAT data
-                summary_lines = []
-                if 'topic_analysis' in analysis_results:
-                    topic_data = analysis_results['topic_analysis']
-                    summary_lines.append(f"Primary Topic: {topic_data.get('primary_topic', 'Unknown')}")
-                    if topic_data.get('reasoning'):
-                        summary_lines.append(f"Context: {topic_data.get('reasoning')}")
-
-                if 'csat_analysis' in analysis_results:
-                    csat_data = analysis_results['csat_analysis']
-                    summary_lines.append(
-                        f"CSAT Score: {csat_data.get('csat_score', 0)}/100 ({csat_data.get('csat_rating', 'Unknown')})")
-
-                if 'agent_performance' in analysis_results:
-                    agent_data = analysis_results['agent_performance']
-                    summary_lines.append(
-                        f"Agent Performance: {agent_data.get('overall_score', 0)}/100 ({agent_data.get('rating', 'Unknown')})")
-
-                # Save transcript file
-                transcript_path = save_transcript_file(
-                    conversation_id=conversation_id,
-                    utterances=utterances,
-                    summary=summary_lines if summary_lines else None
-                )
-
-                analysis_results['transcript_file_path'] = transcript_path
-                logger.info(f"Transcript saved to: {transcript_path}")
-
-        except Exception as transcript_error:
-            logger.warning(f"Failed to save transcript file: {str(transcript_error)}")
-            # Don't fail the entire analysis if transcript saving fails
-
-        background_tasks.add_task(store_analysis_results, db, analysis_results)
+        save_analysis_transcript(analysis_results)
+
+        message = "Analysis completed successfully"
+        degradation = analysis_results.get("degradation") or {}
+        if degradation.get("degraded"):
+            message = (f"Analysis completed with {len(degradation['degraded_utterances'])} utterances "
+                       f"answered locally to meet the {degradation['deadline_seconds']}s deadline")
+        if degradation.get("degraded") and ANALYSIS_BACKGROUND_COMPLETION:
+            degradation["pending_completion"] = True
+            background_tasks.add_task(store_and_complete_analysis, analysis_results, domain)
+        else:
+            background_tasks.add_task(store_analysis_results, db, analysis_results,
+                                      analysis_fingerprint(analysis_results))
 
         logger.info(f"Analysis completed successfully for file: {file.filename}")
         return json.loads(json.dumps({
             "status": "success",
-            "message": "Analysis completed successfully",
+            "message": message,
             "file_type": 'audio' if is_audio_file else 'text',
             "data": serialize_datetimes(analysis_results)
         }))
 
     except HTTPException:
         raise
+    except ClientDisconnected:
+        logger.warning(f"Client disconnected, abandoned analysis of {file.filename}")
+        raise HTTPException(status_code=499, detail="Client disconnected")
     except Exception as e:
         logger.error(f"Unexpected error in analyze endpoint: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@app.post("/conversations/{conversation_id}/reanalyze", response_model=dict)
+async def reanalyze_conversation(
+        conversation_id: str,
+        file: UploadFile = File(...),
+        domain: Optional[str] = Form(None),
+        refresh_topics: bool = Form(False),
+        db: Session = Depends(get_db)
+):
+    """
+    Re-analyze a corrected transcript of a stored conversation. Unchanged utterances reuse their
+    stored sentiment and intent; only inserted or modified lines are sent to the LLM.
+    """
+    try:
+        conversation = db.query(Conversation).filter(Conversation.conversation_id == conversation_id).first()
+        if conversation is None and conversation_id.isdigit():
+            conversation = db.get(Conversation, int(conversation_id))
+        if conversation is None:
+            raise HTTPException(status_code=404, detail=f"Conversation {conversation_id} not found")
+
+        content, is_audio_file = await read_upload(file)
+        call_log = record_calls()
+        if is_audio_file:
+            text_content = await asyncio.to_thread(transcribe_upload, content, file.filename)
+        else:
+            text_content = decode_text_upload(content)
+
+        if not text_content.strip():
+            raise HTTPException(status_code=400, detail="File contains no readable content")
+
+        stored_utterances = [utterance_row_to_dict(u) for u in
+                             sorted(conversation.utterances, key=lambda u: (u.utterance_id or 0, u.id))]
+        stored_topics = {
+            "topics": conversation.topics or [],
+            "primary_topic": conversation.primary_topic,
+            "confidence": conversation.topic_confidence,
+            "reasoning": conversation.topic_reasoning
+        }
+
+        analysis_results = await reanalyze_sentences_async(
+            text_content, stored_utterances, stored_topics, domain or conversation.domain, refresh_topics,
+            call_log=call_log
+        )
+        if "error" in analysis_results:
+            raise HTTPException(status_code=500, detail=analysis_results["error"])
+
+        analysis_results['conversation_id'] = conversation.conversation_id
+        analysis_results['raw_text'] = text_content
+        analysis_results['file_type'] = 'audio' if is_audio_file else 'text'
+        analysis_results['original_filename'] = file.filename
+        save_analysis_transcript(analysis_results)
+
+        update_analysis_results(db, conversation, analysis_results, analysis_fingerprint(analysis_results))
+
+        return json.loads(json.dumps({
+            "status": "success",
+            "message": "Re-analysis completed successfully",
+            "file_type": 'audio' if is_audio_file else 'text',
+            "reanalysis": analysis_results["reanalysis"],
+            "data": serialize_datetimes(analysis_results)
+        }))
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in reanalyze endpoint: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+def format_stream_event(event: dict, use_sse: bool) -> str:
+    """Encode one analysis event as an NDJSON line or a server-sent event"""
+    payload = json.dumps(serialize_datetimes(event), default=str)
+    if use_sse:
+        return f"event: {event['event']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
+def store_streamed_results(analysis_results: dict) -> int:
+    db = SessionLocal()
+    try:
+        return store_analysis_results(db, analysis_results, analysis_fingerprint(analysis_results))
+    finally:
+        db.close()
+
+
+# Streaming variant of /analyze/: per-utterance results as they complete
+@app.post("/analyze/stream")
+async def analyze_conversation_stream(
+        request: Request,
+        file: UploadFile = File(...),
+        domain: Optional[str] = Form("general"),
+        format: Optional[str] = Form(None)
+):
+    """
+    Emits newline-delimited JSON (default) or server-sent events when the client sends
+    Accept: text/event-stream or format=sse. Events: start, utterance (one per utterance, in
+    completion order), topics, summary (same shape as /analyze/ data), stored (database id), or error.
+    """
+    content, is_audio_file = await read_upload(file)
+    filename = file.filename
+    use_sse = format == "sse" or "text/event-stream" in request.headers.get("accept", "")
+
+    async def event_stream():
+        try:
+            call_log = record_calls()
+            if is_audio_file:
+                yield format_stream_event({"event": "transcribing", "filename": filename}, use_sse)
+                text_content = await asyncio.to_thread(transcribe_upload, content, filename)
+            else:
+                text_content = decode_text_upload(content)
+
+            if not text_content.strip():
+                raise HTTPException(status_code=400, detail="File contains no readable content")
+
+            logger.info("Starting streamed conversation analysis...")
+            async for event in stream_analysis(text_content, domain, call_log=call_log):
+                if event["event"] == "summary":
+                    analysis_results = event["analysis"]
+                    analysis_results['raw_text'] = text_content
+                    analysis_results['file_type'] = 'audio' if is_audio_file else 'text'
+                    analysis_results['original_filename'] = filename
+                    save_analysis_transcript(analysis_results)
+                yield format_stream_event(event, use_sse)
+
+            stored_id = await asyncio.to_thread(store_streamed_results, analysis_results)
+            yield format_stream_event({"event": "stored", "conversation_id": analysis_results['conversation_id'],
+                                       "db_id": stored_id}, use_sse)
+            logger.info(f"Streamed analysis completed for file: {filename}")
+
+        except HTTPException as e:
+            yield format_stream_event({"event": "error", "status_code": e.status_code, "detail": e.detail}, use_sse)
+        except Exception as e:
+            logger.error(f"Unexpected error in streaming analyze endpoint: {str(e)}")
+            logger.error(traceback.format_exc())
+            yield format_stream_event({"event": "error", "status_code": 500,
+                                       "detail": f"Analysis failed: {str(e)}"}, use_sse)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def store_transcription(db: Session, transcription_text: str) -> Tuple[str, int]:
+    """Store a transcription-only conversation; returns (conversation_id, database id)"""
+    conversation_id = str(uuid.uuid4())
+
+    conversation = Conversation(
+        conversation_id=conversation_id,
+        raw_text=transcription_text,
+        domain="general",  # Always general for transcribe
+        primary_topic=None,
+        topics=[],
+        topic_confidence=None,
+        topic_reasoning=None,
+        csat_score=None,
+        csat_rating=None,
+        csat_methodology=None,
+        agent_performance_score=None,
+        agent_performance_rating=None,
+        agent_sentiment_avg=None,
+        professionalism_score=None,
+        customer_sentiment_improvement=None,
+        total_utterances=None,
+        speakers=[],
+    )
+    db.add(conversation)
+    db.commit()
+    db.refresh(conversation)
+    return conversation_id, conversation.id
+
+
 @app.post("/transcribe/", response_model=dict)
 async def transcribe_audio(
         file: UploadFile = File(...),
@@ -340,40 +642,15 @@ async def transcribe_audio(
             temp_file_path = temp_file.name
 
         try:
-            # Perform transcription
-            transcription_text = transcribe_audio_only(temp_file_path)
+            # Perform transcription off the event loop: gateway rate-limit waits and backoff block
+            transcription_text = await asyncio.to_thread(transcribe_audio_only, temp_file_path)
 
             # Log transcription length
             char_count = len(transcription_text)
             word_count = len(transcription_text.split())
             logger.info(f"[TRANSCRIBE] Transcription length: {char_count} chars, {word_count} words")
 
-            # Generate conversation_id
-            conversation_id = str(uuid.uuid4())
-
-            # Store in DB
-            conversation = Conversation(
-                conversation_id=conversation_id,
-                raw_text=transcription_text,
-                domain="general",  # Always general for transcribe
-                primary_topic=None,
-                topics=[],
-                topic_confidence=None,
-                topic_reasoning=None,
-                csat_score=None,
-                csat_rating=None,
-                csat_methodology=None,
-                agent_performance_score=None,
-                agent_performance_rating=None,
-                agent_sentiment_avg=None,
-                professionalism_score=None,
-                customer_sentiment_improvement=None,
-                total_utterances=None,
-                speakers=[],
-            )
-            db.add(conversation)
-            db.commit()
-            db.refresh(conversation)
+            conversation_id, _ = store_transcription(db, transcription_text)
 
             return {
                 "status": "success",
@@ -398,3 +675,112 @@ async def transcribe_audio(
         logger.error(f"[TRANSCRIBE] Unexpected error: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+# --- Asynchronous jobs: submit with POST /jobs, poll with GET /jobs/{job_id} ---
+
+async def run_analysis_job(job: dict, context: JobContext) -> dict:
+    with open(job["input_path"], "rb") as fh:
+        content = fh.read()
+
+    call_log = record_calls()
+    if job["is_audio"]:
+        context.report("transcribing", 5.0)
+        text_content = await asyncio.to_thread(transcribe_upload, content, job["filename"])
+        analysis_start = 40.0
+    else:
+        text_content = decode_text_upload(content)
+        analysis_start = 0.0
+
+    if not text_content.strip():
+        raise HTTPException(status_code=400, detail="File contains no readable content")
+
+    context.report("analyzing", analysis_start)
+    analysis_results = None
+    async for event in stream_analysis(text_content, job["domain"], call_log=call_log):
+        if event["event"] == "utterance":
+            done = event["completed"] / event["total_utterances"]
+            context.report("analyzing", analysis_start + (95.0 - analysis_start) * done)
+        elif event["event"] == "summary":
+            analysis_results = event["analysis"]
+
+    analysis_results['raw_text'] = text_content
+    analysis_results['file_type'] = 'audio' if job["is_audio"] else 'text'
+    analysis_results['original_filename'] = job["filename"]
+    save_analysis_transcript(analysis_results)
+
+    context.report("storing", 97.0, force=True)
+    stored_id = await asyncio.to_thread(store_streamed_results, analysis_results)
+    context.update(conversation_db_id=stored_id)
+    return serialize_datetimes(analysis_results)
+
+
+async def run_transcription_job(job: dict, context: JobContext) -> dict:
+    context.report("transcribing", 5.0)
+    transcription_text = await asyncio.to_thread(transcribe_audio_only, job["input_path"])
+
+    context.report("storing", 95.0, force=True)
+
+    def store():
+        db = SessionLocal()
+        try:
+            return store_transcription(db, transcription_text)
+        finally:
+            db.close()
+
+    conversation_id, stored_id = await asyncio.to_thread(store)
+    context.update(conversation_db_id=stored_id)
+    return {
+        "conversation_id": conversation_id,
+        "filename": job["filename"],
+        "transcription": transcription_text
+    }
+
+
+job_queue.register("analyze", run_analysis_job)
+job_queue.register("transcribe", run_transcription_job)
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(
+        file: UploadFile = File(...),
+        kind: str = Form("analyze"),
+        domain: Optional[str] = Form("general"),
+        timeout_seconds: Optional[float] = Form(None)
+):
+    """Queue an analyze or transcribe job and return its id immediately"""
+    if kind not in job_queue.handlers:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind '{kind}'. Use one of: "
+                                                    f"{', '.join(job_queue.handlers)}")
+
+    content, is_audio_file = await read_upload(file)
+    if kind == "transcribe" and not is_audio_file:
+        raise HTTPException(status_code=400, detail="Transcription jobs require an audio file")
+
+    try:
+        return job_queue.submit(content, file.filename, kind, is_audio_file, domain, timeout_seconds)
+    except Exception as e:
+        logger.error(f"Failed to queue job: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to queue job: {str(e)}")
+
+
+@app.get("/jobs")
+def list_jobs(status: Optional[str] = None, limit: int = 50):
+    return {"jobs": job_queue.list(status, limit)}
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Current stage, percent done and, once completed, the result"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    job = job_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
@@ -0,0 +1,54 @@
+"""
+Measure analyze_sentences latency on a synthetic 50-utterance conversation at different
+concurrency limits, using the simulated client.
+
+Usage (from the repository root):
+    python -m benchmarks.async_engine [--utterances 50] [--latency 0.2]
+"""
+import argparse
+import glob
+import itertools
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import analyzer.analyzer as analyzer_module
+from analyzer.cache import llm_cache
+from benchmarks.fake_groq import FakeAsyncGroqClient, install_fake_client
+
+
+def build_conversation(num_utterances: int) -> str:
+    """Cycle the data/*.txt sample lines into a conversation of the requested length"""
+    lines = []
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'data', '*.txt'))):
+        with open(path, encoding="utf-8") as fh:
+            lines.extend(line.strip() for line in fh if ":" in line)
+    return "\n".join(itertools.islice(itertools.cycle(lines), num_utterances))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the async analysis engine")
+    parser.add_argument("--utterances", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated base latency per request (s)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    args = parser.parse_args()
+
+    fake_client = FakeAsyncGroqClient(base_latency=args.latency, per_token_latency=0.0)
+    install_fake_client(fake_client)
+    llm_cache.enabled = False
+    text = build_conversation(args.utterances)
+
+    print(f"{args.utterances} utterances, {args.latency:.2f}s per call")
+    print(f"{'concurrency':>11} {'calls':>6} {'wall (s)':>9} {'sum of calls (s)':>17}")
+    for concurrency in args.concurrency:
+        fake_client.reset()
+        start = time.perf_counter()
+        analyzer_module.analyze_sentences(text, batch_mode=False, concurrency=concurrency)
+        elapsed = time.perf_counter() - start
+        print(f"{concurrency:>11} {fake_client.calls:>6} {elapsed:>9.2f} {fake_client.calls * args.latency:>17.2f}")
+
+
+if __name__ == "__main__":
+    main()
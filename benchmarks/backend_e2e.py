@@ -0,0 +1,85 @@
+"""
+End-to-end check of the LLM backends against the local stub server: runs the sample conversations
+through the full analysis engine on the Groq and OpenAI-compatible backends (real SDK clients and
+HTTP, no injected fakes) and verifies every utterance got a real result and model_used names the
+backend that served it. Exits non-zero on failure.
+
+Usage (from the repository root):
+    python -m benchmarks.backend_e2e [--backend groq|openai|all] [--batch]
+"""
+import argparse
+import asyncio
+import glob
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import analyzer.analyzer as analyzer_module
+from analyzer.backends import GroqBackend, OpenAICompatibleBackend
+from analyzer.cache import llm_cache
+from analyzer.gateway import gateway
+from benchmarks.fake_groq_server import start_server
+
+
+def make_backend(name: str, base_url: str):
+    if name == "groq":
+        return GroqBackend(api_key="fake-key", base_url=base_url, chat_model="llama3-8b-8192",
+                           transcription_model="whisper-large-v3-turbo")
+    # OpenAI-compatible servers are addressed at their /v1 root
+    return OpenAICompatibleBackend(api_key="not-needed", base_url=f"{base_url}/v1", chat_model="local-llama-3.1-8b",
+                                   max_connections=8, max_keepalive=8, max_concurrency=4, rpm=0, tpm=0)
+
+
+async def run(texts, batch_mode: bool):
+    return await asyncio.gather(*(analyzer_module.analyze_sentences_async(text, batch_mode=batch_mode)
+                                  for text in texts))
+
+
+def check_backend(name: str, base_url: str, texts, batch_mode: bool) -> bool:
+    backend = make_backend(name, base_url)
+    gateway.set_backend(backend)
+    gateway.set_limits(rpm=0, tpm=0)
+
+    start = time.perf_counter()
+    results = asyncio.run(run(texts, batch_mode))
+    elapsed = time.perf_counter() - start
+
+    utterances = [u for r in results for u in r.get("utterances", [])]
+    errors = [r["error"] for r in results if "error" in r]
+    defaults = sum(1 for u in utterances if u["reason"] == "Default" or u["intent_reasoning"] == "Default")
+    labels = {r.get("model_used") for r in results}
+
+    ok = not errors and defaults == 0 and labels == {backend.label} and utterances
+    print(f"[{'ok' if ok else 'FAIL'}] {name}: {len(results)} conversations, {len(utterances)} utterances, "
+          f"{defaults} defaults, model_used={sorted(filter(None, labels))}, {elapsed:.2f}s")
+    for error in errors:
+        print(f"    error: {error}")
+    return bool(ok)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the analysis engine end to end against the stub server")
+    parser.add_argument("--backend", choices=["groq", "openai", "all"], default="all")
+    parser.add_argument("--batch", action="store_true", help="Use batched classification")
+    args = parser.parse_args()
+
+    server = start_server()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    llm_cache.enabled = False
+
+    texts = []
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'data', '*.txt'))):
+        with open(path, encoding="utf-8") as fh:
+            texts.append(fh.read())
+
+    names = ["groq", "openai"] if args.backend == "all" else [args.backend]
+    results = [check_backend(name, base_url, texts, args.batch) for name in names]
+    print(f"server: {server.counters}")
+    server.shutdown()
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Compare per-utterance and batched classification on the data/*.txt samples.
+
+Usage (from the repository root):
+    python -m benchmarks.batch_classification [--latency 0.05] [--json]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import analyzer.analyzer as analyzer_module
+from analyzer.cache import llm_cache
+from benchmarks.fake_groq import FakeAsyncGroqClient, install_fake_client
+
+
+def run(path: str, fake_client: FakeAsyncGroqClient, batch_mode: bool) -> dict:
+    with open(path, encoding="utf-8") as fh:
+        text = fh.read()
+    fake_client.reset()
+    start = time.perf_counter()
+    result = analyzer_module.analyze_sentences(text, batch_mode=batch_mode)
+    elapsed = time.perf_counter() - start
+    return {
+        "utterances": result["total_utterances"],
+        "calls": fake_client.calls,
+        "wall_seconds": round(elapsed, 3),
+        "csat_score": result["csat_analysis"].get("csat_score")
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched vs per-utterance classification")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated base latency per request (s)")
+    parser.add_argument("--data", default=os.path.join(os.path.dirname(__file__), '..', 'data', '*.txt'))
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+
+    fake_client = FakeAsyncGroqClient(base_latency=args.latency)
+    install_fake_client(fake_client)
+    llm_cache.enabled = False
+
+    report = {}
+    for path in sorted(glob.glob(args.data)):
+        report[os.path.basename(path)] = {
+            "per_utterance": run(path, fake_client, batch_mode=False),
+            "batched": run(path, fake_client, batch_mode=True)
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'sample':45} {'utts':>5} {'calls':>11} {'wall (s)':>15} {'speedup':>8}")
+    for name, r in report.items():
+        single, batched = r["per_utterance"], r["batched"]
+        speedup = single["wall_seconds"] / batched["wall_seconds"] if batched["wall_seconds"] else 0
+        print(f"{name:45} {single['utterances']:>5} {single['calls']:>5} -> {batched['calls']:<3} "
+              f"{single['wall_seconds']:>6.2f} -> {batched['wall_seconds']:<6.2f} {speedup:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Model cascade accuracy, latency and cost on the labeled utterance corpus (data/labeled_utterances.jsonl).
+
+The corpus is analyzed as --conversation-size line conversations three ways: every utterance on the
+small model, every utterance on the large model, and the cascade (small model first, low-confidence
+or contradictory answers re-asked of the large model). Reports sentiment and intent accuracy against
+the labels, the share of utterances escalated, and calls, mean latency, tokens and cost per tier.
+
+By default both tiers are simulated. The small model is the fake keyword classifier, which reports
+low confidence when no keyword decided its answer, and the large model answers with the labels
+after a longer delay. The accuracy figures then show how much of the large model's quality the
+cascade keeps, not how good either real model is. With --live the configured backends are used
+(the chat backend's model as the small tier, CASCADE_LARGE_MODEL as the large one); this needs
+provider credentials.
+
+Usage (from the repository root):
+    python -m benchmarks.cascade [--threshold 0.6] [--small-price 0.05] [--large-price 0.59] [--live] [--json]
+"""
+import argparse
+import asyncio
+import copy
+import json
+import logging
+import os
+import sys
+import time
+from typing import Dict, List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import analyzer.analyzer as analyzer_module
+from analyzer.backends import LLMBackend
+from analyzer.cache import llm_cache
+from analyzer.cascade import cascade
+from analyzer.gateway import gateway, summarize_calls
+from benchmarks.fake_groq import FakeAsyncGroqClient, FakeBackend, fake_completion
+
+LABELED_CORPUS = os.path.join(os.path.dirname(__file__), '..', 'data', 'labeled_utterances.jsonl')
+
+SENTIMENT_SCORES = {"extreme positive": 0.9, "positive": 0.75, "neutral": 0.5, "negative": 0.3,
+                    "extreme negative": 0.1}
+
+
+def load_labeled_corpus(path: str = LABELED_CORPUS) -> List[Dict]:
+    """Rows of {"speaker", "text", "sentiment", "intent"}"""
+    with open(path, encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def small_completion(kind: str, messages: List[Dict]) -> Dict:
+    """The keyword classifier, unsure of answers no keyword decided"""
+    payload = fake_completion(kind, messages)
+    if kind == "sentiment" and payload["sentiment"] == "neutral":
+        payload["confidence"] = 0.5
+    if kind == "intent" and payload["intent"] == "feedback":
+        payload["confidence"] = 0.5
+    return payload
+
+
+def labeled_completion(rows: List[Dict]):
+    """A simulated large model that answers with the corpus labels"""
+    labels = {row["text"]: row for row in rows}
+
+    def completion(kind: str, messages: List[Dict]) -> Dict:
+        label = labels.get(messages[-1]["content"])
+        if label is None or kind not in ("sentiment", "intent"):
+            return fake_completion(kind, messages)
+        if kind == "sentiment":
+            return {"sentiment": label["sentiment"], "score": SENTIMENT_SCORES[label["sentiment"]],
+                    "confidence": 0.9, "reason": "Simulated large model", "keywords": []}
+        return {"intent": label["intent"], "secondary_intents": [], "confidence": 0.9,
+                "reasoning": "Simulated large model"}
+
+    return completion
+
+
+def tier_backend(backend: LLMBackend, model: str) -> LLMBackend:
+    """The backend with model as its chat model, to run a tier as the plain chat backend"""
+    tier = copy.copy(backend)
+    tier.chat_model = model
+    return tier
+
+
+async def analyze_corpus(rows: List[Dict], conversation_size: int) -> List[Dict]:
+    conversations = [rows[i:i + conversation_size] for i in range(0, len(rows), conversation_size)]
+    texts = ["\n".join(f"{row['speaker']}: {row['text']}" for row in conversation) for conversation in conversations]
+    return await asyncio.gather(*(analyzer_module.analyze_sentences_async(text, batch_mode=False)
+                                  for text in texts))
+
+
+def run(args, rows: List[Dict], mode: str, small: LLMBackend, large: LLMBackend) -> Dict:
+    gateway.set_backend(tier_backend(large, large.chat_model) if mode == "large" else small)
+    cascade.enabled = mode == "cascade"
+    cascade.large_model = large.chat_model
+    cascade.large_backend = large
+    cascade.threshold = args.threshold
+
+    start = time.perf_counter()
+    analyses = asyncio.run(analyze_corpus(rows, args.conversation_size))
+    wall = time.perf_counter() - start
+
+    utterances = [u for analysis in analyses for u in analysis["utterances"]]
+    models = summarize_calls([call for analysis in analyses for call in analysis["llm_calls"]])["models"]
+    tiers = {}
+    for tier, backend, price in (("small", small, args.small_price), ("large", large, args.large_price)):
+        counters = models.get(f"{backend.name}:{backend.chat_model}")
+        if not counters:
+            continue
+        tokens = counters["prompt_tokens"] + counters["completion_tokens"]
+        tiers[tier] = {"calls": counters["calls"],
+                       "mean_call_seconds": round(counters["wall_seconds"] / counters["calls"], 4),
+                       "tokens": tokens, "cost_usd": round(tokens / 1e6 * price, 6)}
+
+    return {
+        "mode": mode,
+        "wall_seconds": round(wall, 3),
+        "utterances": len(utterances),
+        "sentiment_accuracy": round(sum(u["sentiment"] == row["sentiment"] for u, row in zip(utterances, rows))
+                                    / len(rows), 4),
+        "intent_accuracy": round(sum(u["intent"] == row["intent"] for u, row in zip(utterances, rows)) / len(rows), 4),
+        "escalated": sum(1 for u in utterances if u.get("model_tier") == "large"),
+        "local": sum(1 for u in utterances if u.get("analysis_source") not in ("llm", "error")),
+        "tiers": tiers,
+        "cost_usd": round(sum(tier["cost_usd"] for tier in tiers.values()), 6)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the small/large model cascade on the labeled corpus")
+    parser.add_argument("--corpus", default=LABELED_CORPUS, help="JSONL rows of speaker, text, sentiment, intent")
+    parser.add_argument("--conversation-size", type=int, default=20, help="Corpus lines per analyzed conversation")
+    parser.add_argument("--threshold", type=float, default=cascade.threshold, help="CASCADE_CONFIDENCE_THRESHOLD")
+    parser.add_argument("--small-latency", type=float, default=0.05, help="Simulated small model latency (s)")
+    parser.add_argument("--large-latency", type=float, default=0.25, help="Simulated large model latency (s)")
+    parser.add_argument("--small-price", type=float, default=0.05, help="Small model USD per million tokens")
+    parser.add_argument("--large-price", type=float, default=0.59, help="Large model USD per million tokens")
+    parser.add_argument("--live", action="store_true", help="Use the configured backends instead of fakes")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+    for handler in logging.getLogger().handlers:
+        handler.setLevel(logging.ERROR)
+
+    rows = load_labeled_corpus(args.corpus)
+    llm_cache.enabled = False
+    gateway.hedging.enabled = False
+    if args.live:
+        small = gateway.backend
+        large = tier_backend(cascade.large_backend or gateway.backend, cascade.large_model)
+    else:
+        small_client = FakeAsyncGroqClient(args.small_latency, 0.0)
+        small_client.completion = small_completion
+        large_client = FakeAsyncGroqClient(args.large_latency, 0.0)
+        large_client.completion = labeled_completion(rows)
+        small, large = FakeBackend("small", small_client), FakeBackend("large", large_client)
+        gateway.async_client = None
+        gateway.set_limits(rpm=0, tpm=0)
+
+    report = {"utterances": len(rows), "threshold": args.threshold, "live": args.live,
+              "runs": [run(args, rows, mode, small, large) for mode in ("small", "large", "cascade")]}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{len(rows)} labeled utterances, cascade threshold {args.threshold}"
+          f"{'' if args.live else ' (simulated tiers)'}")
+    print(f"{'mode':8} {'sentiment':>10} {'intent':>8} {'escalated':>10} {'small calls':>12} {'large calls':>12} "
+          f"{'large s/call':>13} {'cost $':>10} {'wall s':>8}")
+    for r in report["runs"]:
+        small_tier, large_tier = r["tiers"].get("small", {}), r["tiers"].get("large", {})
+        print(f"{r['mode']:8} {r['sentiment_accuracy']:>10} {r['intent_accuracy']:>8} {r['escalated']:>10} "
+              f"{small_tier.get('calls', 0):>12} {large_tier.get('calls', 0):>12} "
+              f"{large_tier.get('mean_call_seconds', 0.0):>13} {r['cost_usd']:>10} {r['wall_seconds']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Analyses during a provider outage, with and without the circuit breaker.
+
+The chat backend answers every request with a 500. --uploads synthetic conversations are analyzed
+one after another (as users keep arriving during the outage) three ways: with the breaker disabled,
+so every call retries through the full backoff schedule; with the breaker failing fast once the
+circuit opens; and with the breaker routing to a healthy fallback backend. Reports per-upload
+latency, requests sent to the failing backend, and utterances that still got a real result.
+
+Usage (from the repository root):
+    python -m benchmarks.circuit_breaker [--uploads 3] [--utterances 10] [--min-calls 10] [--json]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import analyzer.analyzer as analyzer_module
+from analyzer.breaker import CircuitBreaker
+from analyzer.cache import llm_cache
+from analyzer.gateway import gateway
+from benchmarks.fake_groq import FakeAsyncGroqClient, FakeBackend
+from benchmarks.suite import default_results, latency_stats, synthetic_conversation
+
+
+def run(args, mode: str) -> dict:
+    primary = FakeBackend("primary", FakeAsyncGroqClient(args.latency, 0.0, error_rate=1.0))
+    fallback = FakeBackend("fallback", FakeAsyncGroqClient(args.latency, 0.0))
+    gateway.set_backend(primary)
+    gateway.set_fallback(fallback if mode == "fallback" else None)
+    gateway.breaker = CircuitBreaker(enabled=mode != "off", min_calls=args.min_calls)
+    gateway.set_limits(rpm=0, tpm=0)
+
+    uploads = []
+    start = time.perf_counter()
+    for n in range(args.uploads):
+        upload_start = time.perf_counter()
+        analysis = analyzer_module.analyze_sentences(synthetic_conversation(args.utterances, seed=n))
+        uploads.append((time.perf_counter() - upload_start, analysis))
+    wall = time.perf_counter() - start
+
+    utterances = [u for _, analysis in uploads for u in analysis["utterances"]]
+    return {
+        "mode": mode,
+        "wall_seconds": round(wall, 3),
+        "upload_seconds": latency_stats([seconds for seconds, _ in uploads]),
+        "failing_backend_requests": primary.client.calls,
+        "fallback_requests": fallback.client.calls,
+        "utterances": len(utterances),
+        "analyzed": sum(1 for u in utterances if analyzer_module.utterance_succeeded(u)),
+        "default_results": sum(default_results(analysis) for _, analysis in uploads),
+        "error_results": sum(1 for u in utterances if u.get("analysis_source") == "error"),
+        "circuits": gateway.breaker.stats()["circuits"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark analyses during a provider outage")
+    parser.add_argument("--uploads", type=int, default=3, help="Conversations analyzed one after another")
+    parser.add_argument("--utterances", type=int, default=10, help="Utterances per synthetic conversation")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake backend latency per request (s)")
+    parser.add_argument("--min-calls", type=int, default=10, help="BREAKER_MIN_CALLS for the run")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+    for handler in logging.getLogger().handlers:
+        handler.setLevel(logging.ERROR)
+
+    llm_cache.enabled = False
+    gateway.hedging.enabled = False
+    gateway.async_client = None
+
+    report = {"uploads": args.uploads, "utterances": args.utterances,
+              "runs": [run(args, mode) for mode in ("off", "fail_fast", "fallback")]}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{args.uploads} uploads x {args.utterances} utterances while the chat backend returns 500s")
+    print(f"{'breaker':10} {'wall s':>8} {'upload p50':>11} {'upload p99':>11} {'failing reqs':>13} "
+          f"{'fallback reqs':>14} {'analyzed':>9} {'errors':>7} {'defaults':>9}")
+    for r in report["runs"]:
+        print(f"{r['mode']:10} {r['wall_seconds']:>8} {r['upload_seconds']['p50']:>11} "
+              f"{r['upload_seconds']['p99']:>11} {r['failing_backend_requests']:>13} {r['fallback_requests']:>14} "
+              f"{r['analyzed']:>9} {r['error_results']:>7} {r['default_results']:>9}")
+
+
+if __name__ == "__main__":
+    main()
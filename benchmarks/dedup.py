@@ -0,0 +1,118 @@
+"""
+Duplicate upload detection: fingerprint cost, lookup latency against a growing store, and how
+often re-uploads are recognised versus distinct calls wrongly matched.
+
+Synthetic conversations are fingerprinted into an in-memory SQLite table. Each stored call is then
+looked up as a reformatted copy (speaker case and whitespace changed, expected: exact), with one
+line edited and with several lines edited (expected: near or none depending on the threshold), and
+a set of never-stored calls drawn from the same phrase pool measures false positives.
+
+Usage (from the repository root):
+    python -m benchmarks.dedup [--stored 2000] [--utterances 40] [--queries 200] [--threshold 0.9] [--json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from analyzer.dedup import DuplicateIndex, fingerprint_row
+from benchmarks.suite import latency_stats, synthetic_conversation
+
+EDIT_SUFFIX = " and could you also email me a copy of that"
+
+
+def reformatted(text: str) -> str:
+    """Same call with lower-case speaker labels and extra whitespace"""
+    lines = []
+    for line in text.splitlines():
+        speaker, message = line.split(":", 1)
+        lines.append(f"{speaker.lower()}:  {message.replace(' ', '  ')}  ")
+    return "\n".join(lines)
+
+
+def edited(text: str, lines_changed: int, seed: int) -> str:
+    """Same call with lines_changed utterances extended by a new clause"""
+    lines = text.splitlines()
+    rng = np.random.default_rng(seed)
+    for index in rng.choice(len(lines), size=min(lines_changed, len(lines)), replace=False):
+        lines[index] += EDIT_SUFFIX
+    return "\n".join(lines)
+
+
+def run_queries(index: DuplicateIndex, db, texts, threshold: float) -> dict:
+    seconds, matches = [], {"exact": 0, "near": 0, "none": 0}
+    for text in texts:
+        start = time.perf_counter()
+        match = index.find(db, text, "general", threshold)
+        seconds.append(time.perf_counter() - start)
+        matches[match["match"] if match else "none"] += 1
+    return {"queries": len(texts), "matches": matches, "lookup_ms": latency_stats([s * 1000 for s in seconds])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark duplicate upload detection")
+    parser.add_argument("--stored", type=int, default=2000, help="Conversations already in the store")
+    parser.add_argument("--utterances", type=int, default=40, help="Utterances per synthetic conversation")
+    parser.add_argument("--queries", type=int, default=200, help="Lookups per variant")
+    parser.add_argument("--threshold", type=float, default=0.9, help="DEDUP_NEAR_THRESHOLD for the run")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+
+    bind = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    db = sessionmaker(bind=bind)()
+    index = DuplicateIndex(bind=bind)
+    index.ensure_table()
+
+    stored = [synthetic_conversation(args.utterances, seed=i) for i in range(args.stored)]
+    start = time.perf_counter()
+    rows = [fingerprint_row(i + 1, text) for i, text in enumerate(stored)]
+    fingerprint_seconds = time.perf_counter() - start
+    db.add_all(rows)
+    db.commit()
+
+    start = time.perf_counter()
+    index.sync(db)
+    sync_seconds = time.perf_counter() - start
+
+    sample = stored[:args.queries]
+    report = {
+        "stored": args.stored,
+        "utterances": args.utterances,
+        "threshold": args.threshold,
+        "fingerprint_ms_per_conversation": round(fingerprint_seconds * 1000 / max(1, args.stored), 3),
+        "index_sync_seconds": round(sync_seconds, 3),
+        "variants": {
+            "reformatted": run_queries(index, db, [reformatted(t) for t in sample], args.threshold),
+            "one_line_edited": run_queries(index, db, [edited(t, 1, i) for i, t in enumerate(sample)],
+                                           args.threshold),
+            "five_lines_edited": run_queries(index, db, [edited(t, 5, i) for i, t in enumerate(sample)],
+                                             args.threshold),
+            "distinct": run_queries(index, db, [synthetic_conversation(args.utterances, seed=args.stored + i)
+                                                for i in range(args.queries)], args.threshold)
+        }
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['stored']} stored conversations of {report['utterances']} utterances: "
+          f"{report['fingerprint_ms_per_conversation']}ms to fingerprint each, "
+          f"{report['index_sync_seconds']}s to index")
+    print(f"{'variant':20} {'exact':>6} {'near':>6} {'none':>6} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, result in report["variants"].items():
+        matches, lookup = result["matches"], result["lookup_ms"]
+        print(f"{name:20} {matches['exact']:>6} {matches['near']:>6} {matches['none']:>6} "
+              f"{lookup['p50']:>8} {lookup['p99']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Distilled classifier: held-out agreement with the LLM labels, calibration, and throughput against
+the LLM path.
+
+Training rows come from a temporary SQLite database filled with --rows synthetic utterances labeled
+by the fake model in benchmarks.fake_groq (a stand-in for stored LLM labels), --label-noise of them
+relabeled at random the way a real model is sometimes inconsistent; --from-db trains on the
+configured database's Utterance rows instead. Either way the rows go through the same path as
+'python -m analyzer.distilled train': deduplication, hash split into train/calibration/test,
+training, temperature scaling, and a versioned artifact (written to a temporary directory) that
+is then loaded back.
+
+Reports agreement and calibration error on the held-out split, the share of utterances answered
+locally and their agreement for a sweep of confidence thresholds, and utterances/s of the
+distilled model on one core next to the LLM path (analyze_sentences on a fake chat backend of
+--llm-latency per call, and the ceiling GATEWAY_DEFAULT_RPM puts on it).
+
+Usage (from the repository root):
+    python -m benchmarks.distillation [--rows 20000] [--label-noise 0.05] [--llm-latency 0.3] [--from-db] [--json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import analyzer.analyzer as analyzer_module
+from analyzer.cache import llm_cache
+from analyzer.distilled import (
+    DistilledClassifier, featurize, evaluate, load_training_rows, split_of, train_distilled_model
+)
+from analyzer.gateway import GATEWAY_DEFAULT_RPM, gateway
+from analyzer.semantic_cache import semantic_cache
+from benchmarks.fake_groq import FakeAsyncGroqClient, classify_intent, classify_sentiment, install_fake_client
+from databaseLib.database import SessionLocal
+from databaseLib.models import Base, Utterance
+
+ITEMS = ["router", "package", "order", "charger", "invoice", "laptop", "phone", "subscription", "modem",
+         "headphones", "account", "refund", "delivery", "bill", "tablet", "printer"]
+TIMES = ["two weeks", "three days", "a month", "since Monday", "forty minutes", "all morning", "ten days"]
+OPENERS = ["", "Honestly, ", "Look, ", "Hi, ", "Okay so ", "Well, ", "Hello, ", "Um, "]
+CUSTOMER_BODIES = [
+    "my {item} still hasn't arrived and it's been {time}",
+    "the {item} arrived broken",
+    "I've been waiting {time} for the {item}, this is ridiculous",
+    "the {item} keeps failing and I'm angry",
+    "when will my {item} be delivered?",
+    "how do I return the {item}?",
+    "is the {item} covered by the warranty?",
+    "please send me a new {item}",
+    "could you update the address for my {item}",
+    "I need a refund for the {item}",
+    "I want to talk to a manager about the {item}",
+    "get me your supervisor, the {item} is a waste of money",
+    "thank you, the {item} works now",
+    "okay, I'll wait for the {item}",
+    "got it, the {item} should come in {time}",
+    "the {item} is great",
+    "the new {item} is slow",
+    "your {item} is excellent",
+    "the {item} was delivered {time} late",
+    "I was disappointed by the {item}",
+]
+AGENT_BODIES = [
+    "I'm sorry to hear about the {item}, let me check",
+    "can you read me the number on the {item}?",
+    "I've sent a replacement {item}, it should arrive in {time}",
+    "please hold while I look up your {item}",
+    "the {item} shows as delivered {time} ago",
+    "I'll escalate the {item} issue to my supervisor",
+    "thanks for your patience with the {item}",
+    "your {item} has been updated",
+]
+CLOSERS = ["", " Thanks.", " Please help.", " It's frustrating.", " I appreciate it.", " Sure.", " Great."]
+SENTIMENTS = ["extreme negative", "negative", "neutral", "positive", "extreme positive"]
+INTENTS = ["acknowledgment", "complaint", "escalation", "feedback", "inquiry", "request"]
+
+
+def synthetic_rows(count: int, label_noise: float, seed: int = 0) -> List[Dict]:
+    """Template utterances labeled by the fake model, label_noise of the labels replaced at random"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for _ in range(count):
+        is_agent = rng.random() < 0.35
+        bodies = AGENT_BODIES if is_agent else CUSTOMER_BODIES
+        body = bodies[rng.integers(len(bodies))].format(item=ITEMS[rng.integers(len(ITEMS))],
+                                                         time=TIMES[rng.integers(len(TIMES))])
+        text = f"{OPENERS[rng.integers(len(OPENERS))]}{body}{CLOSERS[rng.integers(len(CLOSERS))]}"
+        sentiment = classify_sentiment(text)
+        intent = classify_intent(text)["intent"]
+        label = sentiment["sentiment"]
+        if rng.random() < label_noise:
+            label = SENTIMENTS[rng.integers(len(SENTIMENTS))]
+        if rng.random() < label_noise:
+            intent = INTENTS[rng.integers(len(INTENTS))]
+        rows.append({"speaker": "Agent" if is_agent else "Customer", "text": text, "sentiment": label,
+                     "sentiment_score": sentiment["score"], "intent": intent})
+    return rows
+
+
+def store_rows(rows: List[Dict], directory: str):
+    """A SQLite session factory over a fresh database holding rows as Utterance records"""
+    bind = create_engine(f"sqlite:///{os.path.join(directory, 'distillation.db')}")
+    Base.metadata.create_all(bind=bind)
+    factory = sessionmaker(bind=bind)
+    db = factory()
+    try:
+        db.add_all(Utterance(speaker=row["speaker"], sentence=row["text"], sentiment=row["sentiment"],
+                             sentiment_score=row["sentiment_score"], sentiment_reason="Stored",
+                             sentiment_confidence=0.8, intent=row["intent"], intent_confidence=0.8,
+                             intent_reasoning="Stored", analysis_source="llm") for row in rows)
+        db.commit()
+    finally:
+        db.close()
+    return factory
+
+
+def pin_to_one_core():
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {sorted(os.sched_getaffinity(0))[0]})
+
+
+def distilled_throughput(classifier: DistilledClassifier, utterances: List[tuple], batch: int) -> Dict:
+    """Utterances/s of predict, one utterance per call and per --batch utterance conversation"""
+    start = time.perf_counter()
+    for utterance in utterances:
+        classifier.predict([utterance])
+    single = len(utterances) / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for offset in range(0, len(utterances), batch):
+        classifier.predict(utterances[offset:offset + batch])
+    batched = len(utterances) / (time.perf_counter() - start)
+    return {"single_utterances_per_second": round(single, 1), f"batch_{batch}_utterances_per_second": round(batched, 1)}
+
+
+def llm_throughput(rows: List[Dict], args, classifier: DistilledClassifier, enabled: bool) -> Dict:
+    """analyze_sentences over --batch utterance conversations on the fake chat backend"""
+    classifier.enabled = enabled
+    analyzer_module.distilled_classifier = classifier
+    fake = FakeAsyncGroqClient(args.llm_latency, 0.0)
+    install_fake_client(fake)
+    conversations = [rows[i:i + args.batch] for i in range(0, len(rows), args.batch)]
+
+    async def analyze_all():
+        return await asyncio.gather(*(analyzer_module.analyze_sentences_async(
+            "\n".join(f"{row['speaker']}: {row['text']}" for row in conversation), batch_mode=False)
+            for conversation in conversations))
+
+    start = time.perf_counter()
+    analyses = asyncio.run(analyze_all())
+    wall = time.perf_counter() - start
+    utterances = [u for analysis in analyses for u in analysis["utterances"]]
+    teacher = [(classify_sentiment(row["text"])["sentiment"], classify_intent(row["text"])["intent"]) for row in rows]
+    return {
+        "distilled": enabled,
+        "utterances": len(utterances),
+        "llm_calls": fake.calls,
+        "local_answers": sum(1 for u in utterances if u["analysis_source"] == "distilled"),
+        "agreement_with_llm": round(sum((u["sentiment"], u["intent"]) == label for u, label in zip(utterances, teacher))
+                                    / len(utterances), 4),
+        "wall_seconds": round(wall, 3),
+        "utterances_per_second": round(len(utterances) / wall, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the distilled sentiment/intent classifier")
+    parser.add_argument("--rows", type=int, default=20000, help="Synthetic LLM-labeled utterances")
+    parser.add_argument("--label-noise", type=float, default=0.05, help="Share of synthetic labels randomized")
+    parser.add_argument("--from-db", action="store_true", help="Train on the configured database instead")
+    parser.add_argument("--limit", type=int, default=None, help="Most recent Utterance rows used with --from-db")
+    parser.add_argument("--thresholds", default="0.5,0.7,0.8,0.9,0.95", help="Routing thresholds to report")
+    parser.add_argument("--threshold", type=float, default=0.9, help="Routing threshold of the pipeline run")
+    parser.add_argument("--batch", type=int, default=20, help="Utterances per conversation")
+    parser.add_argument("--llm-utterances", type=int, default=200, help="Held-out utterances analyzed end to end")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Fake chat backend latency per call (s)")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+    for handler in logging.getLogger().handlers:
+        handler.setLevel(logging.ERROR)
+    pin_to_one_core()
+
+    with tempfile.TemporaryDirectory() as directory:
+        session_factory = SessionLocal if args.from_db else store_rows(synthetic_rows(args.rows, args.label_noise),
+                                                                         directory)
+        rows = load_training_rows(session_factory, args.limit)
+        metadata = train_distilled_model(rows, model_dir=directory, source="database" if args.from_db else "synthetic")
+        classifier = DistilledClassifier(enabled=True, threshold=args.threshold, model_dir=directory)
+        if not classifier.load(str(metadata["version"])):
+            raise RuntimeError("The trained artifact could not be loaded back")
+
+    test_rows = [row for row in rows if split_of(row["text"]) == "test"]
+    test_features = featurize((row["speaker"], row["text"]) for row in test_rows)
+    sweep = [evaluate(classifier.sentiment_head, classifier.intent_head, test_rows, test_features, float(threshold))
+             for threshold in args.thresholds.split(",")]
+    test_utterances = [(row["speaker"], row["text"]) for row in test_rows]
+
+    report = {
+        "source": metadata["source"],
+        "rows": metadata["rows"],
+        "training_seconds": metadata["training_seconds"],
+        "temperatures": metadata["temperatures"],
+        "held_out": metadata["held_out"],
+        "thresholds": sweep,
+        "distilled_throughput": distilled_throughput(classifier, test_utterances, args.batch),
+        "llm_rpm_ceiling_utterances_per_second": round(GATEWAY_DEFAULT_RPM / 2 / 60, 3) if GATEWAY_DEFAULT_RPM else None
+    }
+    if not args.from_db:
+        llm_cache.enabled = False
+        semantic_cache.enabled = False
+        gateway.hedging.enabled = False
+        pipeline_rows = test_rows[:args.llm_utterances]
+        report["pipeline"] = [llm_throughput(pipeline_rows, args, classifier, enabled) for enabled in (False, True)]
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    held_out = report["held_out"]
+    print(f"{report['source']} rows: {report['rows']}, trained in {report['training_seconds']}s, "
+          f"temperatures {report['temperatures']}")
+    print(f"held-out agreement: sentiment {held_out['sentiment_agreement']}, intent {held_out['intent_agreement']}, "
+          f"both {held_out['both_agreement']}; calibration error {held_out['sentiment_calibration_error']} / "
+          f"{held_out['intent_calibration_error']}")
+    print(f"{'threshold':>10} {'local share':>12} {'agreement when local':>21}")
+    for r in sweep:
+        print(f"{r['threshold']:>10} {r['coverage']:>12} {str(r['agreement_when_confident']):>21}")
+    throughput = report["distilled_throughput"]
+    print(f"distilled model on one core: {throughput['single_utterances_per_second']} utterances/s one at a time, "
+          f"{throughput[f'batch_{args.batch}_utterances_per_second']} utterances/s per {args.batch}-line conversation")
+    print(f"LLM path ceiling at GATEWAY_DEFAULT_RPM={GATEWAY_DEFAULT_RPM}: "
+          f"{report['llm_rpm_ceiling_utterances_per_second']} utterances/s")
+    for r in report.get("pipeline", []):
+        print(f"analyze_sentences {'with' if r['distilled'] else 'without'} distilled model (threshold "
+              f"{args.threshold}, {args.llm_latency}s per LLM call, no rate limit): {r['utterances_per_second']} "
+              f"utterances/s, {r['llm_calls']} LLM calls, {r['local_answers']} local, "
+              f"agreement with the LLM {r['agreement_with_llm']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""
+Simulated Groq client for benchmarks.
+
+Mimics the parts of the Groq SDK the analyzer uses (chat.completions.create on AsyncGroq and
+audio.transcriptions.create on Groq) with a deterministic keyword classifier, a configurable
+per-request latency distribution and injected 5xx / 429 errors, so call counts, wall time and
+retry behaviour can be measured without network access or an API key.
+"""
+import asyncio
+import itertools
+import json
+import math
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import groq
+import httpx
+
+from analyzer.backends import GroqBackend
+from analyzer.gateway import gateway
+from analyzer.prompts import (
+    TOPIC_PROMPT, SENTIMENT_PROMPT, INTENT_PROMPT, BATCH_CLASSIFICATION_PROMPT, DECODE_RETRY_PROMPT
+)
+
+NEGATIVE_WORDS = ['upset', 'waste', 'pathetic', 'slow', 'nonsense', 'still hasn', 'never', 'horrible',
+                  'frustrat', 'angry', 'ridiculous', 'disappointed', 'delay', 'broken', 'worst']
+POSITIVE_WORDS = ['thank', 'great', 'appreciate', 'perfect', 'glad', 'happy', 'awesome', 'wonderful',
+                  'works now', 'excellent', 'helpful']
+
+
+def classify_sentiment(text: str) -> Dict:
+    text = text.lower()
+    negative = sum(1 for w in NEGATIVE_WORDS if w in text)
+    positive = sum(1 for w in POSITIVE_WORDS if w in text)
+    if negative >= 2:
+        return {"sentiment": "extreme negative", "score": 0.1, "confidence": 0.85}
+    if negative > positive:
+        return {"sentiment": "negative", "score": 0.3, "confidence": 0.75}
+    if positive >= 2:
+        return {"sentiment": "extreme positive", "score": 0.9, "confidence": 0.8}
+    if positive:
+        return {"sentiment": "positive", "score": 0.75, "confidence": 0.75}
+    return {"sentiment": "neutral", "score": 0.5, "confidence": 0.7}
+
+
+TOPIC_KEYWORDS = {
+    "billing": ['bill', 'charge', 'invoice', 'refund', 'payment'],
+    "shipping": ['deliver', 'tracking', 'shipment', 'courier', 'package'],
+    "technical_support": ['router', 'restart', 'error', 'install', 'reset'],
+    "account_management": ['password', 'login', 'profile', 'account'],
+    "cancellation": ['cancel', 'terminate', 'subscription']
+}
+
+
+def classify_topic(text: str) -> Dict:
+    text = text.lower()
+    counts = {topic: sum(text.count(w) for w in words) for topic, words in TOPIC_KEYWORDS.items()}
+    ranked = sorted((t for t in counts if counts[t]), key=lambda t: (-counts[t], t))
+    if not ranked:
+        return {"topics": ["complaint"], "primary_topic": "complaint", "confidence": 0.6}
+    share = counts[ranked[0]] / sum(counts.values())
+    return {"topics": ranked[:3], "primary_topic": ranked[0], "confidence": round(0.5 + share / 2, 2)}
+
+
+def classify_intent(text: str) -> Dict:
+    text = text.lower()
+    if 'supervisor' in text or 'manager' in text:
+        intent = "escalation"
+    elif '?' in text:
+        intent = "inquiry"
+    elif any(w in text for w in ['please', 'could you', 'can you', 'i need', 'i want']):
+        intent = "request"
+    elif any(w in text for w in NEGATIVE_WORDS):
+        intent = "complaint"
+    elif any(w in text for w in ['thank', 'okay', 'sure', 'yes', 'got it']):
+        intent = "acknowledgment"
+    else:
+        intent = "feedback"
+    return {"intent": intent, "secondary_intents": [], "confidence": 0.7}
+
+
+def prompt_kind(messages: List[Dict]) -> str:
+    """Which analyzer call a request belongs to, judged by its system prompt"""
+    return {TOPIC_PROMPT: "topic", SENTIMENT_PROMPT: "sentiment", INTENT_PROMPT: "intent",
+            BATCH_CLASSIFICATION_PROMPT: "batch"}.get(messages[0]["content"], "unknown")
+
+
+def is_decode_retry(messages: List[Dict]) -> bool:
+    """Whether a request re-asks for a reply the analyzer could not decode"""
+    return messages[-1]["content"].startswith(DECODE_RETRY_PROMPT.split("{")[0])
+
+
+def fake_completion(kind: str, messages: List[Dict]) -> Dict:
+    """JSON payload the simulated model returns for a request of the given kind"""
+    # A decode retry ends with the rejected reply and the follow-up; classify the original input
+    user_text = messages[-3 if is_decode_retry(messages) else -1]["content"]
+    if kind == "topic":
+        return dict(classify_topic(user_text), reasoning="Simulated topic classification")
+    if kind == "sentiment":
+        return dict(classify_sentiment(user_text), reason="Simulated", keywords=[])
+    if kind == "intent":
+        return dict(classify_intent(user_text), reasoning="Simulated")
+    utterances = json.loads(user_text)["utterances"]
+    results = []
+    for u in utterances:
+        sentiment = classify_sentiment(u["text"])
+        intent = classify_intent(u["text"])
+        results.append({"id": u["id"], "sentiment": sentiment["sentiment"], "score": sentiment["score"],
+                        "confidence": sentiment["confidence"], "intent": intent["intent"],
+                        "secondary_intents": [], "reason": "Simulated"})
+    return {"results": results}
+
+
+# Ways the simulated model garbles a reply; all but "truncated" can be repaired locally
+MALFORMATIONS = ["prose", "fenced", "string_numbers", "synonyms", "truncated"]
+LABEL_VARIANTS = {"extreme positive": "Very Positive", "extreme negative": "very_negative", "positive": "Positive",
+                  "negative": "NEGATIVE", "neutral": "Neutral", "inquiry": "question", "acknowledgment": "thanks",
+                  "request": "Request", "complaint": "Complaint", "escalation": "escalate", "feedback": "Feedback"}
+
+
+def malform_completion(payload: Dict, malformation: str) -> str:
+    """Serialize a payload the way a model ignoring the JSON instructions might"""
+    if malformation == "prose":
+        return f"Here is the classification you asked for:\n{json.dumps(payload)}\nLet me know if you need more."
+    if malformation == "fenced":
+        return f"```json\n{json.dumps(payload, indent=2)}\n```"
+    if malformation == "truncated":
+        content = json.dumps(payload)
+        return content[:len(content) // 2]
+
+    def garble(entry: Dict) -> Dict:
+        entry = dict(entry)
+        if malformation == "string_numbers":
+            if isinstance(entry.get("score"), float):
+                entry["score"] = f"{round(entry['score'] * 100)}%"
+            if isinstance(entry.get("confidence"), float):
+                entry["confidence"] = str(entry["confidence"])
+        else:
+            for key in ("sentiment", "intent"):
+                if entry.get(key) in LABEL_VARIANTS:
+                    entry[key] = LABEL_VARIANTS[entry[key]]
+        return entry
+
+    if "results" in payload:
+        return json.dumps({"results": [garble(entry) for entry in payload["results"]]})
+    return json.dumps(garble(payload))
+
+
+class ContextLengthExceeded(Exception):
+    """What the simulated model raises for prompts longer than its context window"""
+
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "exponential", "lognormal")
+
+
+def sample_latency(rng: random.Random, distribution: str, base: float, spread: float) -> float:
+    """
+    One request latency around `base` seconds:
+    constant: always base; uniform: base ± spread; exponential: mean base;
+    lognormal: median base with shape spread (0.5-1.0 gives a realistic long tail).
+    """
+    if base <= 0:
+        return 0.0
+    if distribution == "uniform":
+        return max(0.0, rng.uniform(base - spread, base + spread))
+    if distribution == "exponential":
+        return rng.expovariate(1.0 / base)
+    if distribution == "lognormal":
+        return rng.lognormvariate(math.log(base), spread)
+    return base
+
+
+def make_status_error(status_code: int, retry_after: Optional[float] = None) -> Exception:
+    """The groq SDK exception a real server response with this status would raise"""
+    headers = {"retry-after": f"{retry_after:g}"} if retry_after is not None else {}
+    request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+    response = httpx.Response(status_code, headers=headers, request=request)
+    error_class = {429: groq.RateLimitError, 500: groq.InternalServerError}.get(status_code, groq.APIStatusError)
+    return error_class(f"Simulated {status_code}", response=response, body=None)
+
+
+class FakeGroqBase:
+    """
+    Latency and fault injection shared by the fake chat and transcription clients.
+    Each request first rolls for an injected 429 (rate_limit_rate, with a Retry-After of
+    retry_after seconds) or 500 (error_rate), then sleeps for a latency drawn from
+    latency_distribution plus per_token_latency per prompt/response token; with probability
+    straggler_rate the request hangs for straggler_latency seconds instead. Chat replies are
+    garbled (one of MALFORMATIONS, chosen at random) with probability malformed_rate.
+    """
+
+    def __init__(self, base_latency: float = 0.05, per_token_latency: float = 0.0002, context_window: int = 0,
+                 latency_distribution: str = "constant", latency_spread: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, retry_after: Optional[float] = 0.1, seed: Optional[int] = None,
+                 malformed_rate: float = 0.0, straggler_rate: float = 0.0, straggler_latency: float = 20.0):
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution '{latency_distribution}'")
+        self.base_latency = base_latency
+        self.per_token_latency = per_token_latency
+        self.context_window = context_window
+        self.latency_distribution = latency_distribution
+        self.latency_spread = latency_spread
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.malformed_rate = malformed_rate
+        self.straggler_rate = straggler_rate
+        self.straggler_latency = straggler_latency
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.calls_by_kind = {}
+            self.max_prompt_tokens = 0
+            self.injected_errors = 0
+            self.injected_rate_limits = 0
+            self.injected_malformed = {}
+            self.injected_stragglers = 0
+
+    def _record(self, kind: str):
+        with self._lock:
+            self.calls += 1
+            self.calls_by_kind[kind] = self.calls_by_kind.get(kind, 0) + 1
+
+    def _latency(self, tokens: int = 0) -> float:
+        with self._lock:
+            if self.straggler_rate and self._rng.random() < self.straggler_rate:
+                self.injected_stragglers += 1
+                return self.straggler_latency
+            latency = sample_latency(self._rng, self.latency_distribution, self.base_latency, self.latency_spread)
+        return latency + self.per_token_latency * tokens
+
+    def _injected_error(self) -> Optional[Exception]:
+        with self._lock:
+            roll = self._rng.random()
+            if roll < self.rate_limit_rate:
+                self.injected_rate_limits += 1
+                return make_status_error(429, self.retry_after)
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.injected_errors += 1
+                return make_status_error(500)
+        return None
+
+    def _injected_malformation(self) -> Optional[str]:
+        with self._lock:
+            if not self.malformed_rate or self._rng.random() >= self.malformed_rate:
+                return None
+            malformation = self._rng.choice(MALFORMATIONS)
+            self.injected_malformed[malformation] = self.injected_malformed.get(malformation, 0) + 1
+            return malformation
+
+    def counters(self) -> Dict:
+        with self._lock:
+            return {"calls": self.calls, "calls_by_kind": dict(self.calls_by_kind),
+                    "injected_errors": self.injected_errors, "injected_rate_limits": self.injected_rate_limits,
+                    "injected_malformed": dict(self.injected_malformed),
+                    "injected_stragglers": self.injected_stragglers}
+
+
+class FakeAsyncGroqClient(FakeGroqBase):
+    """
+    Stand-in for groq.AsyncGroq that answers chat completions after a simulated delay.
+    With context_window set, prompts estimated above that many tokens are rejected like a real
+    model would reject them. completion(kind, messages) builds the reply payload (default:
+    fake_completion's keyword classifier); benchmarks replace it to simulate other models.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.completion = fake_completion
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create_chat))
+
+    async def _create_chat(self, model: str, messages: List[Dict], **kwargs):
+        kind = prompt_kind(messages)
+        self._record(kind)
+
+        error = self._injected_error()
+        if error is not None:
+            # Errors come back quickly, like a rejected request would
+            await asyncio.sleep(self._latency() / 4)
+            raise error
+
+        prompt_chars = sum(len(m["content"]) for m in messages)
+        with self._lock:
+            self.max_prompt_tokens = max(self.max_prompt_tokens, prompt_chars // 4)
+        if self.context_window and prompt_chars // 4 > self.context_window:
+            await asyncio.sleep(self.base_latency)
+            raise ContextLengthExceeded(f"Prompt of ~{prompt_chars // 4} tokens exceeds the "
+                                        f"{self.context_window}-token context window")
+
+        payload = self.completion(kind, messages)
+        malformation = self._injected_malformation()
+        content = json.dumps(payload) if malformation is None else malform_completion(payload, malformation)
+        await asyncio.sleep(self._latency((prompt_chars + len(content)) // 4))
+
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], model=model)
+
+
+TRANSCRIPT_LINES = [
+    "Thank you for calling, how can I help you today?",
+    "Hi, I have a problem with my order, it still hasn't arrived.",
+    "I'm sorry to hear that, let me check the tracking details for you.",
+    "I need it by Friday, this delay is really frustrating.",
+    "The courier shows the package at the local depot, it should be delivered tomorrow.",
+    "Okay, thank you, I appreciate the help.",
+]
+
+
+class FakeGroqClient(FakeGroqBase):
+    """
+    Stand-in for the synchronous groq.Groq client used for transcription. Each call returns the
+    next line of a scripted support call, after a simulated delay proportional to the upload size
+    (per_token_latency per kilobyte of audio) on top of the sampled base latency.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lines = itertools.cycle(TRANSCRIPT_LINES)
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=self._create_transcription))
+
+    def _create_transcription(self, file, model: str, **kwargs):
+        self._record("transcription")
+        error = self._injected_error()
+        if error is not None:
+            time.sleep(self._latency() / 4)
+            raise error
+
+        size = len(file.read()) if hasattr(file, "read") else 0
+        time.sleep(self._latency(size // 1024))
+        with self._lock:
+            text = next(self._lines)
+        return SimpleNamespace(text=text, segments=[{"text": text}])
+
+
+class FakeBackend(GroqBackend):
+    """A Groq-protocol backend whose async client is a fake, for benchmarks that need several backends"""
+
+    def __init__(self, name: str, client: FakeAsyncGroqClient, chat_model: Optional[str] = None):
+        super().__init__(api_key="fake-key", base_url=None, chat_model=chat_model or f"{name}-chat")
+        self.name = name
+        self.client = client
+
+    def create_async_client(self):
+        return self.client
+
+
+def install_fake_client(fake_client: FakeAsyncGroqClient, transcription_client: Optional[FakeGroqClient] = None):
+    """Route the shared LLM gateway to the fake client(s), with rate limiting disabled"""
+    gateway.async_client = fake_client
+    if transcription_client is not None:
+        gateway.sync_client = transcription_client
+    gateway.set_limits(rpm=0, tpm=0)
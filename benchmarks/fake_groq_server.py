@@ -0,0 +1,121 @@
+"""
+Local HTTP server speaking the Groq/OpenAI chat completions and transcription protocol.
+
+Requests above a fixed per-second quota are answered with 429 and a Retry-After header, so the
+LLM gateway's rate limiting and backoff can be exercised end to end without network access.
+
+Usage (from the repository root):
+    python -m benchmarks.fake_groq_server --port 8900 --quota 20
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.fake_groq import prompt_kind, fake_completion
+
+
+class FakeGroqServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, quota_per_second: int = 0, retry_after: float = 1.0, latency: float = 0.0):
+        super().__init__(address, FakeGroqHandler)
+        self.quota_per_second = quota_per_second
+        self.retry_after = retry_after
+        self.latency = latency
+        self.window_start = time.monotonic()
+        self.window_count = 0
+        self.counters = {"requests": 0, "rate_limited": 0, "completed": 0}
+        self._lock = threading.Lock()
+
+    def admit(self) -> bool:
+        """Fixed one-second window quota; 0 means unlimited"""
+        with self._lock:
+            self.counters["requests"] += 1
+            now = time.monotonic()
+            if now - self.window_start >= 1.0:
+                self.window_start = now
+                self.window_count = 0
+            if self.quota_per_second and self.window_count >= self.quota_per_second:
+                self.counters["rate_limited"] += 1
+                return False
+            self.window_count += 1
+            return True
+
+    def count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        if not self.server.admit():
+            self._send_json(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+                            {"Retry-After": str(self.server.retry_after)})
+            return
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if self.path.endswith("/chat/completions"):
+            request = json.loads(body)
+            content = json.dumps(fake_completion(prompt_kind(request["messages"]), request["messages"]))
+            prompt_tokens = sum(len(m["content"]) for m in request["messages"]) // 4
+            completion_tokens = len(content) // 4
+            self.server.count("completed")
+            self._send_json(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens}
+            })
+        elif self.path.endswith("/audio/transcriptions"):
+            self.server.count("completed")
+            self._send_json(200, {"text": "Thank you for calling, how can I help you today?", "segments": []})
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+
+def start_server(port: int = 0, quota_per_second: int = 0, retry_after: float = 1.0,
+                 latency: float = 0.0) -> FakeGroqServer:
+    """Start the server on a background thread; port 0 picks a free port"""
+    server = FakeGroqServer(("127.0.0.1", port), quota_per_second, retry_after, latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake Groq API server")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--quota", type=int, default=0, help="Requests per second before 429s (0 = unlimited)")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake_server = FakeGroqServer(("127.0.0.1", args.port), args.quota, args.retry_after, args.latency)
+    print(f"Fake Groq server on http://127.0.0.1:{args.port} (set GROQ_BASE_URL to this address)")
+    fake_server.serve_forever()
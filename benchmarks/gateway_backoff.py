@@ -0,0 +1,63 @@
+"""
+Drive concurrent analyses through the LLM gateway against the local fake server while it
+returns 429s, and check that every utterance still gets a real result instead of a default.
+
+Usage (from the repository root):
+    python -m benchmarks.gateway_backoff [--conversations 5] [--quota 20]
+"""
+import argparse
+import asyncio
+import glob
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import analyzer.analyzer as analyzer_module
+from analyzer.cache import llm_cache
+from analyzer.gateway import gateway
+from benchmarks.fake_groq_server import start_server
+
+
+async def run(texts):
+    return await asyncio.gather(*(analyzer_module.analyze_sentences_async(text, batch_mode=False)
+                                  for text in texts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exercise gateway backoff against a 429-returning server")
+    parser.add_argument("--conversations", type=int, default=5)
+    parser.add_argument("--quota", type=int, default=20, help="Server requests per second before 429s")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--rpm", type=float, default=0, help="Gateway client-side RPM limit (0 = unlimited)")
+    args = parser.parse_args()
+
+    server = start_server(quota_per_second=args.quota, retry_after=args.retry_after)
+    gateway.api_key = "fake-key"
+    gateway.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    gateway.set_limits(rpm=args.rpm, tpm=0)
+    llm_cache.enabled = False
+
+    texts = []
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'data', '*.txt'))):
+        with open(path, encoding="utf-8") as fh:
+            texts.append(fh.read())
+    texts = (texts * args.conversations)[:args.conversations]
+
+    start = time.perf_counter()
+    results = asyncio.run(run(texts))
+    elapsed = time.perf_counter() - start
+
+    utterances = [u for r in results for u in r["utterances"]]
+    defaults = sum(1 for u in utterances if u["reason"] == "Default" or u["intent_reasoning"] == "Default")
+
+    print(f"conversations: {len(results)}, utterances: {len(utterances)}, wall: {elapsed:.2f}s")
+    print(f"server: {server.counters}")
+    print(f"gateway: {gateway.stats()}")
+    print(f"utterances with default results: {defaults}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Hedged LLM requests against a provider that occasionally hangs.
+
+The fake clients answer most requests in tens of milliseconds but leave a small share hanging
+for --straggler-latency seconds. Synthetic conversations are analyzed, and a run of single
+transcriptions is made, with hedging off and then on, reporting per-call and per-conversation
+p50/p99, how many hedges fired and won, and the extra requests they cost.
+
+Usage (from the repository root):
+    python -m benchmarks.hedging [--conversations 20] [--utterances 40] [--straggler-rate 0.01]
+        [--straggler-latency 5] [--json]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import analyzer.analyzer as analyzer_module
+from analyzer.cache import llm_cache
+from analyzer.gateway import gateway
+from benchmarks.fake_groq import FakeAsyncGroqClient, FakeGroqClient, install_fake_client
+from benchmarks.suite import latency_stats, synthetic_conversation
+
+
+def hedge_counters() -> dict:
+    totals = {"requests": 0, "hedges": 0, "hedge_wins": 0, "hedges_skipped": 0}
+    for counters in gateway.stats()["models"].values():
+        for name in totals:
+            totals[name] += counters.get(name, 0)
+    return totals
+
+
+def counter_delta(before: dict, after: dict) -> dict:
+    delta = {name: after[name] - before[name] for name in after}
+    delta["extra_request_share"] = round(delta["hedges"] / max(1, delta["requests"] - delta["hedges"]), 4)
+    return delta
+
+
+def run_analysis(args, hedging: bool) -> dict:
+    """Analyze the synthetic conversations one after another; per-call and per-conversation latency"""
+    gateway.hedging.enabled = hedging
+    before = hedge_counters()
+    call_seconds, conversation_seconds = [], []
+    for i in range(args.conversations):
+        text = synthetic_conversation(args.utterances, seed=i)
+        start = time.perf_counter()
+        result = analyzer_module.analyze_sentences(text)
+        conversation_seconds.append(time.perf_counter() - start)
+        call_seconds.extend(entry["wall_seconds"] for entry in result["llm_calls"] if entry.get("operation") == "chat")
+    return {"hedging": hedging, "calls": latency_stats(call_seconds),
+            "conversations": latency_stats(conversation_seconds),
+            "counters": counter_delta(before, hedge_counters())}
+
+
+def run_transcriptions(args, audio_path: str, hedging: bool) -> dict:
+    """Sequential transcriptions of one small file"""
+    gateway.hedging.enabled = hedging
+    before = hedge_counters()
+    seconds = []
+    for _ in range(args.transcriptions):
+        with open(audio_path, "rb") as fh:
+            start = time.perf_counter()
+            gateway.transcribe(file=fh, model=gateway.transcription_model)
+            seconds.append(time.perf_counter() - start)
+    return {"hedging": hedging, "calls": latency_stats(seconds), "counters": counter_delta(before, hedge_counters())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hedged LLM requests")
+    parser.add_argument("--conversations", type=int, default=20)
+    parser.add_argument("--utterances", type=int, default=40, help="Utterances per synthetic conversation")
+    parser.add_argument("--transcriptions", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.03, help="Median latency per request (s)")
+    parser.add_argument("--straggler-rate", type=float, default=0.01, help="Share of requests that hang")
+    parser.add_argument("--straggler-latency", type=float, default=5.0, help="How long a hung request takes (s)")
+    parser.add_argument("--min-delay", type=float, default=0.1,
+                        help="GATEWAY_HEDGE_MIN_DELAY for the run (the default 1.0 suits real providers)")
+    parser.add_argument("--max-rate", type=float, default=0.05, help="GATEWAY_HEDGE_MAX_RATE for the run")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+    for handler in logging.getLogger().handlers:
+        handler.setLevel(logging.ERROR)
+
+    settings = dict(latency_distribution="lognormal", latency_spread=0.3, straggler_rate=args.straggler_rate,
+                    straggler_latency=args.straggler_latency, seed=11)
+    install_fake_client(FakeAsyncGroqClient(args.latency, 0.0, **settings),
+                        FakeGroqClient(args.latency, 0.0, **settings))
+    llm_cache.enabled = False
+    gateway.hedging.min_delay = args.min_delay
+    gateway.hedging.max_rate = args.max_rate
+
+    # Warm the per-model latency windows so hedging is armed from the first measured call
+    gateway.hedging.enabled = False
+    analyzer_module.analyze_sentences(synthetic_conversation(gateway.hedging.min_samples, seed=999))
+
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as fh:
+        fh.write(b"\0" * 4096)
+        audio_path = fh.name
+    try:
+        for _ in range(gateway.hedging.min_samples):
+            with open(audio_path, "rb") as audio_file:
+                gateway.transcribe(file=audio_file, model=gateway.transcription_model)
+        report = {
+            "analysis": [run_analysis(args, hedging) for hedging in (False, True)],
+            "transcription": [run_transcriptions(args, audio_path, hedging) for hedging in (False, True)],
+            "hedging": gateway.hedging.stats()
+        }
+    finally:
+        os.unlink(audio_path)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{args.straggler_rate:.1%} of requests hang for {args.straggler_latency}s")
+    print(f"{'workload':24} {'call p50':>9} {'call p99':>9} {'call max':>9} {'conv p99':>9} "
+          f"{'hedges':>7} {'won':>5} {'extra':>7}")
+    for workload, results in (("analysis", report["analysis"]), ("transcription", report["transcription"])):
+        for r in results:
+            label = f"{workload} ({'hedged' if r['hedging'] else 'plain'})"
+            conversation_p99 = r["conversations"]["p99"] if "conversations" in r else "-"
+            counters = r["counters"]
+            print(f"{label:24} {r['calls']['p50']:>9} {r['calls']['p99']:>9} {r['calls']['max']:>9} "
+                  f"{conversation_p99:>9} {counters['hedges']:>7} {counters['hedge_wins']:>5} "
+                  f"{counters['extra_request_share']:>7.1%}")
+
+
+if __name__ == "__main__":
+    main()
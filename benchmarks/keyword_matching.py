@@ -0,0 +1,133 @@
+"""
+Keyword matching for agent scoring and speaker role mapping at corpus scale: the previous
+per-keyword substring scans against the compiled matcher in analyzer.keywords, with the default
+lexicons and with lexicons padded to larger per-domain sizes.
+
+Also reports how many utterances change classification under the matcher's whole-word rules
+(e.g. "fix" no longer matching inside "prefix").
+
+Usage (from the repository root):
+    python -m benchmarks.keyword_matching [--utterances 200000] [--lexicon-sizes 0,100,500] [--json]
+"""
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from analyzer.keywords import DEFAULT_LEXICONS, KeywordMatcher
+
+# Keyword lists as they were hard-coded before the matcher
+LEGACY_PROFESSIONAL = ['help', 'assist', 'solve', 'resolve', 'understand', 'sorry', 'apologize', 'thank', 'please',
+                       'certainly', 'absolutely', 'definitely', 'glad', 'happy', 'everything', 'right', 'fix',
+                       'support']
+LEGACY_AGENT_ROLE = ['help', 'assist', 'support', 'company', 'policy', 'thank you for calling']
+LEGACY_CUSTOMER_ROLE = ['problem', 'issue', 'my order', 'I need', 'complaint', 'refund']
+
+SENTENCES = [
+    "I'm happy to help you with that today.",
+    "My order still hasn't arrived and I'm frustrated.",
+    "Let me check the tracking details for you, the parcel left our warehouse on Tuesday.",
+    "Thank you for calling, how can I assist?",
+    "This is the third time I've called about this problem.",
+    "Certainly, I can resolve that right away.",
+    "Okay.",
+    "I understand, I'm sorry for the trouble.",
+    "Alright, the prefix on the account number is wrong.",
+    "I need a refund for the damaged item.",
+    "Our company policy covers returns within thirty days.",
+    "Could you confirm the email address on the account?",
+]
+
+
+def synthetic_corpus(num_utterances: int, seed: int = 3) -> list:
+    rng = random.Random(seed)
+    return [rng.choice(SENTENCES) for _ in range(num_utterances)]
+
+
+def padded_lexicons(extra: int, seed: int = 5) -> tuple:
+    """Default lexicons plus `extra` made-up words each, in legacy (substring) and matcher form"""
+    rng = random.Random(seed)
+    filler = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 10))) for _ in range(extra * 3)]
+    legacy = (LEGACY_PROFESSIONAL + filler[:extra], LEGACY_AGENT_ROLE + filler[extra:2 * extra],
+              LEGACY_CUSTOMER_ROLE + filler[2 * extra:])
+    matcher = KeywordMatcher({
+        "professional": DEFAULT_LEXICONS["professional"] + filler[:extra],
+        "agent_role": DEFAULT_LEXICONS["agent_role"] + filler[extra:2 * extra],
+        "customer_role": DEFAULT_LEXICONS["customer_role"] + filler[2 * extra:]
+    })
+    return legacy, matcher
+
+
+def timed(run) -> tuple:
+    start = time.perf_counter()
+    result = run()
+    return result, time.perf_counter() - start
+
+
+def run_size(corpus: list, extra: int) -> dict:
+    (professional, agent_role, customer_role), matcher = padded_lexicons(extra)
+
+    legacy_professional, legacy_professional_seconds = timed(
+        lambda: [any(k in text.lower() for k in professional) for text in corpus])
+    matcher_professional, matcher_professional_seconds = timed(
+        lambda: [matcher.contains(text, "professional") for text in corpus])
+
+    def legacy_roles():
+        scores = []
+        for text in corpus:
+            text = text.lower()
+            scores.append((sum(1 for k in agent_role if k in text), sum(1 for k in customer_role if k in text)))
+        return scores
+
+    def matcher_roles():
+        scores = []
+        for text in corpus:
+            hits = matcher.count(text, distinct=True)
+            scores.append((hits["agent_role"], hits["customer_role"]))
+        return scores
+
+    legacy_role_scores, legacy_roles_seconds = timed(legacy_roles)
+    matcher_role_scores, matcher_roles_seconds = timed(matcher_roles)
+
+    return {
+        "keywords": len(professional) + len(agent_role) + len(customer_role),
+        "professional_legacy_seconds": round(legacy_professional_seconds, 3),
+        "professional_matcher_seconds": round(matcher_professional_seconds, 3),
+        "roles_legacy_seconds": round(legacy_roles_seconds, 3),
+        "roles_matcher_seconds": round(matcher_roles_seconds, 3),
+        "professional_changed": sum(a != b for a, b in zip(legacy_professional, matcher_professional)),
+        "role_scores_changed": sum(a != b for a, b in zip(legacy_role_scores, matcher_role_scores))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the keyword matcher against substring scans")
+    parser.add_argument("--utterances", type=int, default=200_000)
+    parser.add_argument("--lexicon-sizes", default="0,100,500",
+                        help="Comma-separated number of extra keywords added to each lexicon")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+
+    corpus = synthetic_corpus(args.utterances)
+    results = [run_size(corpus, int(extra)) for extra in args.lexicon_sizes.split(",")]
+
+    if args.json:
+        print(json.dumps({"utterances": args.utterances, "results": results}, indent=2))
+        return
+
+    print(f"{args.utterances} utterances")
+    print(f"{'keywords':>9} {'prof legacy':>12} {'prof matcher':>13} {'roles legacy':>13} {'roles matcher':>14} "
+          f"{'prof changed':>13} {'roles changed':>14}")
+    for r in results:
+        print(f"{r['keywords']:>9} {r['professional_legacy_seconds']:>12} {r['professional_matcher_seconds']:>13} "
+              f"{r['roles_legacy_seconds']:>13} {r['roles_matcher_seconds']:>14} "
+              f"{r['professional_changed']:>13} {r['role_scores_changed']:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Cross-request micro-batching under many concurrent uploads.
+
+--uploads synthetic conversations are analyzed at once on one event loop (as the API does), first
+with every utterance sent as its own sentiment and intent requests, then with the micro-batcher
+collecting work from all of them into shared requests. The fake backend answers with the configured
+latency, and --rpm applies a client-side request limit like a provider's. Reports requests sent,
+requests per minute, utterances per second, per-upload latency and default results.
+
+Usage (from the repository root):
+    python -m benchmarks.microbatching [--uploads 50] [--utterances 20] [--rpm 6000] [--window-ms 25] [--json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import analyzer.analyzer as analyzer_module
+from analyzer.cache import llm_cache
+from analyzer.gateway import gateway
+from analyzer.microbatch import microbatcher
+from benchmarks.fake_groq import FakeAsyncGroqClient, FakeGroqClient, install_fake_client
+from benchmarks.suite import default_results, latency_stats, synthetic_conversation
+
+
+def request_count() -> int:
+    return sum(counters.get("requests", 0) for counters in gateway.stats()["models"].values())
+
+
+async def analyze_uploads(args) -> dict:
+    """Start all uploads together and time each one"""
+    async def upload(n: int):
+        start = time.perf_counter()
+        analysis = await analyzer_module.analyze_sentences_async(synthetic_conversation(args.utterances, seed=n))
+        return time.perf_counter() - start, analysis
+
+    return await asyncio.gather(*(upload(n) for n in range(args.uploads)))
+
+
+def run(args, microbatching: bool) -> dict:
+    microbatcher.enabled = microbatching
+    requests_before = request_count()
+    batcher_before = microbatcher.stats()
+    start = time.perf_counter()
+    uploads = asyncio.run(analyze_uploads(args))
+    wall = time.perf_counter() - start
+    requests = request_count() - requests_before
+    batcher = microbatcher.stats()
+    return {
+        "microbatching": microbatching,
+        "wall_seconds": round(wall, 3),
+        "requests": requests,
+        "requests_per_minute": round(requests / wall * 60, 1),
+        "utterances_per_second": round(args.uploads * args.utterances / wall, 1),
+        "upload_seconds": latency_stats([seconds for seconds, _ in uploads]),
+        "default_results": sum(default_results(analysis) for _, analysis in uploads),
+        "shared_requests": batcher["requests"] - batcher_before["requests"],
+        "items_batched": batcher["items"] - batcher_before["items"],
+        "batch_fallbacks": batcher["fallbacks"] - batcher_before["fallbacks"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cross-request micro-batching")
+    parser.add_argument("--uploads", type=int, default=50, help="Conversations analyzed concurrently")
+    parser.add_argument("--utterances", type=int, default=20, help="Utterances per synthetic conversation")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake backend latency per request (s)")
+    parser.add_argument("--rpm", type=float, default=6000, help="Client-side request limit (0 = unlimited)")
+    parser.add_argument("--window-ms", type=float, default=25, help="MICROBATCH_WINDOW_MS for the run")
+    parser.add_argument("--max-items", type=int, default=25, help="MICROBATCH_MAX_ITEMS for the run")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+    for handler in logging.getLogger().handlers:
+        handler.setLevel(logging.ERROR)
+
+    install_fake_client(FakeAsyncGroqClient(args.latency, 0.0), FakeGroqClient(args.latency, 0.0))
+    llm_cache.enabled = False
+    gateway.hedging.enabled = False
+    gateway.set_limits(rpm=args.rpm, tpm=0)
+    microbatcher.window_seconds = args.window_ms / 1000
+    microbatcher.max_items = args.max_items
+
+    report = {"uploads": args.uploads, "utterances": args.utterances, "rpm_limit": args.rpm,
+              "runs": [run(args, microbatching) for microbatching in (False, True)]}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{args.uploads} concurrent uploads x {args.utterances} utterances, "
+          f"{args.latency * 1000:.0f}ms per request, rpm limit {args.rpm or 'none'}")
+    print(f"{'mode':14} {'requests':>9} {'req/min':>9} {'utt/s':>8} {'wall s':>8} {'upload p50':>11} "
+          f"{'upload p99':>11} {'defaults':>9}")
+    for r in report["runs"]:
+        label = "micro-batched" if r["microbatching"] else "per-utterance"
+        print(f"{label:14} {r['requests']:>9} {r['requests_per_minute']:>9} {r['utterances_per_second']:>8} "
+              f"{r['wall_seconds']:>8} {r['upload_seconds']['p50']:>11} {r['upload_seconds']['p99']:>11} "
+              f"{r['default_results']:>9}")
+
+
+if __name__ == "__main__":
+    main()
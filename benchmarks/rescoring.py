@@ -0,0 +1,88 @@
+"""
+Time the vectorized CSAT / agent performance rescoring on a synthetic corpus and check it
+against the scalar functions.
+
+Usage (from the repository root):
+    python -m benchmarks.rescoring [--utterances 1000000] [--parity-conversations 5000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from analyzer.rescoring import rescore_columns, score_rows, verify_parity
+
+LABELS = ["extreme positive", "positive", "neutral", "negative", "extreme negative", "Positive", "mixed"]
+SPEAKERS = ["Agent", "Customer", "agent", "customer", "Supervisor"]
+SENTENCES = [
+    "I'm happy to help you with that today.",
+    "My order still hasn't arrived and I'm frustrated.",
+    "Let me check the tracking details for you.",
+    "Thank you, that fixes it.",
+    "This is the third time I've called about this.",
+    "Certainly, I can resolve that right away.",
+    "Okay.",
+    "I understand, I'm sorry for the trouble.",
+]
+
+
+def synthetic_columns(num_utterances: int, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    columns = {"conversation_id": [], "speaker": [], "sentence": [], "sentiment": [], "score": []}
+    conversation_id = 0
+    while len(columns["conversation_id"]) < num_utterances:
+        conversation_id += 1
+        for _ in range(min(rng.randint(1, 40), num_utterances - len(columns["conversation_id"]))):
+            columns["conversation_id"].append(conversation_id)
+            columns["speaker"].append(rng.choice(SPEAKERS) if rng.random() > 0.01 else None)
+            columns["sentence"].append(rng.choice(SENTENCES))
+            columns["sentiment"].append(rng.choice(LABELS) if rng.random() > 0.01 else None)
+            columns["score"].append(round(rng.random(), 3) if rng.random() > 0.01 else None)
+    return columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized rescoring")
+    parser.add_argument("--utterances", type=int, default=1_000_000)
+    parser.add_argument("--parity-conversations", type=int, default=5000,
+                        help="Conversations to check against the scalar functions (0 = all)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    columns = synthetic_columns(args.utterances)
+
+    start = time.perf_counter()
+    scores = rescore_columns(columns)
+    vectorized_seconds = time.perf_counter() - start
+    rows = score_rows(scores)
+    rows_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parity = verify_parity(columns, args.parity_conversations or None)
+    parity_seconds = time.perf_counter() - start
+
+    report = {
+        "utterances": args.utterances,
+        "conversations": len(rows),
+        "vectorized_seconds": round(vectorized_seconds, 3),
+        "vectorized_with_rows_seconds": round(rows_seconds, 3),
+        "parity": parity,
+        "parity_seconds": round(parity_seconds, 3)
+    }
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+    else:
+        print(f"{report['utterances']} utterances / {report['conversations']} conversations: "
+              f"{report['vectorized_seconds']}s vectorized, {report['vectorized_with_rows_seconds']}s with row output")
+        print(f"parity: {parity['mismatched_conversations']} mismatches in {parity['conversations_checked']} "
+              f"conversations ({report['parity_seconds']}s)")
+        for example in parity["examples"]:
+            print(f"  {example}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Validated decoding of LLM responses (analyzer.decoding).
+
+Measures decode time per response against a bare json.loads, on clean payloads and on each kind
+of garbled reply the simulated model produces, and how many of those are repaired locally. Then
+runs the data/*.txt samples against a fake client that garbles a share of its replies, with and
+without targeted re-requests, reporting calls, utterances left on default results and the
+decode counters.
+
+Usage (from the repository root):
+    python -m benchmarks.response_decoding [--responses 20000] [--malformed-rate 0.1] [--json]
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import analyzer.analyzer as analyzer_module
+from analyzer.cache import llm_cache
+from analyzer.decoding import DecodeError, decode_response, decode_stats
+from benchmarks.fake_groq import (
+    MALFORMATIONS, FakeAsyncGroqClient, fake_completion, install_fake_client, malform_completion
+)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+SENTENCES = [
+    "Thank you so much, that was really helpful!",
+    "My package still hasn't arrived and this delay is ridiculous.",
+    "Can you check the tracking number for me?",
+    "I want to speak to a supervisor right now.",
+    "Okay, I will restart the router and try again.",
+    "The invoice shows I was charged twice this month."
+]
+
+
+def sample_payloads(count: int):
+    """(kind, payload) pairs cycling through the sample sentences and the three response kinds"""
+    payloads = []
+    for i in range(count):
+        sentence = SENTENCES[i % len(SENTENCES)]
+        kind = ("sentiment", "intent", "topic")[i % 3]
+        payloads.append((kind, fake_completion(kind, [{"role": "user", "content": sentence}])))
+    return payloads
+
+
+def time_decoding(payloads, malformation=None) -> dict:
+    """Decode time per response and the share decoded, for one kind of garbling (None = clean)"""
+    contents = [(kind, json.dumps(payload) if malformation is None else malform_completion(payload, malformation))
+                for kind, payload in payloads]
+
+    start = time.perf_counter()
+    decoded = 0
+    for kind, content in contents:
+        try:
+            decode_response(kind, content)
+            decoded += 1
+        except DecodeError:
+            pass
+    elapsed = time.perf_counter() - start
+
+    report = {"malformation": malformation or "clean", "decoded_share": round(decoded / len(contents), 4),
+              "decode_us": round(elapsed / len(contents) * 1e6, 2)}
+    if malformation is None:
+        start = time.perf_counter()
+        for _, content in contents:
+            json.loads(content)
+        report["json_loads_us"] = round((time.perf_counter() - start) / len(contents) * 1e6, 2)
+    return report
+
+
+def run_samples(fake_client: FakeAsyncGroqClient, retries: int, batch_mode: bool) -> dict:
+    """Analyze every sample conversation; calls, default results and decode counters"""
+    analyzer_module.LLM_DECODE_RETRIES = retries
+    fake_client.reset()
+    decode_stats.reset()
+    utterances = defaults = 0
+    start = time.perf_counter()
+    for path in sorted(glob.glob(os.path.join(DATA_DIR, "*.txt"))):
+        with open(path, encoding="utf-8") as fh:
+            result = analyzer_module.analyze_sentences(fh.read(), batch_mode=batch_mode)
+        utterances += result["total_utterances"]
+        defaults += sum(1 for u in result["utterances"] if not analyzer_module.utterance_succeeded(u))
+    counters = fake_client.counters()
+    return {
+        "retries": retries,
+        "batch_mode": batch_mode,
+        "utterances": utterances,
+        "default_results": defaults,
+        "calls": counters["calls"],
+        "injected_malformed": sum(counters["injected_malformed"].values()),
+        "wall_seconds": round(time.perf_counter() - start, 3),
+        "decoding": decode_stats.stats()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark validated decoding and repair of LLM responses")
+    parser.add_argument("--responses", type=int, default=20000, help="Responses decoded per garbling kind")
+    parser.add_argument("--malformed-rate", type=float, default=0.1, help="Share of fake replies garbled")
+    parser.add_argument("--latency", type=float, default=0.01, help="Simulated base latency per request (s)")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+    for handler in logging.getLogger().handlers:
+        handler.setLevel(logging.ERROR)
+
+    payloads = sample_payloads(args.responses)
+    decoding = [time_decoding(payloads)] + [time_decoding(payloads, m) for m in MALFORMATIONS]
+
+    fake_client = FakeAsyncGroqClient(base_latency=args.latency, malformed_rate=args.malformed_rate, seed=7)
+    install_fake_client(fake_client)
+    llm_cache.enabled = False
+    end_to_end = [run_samples(fake_client, retries, batch_mode)
+                  for batch_mode in (False, True) for retries in (0, 1)]
+
+    report = {"decoding": decoding, "end_to_end": end_to_end}
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'reply':16} {'decoded':>8} {'us/reply':>9}")
+    for r in decoding:
+        baseline = f"  (json.loads {r['json_loads_us']} us)" if "json_loads_us" in r else ""
+        print(f"{r['malformation']:16} {r['decoded_share']:>8.1%} {r['decode_us']:>9}{baseline}")
+    print(f"\nSample conversations, {args.malformed_rate:.0%} of replies garbled:")
+    print(f"{'mode':14} {'retries':>7} {'calls':>6} {'garbled':>8} {'repaired':>9} {'re-asked':>9} {'defaults':>9}")
+    for r in end_to_end:
+        repaired = sum(c["repaired"] for c in r["decoding"].values())
+        re_requested = sum(c["re_requested"] for c in r["decoding"].values())
+        mode = "batched" if r["batch_mode"] else "per-utterance"
+        print(f"{mode:14} {r['retries']:>7} {r['calls']:>6} {r['injected_malformed']:>8} {repaired:>9} "
+              f"{re_requested:>9} {r['default_results']:>5}/{r['utterances']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Semantic cache hit rate and precision on the labeled utterance corpus.
+
+Each query is looked up in an index of labeled utterances, and a hit counts as precise when the
+reused sentiment and intent match the query's own labels. Two query sets are used:
+data/labeled_paraphrases.jsonl (rewordings of corpus lines, plus near-copies whose negation or
+wording flips the labels) against the whole corpus, and every corpus line against the rest of the
+corpus (leave-one-out: distinct utterances, where a hit is rarely right). Hit rate and precision
+are reported for a sweep of thresholds, so SEMANTIC_CACHE_THRESHOLD can be set from them.
+
+Then the paraphrases are analyzed as one conversation after the corpus has been, with and without
+the cache, on a fake chat backend that answers with the labels: LLM calls saved and the accuracy
+cost. Finally embedding and lookup latency are measured against an index of --index-size entries.
+
+Usage (from the repository root):
+    python -m benchmarks.semantic_cache [--thresholds 0.5,0.6,0.7,0.8,0.85,0.9,0.95] [--index-size 50000] [--json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import analyzer.analyzer as analyzer_module
+from analyzer.cache import llm_cache
+from analyzer.gateway import gateway
+from analyzer.semantic_cache import SEMANTIC_CACHE_DIM, SEMANTIC_CACHE_THRESHOLD, SemanticIndex, embed
+from benchmarks.cascade import LABELED_CORPUS, SENTIMENT_SCORES, labeled_completion, load_labeled_corpus
+from benchmarks.fake_groq import FakeAsyncGroqClient, install_fake_client
+from benchmarks.suite import latency_stats
+
+PARAPHRASES = os.path.join(os.path.dirname(__file__), '..', 'data', 'labeled_paraphrases.jsonl')
+MODEL = "benchmark-model"
+
+
+def labeled_results(row: Dict) -> Tuple[Dict, Dict]:
+    return ({"sentiment": row["sentiment"], "score": SENTIMENT_SCORES[row["sentiment"]], "confidence": 0.9,
+             "reason": "Labeled", "keywords": []},
+            {"intent": row["intent"], "secondary_intents": [], "confidence": 0.9, "reasoning": "Labeled"})
+
+
+def build_index(rows: List[Dict], dim: int) -> SemanticIndex:
+    index = SemanticIndex(enabled=True, threshold=0.0, dim=dim, path=None)
+    for row in rows:
+        index.add(row["text"], *labeled_results(row), model=MODEL)
+    return index
+
+
+def best_matches(index: SemanticIndex, queries: List[Dict]) -> List[Optional[Tuple[float, bool, bool]]]:
+    """(similarity, sentiment right, intent right) of each query's nearest entry, None when it has none"""
+    matches = []
+    for query, match in zip(queries, index.lookup_many([query["text"] for query in queries], MODEL)):
+        if match is None:
+            matches.append(None)
+            continue
+        sentiment_result, intent_result, similarity, _ = match
+        matches.append((similarity, sentiment_result["sentiment"] == query["sentiment"],
+                        intent_result["intent"] == query["intent"]))
+    return matches
+
+
+def sweep(matches: List[Optional[Tuple[float, bool, bool]]], thresholds: List[float]) -> List[Dict]:
+    report = []
+    for threshold in thresholds:
+        hits = [match for match in matches if match is not None and match[0] >= threshold]
+        report.append({
+            "threshold": threshold,
+            "hits": len(hits),
+            "hit_rate": round(len(hits) / len(matches), 4) if matches else 0.0,
+            "sentiment_precision": round(sum(m[1] for m in hits) / len(hits), 4) if hits else None,
+            "intent_precision": round(sum(m[2] for m in hits) / len(hits), 4) if hits else None,
+            "precision": round(sum(m[1] and m[2] for m in hits) / len(hits), 4) if hits else None
+        })
+    return report
+
+
+def leave_one_out(rows: List[Dict], dim: int) -> List[Optional[Tuple[float, bool, bool]]]:
+    return [best_matches(build_index(rows[:i] + rows[i + 1:], dim), [row])[0] for i, row in enumerate(rows)]
+
+
+def run_pipeline(rows: List[Dict], paraphrases: List[Dict], threshold: Optional[float], dim: int) -> Dict:
+    """Analyze the corpus, then the paraphrases; threshold None runs without the semantic cache"""
+    index = SemanticIndex(enabled=threshold is not None, threshold=threshold or 0.0, dim=dim, path=None)
+    analyzer_module.semantic_cache = index
+    fake = FakeAsyncGroqClient(0.02, 0.0)
+    fake.completion = labeled_completion(rows + paraphrases)
+    install_fake_client(fake)
+
+    def conversation(lines: List[Dict]) -> str:
+        return "\n".join(f"{row['speaker']}: {row['text']}" for row in lines)
+
+    asyncio.run(analyzer_module.analyze_sentences_async(conversation(rows), batch_mode=False))
+    calls_before = fake.calls
+    start = time.perf_counter()
+    analysis = asyncio.run(analyzer_module.analyze_sentences_async(conversation(paraphrases), batch_mode=False))
+    wall = time.perf_counter() - start
+    utterances = analysis["utterances"]
+    return {
+        "semantic_cache": threshold is not None,
+        "threshold": threshold,
+        "llm_calls": fake.calls - calls_before,
+        "semantic_answers": sum(1 for u in utterances if u["analysis_source"] == "semantic"),
+        "sentiment_accuracy": round(sum(u["sentiment"] == row["sentiment"] for u, row in zip(utterances, paraphrases))
+                                    / len(paraphrases), 4),
+        "intent_accuracy": round(sum(u["intent"] == row["intent"] for u, row in zip(utterances, paraphrases))
+                                 / len(paraphrases), 4),
+        "wall_seconds": round(wall, 3)
+    }
+
+
+def measure_latency(rows: List[Dict], index_size: int, dim: int, batch: int) -> Dict:
+    """Per-utterance embedding time, and lookup time (single and batched) against index_size entries"""
+    index = SemanticIndex(enabled=True, threshold=SEMANTIC_CACHE_THRESHOLD, dim=dim, max_entries=index_size,
+                          path=None)
+    texts = [row["text"] for row in rows]
+    build_start = time.perf_counter()
+    for n in range(index_size):
+        index.add(f"{texts[n % len(texts)]} reference {n}", *labeled_results(rows[n % len(rows)]), model=MODEL)
+    build_seconds = time.perf_counter() - build_start
+
+    embed_times = []
+    for text in texts:
+        start = time.perf_counter()
+        embed(text, dim)
+        embed_times.append((time.perf_counter() - start) * 1000)
+    single_times = []
+    for text in texts:
+        start = time.perf_counter()
+        index.lookup(text, MODEL)
+        single_times.append((time.perf_counter() - start) * 1000)
+    batch_times = []
+    for start_row in range(0, len(texts), batch):
+        start = time.perf_counter()
+        index.lookup_many(texts[start_row:start_row + batch], MODEL)
+        batch_times.append((time.perf_counter() - start) * 1000)
+    return {
+        "index_entries": len(index),
+        "index_megabytes": round(index_size * dim * np.dtype(np.float32).itemsize / 1e6, 1),
+        "build_seconds": round(build_seconds, 3),
+        "embed_ms": latency_stats(embed_times),
+        "lookup_ms": latency_stats(single_times),
+        f"lookup_batch_{batch}_ms": latency_stats(batch_times)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark semantic cache hit rate, precision and latency")
+    parser.add_argument("--corpus", default=LABELED_CORPUS, help="JSONL rows of speaker, text, sentiment, intent")
+    parser.add_argument("--paraphrases", default=PARAPHRASES, help="Labeled queries in the same format")
+    parser.add_argument("--thresholds", default="0.5,0.6,0.7,0.8,0.85,0.9,0.95", help="Comma-separated thresholds")
+    parser.add_argument("--threshold", type=float, default=SEMANTIC_CACHE_THRESHOLD,
+                        help="Threshold for the end-to-end run")
+    parser.add_argument("--dim", type=int, default=SEMANTIC_CACHE_DIM, help="SEMANTIC_CACHE_DIM")
+    parser.add_argument("--index-size", type=int, default=50000, help="Index entries for the latency run")
+    parser.add_argument("--batch", type=int, default=20, help="Utterances per batched lookup")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+    for handler in logging.getLogger().handlers:
+        handler.setLevel(logging.ERROR)
+
+    rows = load_labeled_corpus(args.corpus)
+    paraphrases = load_labeled_corpus(args.paraphrases)
+    thresholds = [float(value) for value in args.thresholds.split(",")]
+    llm_cache.enabled = False
+    gateway.hedging.enabled = False
+    gateway.set_limits(rpm=0, tpm=0)
+
+    report = {
+        "corpus": len(rows),
+        "paraphrases": len(paraphrases),
+        "dim": args.dim,
+        "paraphrase_queries": sweep(best_matches(build_index(rows, args.dim), paraphrases), thresholds),
+        "leave_one_out": sweep(leave_one_out(rows, args.dim), thresholds),
+        "pipeline": [run_pipeline(rows, paraphrases, threshold, args.dim) for threshold in (None, args.threshold)],
+        "latency": measure_latency(rows, args.index_size, args.dim, args.batch)
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{len(rows)} indexed utterances, {len(paraphrases)} paraphrase queries, dim {args.dim}")
+    for name in ("paraphrase_queries", "leave_one_out"):
+        print(f"\n{name}")
+        print(f"{'threshold':>10} {'hits':>6} {'hit rate':>9} {'sentiment':>10} {'intent':>8} {'both':>8}")
+        for r in report[name]:
+            print(f"{r['threshold']:>10} {r['hits']:>6} {r['hit_rate']:>9} {str(r['sentiment_precision']):>10} "
+                  f"{str(r['intent_precision']):>8} {str(r['precision']):>8}")
+    print("\nparaphrase conversation after the corpus was analyzed (labels as LLM answers)")
+    print(f"{'cache':>8} {'LLM calls':>10} {'semantic':>9} {'sentiment':>10} {'intent':>8} {'wall s':>8}")
+    for r in report["pipeline"]:
+        label = f"{r['threshold']}" if r["semantic_cache"] else "off"
+        print(f"{label:>8} {r['llm_calls']:>10} {r['semantic_answers']:>9} {r['sentiment_accuracy']:>10} "
+              f"{r['intent_accuracy']:>8} {r['wall_seconds']:>8}")
+    latency = report["latency"]
+    print(f"\n{latency['index_entries']} entries ({latency['index_megabytes']} MB), built in "
+          f"{latency['build_seconds']}s")
+    for name in ("embed_ms", "lookup_ms", f"lookup_batch_{args.batch}_ms"):
+        print(f"{name:>20}: p50 {latency[name]['p50']}  p99 {latency[name]['p99']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+"""
+Hermetic end-to-end benchmark suite.
+
+Swaps the Groq SDK for the simulated clients in benchmarks.fake_groq (configurable latency
+distribution, hung requests, injected 500s and 429s with Retry-After, garbled JSON replies)
+and drives:
+  - analyze_sentences on synthetic conversations of each requested size,
+  - the FastAPI /analyze/ route through a TestClient with the same conversations,
+  - process_audio_file on data/Call01.wav (diarization stubbed, or the real pyannote pipeline),
+  - the /analyze/ route with the same audio upload.
+
+Every scenario reports p50/p95/p99 latency, throughput, LLM calls per conversation, injected
+faults and utterances left with default results, as JSON that can be saved per commit and
+compared with --compare. Runs in a temporary directory, so the database, logs and transcript
+files it produces never touch the working tree.
+
+Usage (from the repository root):
+    python -m benchmarks.suite [--sizes 10,100,1000,5000] [--latency-distribution lognormal]
+        [--error-rate 0.01] [--rate-limit-rate 0.02] [--malformed-rate 0.05]
+        [--output bench.json] [--compare baseline.json]
+"""
+import argparse
+import functools
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import soundfile as sf
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(REPO_ROOT)
+
+from benchmarks.fake_groq import LATENCY_DISTRIBUTIONS, FakeAsyncGroqClient, FakeGroqClient, install_fake_client
+
+DEFAULT_AUDIO = os.path.join(REPO_ROOT, 'data', 'Call01.wav')
+
+CUSTOMER_LINES = [
+    "Hi, I was charged twice on my last bill and I want a refund.",
+    "My package still has not been delivered and the tracking page is stuck.",
+    "The router keeps dropping the connection every few minutes.",
+    "I can't log in to my account, the password reset email never arrives.",
+    "This is the third time I'm calling about this, it's really frustrating.",
+    "Could you check the order number for me? It's #SF123456.",
+    "Okay.",
+    "Thank you so much, that's really helpful!",
+    "I want to cancel my subscription if this isn't fixed today.",
+    "Can I speak to a supervisor please?",
+]
+AGENT_LINES = [
+    "Thank you for calling, how can I help you today?",
+    "I'm sorry to hear that, let me check the details for you.",
+    "Please hold for a moment while I look into this.",
+    "I can see the duplicate charge on your invoice, I'll open a refund request.",
+    "The courier shows the package at the local depot, it should arrive tomorrow.",
+    "Let's restart the router and install the latest firmware.",
+    "I've sent a new password reset link to your email.",
+    "Is there anything else I can help you with?",
+    "Certainly, I understand, I'll make sure this gets resolved.",
+    "Sure.",
+]
+
+
+def synthetic_conversation(num_utterances: int, seed: int) -> str:
+    """An alternating Customer/Agent call of num_utterances lines, deterministic for a seed"""
+    rng = np.random.default_rng(seed)
+    lines = []
+    for i in range(num_utterances):
+        if i % 2 == 0:
+            lines.append(f"Customer: {CUSTOMER_LINES[rng.integers(len(CUSTOMER_LINES))]}")
+        else:
+            lines.append(f"Agent: {AGENT_LINES[rng.integers(len(AGENT_LINES))]}")
+    return "\n".join(lines)
+
+
+class StubTurn:
+    def __init__(self, start: float, end: float):
+        self.start = start
+        self.end = end
+
+
+class StubAnnotation:
+    def __init__(self, turns: List):
+        self.turns = turns
+
+    def itertracks(self, yield_label: bool = False):
+        for start, end, label in self.turns:
+            yield StubTurn(start, end), None, label
+
+
+class StubDiarizationPipeline:
+    """
+    Stands in for the pyannote pipeline: alternates two speakers every turn_seconds across the
+    file, after sleeping real_time_factor × the audio duration like a CPU pipeline would.
+    """
+
+    def __init__(self, turn_seconds: float = 6.0, real_time_factor: float = 0.05):
+        self.turn_seconds = turn_seconds
+        self.real_time_factor = real_time_factor
+
+    def __call__(self, file: Dict, num_speakers: int = 2):
+        duration = sf.info(file["audio"]).duration
+        time.sleep(duration * self.real_time_factor)
+        turns = []
+        start = 0.0
+        while start < duration:
+            end = min(duration, start + self.turn_seconds)
+            turns.append((start, end, f"SPEAKER_{len(turns) % num_speakers:02d}"))
+            start = end
+        return StubAnnotation(turns)
+
+
+def ensure_pyannote_importable(diarization: str):
+    """The audio pipeline imports pyannote at module level; stub the package when it is not installed"""
+    try:
+        import pyannote.audio  # noqa: F401
+    except ImportError:
+        if diarization == "real":
+            raise SystemExit("pyannote.audio is not installed; run with --diarization stub")
+        package = types.ModuleType("pyannote")
+        module = types.ModuleType("pyannote.audio")
+        module.Pipeline = None
+        package.audio = module
+        sys.modules["pyannote"] = package
+        sys.modules["pyannote.audio"] = module
+
+
+def latency_stats(latencies: List[float]) -> Dict:
+    values = np.array(latencies, dtype=np.float64)
+    return {
+        "p50": round(float(np.percentile(values, 50)), 4),
+        "p95": round(float(np.percentile(values, 95)), 4),
+        "p99": round(float(np.percentile(values, 99)), 4),
+        "mean": round(float(values.mean()), 4),
+        "min": round(float(values.min()), 4),
+        "max": round(float(values.max()), 4)
+    }
+
+
+def default_results(analysis: Dict) -> int:
+    """Utterances whose sentiment or intent fell back to the default (failed) result"""
+    return sum(1 for u in analysis.get("utterances", [])
+               if u.get("reason") == "Default" or u.get("intent_reasoning") == "Default")
+
+
+def summarize_scenario(name: str, samples: List[Dict], wall_seconds: float) -> Dict:
+    """Aggregate per-run samples ({seconds, ok, utterances, defaults, counters}) into one scenario result"""
+    runs = len(samples)
+    utterances = round(sum(s["utterances"] for s in samples) / runs)
+    succeeded = [s for s in samples if s["ok"]]
+    calls_by_kind = {}
+    for sample in samples:
+        for kind, count in sample["counters"]["calls_by_kind"].items():
+            calls_by_kind[kind] = calls_by_kind.get(kind, 0) + count
+
+    return {
+        "scenario": name,
+        "utterances": utterances,
+        "runs": runs,
+        "failures": runs - len(succeeded),
+        "latency_seconds": latency_stats([s["seconds"] for s in samples]),
+        "throughput": {
+            "conversations_per_second": round(runs / wall_seconds, 3) if wall_seconds else None,
+            "utterances_per_second": round(runs * utterances / wall_seconds, 1) if wall_seconds and utterances else None
+        },
+        "calls_per_conversation": round(sum(s["counters"]["calls"] for s in samples) / runs, 2),
+        "calls_by_kind": {kind: round(count / runs, 2) for kind, count in sorted(calls_by_kind.items())},
+        "injected_errors": sum(s["counters"]["injected_errors"] for s in samples),
+        "injected_rate_limits": sum(s["counters"]["injected_rate_limits"] for s in samples),
+        "injected_malformed": sum(s["counters"]["injected_malformed"] for s in samples),
+        "default_results_per_conversation": round(sum(s["defaults"] for s in samples) / runs, 2)
+    }
+
+
+def counters_since(clients: List, before: List[Dict]) -> Dict:
+    """Calls and injected faults on the fake clients since `before` was taken"""
+    result = {"calls": 0, "calls_by_kind": {}, "injected_errors": 0, "injected_rate_limits": 0,
+              "injected_malformed": 0}
+    for client, start in zip(clients, before):
+        now = client.counters()
+        result["calls"] += now["calls"] - start["calls"]
+        result["injected_errors"] += now["injected_errors"] - start["injected_errors"]
+        result["injected_rate_limits"] += now["injected_rate_limits"] - start["injected_rate_limits"]
+        result["injected_malformed"] += (sum(now["injected_malformed"].values())
+                                         - sum(start["injected_malformed"].values()))
+        for kind, count in now["calls_by_kind"].items():
+            delta = count - start["calls_by_kind"].get(kind, 0)
+            if delta:
+                result["calls_by_kind"][kind] = result["calls_by_kind"].get(kind, 0) + delta
+    return result
+
+
+def measure(name: str, runs: int, run_once, clients: List) -> Dict:
+    """Call run_once(run_index) -> (ok, utterances, defaults) `runs` times and summarize"""
+    samples = []
+    wall_start = time.perf_counter()
+    for run in range(runs):
+        before = [client.counters() for client in clients]
+        start = time.perf_counter()
+        try:
+            ok, utterances, defaults = run_once(run)
+        except Exception as e:
+            logging.getLogger(__name__).error(f"{name} run {run} failed: {str(e)}")
+            ok, utterances, defaults = False, 0, 0
+        samples.append({"seconds": time.perf_counter() - start, "ok": ok, "utterances": utterances,
+                        "defaults": defaults, "counters": counters_since(clients, before)})
+    return summarize_scenario(name, samples, time.perf_counter() - wall_start)
+
+
+def runs_for(size: int, args) -> int:
+    """Fewer repetitions for large conversations, so each size costs about the same"""
+    return max(1, min(args.runs, args.utterance_budget // max(1, size)))
+
+
+def run_suite(args) -> Dict:
+    # Imported here, after the working directory moved to the scratch directory, because these
+    # modules open log files and the SQLite database relative to the current directory
+    import analyzer.analyzer as analyzer_module
+    import analyzer.audio_processor as audio_processor
+    import api.main as api_main
+    from analyzer.cache import llm_cache
+    from fastapi.testclient import TestClient
+
+    logging.getLogger().setLevel(logging.DEBUG if args.verbose else logging.CRITICAL)
+    for handler in logging.getLogger().handlers:
+        handler.setLevel(logging.DEBUG if args.verbose else logging.CRITICAL)
+
+    fault_settings = dict(latency_distribution=args.latency_distribution, latency_spread=args.latency_spread,
+                          error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                          retry_after=args.retry_after, straggler_rate=args.straggler_rate,
+                          straggler_latency=args.straggler_latency)
+    chat_client = FakeAsyncGroqClient(args.latency, args.per_token_latency, seed=args.seed,
+                                      malformed_rate=args.malformed_rate, **fault_settings)
+    transcription_client = FakeGroqClient(args.transcription_latency, args.per_token_latency, seed=args.seed + 1,
+                                          **fault_settings)
+    install_fake_client(chat_client, transcription_client)
+    clients = [chat_client, transcription_client]
+    llm_cache.enabled = args.cache
+
+    if args.diarization == "stub":
+        audio_processor.pipeline = StubDiarizationPipeline(args.turn_seconds, args.diarization_rtf)
+    elif audio_processor.pipeline is None:
+        raise SystemExit("The real diarization pipeline did not load (check HF_TOKEN); run with --diarization stub")
+    # Transcript files go to the scratch directory instead of /data/transcripts
+    api_main.save_transcript_file = functools.partial(audio_processor.save_transcript_file,
+                                                      output_dir=os.path.join(os.getcwd(), "transcripts"))
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    scenarios = set(args.scenarios.split(","))
+    results = []
+
+    if "analyze" in scenarios:
+        for size in sizes:
+            def run_analyze(run, size=size):
+                analysis = analyzer_module.analyze_sentences(synthetic_conversation(size, args.seed + run))
+                return "error" not in analysis, size, default_results(analysis)
+            results.append(measure("analyze_sentences", runs_for(size, args), run_analyze, clients))
+            print_progress(results[-1])
+
+    with TestClient(api_main.app, raise_server_exceptions=False) as client:
+        if "api" in scenarios:
+            for size in sizes:
+                def run_api(run, size=size):
+                    body = synthetic_conversation(size, args.seed + run).encode("utf-8")
+                    # force: measure analysis, not the duplicate lookup of an earlier run's upload
+                    response = client.post("/analyze/", files={"file": ("conversation.txt", body, "text/plain")},
+                                           data={"domain": "general", "force": "true"})
+                    if response.status_code != 200:
+                        return False, size, 0
+                    return True, size, default_results(response.json()["data"])
+                results.append(measure("api_analyze_text", runs_for(size, args), run_api, clients))
+                print_progress(results[-1])
+
+        if "audio" in scenarios:
+            def run_audio(run):
+                text = audio_processor.process_audio_file(args.audio)
+                return bool(text.strip()), len(text.strip().splitlines()), 0
+            results.append(measure("process_audio_file", args.audio_runs, run_audio, clients))
+            print_progress(results[-1])
+
+        if "api_audio" in scenarios:
+            with open(args.audio, "rb") as fh:
+                audio_bytes = fh.read()
+
+            def run_api_audio(run):
+                response = client.post("/analyze/", files={"file": (os.path.basename(args.audio), audio_bytes,
+                                                                    "audio/wav")},
+                                       data={"domain": "general", "force": "true"})
+                if response.status_code != 200:
+                    return False, 0, 0
+                data = response.json()["data"]
+                return True, data.get("total_utterances", 0), default_results(data)
+            results.append(measure("api_analyze_audio", args.audio_runs, run_api_audio, clients))
+            print_progress(results[-1])
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": {
+                "latency": args.latency, "latency_distribution": args.latency_distribution,
+                "latency_spread": args.latency_spread, "per_token_latency": args.per_token_latency,
+                "transcription_latency": args.transcription_latency, "error_rate": args.error_rate,
+                "rate_limit_rate": args.rate_limit_rate, "retry_after": args.retry_after,
+                "malformed_rate": args.malformed_rate, "straggler_rate": args.straggler_rate,
+                "straggler_latency": args.straggler_latency,
+                "cache": args.cache, "diarization": args.diarization, "seed": args.seed,
+                "analyzer_concurrency": analyzer_module.ANALYZER_CONCURRENCY
+            }
+        },
+        "results": results
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def print_progress(result: Dict):
+    latency = result["latency_seconds"]
+    print(f"{result['scenario']:20} {result['utterances']:>6} utt x{result['runs']:<3} "
+          f"p50 {latency['p50']:>8.3f}s  p95 {latency['p95']:>8.3f}s  p99 {latency['p99']:>8.3f}s  "
+          f"{result['calls_per_conversation']:>8} calls  {result['default_results_per_conversation']:>6} defaults  "
+          f"{result['failures']} failed", file=sys.stderr)
+
+
+def compare(report: Dict, baseline: Dict) -> List[Dict]:
+    """Relative change of the headline metrics for scenarios present in both reports"""
+    previous = {(r["scenario"], r["utterances"]): r for r in baseline.get("results", [])}
+    rows = []
+    for result in report["results"]:
+        before = previous.get((result["scenario"], result["utterances"]))
+        if before is None:
+            continue
+        row = {"scenario": result["scenario"], "utterances": result["utterances"]}
+        for label, now, then in (
+                ("p50", result["latency_seconds"]["p50"], before["latency_seconds"]["p50"]),
+                ("p95", result["latency_seconds"]["p95"], before["latency_seconds"]["p95"]),
+                ("p99", result["latency_seconds"]["p99"], before["latency_seconds"]["p99"]),
+                ("calls", result["calls_per_conversation"], before["calls_per_conversation"])):
+            row[label] = {"before": then, "after": now,
+                          "change_pct": round((now - then) / then * 100, 1) if then else None}
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hermetic end-to-end benchmark suite with a simulated Groq backend")
+    parser.add_argument("--sizes", default="10,100,1000,5000", help="Comma-separated conversation lengths")
+    parser.add_argument("--runs", type=int, default=10, help="Repetitions per size (capped by --utterance-budget)")
+    parser.add_argument("--utterance-budget", type=int, default=5000,
+                        help="Utterances analyzed per size; large sizes run fewer times")
+    parser.add_argument("--scenarios", default="analyze,api,audio,api_audio",
+                        help="Any of analyze, api, audio, api_audio")
+    parser.add_argument("--latency", type=float, default=0.02, help="Base chat latency per request (s)")
+    parser.add_argument("--latency-distribution", choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--latency-spread", type=float, default=0.5,
+                        help="Uniform half-width (s) or lognormal shape")
+    parser.add_argument("--per-token-latency", type=float, default=0.00002,
+                        help="Added latency per prompt/response token (s); per KB of audio for transcription")
+    parser.add_argument("--transcription-latency", type=float, default=0.1, help="Base transcription latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with a 429")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="Retry-After sent with injected 429s (s)")
+    parser.add_argument("--straggler-rate", type=float, default=0.0, help="Fraction of requests that hang")
+    parser.add_argument("--straggler-latency", type=float, default=20.0, help="How long a hung request takes (s)")
+    parser.add_argument("--malformed-rate", type=float, default=0.0,
+                        help="Fraction of chat replies garbled (prose, fences, string numbers, synonyms, truncation)")
+    parser.add_argument("--cache", action="store_true", help="Keep the LLM result cache enabled")
+    parser.add_argument("--audio", default=DEFAULT_AUDIO, help="Audio file for the audio scenarios")
+    parser.add_argument("--audio-runs", type=int, default=3)
+    parser.add_argument("--diarization", choices=("stub", "real"), default="stub")
+    parser.add_argument("--diarization-rtf", type=float, default=0.05,
+                        help="Stub diarization time as a fraction of the audio duration")
+    parser.add_argument("--turn-seconds", type=float, default=6.0, help="Stub diarization speaker turn length")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", help="Earlier JSON report to compare against")
+    parser.add_argument("--verbose", action="store_true", help="Show application logs")
+    args = parser.parse_args()
+
+    args.audio = os.path.abspath(args.audio)
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+    ensure_pyannote_importable(args.diarization)
+
+    scratch = tempfile.mkdtemp(prefix="speech2sense-bench-")
+    cwd = os.getcwd()
+    os.chdir(scratch)
+    try:
+        report = run_suite(args)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        report["comparison"] = {"baseline_commit": baseline.get("meta", {}).get("commit"),
+                                "scenarios": compare(report, baseline)}
+
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
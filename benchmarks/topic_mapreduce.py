@@ -0,0 +1,137 @@
+"""
+Topic detection on synthetic long call transcripts (2,000 utterances by default): the old single
+prompt against a model with an 8k context window, the single prompt with no context limit, and the
+map-reduce path (token-bounded chunks classified concurrently, then merged).
+
+Each transcript is built from topic segments of different lengths, so the expected primary
+topic is the one with the most text.
+
+Usage (from the repository root):
+    python -m benchmarks.topic_mapreduce [--utterances 2000] [--conversations 5] [--json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import analyzer.analyzer as analyzer_module
+import analyzer.topics as topics_module
+from analyzer.batching import estimate_tokens
+from analyzer.cache import llm_cache
+from benchmarks.fake_groq import FakeAsyncGroqClient, install_fake_client
+
+SEGMENT_LINES = {
+    "billing": [
+        "Customer: I was charged twice on my last bill and I want a refund.",
+        "Agent: I can see the duplicate charge on your invoice, let me open a refund request.",
+        "Customer: The payment went out of my account on the fifth.",
+        "Agent: The refund should reach your card within five business days."
+    ],
+    "shipping": [
+        "Customer: My package still has not been delivered and the tracking page is stuck.",
+        "Agent: Let me check the shipment with the courier for you.",
+        "Customer: It was supposed to be delivered on Monday.",
+        "Agent: The courier shows the package at the local depot, it should arrive tomorrow."
+    ],
+    "technical_support": [
+        "Customer: The router keeps dropping the connection every few minutes.",
+        "Agent: Could you restart the router and tell me which error light is on?",
+        "Customer: I tried to reset it already and the error is still there.",
+        "Agent: Let's install the latest firmware and reset it once more."
+    ],
+    "filler": [
+        "Customer: Okay.",
+        "Agent: Thank you for waiting.",
+        "Customer: Sure, go ahead.",
+        "Agent: Is there anything else I can help you with?"
+    ]
+}
+
+
+def synthetic_transcript(utterances: int, seed: int):
+    """A long call made of topic segments; returns (text, expected primary topic)"""
+    rng = random.Random(seed)
+    topics = ["billing", "shipping", "technical_support"]
+    rng.shuffle(topics)
+    # The first topic dominates the call; the others come up briefly
+    shares = {topics[0]: 0.55, topics[1]: 0.25, topics[2]: 0.1, "filler": 0.1}
+
+    lines = []
+    for topic, share in shares.items():
+        lines.extend(rng.choice(SEGMENT_LINES[topic]) for _ in range(int(utterances * share)))
+    lines.extend(rng.choice(SEGMENT_LINES["filler"]) for _ in range(utterances - len(lines)))
+    # Keep segments contiguous but vary where the dominant topic sits in the call
+    offset = rng.randrange(len(lines))
+    lines = lines[offset:] + lines[:offset]
+    return "\n".join(lines), topics[0]
+
+
+def run_strategy(texts, fake_client: FakeAsyncGroqClient, single_call_tokens: int) -> dict:
+    topics_module.TOPIC_SINGLE_CALL_TOKENS = single_call_tokens
+    fake_client.reset()
+    results = []
+    start = time.perf_counter()
+    for text, expected in texts:
+        result = asyncio.run(analyzer_module.detect_topics_async(text))
+        results.append((result, expected))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "calls": fake_client.calls,
+        "max_prompt_tokens": fake_client.max_prompt_tokens,
+        "wall_seconds": round(elapsed, 3),
+        "per_conversation_seconds": round(elapsed / len(texts), 3),
+        "correct_primary": sum(1 for r, expected in results if r.get("primary_topic") == expected),
+        "general_fallbacks": sum(1 for r, _ in results if r.get("primary_topic") == "general"),
+        "mean_confidence": round(sum(float(r.get("confidence", 0)) for r, _ in results) / len(results), 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark map-reduce topic detection on long transcripts")
+    parser.add_argument("--utterances", type=int, default=2000, help="Utterances per synthetic transcript")
+    parser.add_argument("--conversations", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated base latency per request (s)")
+    parser.add_argument("--per-token-latency", type=float, default=0.0002,
+                        help="Simulated latency per prompt/response token (s)")
+    parser.add_argument("--context-window", type=int, default=8192, help="Simulated model context window")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+
+    llm_cache.enabled = False
+    texts = [synthetic_transcript(args.utterances, seed) for seed in range(args.conversations)]
+    tokens = sum(estimate_tokens(text) for text, _ in texts) // len(texts)
+
+    limited = FakeAsyncGroqClient(args.latency, args.per_token_latency, context_window=args.context_window)
+    unlimited = FakeAsyncGroqClient(args.latency, args.per_token_latency)
+    no_split = 10 ** 9
+    default_threshold = topics_module.TOPIC_SINGLE_CALL_TOKENS
+
+    install_fake_client(limited)
+    report = {"conversations": args.conversations, "utterances": args.utterances, "avg_tokens": tokens,
+              "single_call_context_limited": run_strategy(texts, limited, no_split)}
+    install_fake_client(unlimited)
+    report["single_call_unlimited"] = run_strategy(texts, unlimited, no_split)
+    install_fake_client(limited)
+    report["map_reduce"] = run_strategy(texts, limited, default_threshold)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{args.conversations} transcripts x {args.utterances} utterances (~{tokens} tokens each), "
+          f"context window {args.context_window}")
+    print(f"{'strategy':30} {'calls':>6} {'max prompt':>11} {'s/conv':>8} {'correct':>8} {'general':>8} {'conf':>6}")
+    for name in ("single_call_context_limited", "single_call_unlimited", "map_reduce"):
+        r = report[name]
+        print(f"{name:30} {r['calls']:>6} {r['max_prompt_tokens']:>11} {r['per_conversation_seconds']:>8} "
+              f"{r['correct_primary']:>8} {r['general_fallbacks']:>8} {r['mean_confidence']:>6}")
+
+
+if __name__ == "__main__":
+    main()
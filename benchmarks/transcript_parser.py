@@ -0,0 +1,145 @@
+"""
+Transcript parsing: the previous extract_speaker_utterances (split the whole text, then scan)
+against the streaming parser in analyzer.transcript, on a synthetic export of a given size.
+
+Reports throughput and peak traced memory for the old parser on an in-memory string, the new
+parser on the same string, and the new parser streaming from the file on disk. Also checks that
+both parsers agree on the sample conversations in data/.
+
+Usage (from the repository root):
+    python -m benchmarks.transcript_parser [--size-mb 100] [--json]
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import List, Tuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from analyzer.transcript import iter_file_utterances, iter_speaker_utterances
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+SPEAKERS = ["Agent", "Customer", "Support Rep", "Caller", "Supervisor"]
+WORDS = ("order refund package delivered charged twice account router reset password thanks "
+         "please wait minute check system invoice tracking number replacement sorry").split()
+
+
+def legacy_extract_speaker_utterances(text: str) -> List[Tuple[str, str]]:
+    """extract_speaker_utterances before the streaming parser, without its per-line logging"""
+    lines = text.strip().split("\n")
+    utterances = []
+    for line in lines:
+        line = line.strip()
+        if not line or ":" not in line:
+            continue
+        speaker, message = line.split(":", 1)
+        speaker = speaker.strip()
+        message = message.strip()
+        if speaker and message:
+            if any(word in speaker.lower() for word in ['agent', 'support', 'rep', 'staff']):
+                speaker = "Agent"
+            elif any(word in speaker.lower() for word in ['customer', 'client', 'user', 'caller']):
+                speaker = "Customer"
+            utterances.append((speaker, message))
+    return utterances
+
+
+def write_synthetic_transcript(path: str, size_mb: float, seed: int = 0) -> int:
+    """Write a timestamp-free transcript of about size_mb megabytes; returns bytes written"""
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    written = 0
+    with open(path, "w", encoding="utf-8") as fh:
+        while written < target:
+            block = []
+            for _ in range(1000):
+                speaker = rng.choice(SPEAKERS)
+                block.append(f"{speaker}: {' '.join(rng.choices(WORDS, k=rng.randint(5, 25)))}.\n")
+            chunk = "".join(block)
+            fh.write(chunk)
+            written += len(chunk)
+    return written
+
+
+def measure(label: str, run, size_bytes: int) -> dict:
+    """Wall time from an untraced run, then peak allocations from a traced one"""
+    start = time.perf_counter()
+    count = run()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "parser": label,
+        "utterances": count,
+        "seconds": round(elapsed, 3),
+        "mb_per_second": round(size_bytes / 1024 / 1024 / elapsed, 1) if elapsed else None,
+        "peak_mb": round(peak / 1024 / 1024, 1)
+    }
+
+
+def check_parity() -> dict:
+    """Both parsers on the bundled sample conversations"""
+    report = {}
+    for path in sorted(glob.glob(os.path.join(DATA_DIR, "*.txt"))):
+        with open(path, encoding="utf-8") as fh:
+            text = fh.read()
+        report[os.path.basename(path)] = legacy_extract_speaker_utterances(text) == list(iter_speaker_utterances(text))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the streaming transcript parser")
+    parser.add_argument("--size-mb", type=float, default=100, help="Size of the synthetic transcript")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+
+    logging.getLogger("analyzer.transcript").setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "transcript.txt")
+        size = write_synthetic_transcript(path, args.size_mb)
+
+        def old_in_memory():
+            with open(path, encoding="utf-8") as fh:
+                return len(legacy_extract_speaker_utterances(fh.read()))
+
+        def new_in_memory():
+            with open(path, encoding="utf-8") as fh:
+                return len(list(iter_speaker_utterances(fh.read())))
+
+        def new_streaming():
+            # Consume without keeping results, as a corpus job writing utterances out would
+            return sum(1 for _ in iter_file_utterances(path))
+
+        results = [
+            measure("legacy (whole text)", old_in_memory, size),
+            measure("streaming (whole text)", new_in_memory, size),
+            measure("streaming (file, consumed)", new_streaming, size)
+        ]
+
+    report = {"size_mb": round(size / 1024 / 1024, 1), "results": results, "parity": check_parity()}
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"Synthetic transcript: {report['size_mb']} MB")
+    print(f"{'parser':28} {'utterances':>11} {'seconds':>8} {'MB/s':>7} {'peak MB':>8}")
+    for r in results:
+        print(f"{r['parser']:28} {r['utterances']:>11} {r['seconds']:>8} {r['mb_per_second']:>7} {r['peak_mb']:>8}")
+    print("Parity on data/*.txt: " + ", ".join(f"{name}={ok}" for name, ok in report["parity"].items()))
+
+
+if __name__ == "__main__":
+    main()
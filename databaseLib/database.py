@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
 from databaseLib.models import Base
 
@@ -9,6 +9,25 @@ engine = create_engine(
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Columns added to existing tables after their first release; create_all only creates missing tables
+ADDED_COLUMNS = {
+    "utterances": {"analysis_source": "VARCHAR"},
+}
+
+
+def add_missing_columns(bind=engine):
+    """Add ADDED_COLUMNS to tables of a database created before them (nullable, so old rows read NULL)"""
+    inspector = inspect(bind)
+    with bind.begin() as connection:
+        for table, columns in ADDED_COLUMNS.items():
+            if not inspector.has_table(table):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table)}
+            for name, column_type in columns.items():
+                if name not in existing:
+                    connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}"))
+
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text, JSON, Boolean
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text, JSON, Boolean, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -41,6 +41,8 @@ class Conversation(Base):
     # Relationships
     utterances = relationship("Utterance", back_populates="conversation", cascade="all, delete-orphan")
     analysis_results = relationship("AnalysisResult", back_populates="conversation", cascade="all, delete-orphan")
+    fingerprints = relationship("ConversationFingerprint", back_populates="conversation",
+                                cascade="all, delete-orphan")
 
 
 class Utterance(Base):
@@ -68,6 +70,9 @@ class Utterance(Base):
     intent_reasoning = Column(Text)
 
     # Metadata
+    # The analyzer's analysis_source (llm, batch, lexicon, semantic, distilled, error, ...);
+    # NULL for rows stored before it was recorded
+    analysis_source = Column(String)
     processed_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -103,6 +108,102 @@ class AnalysisResult(Base):
 
     # Relationships
     conversation = relationship("Conversation", back_populates="analysis_results")
+    llm_calls = relationship("LLMCallRecord", back_populates="analysis_result", cascade="all, delete-orphan")
+
+
+class LLMCallRecord(Base):
+    __tablename__ = 'llm_calls'
+
+    id = Column(Integer, primary_key=True, index=True)
+    analysis_result_id = Column(Integer, ForeignKey('analysis_results.id', ondelete='CASCADE'), index=True)
+
+    # What was called
+    stage = Column(String, index=True)  # transcription, diarization, topic, sentiment, intent, batch, ...
+    operation = Column(String)  # chat, transcription, local
+    backend = Column(String)
+    model = Column(String)
+
+    # Timing
+    started_at = Column(DateTime)
+    wall_seconds = Column(Float)  # Including rate-limit waits and retries
+    queued_seconds = Column(Float)  # Time spent waiting on rate limits and backoff
+
+    # Usage
+    prompt_tokens = Column(Integer)
+    completion_tokens = Column(Integer)
+    tokens_estimated = Column(Boolean, default=False)  # True when the server did not report usage
+
+    # Outcome
+    retries = Column(Integer, default=0)
+    outcome = Column(String, index=True)  # ok, error, cancelled
+    error = Column(Text)
+
+    # Relationships
+    analysis_result = relationship("AnalysisResult", back_populates="llm_calls")
+
+
+class LLMCacheEntry(Base):
+    __tablename__ = 'llm_cache_entries'
+
+    # Content-addressed key: hash of normalized input + prompt, few-shot examples, model and temperature
+    cache_key = Column(String, primary_key=True)
+    kind = Column(String, index=True)  # sentiment, intent, topic
+    model = Column(String)
+    result = Column(JSON)
+
+    # Usage tracking for TTL and size-based eviction
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    last_accessed_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class ConversationFingerprint(Base):
+    __tablename__ = 'conversation_fingerprints'
+
+    id = Column(Integer, primary_key=True, index=True)
+    conversation_id = Column(Integer, ForeignKey('conversations.id', ondelete='CASCADE'), index=True)
+    domain = Column(String, default="general")
+
+    # Exact duplicates: SHA-256 of the normalized utterances
+    content_hash = Column(String, index=True)
+    # Near duplicates: MinHash signature (uint32 per permutation) indexed in memory with LSH
+    minhash = Column(LargeBinary)
+    total_utterances = Column(Integer)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relationships
+    conversation = relationship("Conversation", back_populates="fingerprints")
+
+
+class AnalysisJob(Base):
+    __tablename__ = 'analysis_jobs'
+
+    id = Column(String, primary_key=True)  # UUID returned to the client
+    kind = Column(String, index=True)  # analyze, transcribe
+    status = Column(String, index=True, default="queued")  # queued, running, completed, failed, cancelled, timed_out
+
+    # Progress reporting
+    stage = Column(String, default="queued")
+    progress = Column(Float, default=0.0)  # Percent done, 0-100
+
+    # Input
+    filename = Column(String)
+    input_path = Column(String)  # Uploaded file kept on disk until the job finishes
+    is_audio = Column(Boolean, default=False)
+    domain = Column(String, default="general")
+    timeout_seconds = Column(Float)
+
+    # Output
+    result = Column(JSON)
+    error = Column(Text)
+    conversation_db_id = Column(Integer, ForeignKey('conversations.id', ondelete='SET NULL'), nullable=True)
+
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
 class AgentPerformanceMetrics(Base):
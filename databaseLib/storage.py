@@ -0,0 +1,288 @@
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from databaseLib.models import Conversation, ConversationFingerprint, Utterance, AnalysisResult, LLMCallRecord
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_VERSION = "2.1.0"
+
+
+def conversation_fields(analysis_data: dict) -> dict:
+    """Conversation column values for an analysis result"""
+    return dict(
+        raw_text=analysis_data.get('raw_text', ''),
+        domain=analysis_data.get('domain', 'general'),
+        primary_topic=analysis_data.get('topic_analysis', {}).get('primary_topic'),
+        topics=analysis_data.get('topic_analysis', {}).get('topics', []),
+        topic_confidence=analysis_data.get('topic_analysis', {}).get('confidence'),
+        topic_reasoning=analysis_data.get('topic_analysis', {}).get('reasoning'),
+        csat_score=analysis_data.get('csat_analysis', {}).get('csat_score'),
+        csat_rating=analysis_data.get('csat_analysis', {}).get('csat_rating'),
+        csat_methodology=analysis_data.get('csat_analysis', {}).get('methodology'),
+        agent_performance_score=analysis_data.get('agent_performance', {}).get('overall_score'),
+        agent_performance_rating=analysis_data.get('agent_performance', {}).get('rating'),
+        agent_sentiment_avg=analysis_data.get('agent_performance', {}).get('agent_sentiment_avg'),
+        professionalism_score=analysis_data.get('agent_performance', {}).get('professionalism_score'),
+        customer_sentiment_improvement=analysis_data.get('agent_performance', {}).
+        get('customer_sentiment_improvement'),
+        total_utterances=analysis_data.get('total_utterances'),
+        speakers=analysis_data.get('speakers', [])
+    )
+
+
+def add_utterance_rows(db: Session, conversation_db_id: int, analysis_data: dict):
+    for utterance_data in analysis_data.get('utterances', []):
+        utterance = Utterance(
+            conversation_id=conversation_db_id,
+            utterance_id=utterance_data.get('utterance_id'),
+            speaker=utterance_data.get('speaker_name', utterance_data.get('speaker')),
+            sentence=utterance_data.get('sentence'),
+            sentiment=utterance_data.get('sentiment'),
+            sentiment_score=utterance_data.get('score'),
+            sentiment_reason=utterance_data.get('reason'),
+            sentiment_keywords=utterance_data.get('keywords', []),
+            sentiment_confidence=utterance_data.get('sentiment_confidence'),
+            intent=utterance_data.get('intent'),
+            secondary_intents=utterance_data.get('secondary_intents', []),
+            intent_confidence=utterance_data.get('intent_confidence'),
+            intent_reasoning=utterance_data.get('intent_reasoning'),
+            analysis_source=utterance_data.get('analysis_source')
+        )
+        db.add(utterance)
+
+
+def add_fingerprint_row(db: Session, conversation_db_id: int, fingerprint: Optional[ConversationFingerprint]):
+    """Store the transcript's fingerprint (computed by the caller) so later re-uploads can be answered from it"""
+    if fingerprint is not None:
+        fingerprint.conversation_id = conversation_db_id
+        db.add(fingerprint)
+
+
+def build_analysis_result(conversation_db_id: int, analysis_data: dict) -> AnalysisResult:
+    """AnalysisResult row with metrics rolled up from the analysis call ledger, and one row per call"""
+    performance = analysis_data.get('performance') or {}
+    calls = analysis_data.get('llm_calls') or []
+    errors = sorted({f"{call.get('stage')}: {call.get('error')}" for call in calls
+                     if call.get('outcome') == 'error' and call.get('error')})
+
+    analysis_result = AnalysisResult(
+        conversation_id=conversation_db_id,
+        analysis_version=ANALYSIS_VERSION,
+        model_used=analysis_data.get('model_used') or "unknown",
+        processing_time_seconds=performance.get('processing_time_seconds'),
+        analysis_success_rate=performance.get('utterance_success_rate'),
+        average_confidence_score=performance.get('average_confidence'),
+        errors_encountered=errors[:50] or None
+    )
+    for call in calls:
+        started_at = call.get('started_at')
+        analysis_result.llm_calls.append(LLMCallRecord(
+            stage=call.get('stage'),
+            operation=call.get('operation'),
+            backend=call.get('backend'),
+            model=call.get('model'),
+            started_at=datetime.fromisoformat(started_at) if started_at else None,
+            wall_seconds=call.get('wall_seconds'),
+            queued_seconds=call.get('queued_seconds'),
+            prompt_tokens=call.get('prompt_tokens'),
+            completion_tokens=call.get('completion_tokens'),
+            tokens_estimated=bool(call.get('tokens_estimated')),
+            retries=call.get('retries') or 0,
+            outcome=call.get('outcome'),
+            error=call.get('error')
+        ))
+    return analysis_result
+
+
+def utterance_row_to_dict(utterance: Utterance) -> dict:
+    """Stored utterance in the same shape as the analyzer's per-utterance output"""
+    return {
+        "utterance_id": utterance.utterance_id,
+        "speaker": utterance.speaker,
+        "sentence": utterance.sentence,
+        "sentiment": utterance.sentiment,
+        "score": utterance.sentiment_score,
+        "reason": utterance.sentiment_reason,
+        "keywords": utterance.sentiment_keywords or [],
+        "sentiment_confidence": utterance.sentiment_confidence,
+        "intent": utterance.intent,
+        "secondary_intents": utterance.secondary_intents or [],
+        "intent_confidence": utterance.intent_confidence,
+        "intent_reasoning": utterance.intent_reasoning,
+        "analysis_source": utterance.analysis_source
+    }
+
+
+def conversation_to_analysis(conversation: Conversation) -> dict:
+    """Stored conversation in the same shape as an /analyze/ result, for answering duplicate uploads"""
+    latest = max(conversation.analysis_results, key=lambda r: r.id, default=None)
+    stored_at = conversation.updated_at or conversation.created_at
+    utterances = [utterance_row_to_dict(u) for u in
+                  sorted(conversation.utterances, key=lambda u: (u.utterance_id or 0, u.id))]
+    return {
+        "conversation_id": conversation.conversation_id,
+        "total_utterances": conversation.total_utterances,
+        "speakers": conversation.speakers or [],
+        "topic_analysis": {
+            "topics": conversation.topics or [],
+            "primary_topic": conversation.primary_topic,
+            "confidence": conversation.topic_confidence,
+            "reasoning": conversation.topic_reasoning
+        },
+        "csat_analysis": {
+            "csat_score": conversation.csat_score,
+            "csat_rating": conversation.csat_rating,
+            "methodology": conversation.csat_methodology
+        },
+        "agent_performance": {
+            "overall_score": conversation.agent_performance_score,
+            "rating": conversation.agent_performance_rating,
+            "agent_sentiment_avg": conversation.agent_sentiment_avg,
+            "professionalism_score": conversation.professionalism_score,
+            "customer_sentiment_improvement": conversation.customer_sentiment_improvement
+        },
+        "utterances": utterances,
+        "analysis_timestamp": stored_at.isoformat() if stored_at else None,
+        "domain": conversation.domain,
+        "model_used": latest.model_used if latest else "unknown",
+        "raw_text": conversation.raw_text
+    }
+
+
+def store_analysis_results(db: Session, analysis_data: dict,
+                           fingerprint: Optional[ConversationFingerprint] = None) -> int:
+    try:
+        conversation = Conversation(
+            conversation_id=analysis_data.get('conversation_id'),
+            **conversation_fields(analysis_data)
+        )
+
+        db.add(conversation)
+        db.commit()
+        db.refresh(conversation)
+
+        add_utterance_rows(db, conversation.id, analysis_data)
+        add_fingerprint_row(db, conversation.id, fingerprint)
+
+        db.add(build_analysis_result(conversation.id, analysis_data))
+
+        db.commit()
+        logger.info(f"Analysis results stored for conversation {conversation.id}")
+        return conversation.id
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error storing analysis results: {str(e)}")
+        raise
+
+
+def update_analysis_results(db: Session, conversation: Conversation, analysis_data: dict,
+                            fingerprint: Optional[ConversationFingerprint] = None) -> int:
+    """
+    Replace a stored conversation's utterances and metrics with a re-analysis. Its old fingerprint is
+    dropped; fingerprint (None when the re-analysis should not answer duplicate uploads) replaces it.
+    """
+    try:
+        for name, value in conversation_fields(analysis_data).items():
+            setattr(conversation, name, value)
+
+        # delete-orphan cascade removes the old rows
+        conversation.utterances.clear()
+        conversation.fingerprints.clear()
+        db.flush()
+        add_utterance_rows(db, conversation.id, analysis_data)
+        add_fingerprint_row(db, conversation.id, fingerprint)
+
+        db.add(build_analysis_result(conversation.id, analysis_data))
+
+        db.commit()
+        logger.info(f"Re-analysis results stored for conversation {conversation.id}")
+        return conversation.id
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error updating analysis results: {str(e)}")
+        raise
+
+
+def store_analysis_batch(db: Session, analyses: List[dict],
+                         fingerprints: Optional[List[Optional[ConversationFingerprint]]] = None
+                         ) -> List[Optional[int]]:
+    """
+    Store many analyses in one transaction, with their fingerprints (one per analysis, or None). Analyses
+    whose conversation_id is already stored are skipped (None in the returned ids), so a resumed bulk run
+    can re-submit its last batch.
+    """
+    try:
+        external_ids = [a.get('conversation_id') for a in analyses]
+        existing = {row[0] for row in db.query(Conversation.conversation_id)
+                    .filter(Conversation.conversation_id.in_(external_ids)).all()}
+
+        conversations = []
+        for analysis_data in analyses:
+            if analysis_data.get('conversation_id') in existing:
+                conversations.append(None)
+                continue
+            conversation = Conversation(conversation_id=analysis_data.get('conversation_id'),
+                                        **conversation_fields(analysis_data))
+            db.add(conversation)
+            conversations.append(conversation)
+        db.flush()
+
+        for conversation, analysis_data, fingerprint in zip(conversations, analyses,
+                                                            fingerprints or [None] * len(analyses)):
+            if conversation is None:
+                continue
+            add_utterance_rows(db, conversation.id, analysis_data)
+            add_fingerprint_row(db, conversation.id, fingerprint)
+            db.add(build_analysis_result(conversation.id, analysis_data))
+
+        db.commit()
+        stored = [c.id if c is not None else None for c in conversations]
+        logger.info(f"Stored {sum(1 for i in stored if i is not None)} of {len(analyses)} analyses in bulk")
+        return stored
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error storing analysis batch: {str(e)}")
+        raise
+
+
+def stage_latency_report(db: Session, since: Optional[datetime] = None) -> List[dict]:
+    """Per-stage call counts, failures, wall/queued time and tokens from the call ledger, slowest first"""
+    query = db.query(
+        LLMCallRecord.stage,
+        func.count(LLMCallRecord.id),
+        func.sum(case((LLMCallRecord.outcome != 'ok', 1), else_=0)),
+        func.sum(LLMCallRecord.retries),
+        func.sum(LLMCallRecord.wall_seconds),
+        func.avg(LLMCallRecord.wall_seconds),
+        func.max(LLMCallRecord.wall_seconds),
+        func.sum(LLMCallRecord.queued_seconds),
+        func.sum(LLMCallRecord.prompt_tokens),
+        func.sum(LLMCallRecord.completion_tokens)
+    )
+    if since is not None:
+        query = query.filter(LLMCallRecord.started_at >= since)
+
+    report = []
+    for stage, calls, failed, retries, total, average, slowest, queued, prompt, completion in \
+            query.group_by(LLMCallRecord.stage).all():
+        report.append({
+            "stage": stage,
+            "calls": calls,
+            "failed": int(failed or 0),
+            "retries": int(retries or 0),
+            "total_wall_seconds": round(total or 0.0, 3),
+            "avg_wall_seconds": round(average or 0.0, 4),
+            "max_wall_seconds": round(slowest or 0.0, 4),
+            "total_queued_seconds": round(queued or 0.0, 3),
+            "prompt_tokens": int(prompt or 0),
+            "completion_tokens": int(completion or 0)
+        })
+    return sorted(report, key=lambda r: -r["total_wall_seconds"])
@@ -45,15 +45,151 @@ TEXT_PROCESSING_TIMEOUT=60     # 1 minute
 # AI MODEL SETTINGS
 # =============================================================================
 
+# LLM backends: "groq" or "openai" (any OpenAI-compatible server such as llama.cpp or vLLM)
+LLM_BACKEND=groq
+LLM_TRANSCRIPTION_BACKEND=groq
+# Backends that take over while the primary one's circuit is open (empty = fail fast)
+LLM_FALLBACK_BACKEND=
+LLM_TRANSCRIPTION_FALLBACK_BACKEND=
+
 # Groq Models
 GROQ_CHAT_MODEL=llama3-8b-8192
 GROQ_WHISPER_MODEL=whisper-large-v3-turbo
+GROQ_MAX_CONCURRENCY=0  # 0 = no per-backend cap (rate limits still apply)
+
+# OpenAI-compatible backend (used when LLM_BACKEND=openai)
+OPENAI_COMPAT_BASE_URL=http://localhost:8080/v1
+OPENAI_COMPAT_API_KEY=not-needed
+OPENAI_COMPAT_CHAT_MODEL=llama-3.1-8b-instruct
+OPENAI_COMPAT_WHISPER_MODEL=whisper-1
+OPENAI_COMPAT_MAX_CONNECTIONS=16
+OPENAI_COMPAT_MAX_KEEPALIVE=16
+OPENAI_COMPAT_TIMEOUT=120
+OPENAI_COMPAT_MAX_CONCURRENCY=8
+OPENAI_COMPAT_RPM=0
+OPENAI_COMPAT_TPM=0
 
 # Analysis Parameters
 SENTIMENT_TEMPERATURE=0.2
 INTENT_TEMPERATURE=0.2
 TOPIC_TEMPERATURE=0.2
 
+# Maximum concurrent LLM calls per analysis (topic, sentiment and intent share one limit)
+ANALYZER_CONCURRENCY=8
+
+# Bulk corpus CLI (python -m analyzer.corpus)
+CORPUS_TEXT_WORKERS=4
+CORPUS_AUDIO_WORKERS=1
+CORPUS_FLUSH_EVERY=50      # results per output/checkpoint/database flush
+CORPUS_FLUSH_SECONDS=10
+
+# Batched classification (one request per window of utterances instead of two per utterance)
+ANALYZER_BATCH_MODE=false
+ANALYZER_BATCH_TOKEN_BUDGET=1500
+ANALYZER_BATCH_MAX_ITEMS=25
+
+# Cross-request micro-batching: pool sentiment/intent work from all in-flight analyses into shared requests
+MICROBATCH_ENABLED=false
+MICROBATCH_WINDOW_MS=25
+MICROBATCH_TOKEN_BUDGET=1500
+MICROBATCH_MAX_ITEMS=25
+
+# Model cascade: the chat model answers first, low-confidence or contradictory results go to the large model
+CASCADE_ENABLED=false
+CASCADE_LARGE_MODEL=llama-3.3-70b-versatile
+CASCADE_LARGE_BACKEND=   # empty = the chat backend
+CASCADE_CONFIDENCE_THRESHOLD=0.6
+CASCADE_ESCALATE_CONFLICTS=true
+
+# Topic detection for long conversations: above TOPIC_SINGLE_CALL_TOKENS the transcript is split
+# into chunks of ~TOPIC_CHUNK_TOKENS, classified concurrently and merged
+TOPIC_SINGLE_CALL_TOKENS=6000
+TOPIC_CHUNK_TOKENS=2500
+TOPIC_MAX_CHUNKS=24
+TOPIC_MIN_SHARE=0.15
+
+# Per-domain keyword additions for agent scoring / speaker role mapping (extend the built-in lexicons)
+KEYWORD_LEXICONS={}
+
+# Local pre-classifier for trivially classifiable utterances ("Okay.", "Please hold", order numbers)
+PRECLASSIFIER_ENABLED=true
+PRECLASSIFIER_CONFIDENCE_THRESHOLD=0.9
+
+# Re-requests per call when a sentiment/intent/topic reply cannot be repaired locally (0 = use the default result)
+LLM_DECODE_RETRIES=1
+
+# Answer re-uploads of a stored transcript with its analysis (near duplicates: MinHash similarity >= threshold)
+DEDUP_ENABLED=true
+DEDUP_NEAR_THRESHOLD=0.9
+
+# /analyze/ time budget when the client sends no deadline_seconds (0 = none); at 15% left, unfinished
+# utterances are answered locally and finished in the background
+ANALYSIS_DEADLINE_SECONDS=0
+ANALYSIS_DEGRADE_RESERVE=0.15
+ANALYSIS_BACKGROUND_COMPLETION=true
+DISCONNECT_POLL_SECONDS=0.5
+
+# LLM result cache (in-process LRU in front of the llm_cache_entries table)
+LLM_CACHE_ENABLED=true
+LLM_CACHE_MEMORY_SIZE=10000
+LLM_CACHE_TTL_SECONDS=2592000  # 30 days
+LLM_CACHE_MAX_ROWS=200000
+
+# Semantic cache: reuse the answer of a near-identical utterance (cosine >= threshold on local hashed
+# n-gram embeddings, same model and negation); the index is saved beside the SQLite database
+SEMANTIC_CACHE_ENABLED=false
+SEMANTIC_CACHE_THRESHOLD=0.9
+SEMANTIC_CACHE_DIM=512
+SEMANTIC_CACHE_MAX_ENTRIES=50000
+SEMANTIC_CACHE_MIN_CONFIDENCE=0.6
+SEMANTIC_CACHE_SAVE_EVERY=200
+SEMANTIC_CACHE_PATH=   # empty = speech2sense.semantic.npz next to the database
+
+# Distilled classifier trained from stored LLM labels (python -m analyzer.distilled train); utterances
+# it answers with calibrated confidence >= threshold skip the LLM (0 = answer everything locally)
+DISTILLED_ENABLED=false
+DISTILLED_CONFIDENCE_THRESHOLD=0.9
+DISTILLED_MODEL_VERSION=latest
+DISTILLED_MODEL_DIR=   # empty = distilled_models/ next to the database
+DISTILLED_FEATURE_DIM=262144
+
+# LLM gateway: per-model rate limits (0 = unlimited), retries and the Groq HTTP connection pool
+GATEWAY_DEFAULT_RPM=30
+GATEWAY_DEFAULT_TPM=30000
+GATEWAY_MODEL_LIMITS={"whisper-large-v3-turbo": {"rpm": 20, "tpm": 0}}
+GATEWAY_BURST_SECONDS=5
+GATEWAY_MAX_RETRIES=5
+GATEWAY_BACKOFF_BASE=0.5
+GATEWAY_BACKOFF_MAX=30
+GATEWAY_MAX_CONNECTIONS=50
+GATEWAY_MAX_KEEPALIVE=20
+GATEWAY_KEEPALIVE_EXPIRY=60
+GATEWAY_TIMEOUT=60
+
+# Hedged requests: duplicate a call still running past the model's latency percentile
+GATEWAY_HEDGE_ENABLED=true
+GATEWAY_HEDGE_PERCENTILE=95
+GATEWAY_HEDGE_MIN_DELAY=1.0
+GATEWAY_HEDGE_MAX_RATE=0.05   # at most 5% extra requests
+GATEWAY_HEDGE_BURST=5
+GATEWAY_HEDGE_WINDOW=500
+GATEWAY_HEDGE_MIN_SAMPLES=20
+GATEWAY_HEDGE_THREADS=16
+
+# Circuit breaker per backend:model: open on BREAKER_ERROR_RATE failures over the rolling window
+BREAKER_ENABLED=true
+BREAKER_WINDOW_SECONDS=60
+BREAKER_MIN_CALLS=10
+BREAKER_ERROR_RATE=0.5
+BREAKER_OPEN_SECONDS=30
+BREAKER_HALF_OPEN_PROBES=1
+
+# Background job queue (POST /jobs, GET /jobs/{id})
+JOB_WORKERS=2
+JOB_TIMEOUT_SECONDS=900
+JOB_UPLOAD_DIR=./job_uploads
+JOB_PROGRESS_INTERVAL=1.0
+
 # =============================================================================
 # SECURITY SETTINGS (Production)
 # =============================================================================
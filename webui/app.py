@@ -1074,6 +1074,11 @@ def create_detailed_metrics_table(df):
         'Agent Utterances': len(df[df['speaker'] == 'Agent'])
     }
 
+    if 'analysis_source' in df.columns:
+        metrics['Locally Classified Utterances'] = len(df[df['analysis_source'] == 'lexicon'])
+        metrics['Semantic Cache Answers'] = len(df[df['analysis_source'] == 'semantic'])
+        metrics['Distilled Model Answers'] = len(df[df['analysis_source'] == 'distilled'])
+
     metrics_df = pd.DataFrame(list(metrics.items()), columns=['📊 Metric', '📈 Value'])
     return metrics_df
 
@@ -1391,6 +1396,8 @@ def display_analysis_results(data):
         # Display filtered data
         display_columns = ['utterance_id', 'speaker', 'sentence', 'sentiment', 'score',
                            'intent', 'sentiment_confidence', 'intent_confidence']
+        if 'analysis_source' in filtered_df.columns:
+            display_columns.append('analysis_source')
 
         if not filtered_df.empty:
             st.dataframe(
@@ -1731,9 +1738,12 @@ def main():
 
                         # Make API request with longer timeout for audio files
                         timeout = 480 if is_audio_upload else 60
+                        # Leave the API time to answer before this client gives up; utterances it
+                        # cannot analyze by then come back degraded instead of timing out the request
                         response = requests.post(
                             f"{API_URL}/analyze/",
                             files=files,
+                            data={"deadline_seconds": timeout - 10},
                             timeout=timeout
                         )
 
@@ -1742,6 +1752,11 @@ def main():
 
                             if result.get('status') == 'success':
                                 st.success("✅ Analysis completed successfully!")
+                                degradation = (result.get('data') or {}).get('degradation') or {}
+                                if degradation.get('degraded'):
+                                    pending = " They are being finished in the background." \
+                                        if degradation.get('pending_completion') else ""
+                                    st.warning(f"⏱️ {result.get('message')}.{pending}")
 
                                 # Store results in session state
                                 st.session_state['analysis_results'] = result.get('data')